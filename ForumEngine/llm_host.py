@@ -8,7 +8,6 @@
 5. 推动分析流程向目标高效推进
 """
 
-from openai import OpenAI
 import sys
 import os
 from typing import List, Dict, Any, Optional
@@ -20,6 +19,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # 使用统一的配置热重载工具
 from utils.config_reloader import get_config_value
+# 共享连接池的OpenAI兼容客户端(与各引擎复用长连接)
+from utils.http_client import create_openai_client
 
 # 添加utils目录到Python路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -60,7 +61,7 @@ class ForumHost:
 
         self.base_url = base_url or get_config_value('LLM_BASE_URL')
 
-        self.client = OpenAI(
+        self.client = create_openai_client(
             api_key=self.api_key,
             base_url=self.base_url
         )
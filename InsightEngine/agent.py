@@ -20,8 +20,15 @@ from .nodes import (
     ReportFormattingNode
 )
 from .state import State
-from .tools import create_training_data_search, DBResponse
+from .tools import create_training_data_search, BaseTrainingDataSearch, DBResponse
 from .utils import Config, load_config, format_search_results_for_prompt
+from utils.run_journal import RunJournal
+from utils.convergence import ReflectionConvergence
+from utils.state_snapshot import SNAPSHOT_SUFFIX
+
+
+# 检查点日志按引擎分目录存放
+JOURNAL_ENGINE = "insight"
 
 
 class SportsScientistAgent:
@@ -32,12 +39,14 @@ class SportsScientistAgent:
     核心能力:访问本地训练日志,分析心率、配速、距离、训练负荷等基础指标
     """
 
-    def __init__(self, config: Optional[Config] = None):
+    def __init__(self, config: Optional[Config] = None, search_agency: Optional[BaseTrainingDataSearch] = None):
         """
         初始化Sports Scientist Agent
 
         Args:
             config: 配置对象，如果不提供则自动加载
+            search_agency: 使用指定的训练数据查询工具（如基准测试中的离线桩实现），
+                           指定后不再按配置热更新数据源
         """
         # 加载配置
         self.config = config or load_config()
@@ -72,7 +81,8 @@ class SportsScientistAgent:
             os.environ["DB_CHARSET"] = self.config.db_charset
         
         # 初始化搜索工具集 (根据config.py的TRAINING_DATA_SOURCE自动选择)
-        self.search_agency = create_training_data_search()
+        self._fixed_search_agency = search_agency is not None
+        self.search_agency = search_agency or create_training_data_search(user_id=self.config.user_id)
         self._current_data_source = self.search_agency.data_source  # 记录当前数据源
 
         # 初始化节点
@@ -80,6 +90,9 @@ class SportsScientistAgent:
 
         # 状态
         self.state = State()
+        
+        # 当前运行的检查点日志
+        self.journal: Optional[RunJournal] = None
 
         # 确保输出目录存在
         os.makedirs(self.config.output_dir, exist_ok=True)
@@ -87,6 +100,7 @@ class SportsScientistAgent:
         print(f"Sports Scientist Agent (运动科学家) 已初始化")
         print(f"使用LLM: {self.llm_client.get_model_info()}")
         print(f"训练数据源: {self.search_agency.data_source.upper()}")
+        print(f"训练数据用户: {self.search_agency.user_id}")
         print(f"支持的查询工具: {', '.join(self.search_agency.get_supported_tools())}")
 
         # 根据数据源输出不同的分析能力描述
@@ -101,9 +115,12 @@ class SportsScientistAgent:
 
         每次执行查询前调用此方法,确保使用最新的数据源配置
         """
+        if self._fixed_search_agency:
+            return
+
         try:
             # 重新创建搜索工具 (内部会通过importlib.reload读取最新配置)
-            new_agency = create_training_data_search()
+            new_agency = create_training_data_search(user_id=self.config.user_id)
             new_data_source = new_agency.data_source
 
             # 检查数据源是否变化
@@ -178,17 +195,22 @@ class SportsScientistAgent:
                 - "get_training_stats": 获取训练统计数据
                 - "search_by_distance_range": 按距离范围查询
                 - "search_by_heart_rate": 按心率区间查询
+                - "search_similar_trainings": 查询与指定训练最相似的训练
                 - "search_by_training_load": 按训练负荷查询 (Garmin专属)
                 - "search_by_power_zone": 按功率区间查询 (Garmin专属)
                 - "get_training_effect_analysis": 训练效果分析 (Garmin专属)
+                - "get_load_model": 训练负荷模型CTL/ATL/TSB/ACWR (Garmin专属)
+                - "get_heart_rate_analysis": 心率时间序列分析 (Keep专属)
             query: 查询描述（用于日志记录）
             **kwargs: 额外参数：
                 - days: 最近天数
                 - start_date, end_date: 日期范围
                 - min_distance_km, max_distance_km: 距离范围
                 - min_avg_hr, max_avg_hr: 心率范围
+                - activity_id, k: 参考训练记录ID和相似训练数量
                 - min_load, max_load: 训练负荷范围 (Garmin)
                 - min_avg_power, max_avg_power: 功率范围 (Garmin)
+                - max_hr, resting_hr: 最大/静息心率 (Keep心率分析)
                 - limit: 结果数量限制
 
         Returns:
@@ -264,6 +286,18 @@ class SportsScientistAgent:
                     limit=limit
                 )
 
+            elif tool_name == "search_similar_trainings":
+                activity_id = kwargs.get("activity_id")
+                if activity_id is None:
+                    raise ValueError("search_similar_trainings工具需要activity_id参数")
+
+                k = kwargs.get("k") or 5
+
+                response = self.search_agency.search_similar_trainings(
+                    activity_id=activity_id,
+                    k=k
+                )
+
             elif tool_name == "search_by_training_load":
                 # Garmin专属: 按训练负荷查询
                 min_load = kwargs.get("min_load")
@@ -304,6 +338,21 @@ class SportsScientistAgent:
                     end_date=end_date
                 )
 
+            elif tool_name == "get_load_model":
+                # Garmin专属: 训练负荷模型(预计算序列)
+                days = kwargs.get("days") or 42
+
+                response = self.search_agency.get_load_model(days=days)
+
+            elif tool_name == "get_heart_rate_analysis":
+                # Keep专属: 心率时间序列分析
+                response = self.search_agency.get_heart_rate_analysis(
+                    days=kwargs.get("days") or 30,
+                    limit=kwargs.get("limit") or 20,
+                    max_hr=kwargs.get("max_hr"),
+                    resting_hr=kwargs.get("resting_hr")
+                )
+
             else:
                 print(f"    ⚠️ 未知的查询工具: {tool_name}")
                 raise ValueError(f"不支持的工具类型: {tool_name}")
@@ -311,6 +360,8 @@ class SportsScientistAgent:
             # 输出查询结果统计
             if response.results:
                 print(f"  ✅ 找到 {len(response.results)} 条训练记录")
+            elif response.statistics:
+                print(f"  ✅ 获取到统计结果")
             else:
                 print(f"  ℹ️  未找到符合条件的训练记录")
 
@@ -337,15 +388,50 @@ class SportsScientistAgent:
         print(f"分析目标: {query}")
         print(f"{'='*60}")
         
+        self.state = State()
+        self._open_journal()
+        self._checkpoint("record_start", query)
+        
+        return self._run_research(query, save_report)
+    
+    def resume(self, run_id: str, save_report: bool = True) -> str:
+        """
+        从检查点恢复中断的研究,跳过已完成的段落和反思轮次
+        
+        Args:
+            run_id: 中断运行的ID(研究开始时打印,也可用 utils.run_journal.list_runs 查看)
+            save_report: 是否保存报告到文件
+        
+        Returns:
+            最终报告内容
+        """
+        journal = RunJournal(JOURNAL_ENGINE, run_id)
+        if not journal.exists():
+            raise FileNotFoundError(f"检查点日志不存在: {journal.path}")
+        self.state = journal.replay(State())
+        self.journal = journal
+        
+        print(f"\n{'='*60}")
+        print(f"从检查点恢复研究: {self.state.query} (run_id: {run_id})")
+        print(f"已完成段落: {self.state.get_completed_paragraphs_count()}/{self.state.get_total_paragraphs_count()}")
+        print(f"{'='*60}")
+        
+        return self._run_research(self.state.query, save_report)
+    
+    def _run_research(self, query: str, save_report: bool) -> str:
+        """依次执行研究步骤(检查点中已完成的步骤跳过)"""
+        # 按本次运行统计LLM用量(含服务商报告的前缀缓存命中)
+        self.llm_client.usage.reset()
         try:
             # Step 1: 生成报告结构
-            self._generate_report_structure(query)
+            if not self.state.paragraphs:
+                self._generate_report_structure(query)
             
             # Step 2: 处理每个段落
             self._process_paragraphs()
             
             # Step 3: 生成最终报告
-            final_report = self._generate_final_report()
+            final_report = self.state.final_report or self._generate_final_report()
             
             # Step 4: 保存报告
             if save_report:
@@ -353,6 +439,7 @@ class SportsScientistAgent:
             
             print(f"\n{'='*60}")
             print("Sports Scientist: 训练数据分析完成")
+            print(self.llm_client.usage.format_summary())
             print(f"{'='*60}")
 
             return final_report
@@ -361,6 +448,21 @@ class SportsScientistAgent:
             print(f"Sports Scientist: 分析过程中发生错误: {str(e)}")
             raise e
     
+    def _open_journal(self):
+        """为新的研究运行创建检查点日志(配置关闭时不记录)"""
+        self.journal = RunJournal(JOURNAL_ENGINE) if self.config.enable_checkpoints else None
+        if self.journal:
+            print(f"检查点日志: {self.journal.path} (run_id: {self.journal.run_id})")
+    
+    def _checkpoint(self, method: str, *args):
+        """写入检查点;写入失败只打印警告,不中断研究"""
+        if not self.journal:
+            return
+        try:
+            getattr(self.journal, method)(*args)
+        except OSError as e:
+            print(f"写入检查点失败: {str(e)}")
+    
     def _generate_report_structure(self, query: str):
         """生成训练分析报告结构"""
         print(f"\n[步骤 1] 构建科学分析框架...")
@@ -374,26 +476,40 @@ class SportsScientistAgent:
         print(f"分析框架已生成，共 {len(self.state.paragraphs)} 个数据模块:")
         for i, paragraph in enumerate(self.state.paragraphs, 1):
             print(f"  {i}. {paragraph.title}")
+        
+        self._checkpoint("record_structure", self.state)
     
     def _process_paragraphs(self):
         """处理所有数据分析模块"""
         total_paragraphs = len(self.state.paragraphs)
 
         for i in range(total_paragraphs):
+            paragraph = self.state.paragraphs[i]
+            if paragraph.research.is_completed:
+                print(f"\n[步骤 2.{i+1}] 已完成(检查点),跳过: {paragraph.title}")
+                continue
+            
             print(f"\n[步骤 2.{i+1}] 数据模块分析: {self.state.paragraphs[i].title}")
             print("-" * 50)
             
-            # 初始搜索和总结
-            self._initial_search_and_summary(i)
+            # 初始搜索和总结(恢复运行时已有总结则跳过)
+            if not paragraph.research.latest_summary:
+                self._initial_search_and_summary(i)
             
             # 反思循环
             self._reflection_loop(i)
             
             # 标记模块完成
             self.state.paragraphs[i].research.mark_completed()
+            self._checkpoint("record_paragraph_completed", self.state, i)
 
             progress = (i + 1) / total_paragraphs * 100
             print(f"数据模块分析完成 ({progress:.1f}%)")
+        
+        # 反思收敛统计
+        progress = self.state.get_progress_summary()
+        if progress["reflections_saved"]:
+            print(f"\n反思收敛: {progress['early_stopped_paragraphs']} 个段落提前结束反思, 共节省 {progress['reflections_saved']} 轮")
     
     def _initial_search_and_summary(self, paragraph_index: int):
         """执行初始数据查询和量化分析"""
@@ -488,6 +604,18 @@ class SportsScientistAgent:
                 search_tool = "search_recent_trainings"
                 search_kwargs = {"days": 30, "limit": 50}
 
+        # search_similar_trainings: 需要activity_id
+        elif search_tool == "search_similar_trainings":
+            activity_id = search_output.get("activity_id")
+            if activity_id is not None:
+                search_kwargs["activity_id"] = activity_id
+                search_kwargs["k"] = search_output.get("k") or 5
+                print(f"  - 参考训练: {activity_id}")
+            else:
+                print(f"    ⚠️ 缺少activity_id参数,改用search_recent_trainings")
+                search_tool = "search_recent_trainings"
+                search_kwargs = {"days": 30, "limit": 50}
+
         # search_by_training_load: 需要min_load (Garmin专属)
         elif search_tool == "search_by_training_load":
             min_load = search_output.get("min_load")
@@ -524,6 +652,19 @@ class SportsScientistAgent:
                 search_kwargs["end_date"] = end_date
             print(f"  - 获取训练效果分析")
 
+        # get_load_model: 可选days (Garmin专属)
+        elif search_tool == "get_load_model":
+            search_kwargs["days"] = search_output.get("days") or 42
+            print(f"  - 获取最近 {search_kwargs['days']} 天训练负荷模型")
+
+        # get_heart_rate_analysis: 全部可选 (Keep专属)
+        elif search_tool == "get_heart_rate_analysis":
+            search_kwargs["days"] = search_output.get("days") or 30
+            search_kwargs["limit"] = search_output.get("limit") or 20
+            search_kwargs["max_hr"] = search_output.get("max_hr")
+            search_kwargs["resting_hr"] = search_output.get("resting_hr")
+            print(f"  - 分析最近 {search_kwargs['days']} 天心率时间序列")
+
         else:
             print(f"    ⚠️ 未知工具 {search_tool},使用search_recent_trainings")
             search_tool = "search_recent_trainings"
@@ -552,6 +693,7 @@ class SportsScientistAgent:
 
                 title = f"[{sport_type}] {start_time.strftime('%Y-%m-%d %H:%M')} - {distance_km}"
                 content = (
+                    f"记录ID: {result.id}\n"
                     f"运动类型: {sport_type}\n"
                     f"开始时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
                     f"持续时间: {duration_min}\n"
@@ -574,6 +716,8 @@ class SportsScientistAgent:
                     'author': result.user_id,
                     'engagement': calories or 0
                 })
+        if search_response and search_response.statistics:
+            search_results.append(self._statistics_to_search_result(search_response))
         
         if search_results:
             print(f"  - 找到 {len(search_results)} 个搜索结果")
@@ -601,14 +745,20 @@ class SportsScientistAgent:
         self.state = self.first_summary_node.mutate_state(
             summary_input, self.state, paragraph_index
         )
+        self._checkpoint("record_summary", self.state, paragraph_index, "initial")
         
         print("  - 初始总结完成")
     
     def _reflection_loop(self, paragraph_index: int):
         """执行反思循环"""
         paragraph = self.state.paragraphs[paragraph_index]
+        convergence = ReflectionConvergence(
+            paragraph.research.search_history,
+            min_summary_change=self.config.reflection_min_summary_change
+        )
         
-        for reflection_i in range(self.config.max_reflections):
+        # 恢复运行时从已完成的反思轮次之后继续
+        for reflection_i in range(paragraph.research.reflection_iteration, self.config.max_reflections):
             print(f"  - 反思 {reflection_i + 1}/{self.config.max_reflections}...")
             
             # 准备反思输入
@@ -698,6 +848,18 @@ class SportsScientistAgent:
                     search_tool = "search_recent_trainings"
                     search_kwargs = {"days": 30, "limit": 50}
 
+            # search_similar_trainings: 需要activity_id
+            elif search_tool == "search_similar_trainings":
+                activity_id = reflection_output.get("activity_id")
+                if activity_id is not None:
+                    search_kwargs["activity_id"] = activity_id
+                    search_kwargs["k"] = reflection_output.get("k") or 5
+                    print(f"    参考训练: {activity_id}")
+                else:
+                    print(f"      ⚠️ 缺少activity_id参数,改用search_recent_trainings")
+                    search_tool = "search_recent_trainings"
+                    search_kwargs = {"days": 30, "limit": 50}
+
             # search_by_training_load: 需要min_load (Garmin专属)
             elif search_tool == "search_by_training_load":
                 min_load = reflection_output.get("min_load")
@@ -734,6 +896,19 @@ class SportsScientistAgent:
                     search_kwargs["end_date"] = end_date
                 print(f"    获取训练效果分析")
 
+            # get_load_model: 可选days (Garmin专属)
+            elif search_tool == "get_load_model":
+                search_kwargs["days"] = reflection_output.get("days") or 42
+                print(f"    获取最近 {search_kwargs['days']} 天训练负荷模型")
+
+            # get_heart_rate_analysis: 全部可选 (Keep专属)
+            elif search_tool == "get_heart_rate_analysis":
+                search_kwargs["days"] = reflection_output.get("days") or 30
+                search_kwargs["limit"] = reflection_output.get("limit") or 20
+                search_kwargs["max_hr"] = reflection_output.get("max_hr")
+                search_kwargs["resting_hr"] = reflection_output.get("resting_hr")
+                print(f"    分析最近 {search_kwargs['days']} 天心率时间序列")
+
             else:
                 print(f"      ⚠️ 未知工具 {search_tool},使用search_recent_trainings")
                 search_tool = "search_recent_trainings"
@@ -762,6 +937,7 @@ class SportsScientistAgent:
 
                     title = f"[{sport_type}] {start_time.strftime('%Y-%m-%d %H:%M')} - {distance_km}"
                     content = (
+                        f"记录ID: {result.id}\n"
                         f"运动类型: {sport_type}\n"
                         f"开始时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
                         f"持续时间: {duration_min}\n"
@@ -784,6 +960,8 @@ class SportsScientistAgent:
                         'author': result.user_id,
                         'engagement': calories or 0
                     })
+            if search_response and search_response.statistics:
+                search_results.append(self._statistics_to_search_result(search_response))
             
             if search_results:
                 print(f"    找到 {len(search_results)} 个反思搜索结果")
@@ -793,6 +971,12 @@ class SportsScientistAgent:
             else:
                 print("    未找到反思搜索结果")
             
+            stop_reason = convergence.check_results(search_results)
+            if stop_reason:
+                self._stop_reflection(paragraph, reflection_i, stop_reason)
+                break
+            convergence.record_round([search_query], search_results)
+            
             # 更新搜索历史
             paragraph.research.add_search_results(search_query, search_results)
             
@@ -808,12 +992,48 @@ class SportsScientistAgent:
             }
             
             # 更新状态
+            previous_summary = paragraph.research.latest_summary
             self.state = self.reflection_summary_node.mutate_state(
                 reflection_summary_input, self.state, paragraph_index
             )
+            self._checkpoint("record_summary", self.state, paragraph_index, "reflection")
             
             print(f"    反思 {reflection_i + 1} 完成")
+            
+            stop_reason = convergence.check_summary(previous_summary, paragraph.research.latest_summary)
+            if stop_reason:
+                self._stop_reflection(paragraph, reflection_i + 1, stop_reason)
+                break
     
+    def _stop_reflection(self, paragraph, completed_rounds: int, reason: str):
+        """提前结束反思循环,记录原因和节省的轮数"""
+        saved = self.config.max_reflections - completed_rounds
+        if saved <= 0:
+            return
+        paragraph.research.record_early_stop(reason, saved)
+        print(f"    反思提前结束: {reason} (节省 {saved} 轮)")
+    
+    def _statistics_to_search_result(self, search_response: DBResponse) -> Dict[str, Any]:
+        """
+        将统计类工具的结果(statistics)转换为兼容格式的单条搜索结果
+
+        统计类工具(get_training_stats、get_load_model等)返回的是预先计算好的汇总,
+        以紧凑JSON的形式整体交给LLM,而不是逐条训练记录
+        """
+        content = json.dumps(search_response.statistics, ensure_ascii=False, default=str)
+        return {
+            'title': f"[统计] {search_response.tool_name} {json.dumps(search_response.parameters, ensure_ascii=False)}",
+            'url': "",
+            'content': content,
+            'score': None,
+            'raw_content': content,
+            'published_date': None,
+            'platform': "训练记录数据库",
+            'content_type': "statistics",
+            'author': None,
+            'engagement': None
+        }
+
     def _generate_final_report(self) -> str:
         """生成最终报告"""
         print(f"\n[步骤 3] 生成最终报告...")
@@ -838,6 +1058,7 @@ class SportsScientistAgent:
         # 更新状态
         self.state.final_report = final_report
         self.state.mark_completed()
+        self._checkpoint("record_final_report", final_report)
         
         print("最终报告生成完成")
         return final_report
@@ -860,7 +1081,8 @@ class SportsScientistAgent:
         
         # 保存状态（如果配置允许）
         if self.config.save_intermediate_states:
-            state_filename = f"state_{query_safe}_{timestamp}.json"
+            state_ext = SNAPSHOT_SUFFIX if self.config.state_format == "compact" else ".json"
+            state_filename = f"state_{query_safe}_{timestamp}{state_ext}"
             state_filepath = os.path.join(self.config.output_dir, state_filename)
             self.state.save_to_file(state_filepath)
             print(f"状态已保存到: {state_filepath}")
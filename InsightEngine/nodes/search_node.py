@@ -16,6 +16,7 @@ from ..utils.text_processing import (
     extract_clean_response,
     fix_incomplete_json
 )
+from utils.prompt_layout import build_user_message
 
 
 class FirstSearchNode(BaseNode):
@@ -57,20 +58,14 @@ class FirstSearchNode(BaseNode):
             if not self.validate_input(input_data):
                 raise ValueError("输入数据格式错误，需要包含title和content字段")
             
-            # 准备输入数据
-            if isinstance(input_data, str):
-                message = input_data
-            else:
-                message = json.dumps(input_data, ensure_ascii=False)
-
-            # 添加当前时间信息
+            # 当前日期拼接在输入之后,使系统提示词和段落规划保持为稳定前缀
             current_date = datetime.now().strftime("%Y-%m-%d")
-            time_context = f"【当前日期: {current_date}】\n\n{message}"
+            message = build_user_message(input_data, trailing_context=f"【当前日期: {current_date}】")
 
             self.log_info("正在生成首次搜索查询")
 
             # 调用LLM
-            response = self.llm_client.invoke(SYSTEM_PROMPT_FIRST_SEARCH, time_context)
+            response = self.llm_client.invoke(SYSTEM_PROMPT_FIRST_SEARCH, message)
             
             # 处理响应
             processed_response = self.process_output(response)
@@ -148,10 +143,13 @@ class FirstSearchNode(BaseNode):
                     "search_by_date_range": "日期范围训练查询",
                     "search_by_distance_range": "距离范围训练查询",
                     "search_by_heart_rate": "心率范围训练查询",
+                    "search_similar_trainings": "相似训练查询",
                     "search_by_training_load": "训练负荷范围查询",
                     "search_by_power_zone": "功率区间训练查询",
                     "get_training_stats": "训练统计数据查询",
-                    "get_training_effect_analysis": "训练效果分析查询"
+                    "get_training_effect_analysis": "训练效果分析查询",
+                    "get_load_model": "训练负荷模型查询",
+                    "get_heart_rate_analysis": "心率时间序列分析"
                 }
                 search_query = tool_name_map.get(search_tool, f"{search_tool}查询")
                 reasoning = f"基于{search_tool}工具进行数据查询"
@@ -173,6 +171,10 @@ class FirstSearchNode(BaseNode):
                 "max_distance_km": result.get("max_distance_km"),
                 "min_avg_hr": result.get("min_avg_hr"),
                 "max_avg_hr": result.get("max_avg_hr"),
+                "max_hr": result.get("max_hr"),
+                "resting_hr": result.get("resting_hr"),
+                "activity_id": result.get("activity_id"),
+                "k": result.get("k"),
                 "limit": result.get("limit")
             }
 
@@ -237,20 +239,14 @@ class ReflectionNode(BaseNode):
             if not self.validate_input(input_data):
                 raise ValueError("输入数据格式错误，需要包含title、content和paragraph_latest_state字段")
             
-            # 准备输入数据
-            if isinstance(input_data, str):
-                message = input_data
-            else:
-                message = json.dumps(input_data, ensure_ascii=False)
-
-            # 添加当前时间信息
+            # 当前日期拼接在输入之后,使系统提示词和段落规划保持为稳定前缀
             current_date = datetime.now().strftime("%Y-%m-%d")
-            time_context = f"【当前日期: {current_date}】\n\n{message}"
+            message = build_user_message(input_data, trailing_context=f"【当前日期: {current_date}】")
 
             self.log_info("正在进行反思并生成新搜索查询")
 
             # 调用LLM
-            response = self.llm_client.invoke(SYSTEM_PROMPT_REFLECTION, time_context)
+            response = self.llm_client.invoke(SYSTEM_PROMPT_REFLECTION, message)
             
             # 处理响应
             processed_response = self.process_output(response)
@@ -328,10 +324,13 @@ class ReflectionNode(BaseNode):
                     "search_by_date_range": "日期范围训练查询",
                     "search_by_distance_range": "距离范围训练查询",
                     "search_by_heart_rate": "心率范围训练查询",
+                    "search_similar_trainings": "相似训练查询",
                     "search_by_training_load": "训练负荷范围查询",
                     "search_by_power_zone": "功率区间训练查询",
                     "get_training_stats": "训练统计数据查询",
-                    "get_training_effect_analysis": "训练效果分析查询"
+                    "get_training_effect_analysis": "训练效果分析查询",
+                    "get_load_model": "训练负荷模型查询",
+                    "get_heart_rate_analysis": "心率时间序列分析"
                 }
                 search_query = tool_name_map.get(search_tool, f"{search_tool}查询")
                 reasoning = f"基于{search_tool}工具进行数据查询"
@@ -353,6 +352,10 @@ class ReflectionNode(BaseNode):
                 "max_distance_km": result.get("max_distance_km"),
                 "min_avg_hr": result.get("min_avg_hr"),
                 "max_avg_hr": result.get("max_avg_hr"),
+                "max_hr": result.get("max_hr"),
+                "resting_hr": result.get("resting_hr"),
+                "activity_id": result.get("activity_id"),
+                "k": result.get("k"),
                 "limit": result.get("limit")
             }
 
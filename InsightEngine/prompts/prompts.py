@@ -19,8 +19,10 @@ from .tool_descriptions import (
     get_data_features_description,
     get_report_modules_suggestion,
     COMMON_PARAM_REQUIREMENTS,
+    KEEP_PARAM_REQUIREMENTS,
     GARMIN_PARAM_REQUIREMENTS,
     COMMON_QUERY_EXAMPLES,
+    KEEP_QUERY_EXAMPLES,
     GARMIN_QUERY_EXAMPLES
 )
 
@@ -54,13 +56,17 @@ output_schema_first_search = {
         "search_query": {"type": "string"},
         "search_tool": {"type": "string"},
         "reasoning": {"type": "string"},
-        "days": {"type": "integer", "description": "最近N天,search_recent_trainings工具必需"},
+        "days": {"type": "integer", "description": "最近N天,search_recent_trainings工具必需,get_load_model/get_heart_rate_analysis工具可选"},
         "start_date": {"type": "string", "description": "开始日期,格式YYYY-MM-DD,search_by_date_range和get_training_stats工具可能需要"},
         "end_date": {"type": "string", "description": "结束日期,格式YYYY-MM-DD,search_by_date_range和get_training_stats工具可能需要"},
         "min_distance_km": {"type": "number", "description": "最小距离(公里),search_by_distance_range工具必需"},
         "max_distance_km": {"type": "number", "description": "最大距离(公里),search_by_distance_range工具可选"},
         "min_avg_hr": {"type": "integer", "description": "最小平均心率,search_by_heart_rate工具必需"},
         "max_avg_hr": {"type": "integer", "description": "最大平均心率,search_by_heart_rate工具可选"},
+        "activity_id": {"type": "string", "description": "参考训练的记录ID,search_similar_trainings工具必需"},
+        "k": {"type": "integer", "description": "返回的相似训练数量,search_similar_trainings工具可选"},
+        "max_hr": {"type": "integer", "description": "最大心率,get_heart_rate_analysis工具可选"},
+        "resting_hr": {"type": "integer", "description": "静息心率,get_heart_rate_analysis工具可选"},
         "limit": {"type": "integer", "description": "返回记录数量限制,所有工具可选"}
     },
     "required": ["search_query", "search_tool", "reasoning"]
@@ -112,6 +118,10 @@ output_schema_reflection = {
         "max_distance_km": {"type": "number", "description": "最大距离(公里)"},
         "min_avg_hr": {"type": "integer", "description": "最小平均心率"},
         "max_avg_hr": {"type": "integer", "description": "最大平均心率"},
+        "activity_id": {"type": "string", "description": "参考训练的记录ID"},
+        "k": {"type": "integer", "description": "相似训练数量"},
+        "max_hr": {"type": "integer", "description": "最大心率"},
+        "resting_hr": {"type": "integer", "description": "静息心率"},
         "limit": {"type": "integer", "description": "返回记录数量限制"}
     },
     "required": ["search_query", "search_tool", "reasoning"]
@@ -167,8 +177,10 @@ def _get_param_requirements() -> str:
     # 通用参数要求
     param_text = COMMON_PARAM_REQUIREMENTS
 
-    # 如果是Garmin数据源,添加专属参数要求
-    if data_source == 'garmin':
+    # 添加数据源专属参数要求
+    if data_source == 'keep':
+        param_text += KEEP_PARAM_REQUIREMENTS
+    elif data_source == 'garmin':
         param_text += GARMIN_PARAM_REQUIREMENTS
 
     return param_text
@@ -186,8 +198,10 @@ def _get_query_examples() -> str:
     # 通用查询示例
     examples_text = COMMON_QUERY_EXAMPLES
 
-    # 如果是Garmin数据源,添加专属查询示例
-    if data_source == 'garmin':
+    # 添加数据源专属查询示例
+    if data_source == 'keep':
+        examples_text += "\n" + KEEP_QUERY_EXAMPLES
+    elif data_source == 'garmin':
         examples_text += "\n" + GARMIN_QUERY_EXAMPLES
 
     return examples_text
@@ -275,6 +289,7 @@ def _generate_first_search_prompt() -> str:
    ✅ 如果选择search_by_date_range → 检查: 是否已添加"start_date"和"end_date"字段?
    ✅ 如果选择search_by_distance_range → 检查: 是否已添加"min_distance_km"字段?
    ✅ 如果选择search_by_heart_rate → 检查: 是否已添加"min_avg_hr"字段?
+   ✅ 如果选择search_similar_trainings → 检查: 是否已添加"activity_id"字段?
    ✅ 如果选择search_by_training_load(Garmin) → 检查: 是否已添加"min_load"字段?
    ✅ 如果选择search_by_power_zone(Garmin) → 检查: 是否已添加"min_avg_power"字段?
    ❌ 如果上述任一检查失败 → 重新生成JSON并补充缺失参数
@@ -436,6 +451,7 @@ def _generate_reflection_prompt() -> str:
    ✅ 如果选择search_by_date_range → 检查: 是否已添加"start_date"和"end_date"字段?
    ✅ 如果选择search_by_distance_range → 检查: 是否已添加"min_distance_km"字段?
    ✅ 如果选择search_by_heart_rate → 检查: 是否已添加"min_avg_hr"字段?
+   ✅ 如果选择search_similar_trainings → 检查: 是否已添加"activity_id"字段?
    ✅ 如果选择search_by_training_load(Garmin) → 检查: 是否已添加"min_load"字段?
    ✅ 如果选择search_by_power_zone(Garmin) → 检查: 是否已添加"min_avg_power"字段?
    ❌ 如果上述任一检查失败 → 重新生成JSON并补充缺失参数
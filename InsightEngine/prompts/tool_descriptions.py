@@ -10,7 +10,7 @@ from typing import Dict, List
 # ===== 通用工具描述(所有数据源都支持) =====
 
 COMMON_TOOLS_DESCRIPTION = """
-你可以使用以下5种专业的训练数据库查询工具来挖掘真实的训练记录:
+你可以使用以下6种专业的训练数据库查询工具来挖掘真实的训练记录:
 
 1. **search_recent_trainings** - 🔥 查询最近N天训练记录 (推荐用于"最近"、"近期"查询)
    - 适用于:了解最近的训练状态、识别训练规律、分析短期进步
@@ -38,6 +38,32 @@ COMMON_TOOLS_DESCRIPTION = """
    - 适用于:心率训练分析、有氧/无氧训练分布、训练强度评估
    - 特点:基于心率数据筛选,分析训练强度
    - 参数:min_avg_hr(必需,最小平均心率)、max_avg_hr(可选,最大平均心率)、limit(可选,默认50)
+
+6. **search_similar_trainings** - 查询相似训练
+   - 适用于:同类训练的前后对比(如"和上次类似的长距离相比进步了吗")、寻找历史参照课表
+   - 特点:基于距离、时长、配速、心率等(Garmin另含步频、功率、训练效果、心率区间占比)标准化特征向量的k近邻检索
+   - 参数:activity_id(必需,参考训练的记录ID,即查询结果中的"记录ID")、k(可选,默认5)
+   - **返回指标**: 相似训练记录(按相似度排序) + 每条的标准化距离(越小越相似) + 参考训练的特征值
+"""
+
+
+# ===== Keep专属扩展工具描述 =====
+
+KEEP_EXTENDED_TOOLS_DESCRIPTION = """
+**Keep数据源专属扩展工具**:
+
+7. **get_heart_rate_analysis** - 心率时间序列分析
+   - 适用于:心率区间分布、有氧耐力(心率漂移)评估、训练冲量量化、心肺恢复能力评估
+   - 特点:基于每次训练的逐点心率序列(heart_rate_data)预先计算,而不是只看平均/最大心率
+   - 参数:days(可选,最近N天,默认30)、limit(可选,最多分析的训练次数,默认20)、max_hr(可选,最大心率,默认190)、resting_hr(可选,静息心率,默认60)
+   - **返回指标**:
+     * activities: 每次训练的hr_zone_seconds/hr_zone_percent(Z1-Z5时长/占比)、cardiac_drift_pct(心率漂移%)、trimp、hr_recovery_60s
+     * summary: total_trimp、avg_trimp、avg_cardiac_drift_pct、hr_zone_seconds(区间时长合计)
+   - **解读**:
+     * 心率区间按最大心率百分比划分: Z1 50-60%、Z2 60-70%、Z3 70-80%、Z4 80-90%、Z5 90%+
+     * 心率漂移 < 5%(有氧基础良好), 5-10%(一般), > 10%(有氧耐力不足或脱水/高温)
+     * TRIMP(Banister): < 50(轻松), 50-120(中等), 120-250(高负荷), > 250(极高负荷)
+     * hr_recovery_60s: 60秒内最大心率下降,> 25bpm通常代表恢复能力良好
 """
 
 
@@ -46,19 +72,19 @@ COMMON_TOOLS_DESCRIPTION = """
 GARMIN_EXTENDED_TOOLS_DESCRIPTION = """
 **Garmin数据源专属扩展工具**:
 
-6. **search_by_training_load** - 按Garmin训练负荷查询
+7. **search_by_training_load** - 按Garmin训练负荷查询
    - 适用于:训练负荷趋势分析、过度训练检测、训练强度评估
    - 特点:基于Garmin科学算法的训练负荷指标(Training Load)
    - 参数:min_load(必需,最小负荷值)、max_load(可选,最大负荷值)、limit(可选,默认50)
    - **解读**: Training Load < 75(低强度)、75-150(中等强度)、150-300(高强度)、>300(极高强度)
 
-7. **search_by_power_zone** - 按功率区间查询
+8. **search_by_power_zone** - 按功率区间查询
    - 适用于:功率训练分析、跑步效率评估、配速-功率关系研究
    - 特点:基于Garmin Running Power指标,更科学地量化跑步强度
    - 参数:min_avg_power(必需,最小平均功率/瓦)、max_avg_power(可选,最大平均功率/瓦)、limit(可选,默认50)
    - **解读**: 功率指标综合了速度、坡度、风阻、体重等因素,比配速更准确反映运动强度
 
-8. **get_training_effect_analysis** - 获取Garmin训练效果分析
+9. **get_training_effect_analysis** - 获取Garmin训练效果分析
    - 适用于:训练效果评估、有氧/无氧能力分析、训练计划优化
    - 特点:基于Garmin Firstbeat算法,量化训练对有氧/无氧能力的影响
    - 参数:start_date(可选,YYYY-MM-DD)、end_date(可选,YYYY-MM-DD)
@@ -71,6 +97,20 @@ GARMIN_EXTENDED_TOOLS_DESCRIPTION = """
    - **解读**:
      * Training Effect < 2.0(维持), 2.0-2.9(提升), 3.0-3.9(高度提升), ≥4.0(过度训练)
      * 建议: 80%训练保持在2.0-2.9(提升),20%可达到3.0+(高强度)
+
+10. **get_load_model** - 获取训练负荷模型(体能/疲劳/状态)
+   - 适用于:过度训练检测、急性/慢性负荷比监控、比赛前减量(Taper)评估、体能趋势分析
+   - 特点:基于全部历史Training Load预先计算的逐日序列,无需自行对原始记录做加总和平均
+   - 参数:days(可选,返回最近N天的序列,默认42)
+   - **返回指标**:
+     * latest: 今天的ctl/atl/tsb/acwr
+     * series: 逐日dates/daily_load/ctl/atl/tsb/acwr序列
+     * summary: 训练天数、总负荷、CTL变化、最大ACWR、ACWR处于安全区/危险区的天数、最低TSB
+   - **解读**:
+     * CTL(慢性负荷,42天指数加权)≈体能; ATL(急性负荷,7天指数加权)≈疲劳
+     * TSB = 前一日CTL - 前一日ATL: >+10(状态新鲜/可能减量过度), -10~+10(平衡), -30~-10(有效训练), <-30(过度疲劳风险)
+     * ACWR = ATL/CTL: 0.8-1.3(安全区), >1.5(受伤风险显著上升), <0.8(训练刺激不足)
+   - **优先级: 涉及负荷趋势、疲劳、过度训练、急慢性负荷比时,优先使用此工具而不是search_by_training_load!**
 """
 
 
@@ -102,10 +142,24 @@ COMMON_PARAM_REQUIREMENTS = """
      * ⚠️ 全部可选: start_date, end_date (默认查询全部历史数据)
      * 示例: `"start_date": "2025-01-01", "end_date": "2025-01-31"`
 
+   - **search_similar_trainings**:
+     * ✅ 必需参数: activity_id (参考训练的记录ID,来自之前查询结果中的"记录ID")
+     * ⚠️ 可选参数: k (整数,返回的相似训练数量,默认5)
+     * 示例: `"activity_id": "128", "k": 5`
+
    - **通用可选参数**: limit (整数,默认50条,建议范围10-200)
 """
 
 
+# ===== Keep专属参数配置要求 =====
+
+KEEP_PARAM_REQUIREMENTS = """
+   - **get_heart_rate_analysis** (Keep专属):
+     * ⚠️ 全部可选: days (默认30), limit (默认20), max_hr (默认190), resting_hr (默认60)
+     * 示例: `"days": 30, "limit": 20`
+"""
+
+
 # ===== Garmin专属参数配置要求 =====
 
 GARMIN_PARAM_REQUIREMENTS = """
@@ -122,6 +176,10 @@ GARMIN_PARAM_REQUIREMENTS = """
    - **get_training_effect_analysis** (Garmin专属):
      * ⚠️ 全部可选: start_date, end_date (默认查询全部历史数据)
      * 示例: `"start_date": "2025-01-01", "end_date": "2025-01-31"`
+
+   - **get_load_model** (Garmin专属):
+     * ⚠️ 可选参数: days (整数,返回最近N天的逐日序列,默认42)
+     * 示例: `"days": 42`
 """
 
 
@@ -134,6 +192,16 @@ COMMON_QUERY_EXAMPLES = """
 - ✅ 正确: 如果需要补充2025年1-3月的历史数据 → search_by_date_range, start_date="2025-01-01", end_date="2025-03-31"
 - ✅ 正确: 如果需要长距离训练数据 → search_by_distance_range, min_distance_km=15
 - ✅ 正确: 如果需要强度分析 → search_by_heart_rate, min_avg_hr=150, max_avg_hr=170
+- ✅ 正确: 如果需要与历史同类训练对比 → search_similar_trainings, activity_id="128", k=5 (记录ID取自之前的查询结果)
+"""
+
+
+# ===== Keep专属查询优化示例 =====
+
+KEEP_QUERY_EXAMPLES = """
+**Keep专属查询示例**:
+- ✅ 正确: 如果需要心率区间分布/心率漂移/训练冲量 → get_heart_rate_analysis, days=30
+- ❌ 错误: 如果需要心率区间分布 → search_recent_trainings后只根据平均心率估算区间
 """
 
 
@@ -144,6 +212,8 @@ GARMIN_QUERY_EXAMPLES = """
 - ✅ 正确: 如果需要高负荷训练分析 → search_by_training_load, min_load=150, max_load=300
 - ✅ 正确: 如果需要功率区间分析 → search_by_power_zone, min_avg_power=200, max_avg_power=250
 - ✅ 正确: 如果需要训练效果统计 → get_training_effect_analysis, start_date="2025-01-01", end_date="2025-01-31"
+- ✅ 正确: 如果需要判断是否过度训练/急慢性负荷比 → get_load_model, days=42
+- ❌ 错误: 如果需要判断是否过度训练 → search_by_training_load后自行对原始记录计算平均负荷
 """
 
 
@@ -162,7 +232,8 @@ KEEP_REPORT_MODULES_SUGGESTION = """
 **建议分析模块(Keep数据源)**:
 - ✅ 训练负荷量化 (频次、里程、周平均)
 - ✅ 配速表现评估 (配速趋势、区间分布)
-- ✅ 心率强度监测 (平均心率、心率区间)
+- ✅ 心率强度监测 (平均心率、心率区间时长、TRIMP)
+- ✅ 有氧耐力评估 (心率漂移、心率恢复)
 - ✅ 长距离耐力评估 (长距离训练统计)
 - ✅ 训练节奏分析 (频次稳定性、恢复间隔)
 """
@@ -212,12 +283,12 @@ GARMIN_REPORT_MODULES_SUGGESTION = """
 
 DATA_SOURCE_CONFIGS: Dict[str, Dict[str, str]] = {
     'keep': {
-        'tools_description': COMMON_TOOLS_DESCRIPTION,
+        'tools_description': COMMON_TOOLS_DESCRIPTION + KEEP_EXTENDED_TOOLS_DESCRIPTION,
         'data_features': KEEP_DATA_FEATURES_DESCRIPTION,
         'report_modules': KEEP_REPORT_MODULES_SUGGESTION,
-        'extended_tools': '',  # Keep没有扩展工具
-        'available_metrics': '距离、配速、时长、心率、卡路里',
-        'advanced_capabilities': ''
+        'extended_tools': KEEP_EXTENDED_TOOLS_DESCRIPTION,
+        'available_metrics': '距离、配速、时长、心率、卡路里、心率区间时长、心率漂移、TRIMP',
+        'advanced_capabilities': '✅ 逐点心率序列分析'
     },
     'garmin': {
         'tools_description': COMMON_TOOLS_DESCRIPTION + GARMIN_EXTENDED_TOOLS_DESCRIPTION,
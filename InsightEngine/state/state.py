@@ -8,17 +8,25 @@ from typing import List, Dict, Any, Optional
 import json
 from datetime import datetime
 
+from utils.search_store import ContentPool, PooledSearch, SlottedRecord, intern_text
+from utils.state_snapshot import SNAPSHOT_SUFFIX, is_snapshot_file, load_snapshot, save_snapshot
 
-@dataclass
-class Search:
-    """单个搜索结果的状态"""
-    query: str = ""                    # 搜索查询
-    url: str = ""                      # 搜索结果的链接
-    title: str = ""                    # 搜索结果标题
-    content: str = ""                  # 搜索返回的内容
-    score: Optional[float] = None      # 相关度评分
-    platform: str = "训练记录数据库"     # 数据来源平台
-    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+
+class Search(PooledSearch):
+    """单个搜索结果的状态(内容保存在State共享的内容池中,记录上只保留内容哈希)"""
+    __slots__ = ('query', 'url', 'title', 'score', 'platform', 'timestamp')
+    _fields = ('query', 'url', 'title', 'content', 'score', 'platform', 'timestamp')
+
+    def __init__(self, query: str = "", url: str = "", title: str = "", content: str = "",
+                 score: Optional[float] = None, platform: str = "训练记录数据库",
+                 timestamp: Optional[str] = None, pool: Optional[ContentPool] = None):
+        self.query = intern_text(query)                # 搜索查询
+        self.url = url                                 # 搜索结果的链接
+        self.title = title                             # 搜索结果标题
+        self.score = score                             # 相关度评分
+        self.platform = intern_text(platform)          # 数据来源平台
+        self.timestamp = intern_text(timestamp or datetime.now().isoformat())
+        self._init_content(content, pool)              # 搜索返回的内容
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
@@ -33,7 +41,7 @@ class Search:
         }
     
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> "Search":
+    def from_dict(cls, data: Dict[str, Any], pool: Optional[ContentPool] = None) -> "Search":
         """从字典创建Search对象"""
         return cls(
             query=data.get("query", ""),
@@ -42,24 +50,42 @@ class Search:
             content=data.get("content", ""),
             score=data.get("score"),
             platform=data.get("platform", "训练记录数据库"),
-            timestamp=data.get("timestamp", datetime.now().isoformat())
+            timestamp=data.get("timestamp"),
+            pool=pool
         )
 
 
-@dataclass
-class Research:
+class Research(SlottedRecord):
     """段落研究过程的状态"""
-    search_history: List[Search] = field(default_factory=list)     # 搜索记录列表
-    latest_summary: str = ""                                       # 当前段落的最新总结
-    reflection_iteration: int = 0                                  # 反思迭代次数
-    is_completed: bool = False                                     # 是否完成研究
+    __slots__ = ('search_history', 'latest_summary', 'reflection_iteration', 'is_completed',
+                 'early_stop_reason', 'reflections_saved', 'content_pool')
+    _fields = ('search_history', 'latest_summary', 'reflection_iteration', 'is_completed',
+               'early_stop_reason', 'reflections_saved')
+
+    def __init__(self, search_history: Optional[List[Search]] = None, latest_summary: str = "",
+                 reflection_iteration: int = 0, is_completed: bool = False,
+                 early_stop_reason: str = "", reflections_saved: int = 0,
+                 content_pool: Optional[ContentPool] = None):
+        self.search_history = search_history if search_history is not None else []  # 搜索记录列表
+        self.latest_summary = latest_summary                # 当前段落的最新总结
+        self.reflection_iteration = reflection_iteration    # 反思迭代次数
+        self.is_completed = is_completed                    # 是否完成研究
+        self.early_stop_reason = early_stop_reason          # 反思循环提前结束的原因
+        self.reflections_saved = reflections_saved          # 提前结束节省的反思轮数
+        self.content_pool = content_pool                    # 所属State的内容池
+        if content_pool is not None:
+            for search in self.search_history:
+                search.attach_pool(content_pool)
     
     def add_search(self, search: Search):
         """添加搜索记录"""
+        search.attach_pool(self.content_pool)
         self.search_history.append(search)
     
     def add_search_results(self, query: str, results: List[Dict[str, Any]]):
-        """批量添加搜索结果"""
+        """批量添加搜索结果(同一轮的结果共享查询词和时间戳)"""
+        query = intern_text(query)
+        timestamp = datetime.now().isoformat()
         for result in results:
             search = Search(
                 query=query,
@@ -67,9 +93,11 @@ class Research:
                 title=result.get("title", ""),
                 content=result.get("content", ""),
                 score=result.get("score"),
-                platform=result.get("platform", "训练记录数据库")
+                platform=result.get("platform", "训练记录数据库"),
+                timestamp=timestamp,
+                pool=self.content_pool
             )
-            self.add_search(search)
+            self.search_history.append(search)
     
     def get_search_count(self) -> int:
         """获取搜索次数"""
@@ -83,34 +111,49 @@ class Research:
         """标记为完成"""
         self.is_completed = True
     
+    def record_early_stop(self, reason: str, reflections_saved: int):
+        """记录反思循环提前结束"""
+        self.early_stop_reason = reason
+        self.reflections_saved = reflections_saved
+    
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
         return {
             "search_history": [search.to_dict() for search in self.search_history],
             "latest_summary": self.latest_summary,
             "reflection_iteration": self.reflection_iteration,
-            "is_completed": self.is_completed
+            "is_completed": self.is_completed,
+            "early_stop_reason": self.early_stop_reason,
+            "reflections_saved": self.reflections_saved
         }
     
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> "Research":
+    def from_dict(cls, data: Dict[str, Any], content_pool: Optional[ContentPool] = None) -> "Research":
         """从字典创建Research对象"""
-        search_history = [Search.from_dict(search_data) for search_data in data.get("search_history", [])]
+        search_history = [Search.from_dict(search_data, content_pool)
+                          for search_data in data.get("search_history", [])]
         return cls(
             search_history=search_history,
             latest_summary=data.get("latest_summary", ""),
             reflection_iteration=data.get("reflection_iteration", 0),
-            is_completed=data.get("is_completed", False)
+            is_completed=data.get("is_completed", False),
+            early_stop_reason=data.get("early_stop_reason", ""),
+            reflections_saved=data.get("reflections_saved", 0),
+            content_pool=content_pool
         )
 
 
-@dataclass
-class Paragraph:
+class Paragraph(SlottedRecord):
     """报告中单个段落的状态"""
-    title: str = ""                                                # 段落标题
-    content: str = ""                                              # 段落的预期内容（初始规划）
-    research: Research = field(default_factory=Research)          # 研究进度
-    order: int = 0                                                 # 段落顺序
+    __slots__ = ('title', 'content', 'research', 'order')
+    _fields = ('title', 'content', 'research', 'order')
+
+    def __init__(self, title: str = "", content: str = "", research: Optional[Research] = None,
+                 order: int = 0):
+        self.title = title                                             # 段落标题
+        self.content = content                                         # 段落的预期内容（初始规划）
+        self.research = research if research is not None else Research()  # 研究进度
+        self.order = order                                             # 段落顺序
     
     def is_completed(self) -> bool:
         """检查段落是否完成"""
@@ -130,10 +173,10 @@ class Paragraph:
         }
     
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> "Paragraph":
+    def from_dict(cls, data: Dict[str, Any], content_pool: Optional[ContentPool] = None) -> "Paragraph":
         """从字典创建Paragraph对象"""
         research_data = data.get("research", {})
-        research = Research.from_dict(research_data) if research_data else Research()
+        research = Research.from_dict(research_data or {}, content_pool)
         
         return cls(
             title=data.get("title", ""),
@@ -153,6 +196,12 @@ class State:
     is_completed: bool = False                                     # 是否完成
     created_at: str = field(default_factory=lambda: datetime.now().isoformat())
     updated_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    # 本次运行所有段落共享的搜索内容池(不参与序列化和比较)
+    content_pool: ContentPool = field(default_factory=ContentPool, repr=False, compare=False)
+
+    # 持久化字段(与to_dict的键一致,紧凑快照按此序列化)
+    _fields = ('query', 'report_title', 'paragraphs', 'final_report', 'is_completed',
+               'created_at', 'updated_at')
     
     def add_paragraph(self, title: str, content: str) -> int:
         """
@@ -166,7 +215,8 @@ class State:
             段落索引
         """
         order = len(self.paragraphs)
-        paragraph = Paragraph(title=title, content=content, order=order)
+        paragraph = Paragraph(title=title, content=content,
+                              research=Research(content_pool=self.content_pool), order=order)
         self.paragraphs.append(paragraph)
         self.update_timestamp()
         return order
@@ -207,6 +257,8 @@ class State:
             "total_paragraphs": total,
             "completed_paragraphs": completed,
             "progress_percentage": (completed / total * 100) if total > 0 else 0,
+            "reflections_saved": sum(p.research.reflections_saved for p in self.paragraphs),
+            "early_stopped_paragraphs": sum(1 for p in self.paragraphs if p.research.early_stop_reason),
             "is_completed": self.is_completed,
             "created_at": self.created_at,
             "updated_at": self.updated_at
@@ -231,7 +283,8 @@ class State:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "State":
         """从字典创建State对象"""
-        paragraphs = [Paragraph.from_dict(p_data) for p_data in data.get("paragraphs", [])]
+        content_pool = ContentPool()
+        paragraphs = [Paragraph.from_dict(p_data, content_pool) for p_data in data.get("paragraphs", [])]
         
         return cls(
             query=data.get("query", ""),
@@ -240,7 +293,8 @@ class State:
             final_report=data.get("final_report", ""),
             is_completed=data.get("is_completed", False),
             created_at=data.get("created_at", datetime.now().isoformat()),
-            updated_at=data.get("updated_at", datetime.now().isoformat())
+            updated_at=data.get("updated_at", datetime.now().isoformat()),
+            content_pool=content_pool
         )
     
     @classmethod
@@ -250,13 +304,22 @@ class State:
         return cls.from_dict(data)
     
     def save_to_file(self, filepath: str):
-        """保存状态到文件"""
+        """
+        保存状态到文件
+
+        扩展名为.snap时保存为紧凑快照(搜索内容存入同目录的blob仓库),否则保存为JSON
+        """
+        if filepath.endswith(SNAPSHOT_SUFFIX):
+            save_snapshot(self, filepath)
+            return
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(self.to_json())
     
     @classmethod
     def load_from_file(cls, filepath: str) -> "State":
-        """从文件加载状态"""
+        """从文件加载状态(自动识别紧凑快照,快照中的搜索内容在首次访问时才读取)"""
+        if is_snapshot_file(filepath):
+            return load_snapshot(cls, filepath)
         with open(filepath, 'r', encoding='utf-8') as f:
             json_str = f.read()
         return cls.from_json(json_str)
@@ -8,6 +8,8 @@ from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 
+from utils.user_context import get_current_user_id, normalize_user_id
+
 
 @dataclass
 class DBResponse:
@@ -34,14 +36,16 @@ class BaseTrainingDataSearch(ABC):
     提供统一的接口,但每个数据源使用各自的数据格式
     """
 
-    def __init__(self, data_source: str):
+    def __init__(self, data_source: str, user_id: Optional[str] = None):
         """
         初始化搜索工具
 
         Args:
             data_source: 数据源标识 ('keep' 或 'garmin')
+            user_id: 用户标识,所有查询只返回该用户的记录;为None时使用当前用户上下文
         """
         self.data_source = data_source
+        self.user_id = normalize_user_id(user_id) if user_id is not None else get_current_user_id()
         self.db_config = self._load_db_config()
         self._validate_config()
 
@@ -179,6 +183,24 @@ class BaseTrainingDataSearch(ABC):
         """
         pass
 
+    @abstractmethod
+    def search_similar_trainings(
+        self,
+        activity_id: Any,
+        k: int = 5
+    ) -> DBResponse:
+        """
+        查询与指定训练最相似的k次训练(特征向量k近邻)
+
+        Args:
+            activity_id: 参考训练的记录ID
+            k: 返回的相似训练数量
+
+        Returns:
+            DBResponse对象,results为相似训练(按相似度降序),statistics包含距离和参考训练特征
+        """
+        pass
+
     # ===== 工具辅助方法 =====
 
     def _calculate_pace(self, duration_seconds: int, distance_meters: Optional[float]) -> Optional[float]:
@@ -201,5 +223,6 @@ class BaseTrainingDataSearch(ABC):
             "search_by_date_range",
             "get_training_stats",
             "search_by_distance_range",
-            "search_by_heart_rate"
+            "search_by_heart_rate",
+            "search_similar_trainings"
         ]
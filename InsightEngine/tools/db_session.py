@@ -1,12 +1,13 @@
 # -*- coding: utf-8 -*-
 """
 SQLAlchemy数据库会话管理器
-提供统一的数据库连接和会话管理
+提供统一的数据库连接和会话管理,后端(MySQL/SQLite/DuckDB)由 utils.db_backend 按config.py选择
 """
 
 import sys
 import os
-from sqlalchemy import create_engine
+import threading
+from types import SimpleNamespace
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.pool import QueuePool
 from typing import Optional
@@ -17,6 +18,15 @@ project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(_
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+from utils.db_backend import (
+    create_analytics_engine,
+    create_database_engine,
+    get_analytics_engine_name,
+    get_database_url,
+    is_embedded_backend,
+    validate_database_config
+)
+
 
 class DatabaseSessionManager:
     """数据库会话管理器 - 单例模式"""
@@ -24,6 +34,12 @@ class DatabaseSessionManager:
     _instance: Optional['DatabaseSessionManager'] = None
     _engine = None
     _session_factory = None
+    _database_url: Optional[str] = None
+    _analytics_engine_name = ''
+    _analytics_engine = None
+    _analytics_session_factory = None
+    _analytics_initialized = False
+    _analytics_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -36,48 +52,46 @@ class DatabaseSessionManager:
             self._initialize_engine()
 
     def _initialize_engine(self):
-        """初始化SQLAlchemy引擎"""
+        """初始化SQLAlchemy引擎(MySQL,或DB_URL指定的SQLite/DuckDB嵌入式数据库)"""
         # 从config.py读取数据库配置
         try:
             import config
-            db_host = getattr(config, 'DB_HOST', 'localhost')
-            db_port = int(getattr(config, 'DB_PORT', 3306))
-            db_user = getattr(config, 'DB_USER', '')
-            db_password = getattr(config, 'DB_PASSWORD', '')
-            db_name = getattr(config, 'DB_NAME', '')
-            db_charset = getattr(config, 'DB_CHARSET', 'utf8mb4')
         except ImportError:
             # 如果无法导入config,尝试从环境变量读取(兼容性处理)
-            db_host = os.getenv("DB_HOST", "localhost")
-            db_port = int(os.getenv("DB_PORT", 3306))
-            db_user = os.getenv("DB_USER", "")
-            db_password = os.getenv("DB_PASSWORD", "")
-            db_name = os.getenv("DB_NAME", "")
-            db_charset = os.getenv("DB_CHARSET", "utf8mb4")
+            config = SimpleNamespace(
+                DB_URL=os.getenv("DB_URL", ""),
+                DB_HOST=os.getenv("DB_HOST", "localhost"),
+                DB_PORT=int(os.getenv("DB_PORT", 3306)),
+                DB_USER=os.getenv("DB_USER", ""),
+                DB_PASSWORD=os.getenv("DB_PASSWORD", ""),
+                DB_NAME=os.getenv("DB_NAME", ""),
+                DB_CHARSET=os.getenv("DB_CHARSET", "utf8mb4"),
+                DB_ANALYTICS_ENGINE=os.getenv("DB_ANALYTICS_ENGINE", ""),
+            )
 
         # 验证配置完整性
-        if not all([db_host, db_user, db_password, db_name]):
-            raise ValueError(
-                "数据库配置不完整! 请设置环境变量: DB_HOST, DB_USER, DB_PASSWORD, DB_NAME"
-            )
+        error = validate_database_config(config)
+        if error:
+            raise ValueError(error)
 
-        # 构建数据库连接URL
-        database_url = (
-            f"mysql+pymysql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-            f"?charset={db_charset}"
-        )
+        self._database_url = get_database_url(config)
+        self._analytics_engine_name = get_analytics_engine_name(config)
 
-        # 创建引擎
-        self._engine = create_engine(
-            database_url,
+        # 创建引擎(MySQL使用连接池,嵌入式数据库在进程内直接访问文件)
+        self._engine = create_database_engine(
+            self._database_url,
             poolclass=QueuePool,
             pool_size=5,
             max_overflow=10,
             pool_pre_ping=True,  # 自动检测连接是否有效
             pool_recycle=3600,   # 1小时回收连接
-            echo=False,          # 不打印SQL语句
         )
 
+        # 嵌入式数据库没有单独的建库脚本,首次使用时执行版本化迁移建表
+        if is_embedded_backend(self._database_url):
+            from models.migrations import upgrade
+            upgrade(self._engine)
+
         # 创建会话工厂
         self._session_factory = scoped_session(
             sessionmaker(
@@ -88,6 +102,23 @@ class DatabaseSessionManager:
             )
         )
 
+    def _initialize_analytics_engine(self):
+        """按需创建DuckDB分析引擎(只创建一次,失败时回退到主数据库)"""
+        with self._analytics_lock:
+            if self._analytics_initialized:
+                return
+            self._analytics_initialized = True
+            if self._analytics_engine_name != 'duckdb' or not self._database_url:
+                return
+            self._analytics_engine = create_analytics_engine(self._database_url)
+            if self._analytics_engine is not None:
+                self._analytics_session_factory = sessionmaker(
+                    bind=self._analytics_engine,
+                    autoflush=False,
+                    expire_on_commit=False
+                )
+                print("统计聚合查询使用DuckDB分析引擎")
+
     @contextmanager
     def get_session(self):
         """
@@ -109,6 +140,27 @@ class DatabaseSessionManager:
         finally:
             session.close()
 
+    @contextmanager
+    def get_analytics_session(self):
+        """
+        获取用于只读聚合查询的会话(上下文管理器)
+
+        配置 DB_ANALYTICS_ENGINE = "duckdb" 时在DuckDB分析引擎上执行,
+        否则(或分析引擎不可用时)与get_session相同,使用主数据库
+        """
+        if not self._analytics_initialized:
+            self._initialize_analytics_engine()
+        if self._analytics_session_factory is None:
+            with self.get_session() as session:
+                yield session
+            return
+
+        session = self._analytics_session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
     def get_engine(self):
         """获取SQLAlchemy引擎"""
         return self._engine
@@ -119,6 +171,8 @@ class DatabaseSessionManager:
             self._session_factory.remove()
         if self._engine:
             self._engine.dispose()
+        if self._analytics_engine:
+            self._analytics_engine.dispose()
 
 
 # 全局单例实例
@@ -27,13 +27,18 @@ class TrainingDataSearchFactory:
     }
 
     @classmethod
-    def create_search_tool(cls, data_source: Optional[str] = None) -> BaseTrainingDataSearch:
+    def create_search_tool(
+        cls,
+        data_source: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> BaseTrainingDataSearch:
         """
         创建训练数据搜索工具实例
 
         Args:
             data_source: 数据源类型 ('keep' 或 'garmin')
                         如果为None,则从根目录config.py的TRAINING_DATA_SOURCE字段读取
+            user_id: 用户标识,工具只查询该用户的记录;为None时使用当前用户上下文
 
         Returns:
             对应数据源的搜索工具实例
@@ -65,7 +70,8 @@ class TrainingDataSearchFactory:
         print(f"✅ 工具类: {tool_class.__name__}")
 
         try:
-            tool_instance = tool_class()
+            tool_instance = tool_class(user_id=user_id)
+            print(f"✅ 训练数据用户: {tool_instance.user_id}")
             print(f"✅ 支持的查询工具: {', '.join(tool_instance.get_supported_tools())}")
             return tool_instance
         except Exception as e:
@@ -130,13 +136,17 @@ class TrainingDataSearchFactory:
         return data_source.lower() in cls._SUPPORTED_SOURCES
 
 
-def create_training_data_search(data_source: Optional[str] = None) -> BaseTrainingDataSearch:
+def create_training_data_search(
+    data_source: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> BaseTrainingDataSearch:
     """
     便捷函数: 创建训练数据搜索工具实例
 
     Args:
         data_source: 数据源类型 ('keep' 或 'garmin')
                     如果为None,则从config.py自动读取
+        user_id: 用户标识,为None时使用当前用户上下文
 
     Returns:
         对应数据源的搜索工具实例
@@ -149,7 +159,7 @@ def create_training_data_search(data_source: Optional[str] = None) -> BaseTraini
         >>> keep_tool = create_training_data_search('keep')
         >>> garmin_tool = create_training_data_search('garmin')
     """
-    return TrainingDataSearchFactory.create_search_tool(data_source)
+    return TrainingDataSearchFactory.create_search_tool(data_source, user_id)
 
 
 # ===== 向后兼容性支持 =====
@@ -7,12 +7,28 @@ Garmin设备训练数据搜索工具 (ORM版本)
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+import numpy as np
 from sqlalchemy import func, case
 from sqlalchemy.orm import Session
 
 from .base_search import BaseTrainingDataSearch, DBResponse
 from .db_models import TrainingRecordGarmin
 from .db_session import db_session_manager
+from utils.training_load_model import get_load_model_cache
+from utils.similarity_index import (
+    get_similarity_index,
+    rows_to_matrix,
+    derive_volume_features,
+    zone_fractions
+)
+
+# 相似训练检索使用的特征(标准化后参与距离计算)
+GARMIN_SIMILARITY_FEATURES = [
+    'distance_km', 'duration_min', 'pace_s_per_km',
+    'avg_heart_rate', 'max_heart_rate', 'avg_cadence', 'avg_power_watts',
+    'aerobic_training_effect', 'anaerobic_training_effect',
+    'hr_zone_1_pct', 'hr_zone_2_pct', 'hr_zone_3_pct', 'hr_zone_4_pct', 'hr_zone_5_pct'
+]
 
 
 @dataclass
@@ -92,8 +108,8 @@ class GarminTrainingRecord:
 class GarminDataSearch(BaseTrainingDataSearch):
     """Garmin数据源搜索工具 (ORM版本)"""
 
-    def __init__(self):
-        super().__init__(data_source="garmin")
+    def __init__(self, user_id: Optional[str] = None):
+        super().__init__(data_source="garmin", user_id=user_id)
         self.db_manager = db_session_manager
 
     def _load_db_config(self) -> Dict[str, Any]:
@@ -184,7 +200,7 @@ class GarminDataSearch(BaseTrainingDataSearch):
         try:
             with self.db_manager.get_session() as session:
                 query = session.query(TrainingRecordGarmin)\
-                    .filter(TrainingRecordGarmin.start_time_gmt >= start_time)\
+                    .filter(TrainingRecordGarmin.user_id == self.user_id, TrainingRecordGarmin.start_time_gmt >= start_time)\
                     .order_by(TrainingRecordGarmin.start_time_gmt.desc())\
                     .limit(limit)
 
@@ -235,6 +251,7 @@ class GarminDataSearch(BaseTrainingDataSearch):
             with self.db_manager.get_session() as session:
                 query = session.query(TrainingRecordGarmin)\
                     .filter(
+                        TrainingRecordGarmin.user_id == self.user_id,
                         TrainingRecordGarmin.start_time_gmt >= start_dt,
                         TrainingRecordGarmin.start_time_gmt < end_dt
                     )\
@@ -272,7 +289,8 @@ class GarminDataSearch(BaseTrainingDataSearch):
         print(f"--- Garmin数据源(ORM): 获取训练统计 (params: {params_for_log}) ---")
 
         try:
-            with self.db_manager.get_session() as session:
+            # 纯聚合查询,配置了DuckDB分析引擎时在DuckDB中执行
+            with self.db_manager.get_analytics_session() as session:
                 query = session.query(
                     func.count(TrainingRecordGarmin.id).label('total_sessions'),
                     func.sum(TrainingRecordGarmin.duration_seconds).label('total_duration'),
@@ -290,7 +308,7 @@ class GarminDataSearch(BaseTrainingDataSearch):
                     func.avg(TrainingRecordGarmin.avg_stride_length_cm).label('avg_stride_length'),
                     func.avg(TrainingRecordGarmin.avg_vertical_oscillation_cm).label('avg_vertical_oscillation'),
                     func.avg(TrainingRecordGarmin.avg_ground_contact_time_ms).label('avg_ground_contact_time')
-                )
+                ).filter(TrainingRecordGarmin.user_id == self.user_id)
 
                 # 添加日期过滤
                 if start_date:
@@ -388,7 +406,7 @@ class GarminDataSearch(BaseTrainingDataSearch):
         try:
             with self.db_manager.get_session() as session:
                 query = session.query(TrainingRecordGarmin)\
-                    .filter(TrainingRecordGarmin.distance_meters >= min_meters)
+                    .filter(TrainingRecordGarmin.user_id == self.user_id, TrainingRecordGarmin.distance_meters >= min_meters)
 
                 if max_distance_km:
                     max_meters = max_distance_km * 1000
@@ -431,7 +449,7 @@ class GarminDataSearch(BaseTrainingDataSearch):
         try:
             with self.db_manager.get_session() as session:
                 query = session.query(TrainingRecordGarmin)\
-                    .filter(TrainingRecordGarmin.avg_heart_rate >= min_avg_hr)
+                    .filter(TrainingRecordGarmin.user_id == self.user_id, TrainingRecordGarmin.avg_heart_rate >= min_avg_hr)
 
                 if max_avg_hr:
                     query = query.filter(TrainingRecordGarmin.avg_heart_rate <= max_avg_hr)
@@ -475,7 +493,7 @@ class GarminDataSearch(BaseTrainingDataSearch):
         try:
             with self.db_manager.get_session() as session:
                 query = session.query(TrainingRecordGarmin)\
-                    .filter(TrainingRecordGarmin.training_load >= min_load)
+                    .filter(TrainingRecordGarmin.user_id == self.user_id, TrainingRecordGarmin.training_load >= min_load)
 
                 if max_load:
                     query = query.filter(TrainingRecordGarmin.training_load <= max_load)
@@ -517,7 +535,7 @@ class GarminDataSearch(BaseTrainingDataSearch):
         try:
             with self.db_manager.get_session() as session:
                 query = session.query(TrainingRecordGarmin)\
-                    .filter(TrainingRecordGarmin.avg_power_watts >= min_avg_power)
+                    .filter(TrainingRecordGarmin.user_id == self.user_id, TrainingRecordGarmin.avg_power_watts >= min_avg_power)
 
                 if max_avg_power:
                     query = query.filter(TrainingRecordGarmin.avg_power_watts <= max_avg_power)
@@ -552,7 +570,8 @@ class GarminDataSearch(BaseTrainingDataSearch):
         print(f"--- Garmin数据源(ORM): 训练效果分析 (params: {params_for_log}) ---")
 
         try:
-            with self.db_manager.get_session() as session:
+            # 纯聚合查询,配置了DuckDB分析引擎时在DuckDB中执行
+            with self.db_manager.get_analytics_session() as session:
                 query = session.query(
                     func.count(TrainingRecordGarmin.id).label('total_sessions'),
                     func.avg(TrainingRecordGarmin.aerobic_training_effect).label('avg_aerobic_effect'),
@@ -578,7 +597,7 @@ class GarminDataSearch(BaseTrainingDataSearch):
                     ).label('highly_improving_count'),
                     func.sum(TrainingRecordGarmin.moderate_intensity_minutes).label('total_moderate_minutes'),
                     func.sum(TrainingRecordGarmin.vigorous_intensity_minutes).label('total_vigorous_minutes')
-                )
+                ).filter(TrainingRecordGarmin.user_id == self.user_id)
 
                 # 添加日期过滤
                 if start_date:
@@ -641,12 +660,152 @@ class GarminDataSearch(BaseTrainingDataSearch):
                 error_message=str(e)
             )
 
+    def get_load_model(self, days: int = 42) -> DBResponse:
+        """
+        获取训练负荷模型 (CTL/ATL/TSB/ACWR, ORM方式,Garmin专属)
+
+        直接返回预先计算好的逐日序列,避免让LLM对原始训练记录做算术;
+        缓存为空时从数据库全量加载(开始时间, 训练负荷)重建一次
+        """
+        params_for_log = {'days': days}
+        print(f"--- Garmin数据源(ORM): 训练负荷模型 (params: {params_for_log}) ---")
+
+        try:
+            cache = get_load_model_cache(self.data_source, self.user_id)
+            if not cache.is_ready():
+                with self.db_manager.get_session() as session:
+                    rows = session.query(
+                        TrainingRecordGarmin.start_time_gmt,
+                        TrainingRecordGarmin.training_load
+                    ).filter(TrainingRecordGarmin.user_id == self.user_id, TrainingRecordGarmin.training_load.isnot(None)).all()
+                cache.rebuild(rows)
+
+            stats = cache.get_series(days=days)
+            if not stats:
+                return DBResponse(
+                    tool_name="get_load_model",
+                    parameters=params_for_log,
+                    data_source=self.data_source,
+                    error_message="未找到训练负荷数据"
+                )
+
+            return DBResponse(
+                tool_name="get_load_model",
+                parameters=params_for_log,
+                data_source=self.data_source,
+                statistics=stats
+            )
+        except Exception as e:
+            print(f"Garmin数据源(ORM)查询错误: {e}")
+            return DBResponse(
+                tool_name="get_load_model",
+                parameters=params_for_log,
+                data_source=self.data_source,
+                error_message=str(e)
+            )
+
+    # ===== 相似训练检索 =====
+
+    def _similarity_rows(self, session: Session, after_id: Optional[int] = None):
+        """拉取特征列并构建特征矩阵,after_id不为空时只拉取新增记录"""
+        M = TrainingRecordGarmin
+        raw_columns = [
+            'distance_meters', 'duration_seconds',
+            'avg_heart_rate', 'max_heart_rate', 'avg_cadence', 'avg_power_watts',
+            'aerobic_training_effect', 'anaerobic_training_effect',
+            'hr_zone_1_seconds', 'hr_zone_2_seconds', 'hr_zone_3_seconds',
+            'hr_zone_4_seconds', 'hr_zone_5_seconds'
+        ]
+        query = session.query(M.id, M.last_modify_ts, *[getattr(M, c) for c in raw_columns]).filter(M.user_id == self.user_id)
+        if after_id is not None:
+            query = query.filter(M.id > after_id)
+        rows = query.order_by(M.id).all()
+
+        raw = rows_to_matrix(rows, raw_columns)
+        features = np.column_stack(
+            derive_volume_features(raw[:, 0], raw[:, 1])
+            + [raw[:, 2:8], zone_fractions(raw[:, 8:13])]
+        ) if rows else np.empty((0, len(GARMIN_SIMILARITY_FEATURES)))
+        ids = np.array([row.id for row in rows], dtype=np.int64)
+        ts_sum = sum(int(row.last_modify_ts or 0) for row in rows)
+        return ids, features, ts_sum
+
+    def search_similar_trainings(
+        self,
+        activity_id: Any,
+        k: int = 5
+    ) -> DBResponse:
+        """查询相似训练 (标准化特征向量k近邻)"""
+        params_for_log = {'activity_id': activity_id, 'k': k}
+        print(f"--- Garmin数据源(ORM): 查询相似训练 (params: {params_for_log}) ---")
+
+        try:
+            with self.db_manager.get_session() as session:
+                M = TrainingRecordGarmin
+                # 兼容Garmin活动ID和数据库记录ID
+                reference = session.query(M).filter(M.user_id == self.user_id, M.activity_id == str(activity_id)).first()
+                if reference is None and str(activity_id).isdigit():
+                    reference = session.query(M).filter(M.user_id == self.user_id, M.id == int(activity_id)).first()
+                if reference is None:
+                    return DBResponse(
+                        tool_name="search_similar_trainings",
+                        parameters=params_for_log,
+                        data_source=self.data_source,
+                        error_message=f"未找到训练记录: {activity_id}"
+                    )
+
+                signature = session.query(
+                    func.count(M.id), func.max(M.id), func.sum(M.last_modify_ts)
+                ).filter(M.user_id == self.user_id).one()
+                index = get_similarity_index(self.data_source, GARMIN_SIMILARITY_FEATURES, self.user_id)
+                index.sync(
+                    (int(signature[0] or 0), int(signature[1] or 0), int(signature[2] or 0)),
+                    lambda after_id: self._similarity_rows(session, after_id)
+                )
+
+                neighbors = index.query(reference.id, k)
+                neighbor_ids = [nid for nid, _ in neighbors]
+                orm_by_id = {
+                    obj.id: obj for obj in session.query(M).filter(M.user_id == self.user_id, M.id.in_(neighbor_ids)).all()
+                } if neighbor_ids else {}
+                records = [self._orm_to_record(orm_by_id[nid]) for nid in neighbor_ids if nid in orm_by_id]
+
+                stats = {
+                    'reference': {
+                        'id': reference.id,
+                        'activity_id': reference.activity_id,
+                        'start_time': reference.start_time_gmt.strftime('%Y-%m-%d %H:%M') if reference.start_time_gmt else None,
+                        'features': index.describe(reference.id)
+                    },
+                    'neighbors': [
+                        {'id': nid, 'distance': dist} for nid, dist in neighbors
+                    ],
+                    'distance_note': '标准化欧氏距离,表示每个特征平均相差多少个标准差,越小越相似'
+                }
+
+            return DBResponse(
+                tool_name="search_similar_trainings",
+                parameters=params_for_log,
+                data_source=self.data_source,
+                results=records,
+                statistics=stats
+            )
+        except Exception as e:
+            print(f"Garmin数据源(ORM)查询错误: {e}")
+            return DBResponse(
+                tool_name="search_similar_trainings",
+                parameters=params_for_log,
+                data_source=self.data_source,
+                error_message=str(e)
+            )
+
     def get_supported_tools(self) -> List[str]:
         """获取Garmin数据源支持的所有工具"""
         base_tools = super().get_supported_tools()
         garmin_tools = [
             "search_by_training_load",
             "search_by_power_zone",
-            "get_training_effect_analysis"
+            "get_training_effect_analysis",
+            "get_load_model"
         ]
         return base_tools + garmin_tools
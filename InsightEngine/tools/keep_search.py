@@ -4,15 +4,40 @@ Keep运动APP训练数据搜索工具 (ORM版本)
 基于SQLAlchemy ORM实现,替代原生SQL,避免SQL注入风险
 """
 
-import json
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+import numpy as np
 from sqlalchemy import func
 
 from .base_search import BaseTrainingDataSearch, DBResponse
 from .db_models import TrainingRecordKeep
 from .db_session import db_session_manager
+from utils.hr_analytics import (
+    decode_hr_series,
+    get_hr_analytics_cache,
+    summarize_hr_metrics,
+    DEFAULT_MAX_HR,
+    DEFAULT_RESTING_HR,
+    HR_ZONE_BOUNDS
+)
+from utils.similarity_index import (
+    get_similarity_index,
+    rows_to_matrix,
+    derive_volume_features
+)
+
+# 未指定日期范围时,训练统计中的心率时间序列汇总只覆盖最近的天数(与get_load_model默认回看窗口一致),
+# 避免为多年历史逐条解码心率明细
+HR_STATS_DEFAULT_DAYS = 42
+# 按ID批量读取心率明细时每批的ID数,避免超长IN列表
+HR_SERIES_CHUNK_SIZE = 500
+
+# 相似训练检索使用的特征(标准化后参与距离计算)
+KEEP_SIMILARITY_FEATURES = [
+    'distance_km', 'duration_min', 'pace_s_per_km',
+    'avg_heart_rate', 'max_heart_rate', 'calories'
+]
 
 
 @dataclass
@@ -48,8 +73,8 @@ class KeepTrainingRecord:
 class KeepDataSearch(BaseTrainingDataSearch):
     """Keep数据源搜索工具 (ORM版本)"""
 
-    def __init__(self):
-        super().__init__(data_source="keep")
+    def __init__(self, user_id: Optional[str] = None):
+        super().__init__(data_source="keep", user_id=user_id)
         self.db_manager = db_session_manager
 
     def _load_db_config(self) -> Dict[str, Any]:
@@ -65,23 +90,9 @@ class KeepDataSearch(BaseTrainingDataSearch):
         raise NotImplementedError("ORM方式不使用_execute_query方法")
 
     def _parse_heart_rate_data(self, hr_json: Optional[str]) -> Optional[List[int]]:
-        """解析心率JSON数据"""
-        if not hr_json:
-            return None
-        try:
-            data = json.loads(hr_json)
-            if data is None or not isinstance(data, (list, tuple)):
-                return None
-            result = []
-            for x in data:
-                if x is not None and x != '':
-                    try:
-                        result.append(int(x))
-                    except (ValueError, TypeError):
-                        continue
-            return result if result else None
-        except (json.JSONDecodeError, ValueError, TypeError):
-            return None
+        """解析心率JSON数据 (NumPy一次性解码,剔除空值和越界值)"""
+        hr = decode_hr_series(hr_json)
+        return hr.astype(int).tolist() if hr.size else None
 
     def _orm_to_record(self, orm_obj: TrainingRecordKeep) -> KeepTrainingRecord:
         """将ORM对象转换为KeepTrainingRecord数据类"""
@@ -118,7 +129,7 @@ class KeepDataSearch(BaseTrainingDataSearch):
         try:
             with self.db_manager.get_session() as session:
                 query = session.query(TrainingRecordKeep)\
-                    .filter(TrainingRecordKeep.start_time >= start_time)\
+                    .filter(TrainingRecordKeep.user_id == self.user_id, TrainingRecordKeep.start_time >= start_time)\
                     .order_by(TrainingRecordKeep.start_time.desc())\
                     .limit(limit)
 
@@ -170,6 +181,7 @@ class KeepDataSearch(BaseTrainingDataSearch):
             with self.db_manager.get_session() as session:
                 query = session.query(TrainingRecordKeep)\
                     .filter(
+                        TrainingRecordKeep.user_id == self.user_id,
                         TrainingRecordKeep.start_time >= start_dt,
                         TrainingRecordKeep.start_time < end_dt
                     )\
@@ -207,7 +219,8 @@ class KeepDataSearch(BaseTrainingDataSearch):
         print(f"--- Keep数据源(ORM): 获取训练统计 (params: {params_for_log}) ---")
 
         try:
-            with self.db_manager.get_session() as session:
+            # 纯聚合查询,配置了DuckDB分析引擎时在DuckDB中执行
+            with self.db_manager.get_analytics_session() as session:
                 query = session.query(
                     func.count(TrainingRecordKeep.id).label('total_sessions'),
                     func.sum(TrainingRecordKeep.duration_seconds).label('total_duration'),
@@ -217,7 +230,7 @@ class KeepDataSearch(BaseTrainingDataSearch):
                     func.avg(TrainingRecordKeep.avg_heart_rate).label('overall_avg_heart_rate'),
                     func.max(TrainingRecordKeep.max_heart_rate).label('peak_heart_rate'),
                     func.sum(TrainingRecordKeep.calories).label('total_calories')
-                )
+                ).filter(TrainingRecordKeep.user_id == self.user_id)
 
                 # 添加日期过滤
                 if start_date:
@@ -273,6 +286,25 @@ class KeepDataSearch(BaseTrainingDataSearch):
                 else:
                     stats['avg_pace_per_km'] = None
 
+            # 心率时间序列汇总列(TRIMP、心率漂移、区间时长),需要读取心率明细,使用主数据库;
+            # 未指定开始日期时只汇总结束日期(默认今天)前 HR_STATS_DEFAULT_DAYS 天
+            hr_start_dt = start_dt if start_date else \
+                (end_dt if end_date else datetime.now()) - timedelta(days=HR_STATS_DEFAULT_DAYS)
+            with self.db_manager.get_session() as session:
+                hr_rows_query = session.query(
+                    TrainingRecordKeep.id,
+                    TrainingRecordKeep.last_modify_ts,
+                    TrainingRecordKeep.duration_seconds
+                ).filter(
+                    TrainingRecordKeep.user_id == self.user_id,
+                    TrainingRecordKeep.start_time >= hr_start_dt
+                )
+                if end_date:
+                    hr_rows_query = hr_rows_query.filter(TrainingRecordKeep.start_time < end_dt)
+                hr_metrics = self._analyze_heart_rate(session, hr_rows_query.all())
+                stats.update(summarize_hr_metrics(hr_metrics.values()))
+                stats['hr_metrics_since'] = hr_start_dt.strftime('%Y-%m-%d')
+
             return DBResponse(
                 tool_name="get_training_stats",
                 parameters=params_for_log,
@@ -307,7 +339,7 @@ class KeepDataSearch(BaseTrainingDataSearch):
         try:
             with self.db_manager.get_session() as session:
                 query = session.query(TrainingRecordKeep)\
-                    .filter(TrainingRecordKeep.distance_meters >= min_meters)
+                    .filter(TrainingRecordKeep.user_id == self.user_id, TrainingRecordKeep.distance_meters >= min_meters)
 
                 if max_distance_km:
                     max_meters = max_distance_km * 1000
@@ -350,7 +382,7 @@ class KeepDataSearch(BaseTrainingDataSearch):
         try:
             with self.db_manager.get_session() as session:
                 query = session.query(TrainingRecordKeep)\
-                    .filter(TrainingRecordKeep.avg_heart_rate >= min_avg_hr)
+                    .filter(TrainingRecordKeep.user_id == self.user_id, TrainingRecordKeep.avg_heart_rate >= min_avg_hr)
 
                 if max_avg_hr:
                     query = query.filter(TrainingRecordKeep.avg_heart_rate <= max_avg_hr)
@@ -374,3 +406,213 @@ class KeepDataSearch(BaseTrainingDataSearch):
                 data_source=self.data_source,
                 error_message=str(e)
             )
+
+    # ===== 相似训练检索 =====
+
+    def _similarity_rows(self, session, after_id: Optional[int] = None):
+        """拉取特征列并构建特征矩阵,after_id不为空时只拉取新增记录"""
+        M = TrainingRecordKeep
+        raw_columns = ['distance_meters', 'duration_seconds', 'avg_heart_rate', 'max_heart_rate', 'calories']
+        query = session.query(M.id, M.last_modify_ts, *[getattr(M, c) for c in raw_columns]).filter(M.user_id == self.user_id)
+        if after_id is not None:
+            query = query.filter(M.id > after_id)
+        rows = query.order_by(M.id).all()
+
+        raw = rows_to_matrix(rows, raw_columns)
+        # Keep导入时缺失心率/卡路里填0,这里视为缺失值
+        raw[:, 2:5][raw[:, 2:5] == 0] = np.nan
+        features = np.column_stack(
+            derive_volume_features(raw[:, 0], raw[:, 1]) + [raw[:, 2:5]]
+        ) if rows else np.empty((0, len(KEEP_SIMILARITY_FEATURES)))
+        ids = np.array([row.id for row in rows], dtype=np.int64)
+        ts_sum = sum(int(row.last_modify_ts or 0) for row in rows)
+        return ids, features, ts_sum
+
+    def search_similar_trainings(
+        self,
+        activity_id: Any,
+        k: int = 5
+    ) -> DBResponse:
+        """查询相似训练 (标准化特征向量k近邻)"""
+        params_for_log = {'activity_id': activity_id, 'k': k}
+        print(f"--- Keep数据源(ORM): 查询相似训练 (params: {params_for_log}) ---")
+
+        try:
+            with self.db_manager.get_session() as session:
+                M = TrainingRecordKeep
+                reference = None
+                if str(activity_id).isdigit():
+                    reference = session.query(M).filter(M.user_id == self.user_id, M.id == int(activity_id)).first()
+                if reference is None:
+                    return DBResponse(
+                        tool_name="search_similar_trainings",
+                        parameters=params_for_log,
+                        data_source=self.data_source,
+                        error_message=f"未找到训练记录: {activity_id}"
+                    )
+
+                signature = session.query(
+                    func.count(M.id), func.max(M.id), func.sum(M.last_modify_ts)
+                ).filter(M.user_id == self.user_id).one()
+                index = get_similarity_index(self.data_source, KEEP_SIMILARITY_FEATURES, self.user_id)
+                index.sync(
+                    (int(signature[0] or 0), int(signature[1] or 0), int(signature[2] or 0)),
+                    lambda after_id: self._similarity_rows(session, after_id)
+                )
+
+                neighbors = index.query(reference.id, k)
+                neighbor_ids = [nid for nid, _ in neighbors]
+                orm_by_id = {
+                    obj.id: obj for obj in session.query(M).filter(M.user_id == self.user_id, M.id.in_(neighbor_ids)).all()
+                } if neighbor_ids else {}
+                records = [self._orm_to_record(orm_by_id[nid]) for nid in neighbor_ids if nid in orm_by_id]
+
+                stats = {
+                    'reference': {
+                        'id': reference.id,
+                        'start_time': reference.start_time.strftime('%Y-%m-%d %H:%M') if reference.start_time else None,
+                        'features': index.describe(reference.id)
+                    },
+                    'neighbors': [
+                        {'id': nid, 'distance': dist} for nid, dist in neighbors
+                    ],
+                    'distance_note': '标准化欧氏距离,表示每个特征平均相差多少个标准差,越小越相似'
+                }
+
+            return DBResponse(
+                tool_name="search_similar_trainings",
+                parameters=params_for_log,
+                data_source=self.data_source,
+                results=records,
+                statistics=stats
+            )
+        except Exception as e:
+            print(f"Keep数据源(ORM)查询错误: {e}")
+            return DBResponse(
+                tool_name="search_similar_trainings",
+                parameters=params_for_log,
+                data_source=self.data_source,
+                error_message=str(e)
+            )
+
+    # ===== 心率时间序列分析 =====
+
+    def _analyze_heart_rate(
+        self,
+        session,
+        rows: List[Any],
+        max_hr: int = DEFAULT_MAX_HR,
+        resting_hr: int = DEFAULT_RESTING_HR
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        批量计算心率指标,只为缓存未命中的活动读取heart_rate_data
+
+        Args:
+            session: 数据库会话
+            rows: (id, last_modify_ts, duration_seconds) 行列表
+
+        Returns:
+            {记录ID: 心率指标字典}
+        """
+        def load_series(ids: List[int]) -> Dict[int, Optional[str]]:
+            series = {}
+            for i in range(0, len(ids), HR_SERIES_CHUNK_SIZE):
+                chunk = ids[i:i + HR_SERIES_CHUNK_SIZE]
+                rows = session.query(TrainingRecordKeep.id, TrainingRecordKeep.heart_rate_data)\
+                    .filter(TrainingRecordKeep.user_id == self.user_id, TrainingRecordKeep.id.in_(chunk))\
+                    .all()
+                series.update((row.id, row.heart_rate_data) for row in rows)
+            return series
+
+        cache = get_hr_analytics_cache(self.data_source)
+        return cache.analyze_many(
+            ((row.id, row.last_modify_ts, row.duration_seconds) for row in rows),
+            load_series,
+            max_hr=max_hr,
+            resting_hr=resting_hr
+        )
+
+    def get_heart_rate_analysis(
+        self,
+        days: int = 30,
+        limit: int = 20,
+        max_hr: Optional[int] = None,
+        resting_hr: Optional[int] = None
+    ) -> DBResponse:
+        """
+        心率时间序列分析 (ORM方式,Keep专属)
+
+        基于逐点心率序列计算每次训练的心率区间时长、心率漂移、TRIMP和心率恢复
+        """
+        max_hr = max_hr or DEFAULT_MAX_HR
+        resting_hr = resting_hr or DEFAULT_RESTING_HR
+        params_for_log = {'days': days, 'limit': limit, 'max_hr': max_hr, 'resting_hr': resting_hr}
+        print(f"--- Keep数据源(ORM): 心率时间序列分析 (params: {params_for_log}) ---")
+
+        start_time = datetime.now() - timedelta(days=days)
+
+        try:
+            with self.db_manager.get_session() as session:
+                rows = session.query(
+                    TrainingRecordKeep.id,
+                    TrainingRecordKeep.last_modify_ts,
+                    TrainingRecordKeep.duration_seconds,
+                    TrainingRecordKeep.exercise_type,
+                    TrainingRecordKeep.start_time,
+                    TrainingRecordKeep.distance_meters
+                ).filter(TrainingRecordKeep.user_id == self.user_id, TrainingRecordKeep.start_time >= start_time)\
+                    .order_by(TrainingRecordKeep.start_time.desc())\
+                    .limit(limit)\
+                    .all()
+
+                hr_metrics = self._analyze_heart_rate(session, rows, max_hr, resting_hr)
+
+            activities = []
+            for row in rows:
+                metrics = hr_metrics.get(row.id)
+                if not metrics:
+                    continue
+                activities.append({
+                    'id': row.id,
+                    'exercise_type': row.exercise_type,
+                    'start_time': row.start_time.strftime('%Y-%m-%d %H:%M'),
+                    'distance_km': round(float(row.distance_meters) / 1000, 2) if row.distance_meters else None,
+                    **metrics
+                })
+
+            if not activities:
+                return DBResponse(
+                    tool_name="get_heart_rate_analysis",
+                    parameters=params_for_log,
+                    data_source=self.data_source,
+                    error_message="未找到包含心率序列的训练记录"
+                )
+
+            stats = {
+                'summary': summarize_hr_metrics(activities),
+                'hr_zone_bounds_bpm': [int(round(b * max_hr)) for b in HR_ZONE_BOUNDS],
+                'activities': activities
+            }
+
+            return DBResponse(
+                tool_name="get_heart_rate_analysis",
+                parameters=params_for_log,
+                data_source=self.data_source,
+                statistics=stats
+            )
+        except Exception as e:
+            print(f"Keep数据源(ORM)查询错误: {e}")
+            return DBResponse(
+                tool_name="get_heart_rate_analysis",
+                parameters=params_for_log,
+                data_source=self.data_source,
+                error_message=str(e)
+            )
+
+    def get_supported_tools(self) -> List[str]:
+        """获取Keep数据源支持的所有工具"""
+        base_tools = super().get_supported_tools()
+        keep_tools = [
+            "get_heart_rate_analysis"
+        ]
+        return base_tools + keep_tools
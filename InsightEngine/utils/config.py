@@ -41,8 +41,12 @@ class Config:
     db_port: int = 3306
     db_charset: str = "utf8mb4"
 
+    # 训练数据用户(由Flask会话经引擎URL参数user_id传入,None时使用默认用户)
+    user_id: Optional[str] = None
+
     # Model behaviour configuration
     max_reflections: int = 3
+    reflection_min_summary_change: float = 0.05  # 反思总结改动比例低于该值时提前结束(0为不检查)
     max_paragraphs: int = 6
     search_timeout: int = 240
     max_content_length: int = 500000
@@ -53,6 +57,8 @@ class Config:
     # Output configuration
     output_dir: str = "reports"
     save_intermediate_states: bool = True
+    enable_checkpoints: bool = True  # 每步追加写入检查点日志,支持resume(run_id)
+    state_format: str = "json"  # 中间状态保存格式: json / compact(紧凑快照,搜索内容按哈希存入blob仓库)
 
     def __post_init__(self):
         if not self.llm_provider and self.llm_model_name:
@@ -96,6 +102,7 @@ class Config:
                 db_port=int(_get_value(config_module, "DB_PORT", 3306)),
                 db_charset=_get_value(config_module, "DB_CHARSET", "utf8mb4"),
                 max_reflections=int(_get_value(config_module, "MAX_REFLECTIONS", 3)),
+                reflection_min_summary_change=float(_get_value(config_module, "REFLECTION_MIN_SUMMARY_CHANGE", 0.05)),
                 max_paragraphs=int(_get_value(config_module, "MAX_PARAGRAPHS", 6)),
                 search_timeout=int(_get_value(config_module, "SEARCH_TIMEOUT", 240)),
                 max_content_length=int(_get_value(config_module, "SEARCH_CONTENT_MAX_LENGTH", 500000)),
@@ -105,6 +112,11 @@ class Config:
                     _get_value(config_module, "SAVE_INTERMEDIATE_STATES", "true")
                 ).lower()
                 in ("true", "1", "yes"),
+                enable_checkpoints=str(
+                    _get_value(config_module, "ENABLE_CHECKPOINTS", "true")
+                ).lower()
+                in ("true", "1", "yes"),
+                state_format=str(_get_value(config_module, "STATE_SNAPSHOT_FORMAT", "json")).lower(),
             )
 
         # .env style configuration
@@ -128,6 +140,7 @@ class Config:
             db_port=int(_get_value(config_dict, "DB_PORT", 3306)),
             db_charset=_get_value(config_dict, "DB_CHARSET", "utf8mb4"),
             max_reflections=int(_get_value(config_dict, "MAX_REFLECTIONS", 3)),
+            reflection_min_summary_change=float(_get_value(config_dict, "REFLECTION_MIN_SUMMARY_CHANGE", 0.05)),
             max_paragraphs=int(_get_value(config_dict, "MAX_PARAGRAPHS", 6)),
             search_timeout=int(_get_value(config_dict, "SEARCH_TIMEOUT", 240)),
             max_content_length=int(_get_value(config_dict, "SEARCH_CONTENT_MAX_LENGTH", 500000)),
@@ -137,6 +150,11 @@ class Config:
                 _get_value(config_dict, "SAVE_INTERMEDIATE_STATES", "true")
             ).lower()
             in ("true", "1", "yes"),
+            enable_checkpoints=str(
+                _get_value(config_dict, "ENABLE_CHECKPOINTS", "true")
+            ).lower()
+            in ("true", "1", "yes"),
+            state_format=str(_get_value(config_dict, "STATE_SNAPSHOT_FORMAT", "json")).lower(),
         )
 
 
@@ -219,9 +237,13 @@ def print_config(config: Config):
     print(f"搜索超时: {config.search_timeout} 秒")
     print(f"最长内容长度: {config.max_content_length}")
     print(f"最大反思次数: {config.max_reflections}")
+    print(f"反思收敛阈值(总结改动): {config.reflection_min_summary_change}")
     print(f"最大段落数: {config.max_paragraphs}")
+    print(f"训练数据用户: {config.user_id or '(默认)'}")
     print(f"输出目录: {config.output_dir}")
     print(f"保存中间状态: {config.save_intermediate_states}")
+    print(f"检查点日志: {config.enable_checkpoints}")
+    print(f"状态保存格式: {config.state_format}")
     print(f"LLM API Key: {'已配置' if config.llm_api_key else '未配置'}")
     print(f"数据库连接: {'已配置' if all([config.db_host, config.db_user, config.db_password, config.db_name]) else '未配置'}")
     print("========================\n")
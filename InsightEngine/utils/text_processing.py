@@ -8,6 +8,8 @@ import json
 from typing import Dict, Any, List
 from json.decoder import JSONDecodeError
 
+from utils.prompt_packer import truncate_text
+
 
 def clean_json_tags(text: str) -> str:
     """
@@ -272,17 +274,8 @@ def truncate_content(content: str, max_length: int = 20000) -> str:
     Returns:
         截断后的内容
     """
-    if len(content) <= max_length:
-        return content
-    
-    # 尝试在单词边界截断
-    truncated = content[:max_length]
-    last_space = truncated.rfind(' ')
-    
-    if last_space > max_length * 0.8:  # 如果最后一个空格位置合理
-        return truncated[:last_space] + "..."
-    else:
-        return truncated + "..."
+    # 优先在句子边界(含中文标点)截断,其次在空格处截断
+    return truncate_text(content, max_length)
 
 
 def format_search_results_for_prompt(search_results: List[Dict[str, Any]], 
@@ -8,7 +8,7 @@ import json
 import os
 import re
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
 from .llms import LLMClient
 from .nodes import (
@@ -22,6 +22,16 @@ from .nodes import (
 from .state import State
 from .tools import BochaMultimodalSearch, BochaResponse
 from .utils import Config, load_config, format_search_results_for_prompt
+from utils.parallel_search import run_searches_concurrently, merge_search_results, dedupe_queries
+from utils.content_store import ContentStore
+from utils.prompt_packer import estimate_tokens, MIN_ITEM_TOKENS
+from utils.run_journal import RunJournal
+from utils.convergence import ReflectionConvergence
+from utils.state_snapshot import SNAPSHOT_SUFFIX
+
+
+# 检查点日志按引擎分目录存放
+JOURNAL_ENGINE = "media"
 
 
 class LogisticsIntelligenceAgent:
@@ -32,12 +42,13 @@ class LogisticsIntelligenceAgent:
     整合博查多模态搜索工具,提供全面的情报收集和分析服务。
     """
 
-    def __init__(self, config: Optional[Config] = None):
+    def __init__(self, config: Optional[Config] = None, search_agency: Optional[BochaMultimodalSearch] = None):
         """
         初始化后勤与情报官Agent
 
         Args:
             config: 配置对象，如果不提供则自动加载
+            search_agency: 使用指定的搜索客户端（如基准测试中接入离线桩客户端），默认按配置创建
         """
         # 使用配置热重载工具
         from utils.config_reloader import reload_config, get_config_value
@@ -53,7 +64,7 @@ class LogisticsIntelligenceAgent:
         self.llm_client = self._initialize_llm()
         
         # 初始化搜索工具集
-        self.search_agency = BochaMultimodalSearch(api_key=self.config.bocha_api_key)
+        self.search_agency = search_agency or BochaMultimodalSearch(api_key=self.config.bocha_api_key)
         
         # 初始化节点
         self._initialize_nodes()
@@ -61,6 +72,12 @@ class LogisticsIntelligenceAgent:
         # 状态
         self.state = State()
         
+        # 当前运行的检查点日志
+        self.journal: Optional[RunJournal] = None
+        
+        # 本次研究的搜索内容存储(跨段落去重)
+        self.content_store = ContentStore(self.state.content_pool)
+        
         # 确保输出目录存在
         os.makedirs(self.config.output_dir, exist_ok=True)
         
@@ -78,8 +95,8 @@ class LogisticsIntelligenceAgent:
     
     def _initialize_nodes(self):
         """初始化处理节点"""
-        self.first_search_node = FirstSearchNode(self.llm_client)
-        self.reflection_node = ReflectionNode(self.llm_client)
+        self.first_search_node = FirstSearchNode(self.llm_client, self.config.max_parallel_searches)
+        self.reflection_node = ReflectionNode(self.llm_client, self.config.max_parallel_searches)
         self.first_summary_node = FirstSummaryNode(self.llm_client)
         self.reflection_summary_node = ReflectionSummaryNode(self.llm_client)
         self.report_formatting_node = ReportFormattingNode(self.llm_client)
@@ -143,7 +160,83 @@ class LogisticsIntelligenceAgent:
         else:
             print(f"  ⚠️  未知的搜索工具: {tool_name}，使用默认综合搜索")
             return self.search_agency.comprehensive_search(query)
+
+    def _run_search(self, search: Tuple[str, str]) -> BochaResponse:
+        """执行单个(工具, 查询)搜索，支持max_results的工具统一取10条"""
+        search_tool, search_query = search
+        search_kwargs = {}
+        if search_tool in ["comprehensive_search", "web_search_only"]:
+            # 这些工具支持max_results参数
+            search_kwargs["max_results"] = 10
+        return self.execute_search_tool(search_tool, search_query, **search_kwargs)
+
+    def _convert_search_response(self, search_response: Optional[BochaResponse]) -> List[Dict[str, Any]]:
+        """将BochaResponse转换为兼容格式（每种搜索工具都有其特定的结果数量，这里取前10个作为上限）"""
+        search_results = []
+        if search_response and search_response.webpages:
+            for result in search_response.webpages[:10]:
+                search_results.append({
+                    'title': result.name,
+                    'url': result.url,
+                    'content': result.snippet,
+                    'score': None,  # Bocha API不提供score
+                    'raw_content': result.snippet,
+                    'published_date': result.date_last_crawled  # 使用爬取日期
+                })
+        return search_results
+
+    def _plan_searches(self, searches: List[Dict[str, str]]) -> List[Tuple[str, str]]:
+        """去重并截取本轮实际执行的(工具, 查询)组合(最多 max_parallel_searches 个)"""
+        return dedupe_queries(
+            [(item.get("search_tool") or "comprehensive_search", item.get("search_query", "")) for item in searches],
+            max(1, self.config.max_parallel_searches)
+        )
+
+    def _execute_searches(self, paragraph_index: int,
+                          pairs: List[Tuple[str, str]]) -> Tuple[List[str], str, List[Dict[str, Any]]]:
+        """
+        并发执行一组互补的"查询+工具"组合，登记到内容存储并逐个记录到搜索历史，再按URL合并去重
+
+        Args:
+            paragraph_index: 当前段落索引
+            pairs: _plan_searches 返回的(工具, 查询)列表（第一个为主查询）
+
+        Returns:
+            (实际执行的查询列表, 用于总结提示词的查询描述, 合并去重后的搜索结果)
+        """
+        responses = run_searches_concurrently(pairs, self._run_search, self.config.max_parallel_searches)
+
+        paragraph = self.state.paragraphs[paragraph_index]
+        result_lists = []
+        for (search_tool, search_query), response in responses:
+            results = self._convert_search_response(response)
+            for result in results:
+                result['content_id'] = self.content_store.add(result, paragraph_index)[0]
+            paragraph.research.add_search_results(search_query, results)
+            result_lists.append(results)
+
+        search_results = merge_search_results(result_lists, self.config.max_search_results)
+        queries = [query for _, query in pairs]
+        return queries, "; ".join(queries), search_results
     
+    def _format_search_results(self, search_results: List[Dict[str, Any]],
+                               paragraph_index: int) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        格式化送入总结提示词的搜索结果:新内容在token预算内传入,已总结过的内容只按ID引用
+
+        Returns:
+            (提示词中的搜索结果列表, 完整传入的新内容结果)
+        """
+        fresh_results, references = self.content_store.prepare_for_prompt(search_results, paragraph_index)
+        # 引用行同样占用预算
+        token_budget = self.config.search_results_token_budget
+        if token_budget:
+            token_budget = max(token_budget - sum(estimate_tokens(ref) for ref in references), MIN_ITEM_TOKENS)
+        formatted = format_search_results_for_prompt(
+            fresh_results, self.config.max_content_length, token_budget
+        )
+        return formatted + references, fresh_results
+
     def research(self, query: str, save_report: bool = True) -> str:
         """
         执行深度研究
@@ -159,15 +252,53 @@ class LogisticsIntelligenceAgent:
         print(f"开始深度研究: {query}")
         print(f"{'='*60}")
         
+        self.state = State()
+        self.content_store = ContentStore(self.state.content_pool)
+        self._open_journal()
+        self._checkpoint("record_start", query)
+        
+        return self._run_research(query, save_report)
+    
+    def resume(self, run_id: str, save_report: bool = True) -> str:
+        """
+        从检查点恢复中断的研究,跳过已完成的段落和反思轮次
+        
+        Args:
+            run_id: 中断运行的ID(研究开始时打印,也可用 utils.run_journal.list_runs 查看)
+            save_report: 是否保存报告到文件
+        
+        Returns:
+            最终报告内容
+        """
+        journal = RunJournal(JOURNAL_ENGINE, run_id)
+        if not journal.exists():
+            raise FileNotFoundError(f"检查点日志不存在: {journal.path}")
+        self.state = journal.replay(State())
+        self.journal = journal
+        self.content_store = ContentStore(self.state.content_pool)
+        self.content_store.restore(self.state.paragraphs)
+        
+        print(f"\n{'='*60}")
+        print(f"从检查点恢复研究: {self.state.query} (run_id: {run_id})")
+        print(f"已完成段落: {self.state.get_completed_paragraphs_count()}/{self.state.get_total_paragraphs_count()}")
+        print(f"{'='*60}")
+        
+        return self._run_research(self.state.query, save_report)
+    
+    def _run_research(self, query: str, save_report: bool) -> str:
+        """依次执行研究步骤(检查点中已完成的步骤跳过)"""
+        # 按本次运行统计LLM用量(含服务商报告的前缀缓存命中)
+        self.llm_client.usage.reset()
         try:
             # Step 1: 生成报告结构
-            self._generate_report_structure(query)
+            if not self.state.paragraphs:
+                self._generate_report_structure(query)
             
             # Step 2: 处理每个段落
             self._process_paragraphs()
             
             # Step 3: 生成最终报告
-            final_report = self._generate_final_report()
+            final_report = self.state.final_report or self._generate_final_report()
             
             # Step 4: 保存报告
             if save_report:
@@ -175,6 +306,7 @@ class LogisticsIntelligenceAgent:
             
             print(f"\n{'='*60}")
             print("深度研究完成！")
+            print(self.llm_client.usage.format_summary())
             print(f"{'='*60}")
             
             return final_report
@@ -183,6 +315,21 @@ class LogisticsIntelligenceAgent:
             print(f"研究过程中发生错误: {str(e)}")
             raise e
     
+    def _open_journal(self):
+        """为新的研究运行创建检查点日志(配置关闭时不记录)"""
+        self.journal = RunJournal(JOURNAL_ENGINE) if self.config.enable_checkpoints else None
+        if self.journal:
+            print(f"检查点日志: {self.journal.path} (run_id: {self.journal.run_id})")
+    
+    def _checkpoint(self, method: str, *args):
+        """写入检查点;写入失败只打印警告,不中断研究"""
+        if not self.journal:
+            return
+        try:
+            getattr(self.journal, method)(*args)
+        except OSError as e:
+            print(f"写入检查点失败: {str(e)}")
+    
     def _generate_report_structure(self, query: str):
         """生成报告结构"""
         print(f"\n[步骤 1] 生成报告结构...")
@@ -196,26 +343,40 @@ class LogisticsIntelligenceAgent:
         print(f"报告结构已生成，共 {len(self.state.paragraphs)} 个段落:")
         for i, paragraph in enumerate(self.state.paragraphs, 1):
             print(f"  {i}. {paragraph.title}")
+        
+        self._checkpoint("record_structure", self.state)
     
     def _process_paragraphs(self):
         """处理所有段落"""
         total_paragraphs = len(self.state.paragraphs)
         
         for i in range(total_paragraphs):
+            paragraph = self.state.paragraphs[i]
+            if paragraph.research.is_completed:
+                print(f"\n[步骤 2.{i+1}] 已完成(检查点),跳过: {paragraph.title}")
+                continue
+            
             print(f"\n[步骤 2.{i+1}] 处理段落: {self.state.paragraphs[i].title}")
             print("-" * 50)
             
-            # 初始搜索和总结
-            self._initial_search_and_summary(i)
+            # 初始搜索和总结(恢复运行时已有总结则跳过)
+            if not paragraph.research.latest_summary:
+                self._initial_search_and_summary(i)
             
             # 反思循环
             self._reflection_loop(i)
             
             # 标记段落完成
             self.state.paragraphs[i].research.mark_completed()
+            self._checkpoint("record_paragraph_completed", self.state, i)
             
             progress = (i + 1) / total_paragraphs * 100
             print(f"段落处理完成 ({progress:.1f}%)")
+        
+        # 反思收敛统计
+        progress = self.state.get_progress_summary()
+        if progress["reflections_saved"]:
+            print(f"\n反思收敛: {progress['early_stopped_paragraphs']} 个段落提前结束反思, 共节省 {progress['reflections_saved']} 轮")
     
     def _initial_search_and_summary(self, paragraph_index: int):
         """执行初始搜索和总结"""
@@ -238,31 +399,10 @@ class LogisticsIntelligenceAgent:
         print(f"  - 选择的工具: {search_tool}")
         print(f"  - 推理: {reasoning}")
         
-        # 执行搜索
+        # 执行搜索（多个互补的查询+工具组合并发执行）
         print("  - 执行网络搜索...")
-        
-        # 处理特殊参数（新的工具集不需要日期参数处理）
-        search_kwargs = {}
-        if search_tool in ["comprehensive_search", "web_search_only"]:
-            # 这些工具支持max_results参数
-            search_kwargs["max_results"] = 10
-        
-        search_response = self.execute_search_tool(search_tool, search_query, **search_kwargs)
-        
-        # 转换为兼容格式
-        search_results = []
-        if search_response and search_response.webpages:
-            # 每种搜索工具都有其特定的结果数量，这里取前10个作为上限
-            max_results = min(len(search_response.webpages), 10)
-            for result in search_response.webpages[:max_results]:
-                search_results.append({
-                    'title': result.name,
-                    'url': result.url,
-                    'content': result.snippet,
-                    'score': None,  # Bocha API不提供score
-                    'raw_content': result.snippet,
-                    'published_date': result.date_last_crawled  # 使用爬取日期
-                })
+        searches = search_output.get("searches") or [{"search_query": search_query, "search_tool": search_tool}]
+        _, search_query, search_results = self._execute_searches(paragraph_index, self._plan_searches(searches))
         
         if search_results:
             print(f"  - 找到 {len(search_results)} 个搜索结果")
@@ -272,32 +412,36 @@ class LogisticsIntelligenceAgent:
         else:
             print("  - 未找到搜索结果")
         
-        # 更新状态中的搜索历史
-        paragraph.research.add_search_results(search_query, search_results)
-        
         # 生成初始总结
         print("  - 生成初始总结...")
+        prompt_results, fresh_results = self._format_search_results(search_results, paragraph_index)
         summary_input = {
             "title": paragraph.title,
             "content": paragraph.content,
             "search_query": search_query,
-            "search_results": format_search_results_for_prompt(
-                search_results, self.config.max_content_length
-            )
+            "search_results": prompt_results
         }
         
         # 更新状态
         self.state = self.first_summary_node.mutate_state(
             summary_input, self.state, paragraph_index
         )
+        self.content_store.mark_summarized(fresh_results)
+        self._checkpoint("record_summary", self.state, paragraph_index, "initial")
         
         print("  - 初始总结完成")
     
     def _reflection_loop(self, paragraph_index: int):
         """执行反思循环"""
         paragraph = self.state.paragraphs[paragraph_index]
+        convergence = ReflectionConvergence(
+            paragraph.research.search_history,
+            query_threshold=self.config.reflection_query_similarity,
+            min_summary_change=self.config.reflection_min_summary_change
+        )
         
-        for reflection_i in range(self.config.max_reflections):
+        # 恢复运行时从已完成的反思轮次之后继续
+        for reflection_i in range(paragraph.research.reflection_iteration, self.config.max_reflections):
             print(f"  - 反思 {reflection_i + 1}/{self.config.max_reflections}...")
             
             # 准备反思输入
@@ -317,29 +461,15 @@ class LogisticsIntelligenceAgent:
             print(f"    选择的工具: {search_tool}")
             print(f"    反思推理: {reasoning}")
             
-            # 执行反思搜索
-            # 处理特殊参数
-            search_kwargs = {}
-            if search_tool in ["comprehensive_search", "web_search_only"]:
-                # 这些工具支持max_results参数
-                search_kwargs["max_results"] = 10
-            
-            search_response = self.execute_search_tool(search_tool, search_query, **search_kwargs)
-            
-            # 转换为兼容格式
-            search_results = []
-            if search_response and search_response.webpages:
-                # 每种搜索工具都有其特定的结果数量，这里取前10个作为上限
-                max_results = min(len(search_response.webpages), 10)
-                for result in search_response.webpages[:max_results]:
-                    search_results.append({
-                        'title': result.name,
-                        'url': result.url,
-                        'content': result.snippet,
-                        'score': None,  # Bocha API不提供score
-                        'raw_content': result.snippet,
-                        'published_date': result.date_last_crawled
-                    })
+            # 执行反思搜索（多个互补的查询+工具组合并发执行）
+            searches = reflection_output.get("searches") or [{"search_query": search_query, "search_tool": search_tool}]
+            # 只比较本轮实际会执行的查询,超出并发数被丢弃的建议查询不参与收敛判断
+            pairs = self._plan_searches(searches)
+            stop_reason = convergence.check_queries([query for _, query in pairs])
+            if stop_reason:
+                self._stop_reflection(paragraph, reflection_i, stop_reason)
+                break
+            executed_queries, search_query, search_results = self._execute_searches(paragraph_index, pairs)
             
             if search_results:
                 print(f"    找到 {len(search_results)} 个反思搜索结果")
@@ -349,26 +479,46 @@ class LogisticsIntelligenceAgent:
             else:
                 print("    未找到反思搜索结果")
             
-            # 更新搜索历史
-            paragraph.research.add_search_results(search_query, search_results)
+            stop_reason = convergence.check_results(
+                search_results, lambda result: self.content_store.is_summarized(result.get('content_id'))
+            )
+            if stop_reason:
+                self._stop_reflection(paragraph, reflection_i, stop_reason)
+                break
+            convergence.record_round(executed_queries, search_results)
             
             # 生成反思总结
+            prompt_results, fresh_results = self._format_search_results(search_results, paragraph_index)
             reflection_summary_input = {
                 "title": paragraph.title,
                 "content": paragraph.content,
                 "search_query": search_query,
-                "search_results": format_search_results_for_prompt(
-                    search_results, self.config.max_content_length
-                ),
+                "search_results": prompt_results,
                 "paragraph_latest_state": paragraph.research.latest_summary
             }
             
             # 更新状态
+            previous_summary = paragraph.research.latest_summary
             self.state = self.reflection_summary_node.mutate_state(
                 reflection_summary_input, self.state, paragraph_index
             )
+            self.content_store.mark_summarized(fresh_results)
+            self._checkpoint("record_summary", self.state, paragraph_index, "reflection")
             
             print(f"    反思 {reflection_i + 1} 完成")
+            
+            stop_reason = convergence.check_summary(previous_summary, paragraph.research.latest_summary)
+            if stop_reason:
+                self._stop_reflection(paragraph, reflection_i + 1, stop_reason)
+                break
+    
+    def _stop_reflection(self, paragraph, completed_rounds: int, reason: str):
+        """提前结束反思循环,记录原因和节省的轮数"""
+        saved = self.config.max_reflections - completed_rounds
+        if saved <= 0:
+            return
+        paragraph.research.record_early_stop(reason, saved)
+        print(f"    反思提前结束: {reason} (节省 {saved} 轮)")
     
     def _generate_final_report(self) -> str:
         """生成最终报告"""
@@ -394,6 +544,7 @@ class LogisticsIntelligenceAgent:
         # 更新状态
         self.state.final_report = final_report
         self.state.mark_completed()
+        self._checkpoint("record_final_report", final_report)
         
         print("最终报告生成完成")
         return final_report
@@ -416,7 +567,8 @@ class LogisticsIntelligenceAgent:
         
         # 保存状态（如果配置允许）
         if self.config.save_intermediate_states:
-            state_filename = f"state_{query_safe}_{timestamp}.json"
+            state_ext = SNAPSHOT_SUFFIX if self.config.state_format == "compact" else ".json"
+            state_filename = f"state_{query_safe}_{timestamp}{state_ext}"
             state_filepath = os.path.join(self.config.output_dir, state_filename)
             self.state.save_to_file(state_filepath)
             print(f"状态已保存到: {state_filepath}")
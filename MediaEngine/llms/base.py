@@ -6,8 +6,6 @@ import os
 import sys
 from typing import Any, Dict, Optional
 
-from openai import OpenAI
-
 # Ensure project-level retry helper is importable
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(current_dir))
@@ -25,6 +23,14 @@ except ImportError:
 
     LLM_RETRY_CONFIG = None
 
+from llm_usage import LLMUsageStats
+
+# The shared HTTP client is imported by package path so every engine uses the
+# same module instance, and therefore the same keep-alive connection pool.
+if project_root not in sys.path:
+    sys.path.append(project_root)
+from utils.http_client import create_openai_client
+
 
 class LLMClient:
     """
@@ -53,7 +59,9 @@ class LLMClient:
         }
         if base_url:
             client_kwargs["base_url"] = base_url
-        self.client = OpenAI(**client_kwargs)
+        self.client = create_openai_client(**client_kwargs)
+        # Token usage, including prefix-cache hits reported by the provider.
+        self.usage = LLMUsageStats()
 
     @with_retry(LLM_RETRY_CONFIG)
     def invoke(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
@@ -73,6 +81,7 @@ class LLMClient:
             timeout=timeout,
             **extra_params,
         )
+        self.usage.record(getattr(response, "usage", None))
 
         if response.choices and response.choices[0].message:
             return self.validate_response(response.choices[0].message.content)
@@ -84,6 +93,9 @@ class LLMClient:
             return ""
         return response.strip()
 
+    def get_usage_stats(self) -> Dict[str, Any]:
+        return self.usage.snapshot()
+
     def get_model_info(self) -> Dict[str, Any]:
         return {
             "provider": self.provider,
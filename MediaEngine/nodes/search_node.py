@@ -4,31 +4,54 @@
 """
 
 import json
-from typing import Dict, Any
+from typing import Dict, Any, List
 from json.decoder import JSONDecodeError
 
 from .base_node import BaseNode
-from ..prompts import SYSTEM_PROMPT_FIRST_SEARCH, SYSTEM_PROMPT_REFLECTION
+from ..prompts import get_first_search_prompt, get_reflection_prompt
 from ..utils.text_processing import (
     remove_reasoning_from_output,
     clean_json_tags,
     extract_clean_response,
     fix_incomplete_json
 )
+from utils.prompt_layout import build_user_message
 from utils.time_helper import get_current_time_context
 
+# 未指定工具时使用的默认搜索工具
+DEFAULT_SEARCH_TOOL = "comprehensive_search"
+
+
+def _extract_searches(result: Dict[str, Any], search_query: str, search_tool: str) -> List[Dict[str, str]]:
+    """提取可并发执行的"查询+工具"组合列表，主查询始终排在第一个"""
+    searches = [{"search_query": search_query, "search_tool": search_tool}]
+    extra = result.get("searches")
+    if isinstance(extra, list):
+        for item in extra:
+            if not isinstance(item, dict):
+                continue
+            query = item.get("search_query")
+            if isinstance(query, str) and query.strip():
+                searches.append({
+                    "search_query": query.strip(),
+                    "search_tool": item.get("search_tool") or DEFAULT_SEARCH_TOOL
+                })
+    return searches
+
 
 class FirstSearchNode(BaseNode):
     """为段落生成首次搜索查询的节点"""
     
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, max_parallel_searches: int = 1):
         """
         初始化首次搜索节点
         
         Args:
             llm_client: LLM客户端
+            max_parallel_searches: 每轮并发执行的查询数,大于1时提示词要求给出多个互补查询
         """
         super().__init__(llm_client, "FirstSearchNode")
+        self.system_prompt = get_first_search_prompt(max_parallel_searches)
     
     def validate_input(self, input_data: Any) -> bool:
         """验证输入数据"""
@@ -57,20 +80,14 @@ class FirstSearchNode(BaseNode):
             if not self.validate_input(input_data):
                 raise ValueError("输入数据格式错误，需要包含title和content字段")
             
-            # 准备输入数据
-            if isinstance(input_data, str):
-                message = input_data
-            else:
-                message = json.dumps(input_data, ensure_ascii=False)
-            
             self.log_info("正在生成首次搜索查询")
 
-            # 在message前拼接时间信息
+            # 时间信息拼接在输入之后,使系统提示词和段落规划保持为稳定前缀
             time_context = get_current_time_context()
-            enhanced_message = f"{time_context}\n\n---\n\n{message}"
+            enhanced_message = build_user_message(input_data, trailing_context=time_context)
 
             # 调用LLM
-            response = self.llm_client.invoke(SYSTEM_PROMPT_FIRST_SEARCH, enhanced_message)
+            response = self.llm_client.invoke(self.system_prompt, enhanced_message)
             
             # 处理响应
             processed_response = self.process_output(response)
@@ -126,6 +143,7 @@ class FirstSearchNode(BaseNode):
             
             # 验证和清理结果
             search_query = result.get("search_query", "")
+            search_tool = result.get("search_tool") or DEFAULT_SEARCH_TOOL
             reasoning = result.get("reasoning", "")
             
             if not search_query:
@@ -134,6 +152,8 @@ class FirstSearchNode(BaseNode):
             
             return {
                 "search_query": search_query,
+                "search_tool": search_tool,
+                "searches": _extract_searches(result, search_query, search_tool),
                 "reasoning": reasoning
             }
             
@@ -151,6 +171,8 @@ class FirstSearchNode(BaseNode):
         """
         return {
             "search_query": "相关主题研究",
+            "search_tool": DEFAULT_SEARCH_TOOL,
+            "searches": [{"search_query": "相关主题研究", "search_tool": DEFAULT_SEARCH_TOOL}],
             "reasoning": "由于解析失败，使用默认搜索查询"
         }
 
@@ -158,14 +180,16 @@ class FirstSearchNode(BaseNode):
 class ReflectionNode(BaseNode):
     """反思段落并生成新搜索查询的节点"""
     
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, max_parallel_searches: int = 1):
         """
         初始化反思节点
         
         Args:
             llm_client: LLM客户端
+            max_parallel_searches: 每轮并发执行的查询数,大于1时提示词要求给出多个互补查询
         """
         super().__init__(llm_client, "ReflectionNode")
+        self.system_prompt = get_reflection_prompt(max_parallel_searches)
     
     def validate_input(self, input_data: Any) -> bool:
         """验证输入数据"""
@@ -196,20 +220,14 @@ class ReflectionNode(BaseNode):
             if not self.validate_input(input_data):
                 raise ValueError("输入数据格式错误，需要包含title、content和paragraph_latest_state字段")
             
-            # 准备输入数据
-            if isinstance(input_data, str):
-                message = input_data
-            else:
-                message = json.dumps(input_data, ensure_ascii=False)
-            
             self.log_info("正在进行反思并生成新搜索查询")
 
-            # 在message前拼接时间信息
+            # 时间信息拼接在输入之后,使系统提示词和段落规划保持为稳定前缀
             time_context = get_current_time_context()
-            enhanced_message = f"{time_context}\n\n---\n\n{message}"
+            enhanced_message = build_user_message(input_data, trailing_context=time_context)
 
             # 调用LLM
-            response = self.llm_client.invoke(SYSTEM_PROMPT_REFLECTION, enhanced_message)
+            response = self.llm_client.invoke(self.system_prompt, enhanced_message)
             
             # 处理响应
             processed_response = self.process_output(response)
@@ -265,6 +283,7 @@ class ReflectionNode(BaseNode):
             
             # 验证和清理结果
             search_query = result.get("search_query", "")
+            search_tool = result.get("search_tool") or DEFAULT_SEARCH_TOOL
             reasoning = result.get("reasoning", "")
             
             if not search_query:
@@ -273,6 +292,8 @@ class ReflectionNode(BaseNode):
             
             return {
                 "search_query": search_query,
+                "search_tool": search_tool,
+                "searches": _extract_searches(result, search_query, search_tool),
                 "reasoning": reasoning
             }
             
@@ -290,5 +311,7 @@ class ReflectionNode(BaseNode):
         """
         return {
             "search_query": "深度研究补充信息",
+            "search_tool": DEFAULT_SEARCH_TOOL,
+            "searches": [{"search_query": "深度研究补充信息", "search_tool": DEFAULT_SEARCH_TOOL}],
             "reasoning": "由于解析失败，使用默认反思搜索查询"
         }
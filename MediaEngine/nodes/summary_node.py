@@ -22,6 +22,7 @@ from ..utils.text_processing import (
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from utils.prompt_layout import build_user_message
 try:
     from utils.forum_reader import get_latest_host_speech, format_host_speech_for_prompt
     FORUM_READER_AVAILABLE = True
@@ -78,23 +79,18 @@ class FirstSummaryNode(StateMutationNode):
                 data = input_data.copy() if isinstance(input_data, dict) else input_data
             
             # 读取最新的HOST发言（如果可用）
+            host_guidance = ""
             if FORUM_READER_AVAILABLE:
                 try:
                     host_speech = get_latest_host_speech()
                     if host_speech:
-                        # 将HOST发言添加到输入数据中
-                        data['host_speech'] = host_speech
+                        host_guidance = format_host_speech_for_prompt(host_speech)
                         self.log_info(f"已读取HOST发言，长度: {len(host_speech)}字符")
                 except Exception as e:
                     self.log_info(f"读取HOST发言失败: {str(e)}")
             
-            # 转换为JSON字符串
-            message = json.dumps(data, ensure_ascii=False)
-            
-            # 如果有HOST发言，添加到消息前面作为参考
-            if FORUM_READER_AVAILABLE and 'host_speech' in data and data['host_speech']:
-                formatted_host = format_host_speech_for_prompt(data['host_speech'])
-                message = formatted_host + "\n" + message
+            # 稳定内容在前(HOST引导、段落规划),最新总结和搜索结果在后,便于命中服务商的前缀缓存
+            message = build_user_message(data, guidance=host_guidance)
             
             self.log_info("正在生成首次段落总结")
             
@@ -246,23 +242,18 @@ class ReflectionSummaryNode(StateMutationNode):
                 data = input_data.copy() if isinstance(input_data, dict) else input_data
             
             # 读取最新的HOST发言（如果可用）
+            host_guidance = ""
             if FORUM_READER_AVAILABLE:
                 try:
                     host_speech = get_latest_host_speech()
                     if host_speech:
-                        # 将HOST发言添加到输入数据中
-                        data['host_speech'] = host_speech
+                        host_guidance = format_host_speech_for_prompt(host_speech)
                         self.log_info(f"已读取HOST发言，长度: {len(host_speech)}字符")
                 except Exception as e:
                     self.log_info(f"读取HOST发言失败: {str(e)}")
             
-            # 转换为JSON字符串
-            message = json.dumps(data, ensure_ascii=False)
-            
-            # 如果有HOST发言，添加到消息前面作为参考
-            if FORUM_READER_AVAILABLE and 'host_speech' in data and data['host_speech']:
-                formatted_host = format_host_speech_for_prompt(data['host_speech'])
-                message = formatted_host + "\n" + message
+            # 稳定内容在前(HOST引导、段落规划),最新总结和搜索结果在后,便于命中服务商的前缀缓存
+            message = build_user_message(data, guidance=host_guidance)
             
             self.log_info("正在生成反思总结")
             
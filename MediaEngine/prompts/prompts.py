@@ -733,3 +733,38 @@ SYSTEM_PROMPT_REPORT_FORMATTING = f"""
 
 **最终输出**:一份清晰易查、有实用价值的情报报告,让学员看完能直接按照行动清单执行。
 """
+
+# ===== 并发多查询说明 =====
+# 只在 max_parallel_searches > 1 时追加到搜索/反思提示词末尾;
+# 默认(串行单查询)时提示词保持不变,不让LLM生成会被丢弃的额外查询
+
+_PARALLEL_SEARCH_EXAMPLE = [
+    {"search_query": "【城市】【YYYY年MM月DD日】天气预报", "search_tool": "search_for_structured_data"},
+    {"search_query": "【城市】马拉松 比赛日 天气 装备建议", "search_tool": "web_search_only"},
+    {"search_query": "【城市】马拉松 本周 最新消息", "search_tool": "search_last_week"},
+]
+
+
+def _parallel_search_instruction(max_queries: int, focus: str) -> str:
+    example = json.dumps(_PARALLEL_SEARCH_EXAMPLE[:max_queries], ensure_ascii=False)
+    return f"""
+**并发查询**:
+可以额外返回可选字段"searches"("查询+工具"对象数组),给出最多{max_queries}个{focus}的**互补**组合,系统会并发执行并合并结果;第一个应与"search_query"/"search_tool"相同。例如:
+"searches": {example}
+"""
+
+
+def get_first_search_prompt(max_parallel_searches: int = 1) -> str:
+    """首次搜索的系统提示词,并发搜索数大于1时要求给出多个互补的"查询+工具"组合"""
+    if max_parallel_searches <= 1:
+        return SYSTEM_PROMPT_FIRST_SEARCH
+    return SYSTEM_PROMPT_FIRST_SEARCH + _parallel_search_instruction(
+        max_parallel_searches, "覆盖不同信息类型(如天气卡 + 赛事官网 + 本周资讯)")
+
+
+def get_reflection_prompt(max_parallel_searches: int = 1) -> str:
+    """反思的系统提示词,并发搜索数大于1时要求给出多个互补的"查询+工具"组合"""
+    if max_parallel_searches <= 1:
+        return SYSTEM_PROMPT_REFLECTION
+    return SYSTEM_PROMPT_REFLECTION + _parallel_search_instruction(
+        max_parallel_searches, "针对不同情报缺口")
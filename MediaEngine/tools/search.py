@@ -37,11 +37,16 @@ root_dir = os.path.dirname(os.path.dirname(current_dir))
 utils_dir = os.path.join(root_dir, 'utils')
 if utils_dir not in sys.path:
     sys.path.append(utils_dir)
+# 搜索缓存和共享HTTP会话按包路径导入,与其他调用方共用同一个模块实例(同一个单例和连接池)
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
 
 from retry_helper import with_graceful_retry, SEARCH_API_RETRY_CONFIG
+from utils.search_cache import get_search_cache
+from utils.http_client import get_http_session
 
 # --- 1. 数据结构定义 ---
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict
 
 @dataclass
 class WebpageResult:
@@ -82,6 +87,27 @@ class BochaResponse:
     images: List[ImageResult] = field(default_factory=list)
     modal_cards: List[ModalCardResult] = field(default_factory=list)
 
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可JSON序列化的字典（用于搜索缓存）"""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BochaResponse':
+        """从字典还原（用于搜索缓存）"""
+        return cls(
+            query=data.get('query'),
+            conversation_id=data.get('conversation_id'),
+            answer=data.get('answer'),
+            follow_ups=list(data.get('follow_ups', [])),
+            webpages=[WebpageResult(**item) for item in data.get('webpages', [])],
+            images=[ImageResult(**item) for item in data.get('images', [])],
+            modal_cards=[ModalCardResult(**item) for item in data.get('modal_cards', [])]
+        )
+
+    def is_cacheable(self) -> bool:
+        """失败或空结果不写入缓存"""
+        return self.query != "搜索失败" and bool(self.webpages or self.answer or self.modal_cards)
+
 
 # --- 2. 核心客户端与专用工具集 ---
 
@@ -93,12 +119,17 @@ class BochaMultimodalSearch:
     
     BASE_URL = "https://api.bocha.cn/v1/ai-search"
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, use_cache: bool = True,
+                 session: Optional[Any] = None, cache: Optional[Any] = None):
         """
         初始化客户端。
         Args:
             api_key: Bocha API密钥，若不提供则从环境变量 BOCHA_API_KEY 读取。
+            use_cache: 是否启用持久化搜索缓存（默认True）。
+            session: 发送请求的Session（需提供post方法），默认使用共享连接池，基准测试时可替换。
+            cache: 使用指定的SearchCache实例，默认为全局缓存。
         """
+        self._session = session
         if api_key is None:
             api_key = os.getenv("BOCHA_API_KEY")
             if not api_key:
@@ -110,6 +141,13 @@ class BochaMultimodalSearch:
             'Accept': '*/*'
         }
 
+        self._cache = None
+        if use_cache:
+            try:
+                self._cache = cache or get_search_cache()
+            except Exception as e:
+                print(f"搜索缓存初始化失败，将直接请求API: {e}")
+
     def _parse_search_response(self, response_dict: Dict[str, Any], query: str) -> BochaResponse:
         """从API的原始字典响应中解析出结构化的BochaResponse对象"""
         
@@ -178,7 +216,9 @@ class BochaMultimodalSearch:
         payload.update(kwargs)
         
         try:
-            response = requests.post(self.BASE_URL, headers=self._headers, json=payload, timeout=30)
+            # 共享Session复用TCP/TLS连接,超时按主机配置(见 http_client.HOST_TIMEOUTS)
+            session = self._session or get_http_session()
+            response = session.post(self.BASE_URL, headers=self._headers, json=payload)
             response.raise_for_status()  # 如果HTTP状态码是4xx或5xx，则抛出异常
             
             response_dict = response.json()
@@ -195,6 +235,18 @@ class BochaMultimodalSearch:
             print(f"处理响应时发生未知错误: {str(e)}")
             raise e  # 让重试机制捕获并处理
 
+    def _cached_search(self, tool: str, **kwargs) -> BochaResponse:
+        """先查搜索缓存，未命中时调用带重试的 _search_internal"""
+        if self._cache is None:
+            return self._search_internal(**kwargs)
+        return self._cache.get_or_fetch(
+            'bocha', tool, kwargs,
+            fetch=lambda: self._search_internal(**kwargs),
+            serialize=BochaResponse.to_dict,
+            deserialize=BochaResponse.from_dict,
+            is_cacheable=BochaResponse.is_cacheable
+        )
+
     # --- Agent 可用的工具方法 ---
 
     def comprehensive_search(self, query: str, max_results: int = 10) -> BochaResponse:
@@ -204,7 +256,8 @@ class BochaMultimodalSearch:
         Agent可提供搜索查询(query)和可选的最大结果数(max_results)。
         """
         print(f"--- TOOL: 全面综合搜索 (query: {query}) ---")
-        return self._search_internal(
+        return self._cached_search(
+            'comprehensive_search',
             query=query,
             count=max_results,
             answer=True  # 开启AI总结
@@ -216,7 +269,8 @@ class BochaMultimodalSearch:
         适用于需要快速获取原始网页信息，而不需要AI额外分析的场景。速度更快，成本更低。
         """
         print(f"--- TOOL: 纯网页搜索 (query: {query}) ---")
-        return self._search_internal(
+        return self._cached_search(
+            'web_search_only',
             query=query,
             count=max_results,
             answer=False # 关闭AI总结
@@ -230,7 +284,8 @@ class BochaMultimodalSearch:
         """
         print(f"--- TOOL: 结构化数据查询 (query: {query}) ---")
         # 实现上与 comprehensive_search 相同，但通过命名和文档引导Agent的意图
-        return self._search_internal(
+        return self._cached_search(
+            'search_for_structured_data',
             query=query,
             count=5, # 结构化查询通常不需要太多网页结果
             answer=True
@@ -242,7 +297,7 @@ class BochaMultimodalSearch:
         此工具专门查找过去24小时内发布的内容。适用于追踪突发事件或最新进展。
         """
         print(f"--- TOOL: 搜索24小时内信息 (query: {query}) ---")
-        return self._search_internal(query=query, freshness='oneDay', answer=True)
+        return self._cached_search('search_last_24_hours', query=query, freshness='oneDay', answer=True)
 
     def search_last_week(self, query: str) -> BochaResponse:
         """
@@ -250,7 +305,7 @@ class BochaMultimodalSearch:
         适用于进行周度舆情总结或回顾。
         """
         print(f"--- TOOL: 搜索本周信息 (query: {query}) ---")
-        return self._search_internal(query=query, freshness='oneWeek', answer=True)
+        return self._cached_search('search_last_week', query=query, freshness='oneWeek', answer=True)
 
 
 # --- 3. 测试与使用示例 ---
@@ -557,3 +557,34 @@ SYSTEM_PROMPT_REPORT_FORMATTING = f"""
 
 **最终输出**:一份学术深度、理论完整的科学分析报告,让读者系统掌握训练的理论基础。
 """
+
+# ===== 并发多查询说明 =====
+# 只在 max_parallel_searches > 1 时追加到搜索/反思提示词末尾;
+# 默认(串行单查询)时提示词保持不变,不让LLM生成会被丢弃的额外查询
+
+_PARALLEL_QUERY_EXAMPLE = ["间歇跑训练方法 心率控制 理论", "interval training VO2max physiology", "间歇跑与节奏跑 训练效果对比 研究"]
+
+
+def _parallel_search_instruction(max_queries: int, focus: str) -> str:
+    example = json.dumps(_PARALLEL_QUERY_EXAMPLE[:max_queries], ensure_ascii=False)
+    return f"""
+**并发查询**:
+可以额外返回可选字段"search_queries"(字符串数组),给出最多{max_queries}个{focus}的**互补**查询,系统会并发执行并合并结果;第一个应与"search_query"相同。例如:
+"search_queries": {example}
+"""
+
+
+def get_first_search_prompt(max_parallel_searches: int = 1) -> str:
+    """首次搜索的系统提示词,并发搜索数大于1时要求给出多个互补查询"""
+    if max_parallel_searches <= 1:
+        return SYSTEM_PROMPT_FIRST_SEARCH
+    return SYSTEM_PROMPT_FIRST_SEARCH + _parallel_search_instruction(
+        max_parallel_searches, "覆盖不同角度(如生理机制、训练方法、学术争论)")
+
+
+def get_reflection_prompt(max_parallel_searches: int = 1) -> str:
+    """反思的系统提示词,并发搜索数大于1时要求给出多个互补查询"""
+    if max_parallel_searches <= 1:
+        return SYSTEM_PROMPT_REFLECTION
+    return SYSTEM_PROMPT_REFLECTION + _parallel_search_instruction(
+        max_parallel_searches, "针对不同理论空白")
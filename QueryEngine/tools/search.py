@@ -23,9 +23,13 @@ root_dir = os.path.dirname(os.path.dirname(current_dir))
 utils_dir = os.path.join(root_dir, 'utils')
 if utils_dir not in sys.path:
     sys.path.append(utils_dir)
+# 搜索缓存按包路径导入,与 utils.convergence 共用同一个模块实例(同一个缓存单例)
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
 
 from retry_helper import with_graceful_retry, SEARCH_API_RETRY_CONFIG
-from dataclasses import dataclass, field
+from utils.search_cache import get_search_cache
+from dataclasses import dataclass, field, asdict
 
 # 运行前请确保已安装Tavily库: pip install tavily-python
 try:
@@ -211,6 +215,25 @@ class TavilyResponse:
     images: List[ImageResult] = field(default_factory=list)
     response_time: Optional[float] = None
 
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可JSON序列化的字典(用于搜索缓存)"""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TavilyResponse':
+        """从字典还原(用于搜索缓存)"""
+        return cls(
+            query=data.get('query'),
+            answer=data.get('answer'),
+            results=[SearchResult(**item) for item in data.get('results', [])],
+            images=[ImageResult(**item) for item in data.get('images', [])],
+            response_time=data.get('response_time')
+        )
+
+    def is_cacheable(self) -> bool:
+        """失败或空结果不写入缓存"""
+        return self.query != "搜索失败" and bool(self.results or self.answer)
+
 
 # --- 2. 核心客户端与搜索工具 ---
 
@@ -220,17 +243,42 @@ class TavilyNewsAgency:
     提供单一的深度搜索工具,专注于理论研究
     """
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, use_cache: bool = True,
+                 client: Optional[Any] = None, cache: Optional[Any] = None):
         """
         初始化客户端
         Args:
             api_key: Tavily API密钥,若不提供则从环境变量 TAVILY_API_KEY 读取
+            use_cache: 是否启用持久化搜索缓存(默认True)
+            client: 替代TavilyClient的客户端(需提供 search(**params) -> dict),用于基准测试等离线场景
+            cache: 使用指定的SearchCache实例,默认为全局缓存
         """
-        if api_key is None:
-            api_key = os.getenv("TAVILY_API_KEY")
-            if not api_key:
-                raise ValueError("Tavily API Key未找到!请设置TAVILY_API_KEY环境变量或在初始化时提供")
-        self._client = TavilyClient(api_key=api_key)
+        if client is None:
+            if api_key is None:
+                api_key = os.getenv("TAVILY_API_KEY")
+                if not api_key:
+                    raise ValueError("Tavily API Key未找到!请设置TAVILY_API_KEY环境变量或在初始化时提供")
+            client = TavilyClient(api_key=api_key)
+        self._client = client
+
+        self._cache = None
+        if use_cache:
+            try:
+                self._cache = cache or get_search_cache()
+            except Exception as e:
+                print(f"搜索缓存初始化失败,将直接请求API: {e}")
+
+    def _cached_search(self, tool: str, **kwargs) -> TavilyResponse:
+        """先查搜索缓存,未命中时调用带重试的 _search_internal"""
+        if self._cache is None:
+            return self._search_internal(**kwargs)
+        return self._cache.get_or_fetch(
+            'tavily', tool, kwargs,
+            fetch=lambda: self._search_internal(**kwargs),
+            serialize=TavilyResponse.to_dict,
+            deserialize=TavilyResponse.from_dict,
+            is_cacheable=TavilyResponse.is_cacheable
+        )
 
     @with_graceful_retry(SEARCH_API_RETRY_CONFIG, default_return=TavilyResponse(query="搜索失败"))
     def _search_internal(self, **kwargs) -> TavilyResponse:
@@ -335,7 +383,7 @@ class TavilyNewsAgency:
             search_params["include_domains"] = RUNNING_SCIENCE_WHITELIST
             print(f"已启用学术白名单过滤 ({len(RUNNING_SCIENCE_WHITELIST)} 个权威域名)")
 
-        return self._search_internal(**search_params)
+        return self._cached_search('deep_search_news', **search_params)
 
 
 # --- 3. 测试与使用示例 ---
@@ -39,12 +39,18 @@ class Config:
 
     search_timeout: int = 240
     max_content_length: int = 20000
+    search_results_token_budget: int = 12000  # 每次总结送入的搜索结果token预算(0为不限制)
     max_reflections: int = 2
+    reflection_query_similarity: float = 0.85  # 反思查询与之前查询的相似度达到该值时提前结束(0为不检查)
+    reflection_min_summary_change: float = 0.05  # 反思总结改动比例低于该值时提前结束(0为不检查)
+    max_parallel_searches: int = 1  # 每步并发执行的互补搜索数(默认1为单查询,调大后搜索API调用量成倍增加)
     max_paragraphs: int = 5
     max_search_results: int = 20
 
     output_dir: str = "reports"
     save_intermediate_states: bool = True
+    enable_checkpoints: bool = True  # 每步追加写入检查点日志,支持resume(run_id)
+    state_format: str = "json"  # 中间状态保存格式: json / compact(紧凑快照,搜索内容按哈希存入blob仓库)
 
     def __post_init__(self):
         if not self.llm_provider and self.llm_model_name:
@@ -78,7 +84,11 @@ class Config:
                 tavily_api_key=_get_value(config_module, "TAVILY_API_KEY"),
                 search_timeout=int(_get_value(config_module, "SEARCH_TIMEOUT", 240)),
                 max_content_length=int(_get_value(config_module, "SEARCH_CONTENT_MAX_LENGTH", 20000)),
+                search_results_token_budget=int(_get_value(config_module, "SEARCH_RESULTS_TOKEN_BUDGET", 12000)),
                 max_reflections=int(_get_value(config_module, "MAX_REFLECTIONS", 2)),
+                reflection_query_similarity=float(_get_value(config_module, "REFLECTION_QUERY_SIMILARITY", 0.85)),
+                reflection_min_summary_change=float(_get_value(config_module, "REFLECTION_MIN_SUMMARY_CHANGE", 0.05)),
+                max_parallel_searches=int(_get_value(config_module, "MAX_PARALLEL_SEARCHES", 1)),
                 max_paragraphs=int(_get_value(config_module, "MAX_PARAGRAPHS", 5)),
                 max_search_results=int(_get_value(config_module, "MAX_SEARCH_RESULTS", 20)),
                 output_dir=_get_value(config_module, "OUTPUT_DIR", "reports"),
@@ -86,6 +96,11 @@ class Config:
                     _get_value(config_module, "SAVE_INTERMEDIATE_STATES", "true")
                 ).lower()
                 in ("true", "1", "yes"),
+                enable_checkpoints=str(
+                    _get_value(config_module, "ENABLE_CHECKPOINTS", "true")
+                ).lower()
+                in ("true", "1", "yes"),
+                state_format=str(_get_value(config_module, "STATE_SNAPSHOT_FORMAT", "json")).lower(),
             )
 
         config_dict = {}
@@ -104,7 +119,11 @@ class Config:
             tavily_api_key=_get_value(config_dict, "TAVILY_API_KEY"),
             search_timeout=int(_get_value(config_dict, "SEARCH_TIMEOUT", 240)),
             max_content_length=int(_get_value(config_dict, "SEARCH_CONTENT_MAX_LENGTH", 20000)),
+            search_results_token_budget=int(_get_value(config_dict, "SEARCH_RESULTS_TOKEN_BUDGET", 12000)),
             max_reflections=int(_get_value(config_dict, "MAX_REFLECTIONS", 2)),
+            reflection_query_similarity=float(_get_value(config_dict, "REFLECTION_QUERY_SIMILARITY", 0.85)),
+            reflection_min_summary_change=float(_get_value(config_dict, "REFLECTION_MIN_SUMMARY_CHANGE", 0.05)),
+            max_parallel_searches=int(_get_value(config_dict, "MAX_PARALLEL_SEARCHES", 1)),
             max_paragraphs=int(_get_value(config_dict, "MAX_PARAGRAPHS", 5)),
             max_search_results=int(_get_value(config_dict, "MAX_SEARCH_RESULTS", 20)),
             output_dir=_get_value(config_dict, "OUTPUT_DIR", "reports"),
@@ -112,6 +131,11 @@ class Config:
                 _get_value(config_dict, "SAVE_INTERMEDIATE_STATES", "true")
             ).lower()
             in ("true", "1", "yes"),
+            enable_checkpoints=str(
+                _get_value(config_dict, "ENABLE_CHECKPOINTS", "true")
+            ).lower()
+            in ("true", "1", "yes"),
+            state_format=str(_get_value(config_dict, "STATE_SNAPSHOT_FORMAT", "json")).lower(),
         )
 
 
@@ -141,10 +165,16 @@ def print_config(config: Config):
     print(f"Tavily API Key: {'已配置' if config.tavily_api_key else '未配置'}")
     print(f"搜索超时: {config.search_timeout} 秒")
     print(f"最长内容长度: {config.max_content_length}")
+    print(f"搜索结果token预算: {config.search_results_token_budget}")
     print(f"最大反思次数: {config.max_reflections}")
+    print(f"反思收敛阈值(查询相似度): {config.reflection_query_similarity}")
+    print(f"反思收敛阈值(总结改动): {config.reflection_min_summary_change}")
+    print(f"并发搜索数: {config.max_parallel_searches}")
     print(f"最大段落数: {config.max_paragraphs}")
     print(f"最大搜索结果数: {config.max_search_results}")
     print(f"输出目录: {config.output_dir}")
     print(f"保存中间状态: {config.save_intermediate_states}")
+    print(f"检查点日志: {config.enable_checkpoints}")
+    print(f"状态保存格式: {config.state_format}")
     print(f"LLM API Key: {'已配置' if config.llm_api_key else '未配置'}")
     print("========================\n")
@@ -5,9 +5,11 @@
 
 import re
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from json.decoder import JSONDecodeError
 
+from utils.prompt_packer import pack_search_results, truncate_text
+
 
 def clean_json_tags(text: str) -> str:
     """
@@ -272,37 +274,46 @@ def truncate_content(content: str, max_length: int = 20000) -> str:
     Returns:
         截断后的内容
     """
-    if len(content) <= max_length:
-        return content
-    
-    # 尝试在单词边界截断
-    truncated = content[:max_length]
-    last_space = truncated.rfind(' ')
-    
-    if last_space > max_length * 0.8:  # 如果最后一个空格位置合理
-        return truncated[:last_space] + "..."
-    else:
-        return truncated + "..."
+    # 优先在句子边界(含中文标点)截断,其次在空格处截断
+    return truncate_text(content, max_length)
+
+
+def _render_search_result(result: Dict[str, Any], content: str) -> str:
+    """渲染单条搜索结果:带上内容ID,之后的提示词可按ID引用已总结过的内容"""
+    if result.get('content_id'):
+        return f"[{result['content_id']}] {content}"
+    return content
 
 
 def format_search_results_for_prompt(search_results: List[Dict[str, Any]], 
-                                   max_length: int = 20000) -> List[str]:
+                                   max_length: int = 20000,
+                                   token_budget: Optional[int] = None) -> List[str]:
     """
     格式化搜索结果用于提示词
     
     Args:
         search_results: 搜索结果列表
         max_length: 每个结果的最大长度
+        token_budget: 所有结果合计的token预算,设置后按相关度分配预算,
+                      低相关结果可能被截断或丢弃
         
     Returns:
         格式化后的内容列表
     """
+    if token_budget:
+        formatted_results, report = pack_search_results(
+            search_results, token_budget, max_length, render=_render_search_result
+        )
+        if report.trimmed or report.dropped:
+            print(f"  - {report.summary()}")
+        return formatted_results
+
     formatted_results = []
     
     for result in search_results:
         content = result.get('content', '')
         if content:
             truncated_content = truncate_content(content, max_length)
-            formatted_results.append(truncated_content)
+            formatted_results.append(_render_search_result(result, truncated_content))
     
     return formatted_results
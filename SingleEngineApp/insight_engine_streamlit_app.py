@@ -29,6 +29,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from InsightEngine import SportsScientistAgent, Config
 from utils.config_reloader import reload_config, get_config_snapshot
+from utils.user_context import normalize_user_id
 
 
 def main():
@@ -187,11 +188,20 @@ def main():
         query_params = st.query_params
         auto_query = query_params.get('query', '')
         auto_search = query_params.get('auto_search', 'false').lower() == 'true'
+        user_param = query_params.get('user_id', '')
     except AttributeError:
         # 兼容旧版本
         query_params = st.experimental_get_query_params()
         auto_query = query_params.get('query', [''])[0]
         auto_search = query_params.get('auto_search', ['false'])[0].lower() == 'true'
+        user_param = query_params.get('user_id', [''])[0]
+
+    # 训练数据用户由主页面按Flask会话传入
+    try:
+        user_id = normalize_user_id(user_param)
+    except ValueError as e:
+        st.error(str(e))
+        return
 
     # ----- 从配置热重载工具获取最新配置 -----
     snapshot = get_config_snapshot()
@@ -249,7 +259,8 @@ def main():
             db_charset=snapshot.DB_CHARSET,
             max_reflections=max_reflections,
             max_content_length=max_content_length,
-            output_dir="insight_engine_streamlit_reports"
+            output_dir="insight_engine_streamlit_reports",
+            user_id=user_id
         )
 
         # 执行研究
@@ -17,6 +17,8 @@ import atexit
 import requests
 import logging
 from pathlib import Path
+from utils.http_client import get_http_session, close_http_clients
+from utils.user_context import get_request_user_id
 
 # 导入ReportEngine
 try:
@@ -75,6 +77,13 @@ if SETUP_AVAILABLE:
 else:
     print("配置路由不可用，跳过接口注册")
 
+# 后台导入任务进度通过Socket.IO推送
+try:
+    from utils.import_jobs import get_import_job_manager
+    get_import_job_manager().set_emitter(lambda job: socketio.emit('import_progress', job))
+except ImportError as e:
+    print(f"导入任务模块导入失败: {e}")
+
 # 设置UTF-8编码环境
 os.environ['PYTHONIOENCODING'] = 'utf-8'
 os.environ['PYTHONUTF8'] = '1'
@@ -451,7 +460,7 @@ def check_app_status():
             if info['process'].poll() is None:
                 # 进程仍在运行，检查端口是否可访问
                 try:
-                    response = requests.get(f"http://localhost:{info['port']}", timeout=2)
+                    response = get_http_session().get(f"http://localhost:{info['port']}", timeout=2)
                     if response.status_code == 200:
                         info['status'] = 'running'
                     else:
@@ -478,7 +487,7 @@ def wait_for_app_startup(app_name, max_wait_time=30):
             return False, "进程启动失败"
         
         try:
-            response = requests.get(f"http://localhost:{info['port']}", timeout=2)
+            response = get_http_session().get(f"http://localhost:{info['port']}", timeout=2)
             if response.status_code == 200:
                 info['status'] = 'running'
                 return True, "启动成功"
@@ -493,6 +502,7 @@ def cleanup_processes():
     """清理所有进程"""
     for app_name in processes:
         stop_streamlit_app(app_name)
+    close_http_clients()
 
 # 注册清理函数
 atexit.register(cleanup_processes)
@@ -511,7 +521,7 @@ def index():
         except Exception as e:
             print(f"健康检查失败: {e}")
 
-    return render_template('index.html')
+    return render_template('index.html', current_user_id=get_request_user_id())
 
 @app.route('/api/status')
 def get_status():
@@ -692,9 +702,9 @@ def search():
         try:
             api_port = api_ports[app_name]
             # 调用Streamlit应用的API端点
-            response = requests.post(
+            response = get_http_session().post(
                 f"http://localhost:{api_port}/api/search",
-                json={'query': query},
+                json={'query': query, 'user_id': get_request_user_id()},
                 timeout=10
             )
             if response.status_code == 200:
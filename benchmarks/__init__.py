@@ -0,0 +1,4 @@
+"""
+离线基准测试
+使用确定性的LLM/搜索桩服务,测量各引擎端到端的耗时、调用次数、内存峰值和吞吐量
+"""
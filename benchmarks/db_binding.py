@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+把训练数据模块绑定到基准测试使用的数据库
+训练数据工具、路由和导入器各自从根目录config.py构建MySQL引擎,
+这里在当前进程内把它们统一替换为指定的引擎(SQLite文件或本地MySQL),
+并把派生缓存(心率分析、训练负荷模型、相似训练索引、记录总数)重置到临时目录
+"""
+
+import sys
+from pathlib import Path
+
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+
+def use_placeholder_db_config():
+    """
+    未配置数据库时填入占位值
+    InsightEngine.tools 在导入时就按config.py创建数据库引擎(只创建不连接),
+    配置为空会直接报错;占位值只存在于当前进程
+    """
+    import config as root_config
+    for key in ("DB_HOST", "DB_USER", "DB_PASSWORD", "DB_NAME"):
+        if not getattr(root_config, key, ""):
+            setattr(root_config, key, "bench")
+
+
+def bind_database(engine, analytics_engine: str = ""):
+    """
+    让训练数据工具、CRUD路由和导入器使用指定引擎
+
+    需要在导入 routes.training_data / scripts.training_data_importer 之后调用,
+    这两个模块按名字引用了 SessionLocal / get_session_local
+
+    Args:
+        engine: 训练数据库引擎
+        analytics_engine: 聚合查询的分析引擎("duckdb"或留空,同 config.DB_ANALYTICS_ENGINE)
+    """
+    use_placeholder_db_config()
+    from InsightEngine.tools.db_session import db_session_manager
+    import models.training_record as training_record
+
+    db_session_manager.close_all()
+    db_session_manager._engine = engine
+    db_session_manager._session_factory = scoped_session(
+        sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+    )
+    # 分析引擎在第一次聚合查询时按新的数据库URL重新创建
+    db_session_manager._database_url = engine.url.render_as_string(hide_password=False)
+    db_session_manager._analytics_engine_name = analytics_engine
+    db_session_manager._analytics_engine = None
+    db_session_manager._analytics_session_factory = None
+    db_session_manager._analytics_initialized = False
+
+    session_local = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    training_record.engine = engine
+    training_record.SessionLocal = session_local
+    training_record.get_engine = lambda: engine
+
+    routes_module = sys.modules.get("routes.training_data")
+    if routes_module is not None:
+        routes_module.SessionLocal = session_local
+
+
+def reset_derived_caches(cache_dir: Path):
+    """清空派生缓存单例,并把磁盘缓存目录指向cache_dir(不读写仓库data/cache)"""
+    import utils.hr_analytics as hr_analytics
+    import utils.similarity_index as similarity_index
+    import utils.training_load_model as training_load_model
+    from utils.record_count_cache import get_record_count_cache
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    hr_analytics.DEFAULT_CACHE_DIR = cache_dir
+    training_load_model.DEFAULT_CACHE_DIR = cache_dir
+    with hr_analytics._caches_lock:
+        hr_analytics._caches.clear()
+    with training_load_model._caches_lock:
+        training_load_model._caches.clear()
+    with similarity_index._indexes_lock:
+        similarity_index._indexes.clear()
+    get_record_count_cache().invalidate()
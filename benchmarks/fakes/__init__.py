@@ -0,0 +1,16 @@
+"""
+基准测试使用的离线桩实现
+"""
+
+from .latency import LatencyModel
+from .llm_server import CannedResponder, FakeLLMServer
+from .search_backends import FakeBochaSession, FakeTavilyClient, FakeTrainingDataSearch
+
+__all__ = [
+    "LatencyModel",
+    "CannedResponder",
+    "FakeLLMServer",
+    "FakeBochaSession",
+    "FakeTavilyClient",
+    "FakeTrainingDataSearch",
+]
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+可配置的延迟分布
+格式: "none" | "fixed:秒" | "uniform:最小:最大" | "lognormal:中位数:sigma"
+同一个种子和同一个请求键总是得到相同的延迟,保证基准测试可复现
+"""
+
+import hashlib
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Tuple
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """延迟分布"""
+    kind: str = "none"
+    params: Tuple[float, ...] = ()
+    seed: int = 0
+
+    @classmethod
+    def parse(cls, spec: str, seed: int = 0) -> "LatencyModel":
+        parts = (spec or "none").split(":")
+        kind = parts[0].strip().lower()
+        params = tuple(float(p) for p in parts[1:])
+        expected = {"none": 0, "fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"无效的延迟分布: {spec} (可用: none, fixed:s, uniform:min:max, lognormal:median:sigma)")
+        return cls(kind, params, seed)
+
+    def sample(self, key: str = "") -> float:
+        """按请求键采样延迟(秒)"""
+        if self.kind == "none":
+            return 0.0
+        if self.kind == "fixed":
+            return self.params[0]
+        digest = hashlib.blake2b(f"{self.seed}:{key}".encode("utf-8"), digest_size=8).digest()
+        rng = random.Random(int.from_bytes(digest, "big"))
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        median, sigma = self.params
+        return rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+    def sleep(self, key: str = "") -> float:
+        delay = self.sample(key)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def __str__(self) -> str:
+        return ":".join([self.kind] + [f"{p:g}" for p in self.params])
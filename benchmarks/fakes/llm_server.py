@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+确定性的OpenAI兼容LLM桩服务
+实现 POST /v1/chat/completions(非流式),按系统提示词识别所属阶段
+(报告结构、首次搜索、首次总结、反思、反思总结、报告格式化、模板选择、HTML生成),
+返回各节点可以解析的固定格式输出;相同输入总是得到相同输出。
+按块模拟服务商的前缀缓存,命中的前缀token在 usage.prompt_tokens_details.cached_tokens 中返回。
+
+额外接口:
+- GET  /v1/models  模型列表
+- GET  /stats      各阶段调用次数、延迟与token统计
+- POST /reset      清空统计和前缀缓存
+
+单独运行:
+    python -m benchmarks.fakes.llm_server --port 8765 --latency lognormal:0.2:0.5
+然后把 LLM_BASE_URL 指向 http://127.0.0.1:8765/v1
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+from utils.prompt_layout import SECTION_SEPARATOR
+from utils.prompt_packer import estimate_tokens
+
+from .latency import LatencyModel
+
+# 模拟服务商前缀缓存的块大小(字符),只有完整的块才能命中
+CACHE_BLOCK_CHARS = 256
+
+_SCHEMA_RE = re.compile(r'<(INPUT|OUTPUT) JSON SCHEMA>\s*(.*?)\s*</\1 JSON SCHEMA>', re.S)
+_TEMPLATE_RE = re.compile(r'([^\s\'"“”《》,，:：、()（）\[\]]+报告模板)')
+
+_SENTENCES = [
+    "有氧基础决定了中长跑成绩的上限,乳酸阈配速是训练强度划分的关键锚点。",
+    "周期化安排需要在基础期、强化期和比赛期之间逐步转移训练重点。",
+    "间歇训练提升最大摄氧量,节奏跑提高乳酸清除能力,两者互为补充。",
+    "训练负荷应遵循循序渐进原则,周跑量增幅一般控制在百分之十以内。",
+    "心率区间训练可以帮助跑者把大部分训练量控制在低强度区间。",
+    "赛前减量能够在保持体能的同时消除累积疲劳,提升比赛日表现。",
+    "力量训练和跑姿练习可以改善跑步经济性并降低受伤风险。",
+    "睡眠、营养与主动恢复决定了训练刺激能否转化为能力提升。",
+    "高温和高海拔环境会显著提高心率,需要相应调整配速目标。",
+    "比赛策略上,均匀配速或轻微负分段通常优于前程冒进。",
+]
+
+
+def _digest(*parts: str) -> int:
+    text = "\x1f".join(parts)
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _filler(seed: int, chars: int) -> str:
+    """由种子生成约chars个字符的确定性正文"""
+    out, i = [], 0
+    while sum(len(s) for s in out) < chars:
+        out.append(_SENTENCES[(seed + i * 7) % len(_SENTENCES)])
+        i += 1
+    return "".join(out)
+
+
+def _parse_user_payload(user: str) -> Dict[str, Any]:
+    """用户消息由 "\\n\\n---\\n\\n" 分隔的若干部分组成(HOST引导、JSON输入、时间信息),取出JSON部分"""
+    for section in user.split(SECTION_SEPARATOR):
+        try:
+            data = json.loads(section.strip())
+        except (json.JSONDecodeError, ValueError):
+            continue
+        return data if isinstance(data, dict) else {"items": data}
+    return {}
+
+
+def classify(system: str) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+    """
+    按系统提示词识别阶段
+
+    Returns:
+        (阶段名, 输入schema, 输出schema)
+    """
+    schemas = {}
+    for kind, body in _SCHEMA_RE.findall(system):
+        try:
+            schemas[kind] = json.loads(body)
+        except json.JSONDecodeError:
+            schemas[kind] = {}
+    output_schema = schemas.get("OUTPUT")
+    input_schema = schemas.get("INPUT") or {}
+    if output_schema is None:
+        if "HTML" in system or "html" in system:
+            return "html_generation", input_schema, {}
+        return "report_formatting", input_schema, {}
+
+    if output_schema.get("type") == "array":
+        return "report_structure", input_schema, output_schema
+    props = output_schema.get("properties", {})
+    if "template_name" in props:
+        return "template_selection", input_schema, output_schema
+    if "updated_paragraph_latest_state" in props:
+        return "reflection_summary", input_schema, output_schema
+    if "paragraph_latest_state" in props:
+        return "first_summary", input_schema, output_schema
+    if "search_query" in props:
+        if "paragraph_latest_state" in input_schema.get("properties", {}):
+            return "reflection", input_schema, output_schema
+        return "first_search", input_schema, output_schema
+    return "unknown", input_schema, output_schema
+
+
+class CannedResponder:
+    """按阶段生成固定格式的输出"""
+
+    def __init__(self, paragraphs: int = 3, summary_chars: int = 600, fanout: int = 2):
+        """
+        Args:
+            paragraphs: 报告结构的段落数
+            summary_chars: 每次总结新增的正文字符数
+            fanout: 每次搜索给出的互补查询数
+        """
+        self.paragraphs = paragraphs
+        self.summary_chars = summary_chars
+        self.fanout = fanout
+
+    def respond(self, stage: str, output_schema: Dict[str, Any], user: str) -> str:
+        payload = _parse_user_payload(user)
+        seed = _digest(stage, user)
+        title = payload.get("title") or "训练主题"
+        props = output_schema.get("properties", {})
+
+        if stage == "report_structure":
+            return json.dumps([
+                {"title": f"第{i + 1}部分: {_SENTENCES[(seed + i) % len(_SENTENCES)][:12]}",
+                 "content": _SENTENCES[(seed + i + 3) % len(_SENTENCES)]}
+                for i in range(self.paragraphs)
+            ], ensure_ascii=False)
+
+        if stage in ("first_search", "reflection"):
+            tag = f"{seed % 100000:05d}"
+            queries = [f"{title} 研究 {tag}"] + [f"{title} 角度{k} {tag}" for k in range(1, self.fanout)]
+            result: Dict[str, Any] = {"search_query": queries[0], "reasoning": _filler(seed, 60)}
+            if "days" in props:
+                # InsightEngine: 训练数据查询工具
+                result.update(search_tool="search_recent_trainings", days=30 + seed % 60, limit=20)
+            elif "search_tool" in props:
+                # MediaEngine: 博查搜索工具
+                result["search_tool"] = "comprehensive_search"
+                result["searches"] = [{"search_query": q, "search_tool": "comprehensive_search"} for q in queries]
+            else:
+                result["search_queries"] = queries
+            return json.dumps(result, ensure_ascii=False)
+
+        if stage == "first_summary":
+            return json.dumps({"paragraph_latest_state": _filler(seed, self.summary_chars)}, ensure_ascii=False)
+
+        if stage == "reflection_summary":
+            previous = payload.get("paragraph_latest_state", "")
+            updated = previous + _filler(seed, self.summary_chars // 2)
+            return json.dumps({"updated_paragraph_latest_state": updated}, ensure_ascii=False)
+
+        if stage == "template_selection":
+            match = _TEMPLATE_RE.search(user)
+            return json.dumps({
+                "template_name": match.group(1) if match else "训练数据分析与进步评估报告模板",
+                "selection_reason": _filler(seed, 40)
+            }, ensure_ascii=False)
+
+        if stage == "html_generation":
+            body = "".join(f"<p>{_filler(seed + i, 200)}</p>" for i in range(self.paragraphs))
+            return f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>报告</title></head><body>{body}</body></html>"
+
+        if stage == "report_formatting":
+            items = payload.get("items") or []
+            sections = [f"## {item.get('title', '')}\n\n{item.get('paragraph_latest_state', '')}"
+                        for item in items if isinstance(item, dict)]
+            return "# 研究报告\n\n" + ("\n\n".join(sections) or _filler(seed, self.summary_chars))
+
+        # 未识别的阶段: 按输出schema填充字符串字段
+        return json.dumps({key: _filler(seed, 40) for key in props} or {"result": _filler(seed, 40)},
+                          ensure_ascii=False)
+
+
+class FakeLLMServer:
+    """在后台线程运行的OpenAI兼容桩服务"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 latency: Optional[LatencyModel] = None,
+                 stage_latency: Optional[Dict[str, LatencyModel]] = None,
+                 responder: Optional[CannedResponder] = None):
+        """
+        Args:
+            port: 监听端口,0表示随机空闲端口
+            latency: 默认延迟分布
+            stage_latency: 按阶段覆盖的延迟分布
+            responder: 输出生成器
+        """
+        self.latency = latency or LatencyModel()
+        self.stage_latency = stage_latency or {}
+        self.responder = responder or CannedResponder()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self._prefix_blocks = set()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {stage: dict(values) for stage, values in self._stats.items()}
+            return {
+                "stages": stages,
+                "total_calls": int(sum(v.get("calls", 0) for v in stages.values())),
+                "max_in_flight": self._max_in_flight,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._max_in_flight = 0
+            self._prefix_blocks.clear()
+
+    def _cached_prefix_chars(self, prompt: str) -> int:
+        """
+        模拟服务商的前缀缓存: 按块计算前缀链式哈希,与之前请求相同的最长前缀视为命中
+
+        Returns:
+            命中缓存的前缀字符数
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        keys = []
+        for start in range(0, len(prompt) - CACHE_BLOCK_CHARS + 1, CACHE_BLOCK_CHARS):
+            digest.update(prompt[start:start + CACHE_BLOCK_CHARS].encode("utf-8"))
+            keys.append(digest.copy().digest())
+        with self._lock:
+            hits = 0
+            for key in keys:
+                if key not in self._prefix_blocks:
+                    break
+                hits += 1
+            self._prefix_blocks.update(keys)
+        return hits * CACHE_BLOCK_CHARS
+
+    def complete(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """处理一次chat completion请求"""
+        messages = body.get("messages") or []
+        system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        stage, _, output_schema = classify(system)
+
+        with self._lock:
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+        try:
+            delay = self.stage_latency.get(stage, self.latency).sleep(f"{stage}:{user}")
+            content = self.responder.respond(stage, output_schema, user)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        prompt_tokens = estimate_tokens(system) + estimate_tokens(user)
+        completion_tokens = estimate_tokens(content)
+        prompt = f"{system}\x00{user}"
+        cached_tokens = min(estimate_tokens(prompt[:self._cached_prefix_chars(prompt)]), prompt_tokens)
+        with self._lock:
+            stats = self._stats[stage]
+            stats["calls"] += 1
+            stats["latency_s"] += delay
+            stats["prompt_tokens"] += prompt_tokens
+            stats["cached_tokens"] += cached_tokens
+            stats["completion_tokens"] += completion_tokens
+
+        return {
+            "id": f"chatcmpl-fake-{_digest(stage, user) % 10 ** 12}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, data: Dict[str, Any]):
+                payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+                elif self.path.rstrip("/") == "/stats":
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b"{}"
+                if self.path.rstrip("/") == "/reset":
+                    server.reset()
+                    self._send_json(200, {"ok": True})
+                    return
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+                    return
+                try:
+                    body = json.loads(raw.decode("utf-8"))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    self._send_json(400, {"error": {"message": "invalid JSON body"}})
+                    return
+                if body.get("stream"):
+                    self._send_json(400, {"error": {"message": "streaming is not supported by the fake server"}})
+                    return
+                self._send_json(200, server.complete(body))
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI兼容LLM桩服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="none", help="延迟分布,如 lognormal:0.2:0.5")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--paragraphs", type=int, default=3)
+    parser.add_argument("--summary-chars", type=int, default=600)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        args.host, args.port,
+        latency=LatencyModel.parse(args.latency, args.seed),
+        responder=CannedResponder(paragraphs=args.paragraphs, summary_chars=args.summary_chars)
+    )
+    print(f"LLM桩服务已启动: {server.base_url} (延迟: {server.latency})")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Tavily/Bocha/训练数据库的离线桩实现
+- FakeTavilyClient: 替代 tavily.TavilyClient,传给 TavilyNewsAgency(client=...)
+- FakeBochaSession: 替代 requests.Session,传给 BochaMultimodalSearch(session=...)
+- FakeTrainingDataSearch: 替代 InsightEngine 的训练数据查询工具,传给 SportsScientistAgent(search_agency=...)
+
+结果由查询和参数确定性生成;相近的查询会返回部分相同的URL,便于观察缓存和去重的效果
+"""
+
+import hashlib
+import json
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .latency import LatencyModel
+
+_TOPICS = ["乳酸阈", "最大摄氧量", "跑步经济性", "周期化", "赛前减量", "心率区间", "间歇训练", "长距离慢跑"]
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _documents(query: str, count: int, content_chars: int) -> List[Dict[str, Any]]:
+    """按查询生成确定性的文档列表(一半URL只由主题决定,不同查询之间会重复)"""
+    seed = _digest(query)
+    docs = []
+    for i in range(count):
+        topic = _TOPICS[(seed + i) % len(_TOPICS)]
+        shared = i % 2 == 0
+        slug = f"{topic}-{i}" if shared else f"{seed % 100000}-{i}"
+        body = f"{topic}相关研究表明,训练强度与恢复需要平衡。" * max(1, content_chars // 24)
+        docs.append({
+            "title": f"{topic}研究综述 {slug}",
+            "url": f"https://example.org/articles/{slug}",
+            "content": body[:content_chars],
+            "score": round(1.0 - i / (count + 1), 3),
+            "published_date": (datetime(2025, 1, 1) + timedelta(days=seed % 365)).strftime("%Y-%m-%d"),
+        })
+    return docs
+
+
+class _CallCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = Counter()
+
+    def count(self, name: str):
+        with self._lock:
+            self.calls[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.calls)
+
+
+class FakeTavilyClient(_CallCounter):
+    """tavily.TavilyClient 的桩实现"""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, results: int = 8, content_chars: int = 1500):
+        super().__init__()
+        self.latency = latency or LatencyModel()
+        self.results = results
+        self.content_chars = content_chars
+
+    def search(self, query: str, max_results: int = 5, **kwargs) -> Dict[str, Any]:
+        self.count("tavily.search")
+        delay = self.latency.sleep(f"tavily:{query}")
+        docs = _documents(query, min(max_results or self.results, self.results), self.content_chars)
+        for doc in docs:
+            doc["raw_content"] = doc["content"] if kwargs.get("include_raw_content") else None
+        return {
+            "query": query,
+            "answer": f"{query}的要点总结" if kwargs.get("include_answer") else None,
+            "results": docs,
+            "images": [],
+            "response_time": round(delay, 3),
+        }
+
+
+class _FakeResponse:
+    def __init__(self, data: Dict[str, Any], status_code: int = 200):
+        self._data = data
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        return None
+
+    def json(self) -> Dict[str, Any]:
+        return self._data
+
+
+class FakeBochaSession(_CallCounter):
+    """Bocha AI搜索接口的桩实现(只实现BochaMultimodalSearch用到的post)"""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, results: int = 8, content_chars: int = 800):
+        super().__init__()
+        self.latency = latency or LatencyModel()
+        self.results = results
+        self.content_chars = content_chars
+
+    def post(self, url: str, headers: Optional[Dict[str, str]] = None,
+             json: Optional[Dict[str, Any]] = None, **kwargs) -> _FakeResponse:
+        payload = json or {}
+        query = payload.get("query", "")
+        self.count("bocha.post")
+        self.latency.sleep(f"bocha:{query}:{payload.get('freshness', '')}")
+        docs = _documents(f"{query}:{payload.get('freshness', '')}", min(payload.get("count") or self.results, self.results),
+                          self.content_chars)
+        webpages = [{
+            "name": doc["title"],
+            "url": doc["url"],
+            "snippet": doc["content"],
+            "displayUrl": doc["url"],
+            "dateLastCrawled": doc["published_date"],
+        } for doc in docs]
+        return _FakeResponse({
+            "code": 200,
+            "conversation_id": f"fake-{_digest(query) % 10 ** 8}",
+            "messages": [
+                {"role": "assistant", "type": "source", "content_type": "webpage",
+                 "content": _json_dumps({"value": webpages})},
+                {"role": "assistant", "type": "answer", "content_type": "text", "content": f"{query}的要点总结"},
+            ],
+        })
+
+
+def _json_dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False)
+
+
+class FakeTrainingDataSearch(_CallCounter):
+    """
+    InsightEngine训练数据查询工具的桩实现(Keep数据源)
+
+    记录类查询返回确定性生成的 KeepTrainingRecord,统计类查询返回汇总字典
+    """
+
+    RECORD_TOOLS = ("search_recent_trainings", "search_by_date_range", "search_by_distance_range",
+                    "search_by_heart_rate", "search_similar_trainings")
+    STATS_TOOLS = ("get_training_stats", "get_heart_rate_analysis")
+
+    def __init__(self, latency: Optional[LatencyModel] = None, records: int = 30):
+        super().__init__()
+        self.data_source = "keep"
+        self.user_id = "bench"
+        self.latency = latency or LatencyModel()
+        self.records = records
+
+    def get_supported_tools(self) -> List[str]:
+        return list(self.RECORD_TOOLS + self.STATS_TOOLS)
+
+    def _records(self, key: str, limit: int):
+        from InsightEngine.tools.keep_search import KeepTrainingRecord
+
+        seed = _digest(key)
+        now = datetime(2025, 6, 1, 7, 0, 0)
+        records = []
+        for i in range(min(limit or self.records, self.records)):
+            distance = 5000 + (seed + i * 977) % 16000
+            duration = int(distance / 1000 * (270 + (seed + i) % 90))
+            start = now - timedelta(days=i, minutes=(seed + i) % 120)
+            records.append(KeepTrainingRecord(
+                id=100000 + (seed + i) % 900000,
+                user_id="bench",
+                exercise_type="running",
+                duration_seconds=duration,
+                start_time=start,
+                end_time=start + timedelta(seconds=duration),
+                calories=int(distance / 1000 * 65),
+                distance_meters=float(distance),
+                avg_heart_rate=135 + (seed + i) % 35,
+                max_heart_rate=165 + (seed + i) % 25,
+                heart_rate_data=None,
+                add_ts=0,
+                last_modify_ts=0,
+                data_source="keep",
+                pace_per_km=duration / (distance / 1000),
+            ))
+        return records
+
+    def _respond(self, tool_name: str, **params):
+        from InsightEngine.tools.base_search import DBResponse
+
+        self.count(tool_name)
+        key = f"{tool_name}:{sorted(params.items(), key=lambda kv: kv[0])}"
+        self.latency.sleep(key)
+        if tool_name in self.STATS_TOOLS:
+            seed = _digest(key)
+            return DBResponse(tool_name=tool_name, parameters=params, data_source=self.data_source, statistics={
+                "total_trainings": self.records,
+                "total_distance_km": round(self.records * 9.5, 1),
+                "avg_heart_rate": 140 + seed % 20,
+                "avg_pace_per_km": 300 + seed % 60,
+            })
+        return DBResponse(tool_name=tool_name, parameters=params, data_source=self.data_source,
+                          results=self._records(key, params.get("limit") or params.get("k") or self.records))
+
+    def __getattr__(self, name: str):
+        if name in self.RECORD_TOOLS or name in self.STATS_TOOLS:
+            return lambda **params: self._respond(name, **params)
+        raise AttributeError(name)
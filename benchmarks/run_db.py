@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+"""
+训练数据库基准测试
+在不同规模(用户数 x 年数)的合成训练历史上计时:
+- tools:   KeepDataSearch / GarminDataSearch 的每个查询工具
+- routes:  /training/api/records 分页(页码/游标)、单条CRUD、导出等路由
+- imports: Keep CSV导入(追加/影子表替换)、Garmin导入(逐条/全量替换)
+
+每个操作先执行一次(冷,派生缓存为空),再重复执行若干次取中位数和P95(热),
+最后输出 操作 x 规模 的对比表和JSON结果,可与基线比较判定性能回退。
+
+用法:
+    python -m benchmarks.run_db --sizes 1x1,1x5,10x3 --sources keep,garmin
+    python -m benchmarks.run_db --backend duckdb --sizes 1x5
+    python -m benchmarks.run_db --analytics duckdb --sizes 10x3
+    python -m benchmarks.run_db --db-url mysql+pymysql://root:pw@127.0.0.1:3306/bench --sizes 1x3
+    python -m benchmarks.run_db --baseline data/benchmarks/db_baseline.json --tolerance 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.db_binding import bind_database, reset_derived_caches, use_placeholder_db_config
+from benchmarks.synthetic_history import SyntheticHistory, create_engine_for
+
+GROUPS = ("tools", "routes", "imports")
+# 未指定--db-url时每个规模使用的临时数据库文件
+BACKEND_SUFFIXES = {"sqlite": "sqlite3", "duckdb": "duckdb"}
+DEFAULT_OUTPUT_DIR = ROOT_DIR / "data" / "benchmarks"
+# 导入基准使用的记录数上限
+IMPORT_ROWS = 2000
+
+
+def _day(offset_days: int) -> str:
+    return (datetime.now() - timedelta(days=offset_days)).strftime("%Y-%m-%d")
+
+
+def _parse_size(label: str) -> Tuple[int, float]:
+    """'10x3' -> (10用户, 3年)"""
+    users, _, years = label.lower().partition("x")
+    return int(users), float(years or 1)
+
+
+class Timer:
+    """记录每个操作的冷/热耗时"""
+
+    def __init__(self, repeat: int, verbose: bool = False):
+        self.repeat = repeat
+        self.verbose = verbose
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    @contextlib.contextmanager
+    def _quiet(self):
+        if self.verbose:
+            yield
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield
+
+    def measure(self, group: str, source: str, name: str, func: Callable[[], Optional[str]],
+                repeat: Optional[int] = None):
+        """
+        计时一个操作
+
+        Args:
+            func: 执行一次操作,出错时返回错误信息(或抛出异常)
+            repeat: 热执行次数,默认使用全局设置
+        """
+        key = f"{group}/{source}/{name}"
+        samples: List[float] = []
+        error = None
+        for _ in range(1 + (self.repeat if repeat is None else repeat)):
+            started = time.perf_counter()
+            try:
+                with self._quiet():
+                    error = func()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            samples.append((time.perf_counter() - started) * 1000)
+            if error:
+                break
+
+        warm = samples[1:] or samples
+        self.results[key] = {
+            "group": group,
+            "source": source,
+            "operation": name,
+            "cold_ms": round(samples[0], 2),
+            "median_ms": round(statistics.median(warm), 2),
+            "p95_ms": round(sorted(warm)[max(0, int(len(warm) * 0.95) - 1)], 2),
+            "error": error,
+        }
+        status = f"错误: {error}" if error else f"冷 {samples[0]:.1f}ms, 热中位数 {statistics.median(warm):.1f}ms"
+        print(f"  {key}: {status}")
+
+
+# ===== 查询工具 =====
+
+def _tool_operations(source: str, latest_id: Any) -> List[Tuple[str, Callable]]:
+    operations = [
+        ("search_recent_trainings(30d)", lambda t: t.search_recent_trainings(days=30, limit=50)),
+        ("search_by_date_range(90d)", lambda t: t.search_by_date_range(_day(90), _day(0), limit=100)),
+        ("get_training_stats(1y)", lambda t: t.get_training_stats(_day(365), _day(0))),
+        ("get_training_stats(all)", lambda t: t.get_training_stats()),
+        ("search_by_distance_range(10-21km)", lambda t: t.search_by_distance_range(10, 21, limit=50)),
+        ("search_by_heart_rate(150-170)", lambda t: t.search_by_heart_rate(150, 170, limit=50)),
+        ("search_similar_trainings(k=5)", lambda t: t.search_similar_trainings(latest_id, k=5)),
+    ]
+    if source == "keep":
+        operations.append(("get_heart_rate_analysis(30d)", lambda t: t.get_heart_rate_analysis(days=30, limit=20)))
+    else:
+        operations += [
+            ("search_by_training_load(>=100)", lambda t: t.search_by_training_load(100, limit=50)),
+            ("search_by_power_zone(>=250W)", lambda t: t.search_by_power_zone(250, limit=50)),
+            ("get_training_effect_analysis(1y)", lambda t: t.get_training_effect_analysis(_day(365), _day(0))),
+            ("get_load_model(42d)", lambda t: t.get_load_model(days=42)),
+        ]
+    return operations
+
+
+def bench_tools(timer: Timer, source: str, latest_id: Any):
+    from InsightEngine.tools import GarminDataSearch, KeepDataSearch
+
+    tool = KeepDataSearch() if source == "keep" else GarminDataSearch()
+    for name, call in _tool_operations(source, latest_id):
+        timer.measure("tools", source, name, lambda: call(tool).error_message)
+
+
+# ===== CRUD路由 =====
+
+@contextlib.contextmanager
+def _route_source(routes_module, source: str):
+    """让路由按指定数据源工作(路由每次请求都从config.py读取TRAINING_DATA_SOURCE)"""
+    original = routes_module.get_config_value
+
+    def get_config_value(key, default=None):
+        return source if key == "TRAINING_DATA_SOURCE" else original(key, default)
+
+    routes_module.get_config_value = get_config_value
+    try:
+        yield
+    finally:
+        routes_module.get_config_value = original
+
+
+def _check(response, expected: int = 200) -> Optional[str]:
+    if response.status_code != expected:
+        return f"HTTP {response.status_code}: {response.get_data(as_text=True).strip()[:200]}"
+    return None
+
+
+def bench_routes(timer: Timer, source: str, total: int, record_id: Any):
+    from flask import Flask
+    import routes.training_data as routes_module
+
+    app = Flask(__name__)
+    app.register_blueprint(routes_module.training_data_bp)
+    client = app.test_client()
+
+    with _route_source(routes_module, source):
+        per_page = 20
+        middle_page = max(1, total // per_page // 2)
+        first = client.get(f"/training/api/records?page=1&per_page={per_page}")
+        next_cursor = first.get_json().get("next_cursor") if first.status_code == 200 else None
+
+        timer.measure("routes", source, "GET records page=1",
+                      lambda: _check(client.get(f"/training/api/records?page=1&per_page={per_page}")))
+        timer.measure("routes", source, "GET records middle page (OFFSET)",
+                      lambda: _check(client.get(f"/training/api/records?page={middle_page}&per_page={per_page}")))
+        if next_cursor:
+            timer.measure("routes", source, "GET records cursor (page 2)",
+                          lambda: _check(client.get(f"/training/api/records?cursor={next_cursor}&per_page={per_page}")))
+        timer.measure("routes", source, "GET record/<id>",
+                      lambda: _check(client.get(f"/training/api/record/{record_id}")))
+        timer.measure("routes", source, "GET exercise_types",
+                      lambda: _check(client.get("/training/api/exercise_types")))
+        timer.measure("routes", source, "GET export csv (1y)",
+                      lambda: _check(client.get(f"/training/api/export?format=csv&from={_day(365)}")), repeat=1)
+
+        if source != "keep":
+            # 新增/更新接口只接受Keep字段
+            return
+
+        created: List[int] = []
+
+        def post():
+            now = datetime.now()
+            response = client.post("/training/api/record", json={
+                "exercise_type": "跑步",
+                "duration_seconds": 1800,
+                "start_time": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "end_time": (now + timedelta(seconds=1800)).strftime("%Y-%m-%d %H:%M:%S"),
+                "distance_meters": 5000,
+                "avg_heart_rate": 145,
+                "heart_rate_data": json.dumps([140] * 360),
+            })
+            if response.status_code == 200:
+                created.append(response.get_json()["data"]["id"])
+            return _check(response)
+
+        timer.measure("routes", source, "POST record", post)
+        pending = list(created)
+        timer.measure("routes", source, "PUT record/<id>", lambda: _check(
+            client.put(f"/training/api/record/{pending[0]}", json={"avg_heart_rate": 150})
+        ) if pending else "没有可更新的记录", repeat=max(0, len(pending) - 1))
+
+        def delete():
+            if not created:
+                return "没有可删除的记录"
+            return _check(client.delete(f"/training/api/record/{created.pop()}"))
+
+        timer.measure("routes", source, "DELETE record/<id>", delete, repeat=max(0, len(created) - 1))
+
+
+# ===== 导入 =====
+
+def bench_imports(timer: Timer, engine, sources: List[str], workdir: Path, seed: int):
+    try:
+        from scripts.training_data_importer import GarminDataImporter, KeepDataImporter
+    except ImportError as e:
+        for source in sources:
+            timer.results[f"imports/{source}/*"] = {
+                "group": "imports", "source": source, "operation": "*",
+                "cold_ms": None, "median_ms": None, "p95_ms": None, "error": f"缺少依赖: {e}",
+            }
+        print(f"  跳过导入基准: {e}")
+        return
+
+    # 导入数据使用独立种子,避免与库中已有记录重复
+    history = SyntheticHistory(users=1, years=IMPORT_ROWS / 200, seed=seed + 1)
+
+    if "keep" in sources:
+        csv_path = workdir / "keep_import.csv"
+        rows = history.write_keep_import_file(csv_path, limit=IMPORT_ROWS)
+        timer.measure("imports", "keep", f"Keep CSV append ({rows} rows)",
+                      lambda: _import_error(KeepDataImporter(str(csv_path), db_engine=engine).run(False)), repeat=0)
+        # 替换导入会把正式表换成导入数据,放在最后执行
+        timer.measure("imports", "keep", f"Keep CSV replace ({rows} rows)",
+                      lambda: _import_error(KeepDataImporter(str(csv_path), db_engine=engine).run(True)), repeat=0)
+
+    if "garmin" in sources:
+        activities = history.garmin_activities(limit=IMPORT_ROWS)
+        for act in activities:
+            act["activityId"] += 5 * 10 ** 9
+        importer = GarminDataImporter("bench@example.com", "bench", db_engine=engine)
+        timer.measure("imports", "garmin", f"Garmin per-row ({len(activities)} rows)",
+                      lambda: _import_error(importer.import_to_database(activities, truncate_first=False)), repeat=0)
+        timer.measure("imports", "garmin", f"Garmin full replace ({len(activities)} rows)",
+                      lambda: _import_error(importer.import_to_database(activities, truncate_first=True)), repeat=0)
+
+
+def _import_error(result: Dict[str, Any]) -> Optional[str]:
+    if result.get("error"):
+        return result["error"]
+    if not result.get("success"):
+        return f"没有成功导入的记录: {result}"
+    return None
+
+
+# ===== 场景 =====
+
+def _table_stats(engine, source: str) -> Tuple[int, Any]:
+    """返回默认用户的(记录数, 最新记录ID);工具和路由均以默认用户身份查询"""
+    from sqlalchemy import func, select
+    from InsightEngine.tools.db_models import TrainingRecordGarmin, TrainingRecordKeep
+    from utils.user_context import DEFAULT_USER_ID
+
+    model = TrainingRecordKeep if source == "keep" else TrainingRecordGarmin
+    start_field = model.start_time if source == "keep" else model.start_time_gmt
+    own = model.user_id == DEFAULT_USER_ID
+    with engine.connect() as conn:
+        total = conn.execute(select(func.count()).select_from(model.__table__).where(own)).scalar() or 0
+        latest = conn.execute(select(model.id).where(own).order_by(start_field.desc()).limit(1)).scalar()
+    return int(total), latest
+
+
+def run_size(label: str, args, sources: List[str], groups: List[str], workroot: Path) -> Dict[str, Any]:
+    users, years = _parse_size(label)
+    workdir = workroot / label
+    workdir.mkdir(parents=True, exist_ok=True)
+    db_url = args.db_url or f"{args.backend}:///{workdir / ('training.' + BACKEND_SUFFIXES[args.backend])}"
+    print(f"\n=== 规模 {label}: {users}用户 x {years:g}年 ({db_url.split('@')[-1]}) ===")
+
+    engine = create_engine_for(db_url)
+    history = SyntheticHistory(users, years, args.seed, args.hr_interval, args.hr_fraction)
+    started = time.perf_counter()
+    counts = history.populate(engine, sources)
+    generate_s = time.perf_counter() - started
+
+    bind_database(engine, args.analytics)
+    reset_derived_caches(workdir / "cache")
+
+    timer = Timer(args.repeat, args.verbose)
+    for source in sources:
+        total, latest_id = _table_stats(engine, source)
+        if "tools" in groups:
+            bench_tools(timer, source, latest_id)
+        if "routes" in groups:
+            bench_routes(timer, source, total, latest_id)
+    if "imports" in groups:
+        bench_imports(timer, engine, sources, workdir, args.seed)
+
+    query_plans = None
+    if args.explain and engine.dialect.name in ("sqlite", "mysql"):
+        from models.migrations import verify_query_plans
+        query_plans = [{key: item[key] for key in ("name", "used_index", "filesort", "ok")}
+                       for item in verify_query_plans(engine)]
+        missed = [item["name"] for item in query_plans if not item["ok"]]
+        print(f"  执行计划校验: {len(query_plans) - len(missed)}/{len(query_plans)} 命中复合索引"
+              + (f", 未命中: {', '.join(missed)}" if missed else ""))
+
+    engine.dispose()
+    return {
+        "size": label,
+        "users": users,
+        "years": years,
+        "rows": counts,
+        "generate_s": round(generate_s, 2),
+        "operations": timer.results,
+        "query_plans": query_plans,
+    }
+
+
+def print_comparison(results: List[Dict[str, Any]]):
+    """操作 x 规模 对比表: 热中位数(冷) 毫秒"""
+    labels = [result["size"] for result in results]
+    keys: List[str] = []
+    for result in results:
+        keys += [key for key in result["operations"] if key not in keys]
+
+    width = max([len(key) for key in keys] + [10]) + 2
+    print("\n" + "操作".ljust(width) + "".join(f"{label:>22}" for label in labels))
+    print("行数".ljust(width) + "".join(f"{str(sum(r['rows'].values())):>22}" for r in results))
+    print("-" * (width + 22 * len(labels)))
+    for key in keys:
+        cells = []
+        for result in results:
+            item = result["operations"].get(key)
+            if item is None:
+                cells.append(f"{'-':>22}")
+            elif item["error"]:
+                cells.append(f"{'错误':>22}")
+            else:
+                cells.append(f"{item['median_ms']:>11.1f} ({item['cold_ms']:.1f})".rjust(22))
+        print(key.ljust(width) + "".join(cells))
+    print("单位: 毫秒, 热执行中位数(冷执行)")
+
+    errors = [(r["size"], key, item["error"]) for r in results for key, item in r["operations"].items() if item["error"]]
+    for size, key, error in errors:
+        print(f"  [{size}] {key}: {error}")
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+                     tolerance: float, min_ms: float = 1.0) -> List[str]:
+    """与基线对比热中位数,忽略基线低于min_ms的操作(计时噪声)"""
+    baseline_by_size = {item["size"]: item for item in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_by_size.get(result["size"])
+        if not previous:
+            continue
+        for key, item in result["operations"].items():
+            old = previous["operations"].get(key, {}).get("median_ms")
+            new = item.get("median_ms")
+            if not old or new is None or old < min_ms:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append(f"[{result['size']}] {key}: {old}ms -> {new}ms (+{(new / old - 1) * 100:.1f}%)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="训练数据库查询/路由/导入基准测试")
+    parser.add_argument("--sizes", default="1x1,1x5,10x3", help="逗号分隔的 用户数x年数")
+    parser.add_argument("--sources", default="keep,garmin")
+    parser.add_argument("--groups", default=",".join(GROUPS), help="逗号分隔: tools,routes,imports")
+    parser.add_argument("--db-url", default=None, help="数据库URL,默认每个规模使用临时嵌入式数据库文件(MySQL库会被清空重建)")
+    parser.add_argument("--backend", default="sqlite", choices=sorted(BACKEND_SUFFIXES), help="临时数据库类型")
+    parser.add_argument("--analytics", default="", choices=["", "duckdb"], help="聚合查询使用的分析引擎")
+    parser.add_argument("--repeat", type=int, default=5, help="热执行次数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--hr-interval", type=int, default=5, help="心率采样间隔(秒)")
+    parser.add_argument("--hr-fraction", type=float, default=1.0, help="带心率序列的训练比例")
+    parser.add_argument("--output", default=None, help="结果JSON路径(默认 data/benchmarks/db_时间戳.json)")
+    parser.add_argument("--baseline", default=None, help="基线结果JSON,用于回归判定")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="回归容忍比例")
+    parser.add_argument("--explain", action="store_true", help="检查工具查询形状的执行计划是否命中复合索引")
+    parser.add_argument("--keep-db", action="store_true", help="保留生成的临时数据库")
+    parser.add_argument("--verbose", action="store_true", help="显示工具和路由的运行输出")
+    args = parser.parse_args(argv)
+
+    sources = [s.strip() for s in args.sources.split(",") if s.strip()]
+    groups = [g.strip() for g in args.groups.split(",") if g.strip()]
+    unknown = [g for g in groups if g not in GROUPS]
+    if unknown:
+        parser.error(f"未知分组: {', '.join(unknown)}")
+
+    use_placeholder_db_config()
+    workroot = Path(tempfile.mkdtemp(prefix="bench_db_"))
+    results = []
+    try:
+        for label in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+            results.append(run_size(label, args, sources, groups, workroot))
+    finally:
+        if args.keep_db:
+            print(f"\n临时数据库保留在: {workroot}")
+        else:
+            shutil.rmtree(workroot, ignore_errors=True)
+
+    print_comparison(results)
+
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"db_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(),
+            "settings": {
+                "sources": sources, "groups": groups, "repeat": args.repeat, "seed": args.seed,
+                "hr_interval": args.hr_interval, "hr_fraction": args.hr_fraction,
+                "backend": (args.db_url or args.backend).split(":")[0],
+                "analytics": args.analytics or None,
+            },
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline.get("results", []), args.tolerance)
+        if regressions:
+            print(f"\n发现性能回退(容忍 {args.tolerance * 100:.0f}%):")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\n与基线相比无性能回退(容忍 {args.tolerance * 100:.0f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
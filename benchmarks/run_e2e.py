@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+端到端基准测试
+在本地LLM桩服务和离线搜索桩上运行各引擎的完整研究流程,对 1..N 个并发研究任务报告:
+墙钟时间、单次运行耗时、各阶段LLM调用次数与token(含模拟的前缀缓存命中)、搜索调用次数、内存峰值(RSS)和吞吐量。
+
+每个 (引擎, 并发数) 场景在单独的子进程中运行,内存峰值互不影响;
+LLM桩服务在主进程中运行,每个场景开始前清空统计。
+
+用法:
+    python -m benchmarks.run_e2e --engines query,media,insight,report --concurrency 1,2,4 \\
+        --llm-latency lognormal:0.3:0.4 --search-latency uniform:0.2:0.6
+    python -m benchmarks.run_e2e --baseline data/benchmarks/e2e_baseline.json --tolerance 0.15
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.fakes import (
+    CannedResponder,
+    FakeBochaSession,
+    FakeLLMServer,
+    FakeTavilyClient,
+    FakeTrainingDataSearch,
+    LatencyModel,
+)
+
+ENGINES = ("query", "media", "insight", "report")
+DEFAULT_OUTPUT_DIR = ROOT_DIR / "data" / "benchmarks"
+
+QUERIES = [
+    "马拉松赛前三周如何安排减量训练",
+    "乳酸阈训练对半程马拉松成绩的影响",
+    "业余跑者如何通过心率区间控制训练强度",
+    "高温环境下长距离训练的配速调整",
+    "力量训练能否提升中长跑跑步经济性",
+    "周跑量增加过快带来的伤病风险",
+]
+
+# 回归判定的指标(数值越大越差)
+REGRESSION_METRICS = ("wall_s", "mean_run_s", "peak_rss_mb", "llm_calls", "prompt_tokens")
+
+
+def _canned_engine_reports(paragraphs: int) -> List[str]:
+    """ReportAgent的输入: 三个子引擎的固定Markdown报告"""
+    from benchmarks.fakes.llm_server import _filler
+
+    reports = []
+    for engine_index, name in enumerate(("理论专家", "后勤情报", "运动科学")):
+        sections = [f"# {name}报告"]
+        for i in range(paragraphs):
+            sections.append(f"## 第{i + 1}部分\n\n{_filler(engine_index * 31 + i, 800)}")
+        reports.append("\n\n".join(sections))
+    return reports
+
+
+def _build_agent(engine: str, opts: Dict[str, Any], base_url: str, workdir: Path, shared: Dict[str, Any]):
+    """按引擎创建接入桩服务的Agent(每个并发任务一个实例)"""
+    common = dict(
+        llm_api_key="bench",
+        llm_base_url=base_url,
+        llm_model_name="fake-model",
+        output_dir=str(workdir / f"{engine}_reports"),
+    )
+    research = dict(
+        max_reflections=opts["reflections"],
+        max_paragraphs=opts["paragraphs"],
+        save_intermediate_states=False,
+        enable_checkpoints=opts["checkpoints"],
+    )
+
+    if engine == "query":
+        from QueryEngine.agent import TheoryExpertAgent
+        from QueryEngine.tools.search import TavilyNewsAgency
+        from QueryEngine.utils.config import Config
+
+        agency = TavilyNewsAgency(client=shared["search"], use_cache=shared["cache"] is not None,
+                                  cache=shared["cache"])
+        return TheoryExpertAgent(Config(tavily_api_key="bench", **common, **research), search_agency=agency)
+
+    if engine == "media":
+        from MediaEngine.agent import LogisticsIntelligenceAgent
+        from MediaEngine.tools.search import BochaMultimodalSearch
+        from MediaEngine.utils.config import Config
+
+        agency = BochaMultimodalSearch(api_key="bench", session=shared["search"],
+                                       use_cache=shared["cache"] is not None, cache=shared["cache"])
+        return LogisticsIntelligenceAgent(Config(bocha_api_key="bench", **common, **research), search_agency=agency)
+
+    if engine == "insight":
+        # 导入训练数据工具时会按根目录config.py创建数据库引擎(不建立连接),未配置数据库时
+        # 只在本子进程内填入占位值;查询全部由桩实现完成,不会连接数据库
+        from benchmarks.db_binding import use_placeholder_db_config
+        use_placeholder_db_config()
+        from InsightEngine.agent import SportsScientistAgent
+        from InsightEngine.utils.config import Config
+
+        return SportsScientistAgent(Config(**common, **research), search_agency=shared["search"])
+
+    from ReportEngine.agent import ReportAgent
+    from ReportEngine.utils.config import Config
+
+    return ReportAgent(Config(
+        template_dir=str(ROOT_DIR / "ReportEngine" / "report_template"),
+        log_file=str(workdir / "logs" / "report.log"),
+        **common
+    ))
+
+
+def _shared_backends(engine: str, opts: Dict[str, Any], workdir: Path) -> Dict[str, Any]:
+    """同一场景内所有并发任务共享的搜索桩和(可选的)临时搜索缓存"""
+    latency = LatencyModel.parse(opts["search_latency"], opts["seed"])
+    search = {
+        "query": lambda: FakeTavilyClient(latency),
+        "media": lambda: FakeBochaSession(latency),
+        "insight": lambda: FakeTrainingDataSearch(latency),
+    }.get(engine, lambda: None)()
+
+    cache = None
+    if opts["search_cache"] and engine in ("query", "media"):
+        # 使用场景临时目录中的缓存,不读写仓库的全局缓存
+        from utils.search_cache import SearchCache
+        cache = SearchCache(cache_file=workdir / "search_cache.sqlite3")
+    return {"search": search, "cache": cache}
+
+
+def _run_scenario(engine: str, concurrency: int, base_url: str, opts: Dict[str, Any]) -> Dict[str, Any]:
+    """子进程入口: 运行一个 (引擎, 并发数) 场景"""
+    workdir = Path(tempfile.mkdtemp(prefix=f"bench_{engine}_"))
+    os.chdir(workdir)
+
+    import utils.run_journal as run_journal
+    run_journal.DEFAULT_JOURNAL_DIR = workdir / "checkpoints"
+
+    sink = contextlib.ExitStack()
+    if not opts["verbose"]:
+        devnull = sink.enter_context(open(os.devnull, "w", encoding="utf-8"))
+        sink.enter_context(contextlib.redirect_stdout(devnull))
+        sink.enter_context(contextlib.redirect_stderr(devnull))
+
+    run_times: List[float] = [0.0] * concurrency
+    errors: List[str] = []
+    errors_lock = threading.Lock()
+
+    with sink:
+        shared = _shared_backends(engine, opts, workdir)
+        agents = [_build_agent(engine, opts, base_url, workdir, shared) for _ in range(concurrency)]
+        reports = _canned_engine_reports(opts["paragraphs"]) if engine == "report" else None
+
+        def run(index: int):
+            query = QUERIES[index % len(QUERIES)]
+            start = time.perf_counter()
+            try:
+                if engine == "report":
+                    agents[index].generate_report(query, reports)
+                else:
+                    agents[index].research(query, save_report=True)
+            except Exception as e:
+                with errors_lock:
+                    errors.append(f"run {index}: {type(e).__name__}: {e}")
+            finally:
+                run_times[index] = time.perf_counter() - start
+
+        threads = [threading.Thread(target=run, args=(i,), name=f"bench-{engine}-{i}") for i in range(concurrency)]
+        wall_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - wall_start
+
+    search_calls = shared["search"].stats() if shared["search"] is not None else {}
+    cache_stats = shared["cache"].stats() if shared["cache"] is not None else None
+    os.chdir(ROOT_DIR)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    # Linux下ru_maxrss单位为KB,macOS下为字节
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+    return {
+        "engine": engine,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "mean_run_s": round(statistics.mean(run_times), 3),
+        "max_run_s": round(max(run_times), 3),
+        "throughput_per_min": round(concurrency / wall * 60, 2) if wall > 0 else 0.0,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "search_calls": search_calls,
+        "search_cache": cache_stats,
+        "errors": errors,
+    }
+
+
+def run_scenario(server: FakeLLMServer, engine: str, concurrency: int, opts: Dict[str, Any]) -> Dict[str, Any]:
+    """在新的子进程中运行场景,并合并主进程中LLM桩服务的统计"""
+    server.reset()
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        result = pool.apply(_run_scenario, (engine, concurrency, server.base_url, opts))
+
+    llm = server.stats()
+    result["llm_calls"] = llm["total_calls"]
+    result["llm_max_in_flight"] = llm["max_in_flight"]
+    result["prompt_tokens"] = int(sum(s.get("prompt_tokens", 0) for s in llm["stages"].values()))
+    result["cached_tokens"] = int(sum(s.get("cached_tokens", 0) for s in llm["stages"].values()))
+    result["completion_tokens"] = int(sum(s.get("completion_tokens", 0) for s in llm["stages"].values()))
+    result["llm_stages"] = {
+        stage: {key: round(value, 3) if isinstance(value, float) else value for key, value in values.items()}
+        for stage, values in sorted(llm["stages"].items())
+    }
+    return result
+
+
+def _scenario_key(result: Dict[str, Any]) -> str:
+    return f"{result['engine']}@{result['concurrency']}"
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+                     tolerance: float) -> List[str]:
+    """与基线结果对比,列出超出容忍比例的指标"""
+    baseline_by_key = {_scenario_key(item): item for item in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_by_key.get(_scenario_key(result))
+        if not previous:
+            continue
+        for metric in REGRESSION_METRICS:
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append(
+                    f"{_scenario_key(result)} {metric}: {old} -> {new} (+{(new / old - 1) * 100:.1f}%)"
+                )
+    return regressions
+
+
+def print_table(results: List[Dict[str, Any]]):
+    header = f"{'场景':<14}{'墙钟(s)':>10}{'单次均值(s)':>12}{'吞吐(次/分)':>12}{'RSS(MB)':>10}{'LLM调用':>9}{'搜索调用':>9}{'输入token':>11}{'缓存token':>11}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        search_calls = sum(result["search_calls"].values())
+        print(f"{_scenario_key(result):<14}{result['wall_s']:>10.2f}{result['mean_run_s']:>12.2f}"
+              f"{result['throughput_per_min']:>12.2f}{result['peak_rss_mb']:>10.1f}{result['llm_calls']:>9}"
+              f"{search_calls:>9}{result['prompt_tokens']:>11}{result['cached_tokens']:>11}")
+        stages = ", ".join(f"{stage}={int(values.get('calls', 0))}" for stage, values in result["llm_stages"].items())
+        print(f"  阶段调用: {stages}")
+        if result["search_cache"]:
+            print(f"  搜索缓存: {result['search_cache']}")
+        for error in result["errors"]:
+            print(f"  错误: {error}")
+
+
+def _parse_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="离线端到端基准测试")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="逗号分隔: query,media,insight,report")
+    parser.add_argument("--concurrency", default="1,2,4", help="逗号分隔的并发研究任务数")
+    parser.add_argument("--llm-latency", default="lognormal:0.2:0.4", help="LLM延迟分布")
+    parser.add_argument("--search-latency", default="uniform:0.1:0.4", help="搜索延迟分布")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--paragraphs", type=int, default=3, help="报告结构的段落数")
+    parser.add_argument("--reflections", type=int, default=2, help="每段最大反思轮数")
+    parser.add_argument("--summary-chars", type=int, default=600, help="桩服务输出的总结长度")
+    parser.add_argument("--search-cache", action="store_true", help="启用搜索缓存(场景临时目录)")
+    parser.add_argument("--checkpoints", action="store_true", help="启用检查点日志")
+    parser.add_argument("--output", default=None, help="结果JSON路径(默认 data/benchmarks/e2e_时间戳.json)")
+    parser.add_argument("--baseline", default=None, help="基线结果JSON,用于回归判定")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="回归容忍比例")
+    parser.add_argument("--verbose", action="store_true", help="显示Agent的运行输出")
+    args = parser.parse_args(argv)
+
+    engines = _parse_list(args.engines)
+    unknown = [engine for engine in engines if engine not in ENGINES]
+    if unknown:
+        parser.error(f"未知引擎: {', '.join(unknown)}")
+    levels = [int(level) for level in _parse_list(args.concurrency)]
+
+    opts = {
+        "search_latency": args.search_latency,
+        "seed": args.seed,
+        "paragraphs": args.paragraphs,
+        "reflections": args.reflections,
+        "search_cache": args.search_cache,
+        "checkpoints": args.checkpoints,
+        "verbose": args.verbose,
+    }
+    server = FakeLLMServer(
+        latency=LatencyModel.parse(args.llm_latency, args.seed),
+        responder=CannedResponder(paragraphs=args.paragraphs, summary_chars=args.summary_chars)
+    )
+
+    results = []
+    with server:
+        print(f"LLM桩服务: {server.base_url} (延迟 {args.llm_latency}), 搜索延迟 {args.search_latency}")
+        for engine in engines:
+            for level in levels:
+                print(f"运行场景 {engine}@{level} ...")
+                results.append(run_scenario(server, engine, level, opts))
+
+    print()
+    print_table(results)
+
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"e2e_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(),
+            "settings": dict(opts, llm_latency=args.llm_latency, concurrency=levels, engines=engines),
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+
+    exit_code = 1 if any(result["errors"] for result in results) else 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline.get("results", []), args.tolerance)
+        if regressions:
+            print(f"\n发现性能回退(容忍 {args.tolerance * 100:.0f}%):")
+            for line in regressions:
+                print(f"  - {line}")
+            exit_code = 1
+        else:
+            print(f"\n与基线相比无性能回退(容忍 {args.tolerance * 100:.0f}%)")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
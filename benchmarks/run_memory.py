@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+研究状态内存基准测试
+模拟一次长时间研究运行(多段落 x 多轮反思 x 每轮多条搜索结果),分别用
+- legacy:  原先的dataclass表示(每条Search独立的实例字典、时间戳、查询字符串和内容)
+- slotted: 当前各引擎State的表示(__slots__、每轮驻留查询词和时间戳、运行共享的内容池)
+构建同样的State,用tracemalloc统计构建完成后State常驻的内存,并校验两者to_dict结果一致。
+
+搜索结果按真实流程模拟: 每轮结果都是新解析出的字符串(与之前轮次内容相同也是不同对象),
+--duplicate-ratio 控制与之前轮次重复的结果比例(反思轮次经常搜到相同来源)。
+
+用法:
+    python -m benchmarks.run_memory --engines insight,media,query --paragraphs 5 --reflections 20
+    python -m benchmarks.run_memory --results 10 --content-chars 3000 --duplicate-ratio 0.4
+    python -m benchmarks.run_memory --baseline data/benchmarks/memory_baseline.json --tolerance 0.1
+"""
+
+import argparse
+import gc
+import importlib
+import json
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+ENGINES = ("insight", "media", "query")
+STATE_MODULES = {
+    "insight": "InsightEngine.state.state",
+    "media": "MediaEngine.state.state",
+    "query": "QueryEngine.state.state",
+}
+DEFAULT_OUTPUT_DIR = ROOT_DIR / "data" / "benchmarks"
+
+
+# ===== 原先的dataclass表示(基线) =====
+
+@dataclass
+class LegacySearch:
+    query: str = ""
+    url: str = ""
+    title: str = ""
+    content: str = ""
+    score: Optional[float] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"query": self.query, "url": self.url, "title": self.title,
+                "content": self.content, "score": self.score}
+        data.update(self.extra)
+        data["timestamp"] = self.timestamp
+        return data
+
+
+@dataclass
+class LegacyResearch:
+    search_history: List[LegacySearch] = field(default_factory=list)
+    latest_summary: str = ""
+    reflection_iteration: int = 0
+
+    def add_search_results(self, query: str, results: List[Dict[str, Any]], extra_keys: List[str]):
+        for result in results:
+            self.search_history.append(LegacySearch(
+                query=query,
+                url=result.get("url", ""),
+                title=result.get("title", ""),
+                content=result.get("content", ""),
+                score=result.get("score"),
+                extra={key: result.get(key) for key in extra_keys}
+            ))
+
+
+@dataclass
+class LegacyParagraph:
+    title: str = ""
+    content: str = ""
+    research: LegacyResearch = field(default_factory=LegacyResearch)
+
+
+@dataclass
+class LegacyState:
+    paragraphs: List[LegacyParagraph] = field(default_factory=list)
+
+
+# ===== 模拟运行 =====
+
+def _fresh(text: str) -> str:
+    """返回内容相同的新字符串对象(模拟每次从API响应中解析出的结果)"""
+    return text.encode("utf-8").decode("utf-8")
+
+
+class RunScript:
+    """一次研究运行中每轮搜索的查询和结果(两种表示使用同一脚本)"""
+
+    def __init__(self, opts: Dict[str, Any], extra_keys: List[str]):
+        rng = random.Random(opts["seed"])
+        self.opts = opts
+        self.extra_keys = extra_keys
+        sentence = "训练负荷、心率区间与配速变化显示本周期有氧基础提升明显。Aerobic base improved. "
+        self.sources: List[Dict[str, Any]] = []
+        self.rounds: List[List[tuple]] = []
+        for p in range(opts["paragraphs"]):
+            paragraph_rounds = []
+            for r in range(opts["reflections"] + 1):
+                query = f"段落{p}的第{r}轮查询: 近期训练负荷与恢复趋势"
+                picks = []
+                for _ in range(opts["results"]):
+                    if self.sources and rng.random() < opts["duplicate_ratio"]:
+                        picks.append(rng.randrange(len(self.sources)))
+                    else:
+                        index = len(self.sources)
+                        body = (sentence * (opts["content_chars"] // len(sentence) + 1))[:opts["content_chars"] - 12]
+                        self.sources.append({
+                            "url": f"https://example.com/source/{index}",
+                            "title": f"来源 {index}",
+                            "content": f"{index:010d}: {body}",
+                            "score": round(rng.random(), 3),
+                        })
+                        picks.append(index)
+                paragraph_rounds.append((query, picks))
+            self.rounds.append(paragraph_rounds)
+
+    def results(self, picks: List[int]) -> List[Dict[str, Any]]:
+        results = []
+        for index in picks:
+            source = self.sources[index]
+            result = {key: _fresh(value) if isinstance(value, str) else value for key, value in source.items()}
+            for key in self.extra_keys:
+                result[key] = "训练记录数据库" if key == "platform" else f"S{index}"
+            results.append(result)
+        return results
+
+    def query(self, text: str) -> str:
+        return _fresh(text)
+
+
+def _build_legacy(script: RunScript):
+    state = LegacyState()
+    for p, paragraph_rounds in enumerate(script.rounds):
+        paragraph = LegacyParagraph(title=f"段落{p}", content="预期内容")
+        state.paragraphs.append(paragraph)
+        for query, picks in paragraph_rounds:
+            paragraph.research.add_search_results(script.query(query), script.results(picks), script.extra_keys)
+    return state
+
+
+def _build_slotted(state_cls, script: RunScript):
+    state = state_cls()
+    for p, paragraph_rounds in enumerate(script.rounds):
+        index = state.add_paragraph(f"段落{p}", "预期内容")
+        research = state.paragraphs[index].research
+        for query, picks in paragraph_rounds:
+            research.add_search_results(script.query(query), script.results(picks))
+    return state
+
+
+def _measure(build) -> Dict[str, Any]:
+    """构建State并返回其常驻内存(构建过程中的临时对象已释放)"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    state = build()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return {"state": state, "bytes": retained, "build_s": elapsed}
+
+
+def _history_dicts(state) -> List[Dict[str, Any]]:
+    return [
+        {key: value for key, value in search.to_dict().items() if key != "timestamp"}
+        for paragraph in state.paragraphs
+        for search in paragraph.research.search_history
+    ]
+
+
+def run_engine(engine: str, opts: Dict[str, Any]) -> Dict[str, Any]:
+    if engine == "insight":
+        # 导入InsightEngine包时会按根目录config.py创建数据库引擎(不建立连接),未配置时填入占位值
+        from benchmarks.db_binding import use_placeholder_db_config
+        use_placeholder_db_config()
+    module = importlib.import_module(STATE_MODULES[engine])
+    extra_keys = ["platform"] if "platform" in module.Search._fields else ["content_id"]
+    script = RunScript(opts, extra_keys)
+
+    legacy = _measure(lambda: _build_legacy(script))
+    slotted = _measure(lambda: _build_slotted(module.State, script))
+    if _history_dicts(legacy["state"]) != _history_dicts(slotted["state"]):
+        raise AssertionError(f"{engine}: 两种表示的搜索记录不一致")
+
+    searches = sum(len(p.research.search_history) for p in slotted["state"].paragraphs)
+    return {
+        "engine": engine,
+        "searches": searches,
+        "unique_contents": len(slotted["state"].content_pool),
+        "legacy_bytes": legacy["bytes"],
+        "slotted_bytes": slotted["bytes"],
+        "reduction": 1 - slotted["bytes"] / legacy["bytes"] if legacy["bytes"] else 0.0,
+        "legacy_bytes_per_search": legacy["bytes"] / searches if searches else 0.0,
+        "slotted_bytes_per_search": slotted["bytes"] / searches if searches else 0.0,
+        "legacy_build_s": legacy["build_s"],
+        "slotted_build_s": slotted["build_s"],
+    }
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+                     tolerance: float) -> List[str]:
+    """当前内存比基线多出tolerance比例以上视为回退"""
+    base = {item["engine"]: item for item in baseline}
+    regressions = []
+    for item in results:
+        previous = base.get(item["engine"])
+        if previous and item["slotted_bytes"] > previous["slotted_bytes"] * (1 + tolerance):
+            regressions.append(
+                f"{item['engine']}: {previous['slotted_bytes'] / 1e6:.2f}MB -> {item['slotted_bytes'] / 1e6:.2f}MB"
+            )
+    return regressions
+
+
+def print_table(results: List[Dict[str, Any]]):
+    header = (f"{'引擎':<8}{'搜索数':>8}{'去重内容':>10}{'legacy':>12}{'slotted':>12}"
+              f"{'降低':>8}{'B/搜索(旧)':>14}{'B/搜索(新)':>14}")
+    print(header)
+    print("-" * len(header))
+    for item in results:
+        print(f"{item['engine']:<8}{item['searches']:>8}{item['unique_contents']:>10}"
+              f"{item['legacy_bytes'] / 1e6:>10.2f}MB{item['slotted_bytes'] / 1e6:>10.2f}MB"
+              f"{item['reduction']:>8.1%}{item['legacy_bytes_per_search']:>14.0f}"
+              f"{item['slotted_bytes_per_search']:>14.0f}")
+
+
+def _parse_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="研究状态内存基准测试")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="逗号分隔: insight,media,query")
+    parser.add_argument("--paragraphs", type=int, default=5, help="段落数")
+    parser.add_argument("--reflections", type=int, default=20, help="每段反思轮数")
+    parser.add_argument("--results", type=int, default=10, help="每轮搜索结果数")
+    parser.add_argument("--content-chars", type=int, default=2000, help="每条搜索内容的字符数")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3, help="与之前轮次重复的结果比例")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="结果JSON路径(默认 data/benchmarks/memory_时间戳.json)")
+    parser.add_argument("--baseline", default=None, help="基线结果JSON,用于回归判定")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="回归容忍比例")
+    args = parser.parse_args(argv)
+
+    engines = _parse_list(args.engines)
+    unknown = [engine for engine in engines if engine not in ENGINES]
+    if unknown:
+        parser.error(f"未知引擎: {', '.join(unknown)}")
+
+    opts = {
+        "paragraphs": args.paragraphs,
+        "reflections": args.reflections,
+        "results": args.results,
+        "content_chars": args.content_chars,
+        "duplicate_ratio": args.duplicate_ratio,
+        "seed": args.seed,
+    }
+    results = [run_engine(engine, opts) for engine in engines]
+    print_table(results)
+
+    output = Path(args.output) if args.output else \
+        DEFAULT_OUTPUT_DIR / f"memory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"options": opts, "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline.get("results", []), args.tolerance)
+        if regressions:
+            print("\n内存回退:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
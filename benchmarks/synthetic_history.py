@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+"""
+合成训练历史生成器
+为 1..N 个用户生成 1..10 年的Keep/Garmin跑步记录,用于数据库查询和导入的基准测试。
+
+每个用户有固定的运动员画像(最大/静息心率、轻松跑配速、每周训练次数、体重),
+训练按周期化安排(年度起伏、逐年进步、偶尔的伤停),课表类型包括轻松跑、长距离、
+节奏跑、间歇和恢复跑;平均心率、配速、训练负荷与课表强度相关,
+心率序列包含热身爬升、心率漂移和间歇的高低交替。
+同一个种子总是生成相同的数据。
+
+输出:
+- 直接写入数据库(SQLite文件或本地MySQL),与线上表结构一致
+- Keep导入文件格式的行(中文列名,供KeepDataImporter使用)
+- Garmin Connect接口格式的活动(供GarminDataImporter使用)
+
+用法:
+    python -m benchmarks.synthetic_history --db-url sqlite:///data/benchmarks/training.sqlite3 \\
+        --users 10 --years 3 --sources keep,garmin
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+# 课表类型: (出现概率, 距离范围km, 心率储备强度, 相对轻松跑的配速系数)
+SESSION_TYPES = {
+    "easy": (0.50, (6.0, 12.0), 0.62, 1.00),
+    "long": (0.15, (16.0, 32.0), 0.68, 1.04),
+    "tempo": (0.15, (8.0, 14.0), 0.82, 0.86),
+    "interval": (0.12, (8.0, 12.0), 0.88, 0.82),
+    "recovery": (0.08, (4.0, 7.0), 0.55, 1.12),
+}
+_TYPE_NAMES = list(SESSION_TYPES)
+_TYPE_PROBS = [SESSION_TYPES[name][0] for name in _TYPE_NAMES]
+
+TRAINING_EFFECT_LABELS = {
+    "easy": "AEROBIC_BASE",
+    "long": "AEROBIC_BASE",
+    "tempo": "TEMPO",
+    "interval": "VO2MAX",
+    "recovery": "RECOVERY",
+}
+KEEP_EXERCISE_TYPE = "跑步"
+GARMIN_SPORT_TYPE = "running"
+
+
+@dataclass
+class AthleteProfile:
+    """运动员画像"""
+    user_id: str
+    max_hr: int
+    resting_hr: int
+    easy_pace: float  # 秒/公里
+    sessions_per_week: float
+    weight_kg: float
+    cadence: int
+
+
+@dataclass
+class Session:
+    """一次合成训练(与数据源无关)"""
+    user_index: int
+    seq: int
+    profile: AthleteProfile
+    kind: str
+    start: datetime
+    duration_seconds: int
+    distance_meters: float
+    avg_hr: int
+    max_hr: int
+    intensity: float
+    hr_series: Optional[np.ndarray]
+
+
+def user_id_for(index: int) -> str:
+    """第0个用户沿用默认用户ID,其余按序号编号"""
+    return "default_user" if index == 0 else f"athlete_{index:04d}"
+
+
+class SyntheticHistory:
+    """确定性的多用户、多年训练历史生成器"""
+
+    def __init__(self, users: int = 1, years: float = 1.0, seed: int = 42,
+                 hr_interval: int = 5, hr_fraction: float = 1.0, end: Optional[datetime] = None):
+        """
+        Args:
+            users: 用户数
+            years: 每个用户的历史年数
+            seed: 随机种子
+            hr_interval: 心率序列采样间隔(秒),越小序列越长
+            hr_fraction: 带心率序列的训练比例(其余只有平均/最大心率)
+            end: 历史截止时间,默认为今天(便于"最近N天"类查询命中数据)
+        """
+        self.users = users
+        self.years = years
+        self.seed = seed
+        self.hr_interval = max(1, hr_interval)
+        self.hr_fraction = hr_fraction
+        self.end = (end or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def profile(self, user_index: int) -> AthleteProfile:
+        rng = random.Random(f"{self.seed}:profile:{user_index}")
+        return AthleteProfile(
+            user_id=user_id_for(user_index),
+            max_hr=rng.randint(176, 200),
+            resting_hr=rng.randint(44, 64),
+            easy_pace=rng.uniform(290, 400),
+            sessions_per_week=rng.uniform(3.0, 6.0),
+            weight_kg=round(rng.uniform(52, 85), 1),
+            cadence=rng.randint(162, 186),
+        )
+
+    def _hr_series(self, rng: np.random.Generator, session_kind: str, duration: int,
+                   profile: AthleteProfile, target: float) -> np.ndarray:
+        """热身爬升 + 稳态漂移(间歇为高低交替) + 噪声"""
+        n = max(2, duration // self.hr_interval)
+        t = np.arange(n) * self.hr_interval
+        warmup = min(600.0, duration * 0.15)
+        start_hr = profile.resting_hr + 25
+        series = np.where(t < warmup, start_hr + (target - start_hr) * t / max(warmup, 1.0), target)
+        # 心率漂移: 稳态部分随时间缓慢上升
+        series = series + np.clip(t - warmup, 0, None) / max(duration, 1) * target * 0.05
+        if session_kind == "interval":
+            on = ((t - warmup) // 180) % 2 == 0
+            series = np.where((t >= warmup) & on, series + 10, np.where(t >= warmup, series - 12, series))
+        series = series + rng.normal(0, 2.0, n)
+        return np.clip(np.round(series), 40, profile.max_hr).astype(np.int64)
+
+    def iter_sessions(self, user_index: int) -> Iterator[Session]:
+        """按时间顺序生成某个用户的全部训练"""
+        profile = self.profile(user_index)
+        rng = random.Random(f"{self.seed}:sessions:{user_index}")
+        np_rng = np.random.default_rng([self.seed, user_index])
+        days = int(round(self.years * 365))
+        first_day = self.end - timedelta(days=days)
+        # 每年可能有一次2~4周的伤停
+        breaks = []
+        for year in range(int(math.ceil(self.years))):
+            if rng.random() < 0.5:
+                begin = year * 365 + rng.randint(0, 330)
+                breaks.append((begin, begin + rng.randint(14, 28)))
+
+        seq = 0
+        for day in range(days):
+            if any(begin <= day < stop for begin, stop in breaks):
+                continue
+            # 年度周期起伏(基础期/比赛期)与逐年进步
+            season = 1.0 + 0.2 * math.sin(2 * math.pi * day / 365.0)
+            if rng.random() > profile.sessions_per_week / 7.0 * season:
+                continue
+
+            kind = rng.choices(_TYPE_NAMES, _TYPE_PROBS)[0]
+            _, (low, high), intensity, pace_factor = SESSION_TYPES[kind]
+            progress = 1.0 - 0.02 * day / 365.0
+            distance_km = rng.uniform(low, high)
+            pace = profile.easy_pace * pace_factor * progress * rng.uniform(0.96, 1.05)
+            duration = int(distance_km * pace)
+
+            reserve = profile.max_hr - profile.resting_hr
+            target = profile.resting_hr + reserve * (intensity + rng.uniform(-0.04, 0.04))
+            hr_series = None
+            if rng.random() < self.hr_fraction:
+                hr_series = self._hr_series(np_rng, kind, duration, profile, target)
+                avg_hr = int(round(hr_series.mean()))
+                max_hr = int(hr_series.max())
+            else:
+                avg_hr = int(round(target))
+                max_hr = min(profile.max_hr, avg_hr + rng.randint(8, 22))
+
+            hour = rng.choice((6, 7, 8, 18, 19, 20))
+            start = first_day + timedelta(days=day, hours=hour, minutes=rng.randint(0, 59))
+            yield Session(user_index, seq, profile, kind, start, duration, round(distance_km * 1000, 1),
+                          avg_hr, max_hr, intensity, hr_series)
+            seq += 1
+
+    def iter_all_sessions(self) -> Iterator[Session]:
+        for user_index in range(self.users):
+            yield from self.iter_sessions(user_index)
+
+    # ===== 各数据源格式 =====
+
+    def keep_row(self, session: Session, now_ts: int) -> Dict[str, Any]:
+        """training_records_keep 表的一行"""
+        return {
+            "user_id": session.profile.user_id,
+            "exercise_type": KEEP_EXERCISE_TYPE,
+            "duration_seconds": session.duration_seconds,
+            "start_time": session.start,
+            "end_time": session.start + timedelta(seconds=session.duration_seconds),
+            "calories": int(session.distance_meters / 1000 * session.profile.weight_kg * 1.036),
+            "distance_meters": session.distance_meters,
+            "avg_heart_rate": session.avg_hr,
+            "max_heart_rate": session.max_hr,
+            "heart_rate_data": json.dumps(session.hr_series.tolist()) if session.hr_series is not None else None,
+            "add_ts": now_ts,
+            "last_modify_ts": now_ts,
+            "data_source": "synthetic",
+        }
+
+    def garmin_activity(self, session: Session) -> Dict[str, Any]:
+        """Garmin Connect get_activities 接口格式的活动"""
+        profile = session.profile
+        duration = session.duration_seconds
+        speed = session.distance_meters / max(duration, 1)
+        rng = random.Random(f"{self.seed}:garmin:{session.user_index}:{session.seq}")
+        cadence = int(profile.cadence * (1.04 if session.kind == "interval" else 1.0)) + rng.randint(-3, 3)
+
+        # 心率区间时长: 以课表强度为中心分配到5个区间
+        center = min(4, max(0, int((session.avg_hr / profile.max_hr - 0.5) / 0.1)))
+        weights = np.array([math.exp(-abs(zone - center) * 1.3) for zone in range(5)])
+        hr_zones = (weights / weights.sum() * duration).astype(int)
+        power = int(profile.weight_kg * speed * 1.04 * (1.08 if session.kind in ("tempo", "interval") else 1.0))
+        trimp = duration / 60 * session.intensity * 0.64 * math.exp(1.92 * session.intensity)
+        end = session.start + timedelta(seconds=duration)
+
+        activity = {
+            "activityId": 10 ** 10 + session.user_index * 10 ** 6 + session.seq,
+            "activityName": f"{session.kind.capitalize()} Run",
+            "activityType": {"typeKey": GARMIN_SPORT_TYPE},
+            "startTimeGMT": session.start.strftime("%Y-%m-%d %H:%M:%S"),
+            "endTimeGMT": end.strftime("%Y-%m-%d %H:%M:%S"),
+            "duration": duration,
+            "distance": session.distance_meters,
+            "averageHR": session.avg_hr,
+            "maxHR": session.max_hr,
+            "averageRunningCadenceInStepsPerMinute": cadence,
+            "maxRunningCadenceInStepsPerMinute": cadence + rng.randint(6, 20),
+            "avgStrideLength": round(speed * 60 / cadence * 100, 1),
+            "avgVerticalOscillation": round(rng.uniform(7.0, 10.5), 1),
+            "avgGroundContactTime": rng.randint(215, 285),
+            "avgVerticalRatio": round(rng.uniform(6.5, 9.5), 1),
+            "steps": int(cadence * duration / 60),
+            "avgPower": power,
+            "maxPower": int(power * rng.uniform(1.3, 1.8)),
+            "normPower": int(power * rng.uniform(1.01, 1.08)),
+            "averageSpeed": round(speed, 3),
+            "maxSpeed": round(speed * rng.uniform(1.15, 1.5), 3),
+            "aerobicTrainingEffect": round(min(5.0, 1.0 + trimp / 60), 1),
+            "anaerobicTrainingEffect": round(min(5.0, (2.5 if session.kind == "interval" else 0.4) + rng.uniform(0, 0.8)), 1),
+            "trainingEffectLabel": TRAINING_EFFECT_LABELS[session.kind],
+            "activityTrainingLoad": int(trimp),
+            "calories": int(session.distance_meters / 1000 * profile.weight_kg * 1.036),
+            "bmrCalories": int(duration / 60 * 1.2),
+            "waterEstimated": int(duration / 3600 * rng.uniform(400, 900)),
+            "moderateIntensityMinutes": int(duration / 60 * (1 - session.intensity)),
+            "vigorousIntensityMinutes": int(duration / 60 * session.intensity),
+            "differenceBodyBattery": -int(trimp / 8),
+        }
+        for zone in range(5):
+            activity[f"hrTimeInZone_{zone + 1}"] = int(hr_zones[zone])
+            activity[f"powerTimeInZone_{zone + 1}"] = int(hr_zones[zone])
+        return activity
+
+    def garmin_row(self, session: Session, now_ts: int) -> Dict[str, Any]:
+        """training_records_garmin 表的一行(与GarminDataImporter.parse_activity的映射一致)"""
+        act = self.garmin_activity(session)
+        row = {
+            "user_id": session.profile.user_id,
+            "activity_id": str(act["activityId"]),
+            "activity_name": act["activityName"],
+            "sport_type": GARMIN_SPORT_TYPE,
+            "start_time_gmt": session.start,
+            "end_time_gmt": session.start + timedelta(seconds=session.duration_seconds),
+            "duration_seconds": session.duration_seconds,
+            "distance_meters": session.distance_meters,
+            "avg_heart_rate": act["averageHR"],
+            "max_heart_rate": act["maxHR"],
+            "avg_cadence": act["averageRunningCadenceInStepsPerMinute"],
+            "max_cadence": act["maxRunningCadenceInStepsPerMinute"],
+            "avg_stride_length_cm": act["avgStrideLength"],
+            "avg_vertical_oscillation_cm": act["avgVerticalOscillation"],
+            "avg_ground_contact_time_ms": act["avgGroundContactTime"],
+            "vertical_ratio_percent": act["avgVerticalRatio"],
+            "total_steps": act["steps"],
+            "avg_power_watts": act["avgPower"],
+            "max_power_watts": act["maxPower"],
+            "normalized_power_watts": act["normPower"],
+            "avg_speed_mps": act["averageSpeed"],
+            "max_speed_mps": act["maxSpeed"],
+            "aerobic_training_effect": act["aerobicTrainingEffect"],
+            "anaerobic_training_effect": act["anaerobicTrainingEffect"],
+            "training_effect_label": act["trainingEffectLabel"],
+            "training_load": act["activityTrainingLoad"],
+            "activity_calories": act["calories"],
+            "basal_metabolism_calories": act["bmrCalories"],
+            "estimated_sweat_loss_ml": act["waterEstimated"],
+            "moderate_intensity_minutes": act["moderateIntensityMinutes"],
+            "vigorous_intensity_minutes": act["vigorousIntensityMinutes"],
+            "body_battery_change": act["differenceBodyBattery"],
+            "add_ts": now_ts,
+            "last_modify_ts": now_ts,
+            "data_source": "synthetic",
+        }
+        for zone in range(1, 6):
+            row[f"hr_zone_{zone}_seconds"] = act[f"hrTimeInZone_{zone}"]
+            row[f"power_zone_{zone}_seconds"] = act[f"powerTimeInZone_{zone}"]
+        return row
+
+    def keep_import_row(self, session: Session) -> Dict[str, Any]:
+        """Keep导出文件格式的一行(中文列名,与KeepDataImporter.COLUMN_MAPPING一致)"""
+        row = self.keep_row(session, 0)
+        return {
+            "运动类型": row["exercise_type"],
+            "运动时长(秒)": row["duration_seconds"],
+            "开始时间": row["start_time"].strftime("%Y-%m-%d %H:%M:%S"),
+            "结束时间": row["end_time"].strftime("%Y-%m-%d %H:%M:%S"),
+            "卡路里": row["calories"],
+            "运动距离(米)": row["distance_meters"],
+            "平均心率": row["avg_heart_rate"],
+            "最大心率": row["max_heart_rate"],
+            "心率记录": row["heart_rate_data"] or "[]",
+        }
+
+    def write_keep_import_file(self, path: Path, limit: Optional[int] = None) -> int:
+        """写出Keep导入CSV文件,返回行数"""
+        import pandas as pd
+
+        rows: List[Dict[str, Any]] = []
+        for session in self.iter_all_sessions():
+            if limit is not None and len(rows) >= limit:
+                break
+            rows.append(self.keep_import_row(session))
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(rows).to_csv(path, index=False)
+        return len(rows)
+
+    def garmin_activities(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Garmin接口格式的活动列表(最新的在前,与接口分页顺序一致)"""
+        activities = [self.garmin_activity(session) for session in self.iter_all_sessions()]
+        activities.sort(key=lambda act: act["startTimeGMT"], reverse=True)
+        return activities[:limit] if limit is not None else activities
+
+    # ===== 写入数据库 =====
+
+    def populate(self, engine, sources=("keep", "garmin"), batch_size: int = 2000,
+                 replace: bool = True) -> Dict[str, int]:
+        """
+        生成数据并批量写入数据库
+
+        表结构由 models.migrations 创建(与应用一致,含复合索引)
+
+        Args:
+            engine: SQLAlchemy引擎
+            sources: 写入的数据源
+            batch_size: 每批插入行数
+            replace: 是否先删除重建表
+
+        Returns:
+            {数据源: 写入行数}
+        """
+        from benchmarks.db_binding import use_placeholder_db_config
+        use_placeholder_db_config()
+        from models.migrations import TRAINING_TABLES, schema_migrations, upgrade
+        from models.training_record import TrainingRecordGarmin, TrainingRecordKeep
+
+        tables = {"keep": TrainingRecordKeep.__table__, "garmin": TrainingRecordGarmin.__table__}
+        if replace:
+            # 删除全部训练表和迁移记录,由迁移重新建表
+            for table in TRAINING_TABLES + (schema_migrations,):
+                table.drop(engine, checkfirst=True)
+        upgrade(engine, verbose=False)
+
+        now_ts = int(time.time())
+        counts = {source: 0 for source in sources}
+        buffers: Dict[str, List[Dict[str, Any]]] = {source: [] for source in sources}
+        started = time.perf_counter()
+
+        def flush(source: str):
+            if buffers[source]:
+                with engine.begin() as conn:
+                    conn.execute(tables[source].insert(), buffers[source])
+                counts[source] += len(buffers[source])
+                buffers[source] = []
+
+        for session in self.iter_all_sessions():
+            if "keep" in buffers:
+                buffers["keep"].append(self.keep_row(session, now_ts))
+            if "garmin" in buffers:
+                buffers["garmin"].append(self.garmin_row(session, now_ts))
+            for source in sources:
+                if len(buffers[source]) >= batch_size:
+                    flush(source)
+        for source in sources:
+            flush(source)
+
+        elapsed = time.perf_counter() - started
+        print(f"合成数据写入完成: {counts} ({self.users}用户 x {self.years:g}年, 耗时{elapsed:.1f}秒)")
+        return counts
+
+
+def create_engine_for(db_url: str):
+    """按URL创建引擎(与应用相同的后端配置: SQLite开启WAL,DuckDB自增主键兼容)"""
+    from utils.db_backend import create_database_engine
+
+    return create_database_engine(db_url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成训练历史")
+    parser.add_argument("--db-url", default=f"sqlite:///{ROOT_DIR / 'data' / 'benchmarks' / 'training.sqlite3'}",
+                        help="目标数据库URL(sqlite:///... / duckdb:///... / mysql+pymysql://...)")
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--sources", default="keep,garmin")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--hr-interval", type=int, default=5, help="心率采样间隔(秒)")
+    parser.add_argument("--hr-fraction", type=float, default=1.0, help="带心率序列的训练比例")
+    parser.add_argument("--keep-csv", default=None, help="同时写出Keep导入CSV文件")
+    args = parser.parse_args()
+
+    history = SyntheticHistory(args.users, args.years, args.seed, args.hr_interval, args.hr_fraction)
+    sources = [s.strip() for s in args.sources.split(",") if s.strip()]
+    history.populate(create_engine_for(args.db_url), sources)
+    if args.keep_csv:
+        count = history.write_keep_import_file(Path(args.keep_csv))
+        print(f"Keep导入文件: {args.keep_csv} ({count}行)")
+
+
+if __name__ == "__main__":
+    main()
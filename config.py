@@ -14,6 +14,13 @@ DB_PASSWORD = "" # 数据库密码
 DB_NAME = "traningData" # 数据库名称(建议保持此名称)
 DB_CHARSET = "utf8mb4"          # 字符集,建议使用utf8mb4
 
+# 嵌入式数据库(可选): 单用户部署可不安装MySQL,设置DB_URL后以上MySQL配置不再使用
+# SQLite(WAL模式): "sqlite:///data/training.sqlite3"
+# DuckDB(需要 pip install duckdb duckdb-engine): "duckdb:///data/training.duckdb"
+DB_URL = ""
+# 统计聚合分析引擎(可选): "duckdb" 表示训练统计/训练效果等聚合查询由DuckDB只读挂载训练库后执行,留空使用主数据库
+DB_ANALYTICS_ENGINE = ""
+
 # 训练数据源配置
 # 支持的数据源: 'keep' (Keep运动APP) 或 'garmin' (Garmin设备)
 TRAINING_DATA_SOURCE = "keep"
@@ -23,6 +30,11 @@ GARMIN_EMAIL = ""
 GARMIN_PASSWORD = "W"
 GARMIN_IS_CN = True  # True: 中国区账户, False: 国际区账户
 
+# 多用户: 训练数据按user_id隔离,会话默认使用 default_user
+# 开启后任何访问者都可以通过 POST /training/api/switch_user 把会话切换为任意用户并读写其数据,
+# 本项目没有登录认证,仅在可信的本地/内网环境开启(修改后需重启服务)
+ALLOW_USER_SWITCH = False
+
 
 # ============================== LLM配置 ==============================
 # 统一LLM配置 - 所有Agent共享相同的API Key和Base URL
@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+"""
+训练数据库版本化迁移
+表结构变更按版本号顺序执行,已执行的版本记录在schema_migrations表中,
+取代各处直接调用 Base.metadata.create_all 的做法:
+- 版本1: 基线表结构(training_records_keep / training_records_garmin,单列索引)
+- 版本2: 按工具查询形状设计的复合索引(user_id + 指标 + 开始时间)
+
+另提供EXPLAIN校验,确认各工具查询形状命中了对应的复合索引;
+多用户的MySQL部署可选按user_id哈希分区(partition命令,不属于默认迁移)
+
+用法:
+    python -m models.migrations upgrade     # 执行未执行的迁移
+    python -m models.migrations status      # 查看当前版本
+    python -m models.migrations explain     # 检查工具查询的执行计划(未命中索引时退出码为1)
+    python -m models.migrations partition --partitions 16  # MySQL训练表按用户哈希分区
+"""
+
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+)
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.training_record import TrainingRecordGarmin, TrainingRecordKeep
+from utils.user_context import DEFAULT_USER_ID
+
+TRAINING_TABLES = (TrainingRecordKeep.__table__, TrainingRecordGarmin.__table__)
+
+# 版本2创建的复合索引(定义在ORM模型的__table_args__中,影子表交换时随表结构一起复制)
+COMPOSITE_INDEXES = {
+    TrainingRecordKeep.__tablename__: (
+        'idx_keep_user_start_cover',
+        'idx_keep_user_distance_start',
+        'idx_keep_user_hr_start',
+    ),
+    TrainingRecordGarmin.__tablename__: (
+        'idx_garmin_user_start',
+        'idx_garmin_user_distance_start',
+        'idx_garmin_user_hr_start',
+        'idx_garmin_user_load_start',
+        'idx_garmin_user_power_start',
+    ),
+}
+
+migration_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', migration_metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(128), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+_upgrade_lock = threading.Lock()
+
+
+@dataclass
+class Migration:
+    """一个迁移版本"""
+    version: int
+    name: str
+    upgrade: Callable
+
+
+def _create_baseline_tables(conn):
+    """版本1: 创建基线表结构(不含后续版本加入的复合索引)"""
+    later_indexes = {name for names in COMPOSITE_INDEXES.values() for name in names}
+    for table in TRAINING_TABLES:
+        baseline = table.to_metadata(MetaData())
+        for index in list(baseline.indexes):
+            if index.name in later_indexes:
+                baseline.indexes.discard(index)
+        baseline.create(conn, checkfirst=True)
+
+
+def _existing_indexes(conn, table_name: str) -> set:
+    if conn.dialect.name == 'duckdb':
+        # duckdb-engine不支持索引反射,直接查询系统表
+        rows = conn.exec_driver_sql(
+            "SELECT index_name FROM duckdb_indexes() WHERE table_name = ?", (table_name,)
+        )
+        return {row[0] for row in rows}
+    return {index['name'] for index in inspect(conn).get_indexes(table_name)}
+
+
+def _create_composite_indexes(conn):
+    """版本2: 为已有表补建复合索引(跳过已存在的同名索引)"""
+    for table in TRAINING_TABLES:
+        existing = _existing_indexes(conn, table.name)
+        for index in table.indexes:
+            if index.name in COMPOSITE_INDEXES[table.name] and index.name not in existing:
+                started = time.perf_counter()
+                index.create(conn)
+                print(f"已创建索引 {table.name}.{index.name} ({time.perf_counter() - started:.1f}秒)")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, 'baseline_training_tables', _create_baseline_tables),
+    Migration(2, 'composite_tool_indexes', _create_composite_indexes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def applied_versions(engine) -> List[int]:
+    """已执行的迁移版本(迁移表不存在时为空)"""
+    if not inspect(engine).has_table(schema_migrations.name):
+        return []
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(select(schema_migrations.c.version).order_by(schema_migrations.c.version))]
+
+
+def current_version(engine) -> int:
+    versions = applied_versions(engine)
+    return versions[-1] if versions else 0
+
+
+def upgrade(engine, target: Optional[int] = None, verbose: bool = True) -> List[int]:
+    """
+    按顺序执行未执行的迁移
+
+    Args:
+        engine: SQLAlchemy引擎
+        target: 升级到的版本,默认最新
+        verbose: 是否打印执行日志
+
+    Returns:
+        本次执行的版本号列表
+    """
+    target = LATEST_VERSION if target is None else target
+    executed = []
+    with _upgrade_lock:
+        schema_migrations.create(engine, checkfirst=True)
+        done = set(applied_versions(engine))
+        for migration in MIGRATIONS:
+            if migration.version in done or migration.version > target:
+                continue
+            started = time.perf_counter()
+            # MySQL的DDL会隐式提交,每个版本单独一个事务,版本记录在DDL成功后写入
+            with engine.begin() as conn:
+                migration.upgrade(conn)
+                conn.execute(schema_migrations.insert().values(
+                    version=migration.version,
+                    name=migration.name,
+                    applied_at=datetime.now()
+                ))
+            executed.append(migration.version)
+            if verbose:
+                print(f"数据库迁移 v{migration.version} {migration.name} 完成 ({time.perf_counter() - started:.1f}秒)")
+    return executed
+
+
+# ===== 按用户分区(MySQL,可选) =====
+# 多用户的大型部署可把训练表按user_id哈希分区,单用户查询只扫描一个分区。
+# 分区不是默认迁移的一部分,需要显式执行: python -m models.migrations partition --partitions 16
+
+DEFAULT_USER_PARTITIONS = 16
+
+
+def user_partition_count(engine, table_name: str) -> int:
+    """训练表当前的分区数(未分区或非MySQL时为0)"""
+    if engine.dialect.name != 'mysql':
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.partitions "
+            "WHERE table_schema = DATABASE() AND table_name = :table AND partition_name IS NOT NULL"
+        ), {'table': table_name}).scalar() or 0
+
+
+def partition_by_user(engine, partitions: int = DEFAULT_USER_PARTITIONS, verbose: bool = True) -> List[str]:
+    """
+    将训练表改为按user_id哈希分区 (PARTITION BY KEY)
+
+    MySQL要求分区键包含在每个唯一键中,因此主键由(id)改为(id, user_id),
+    user_id改为NOT NULL(空值先归入默认用户)。影子表通过CREATE TABLE ... LIKE创建,
+    会继承分区定义,全量导入的原子交换不受影响。
+
+    Args:
+        engine: SQLAlchemy引擎(仅支持MySQL)
+        partitions: 分区数
+        verbose: 是否打印执行日志
+
+    Returns:
+        本次完成分区的表名列表(已按相同分区数分区的表跳过)
+
+    Raises:
+        ValueError: 非MySQL数据库或分区数不合法
+    """
+    if engine.dialect.name != 'mysql':
+        raise ValueError(f"按用户分区仅支持MySQL,当前数据库: {engine.dialect.name}")
+    if partitions < 2:
+        raise ValueError("分区数至少为2")
+
+    upgrade(engine, verbose=verbose)
+    done = []
+    for table in TRAINING_TABLES:
+        if user_partition_count(engine, table.name) == partitions:
+            continue
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(
+                text(f"UPDATE {table.name} SET user_id = :user_id WHERE user_id IS NULL"),
+                {'user_id': DEFAULT_USER_ID}
+            )
+            conn.execute(text(
+                f"ALTER TABLE {table.name} "
+                f"MODIFY user_id VARCHAR(64) NOT NULL DEFAULT '{DEFAULT_USER_ID}', "
+                f"DROP PRIMARY KEY, ADD PRIMARY KEY (id, user_id)"
+            ))
+            conn.execute(text(f"ALTER TABLE {table.name} PARTITION BY KEY(user_id) PARTITIONS {int(partitions)}"))
+        done.append(table.name)
+        if verbose:
+            print(f"已按用户分区 {table.name}: {partitions}个分区 ({time.perf_counter() - started:.1f}秒)")
+    return done
+
+
+# ===== 执行计划校验 =====
+
+def tool_query_shapes(user_id: str = DEFAULT_USER_ID) -> List[Dict]:
+    """
+    训练数据工具的查询形状(按用户过滤)及期望命中的索引
+
+    Returns:
+        [{'name': 名称, 'statement': select语句, 'indexes': 可接受的索引名}]
+    """
+    K = TrainingRecordKeep
+    G = TrainingRecordGarmin
+    since = datetime.now() - timedelta(days=30)
+    until = datetime.now()
+
+    return [
+        {'name': 'keep.search_recent_trainings', 'indexes': ('idx_keep_user_start_cover',),
+         'statement': select(K).where(K.user_id == user_id, K.start_time >= since)
+            .order_by(K.start_time.desc()).limit(50)},
+        {'name': 'keep.get_training_stats', 'indexes': ('idx_keep_user_start_cover',),
+         'statement': select(func.count(K.id), func.sum(K.duration_seconds), func.sum(K.distance_meters),
+                             func.avg(K.avg_heart_rate), func.max(K.max_heart_rate), func.sum(K.calories))
+            .where(K.user_id == user_id, K.start_time >= since, K.start_time < until)},
+        {'name': 'keep.search_by_distance_range', 'indexes': ('idx_keep_user_distance_start',),
+         'statement': select(K).where(K.user_id == user_id, K.distance_meters >= 10000, K.distance_meters <= 21000)
+            .order_by(K.distance_meters.desc()).limit(50)},
+        {'name': 'keep.search_by_heart_rate', 'indexes': ('idx_keep_user_hr_start', 'idx_keep_user_start_cover'),
+         'statement': select(K).where(K.user_id == user_id, K.avg_heart_rate >= 150, K.avg_heart_rate <= 170)
+            .order_by(K.start_time.desc()).limit(50)},
+        {'name': 'garmin.search_recent_trainings', 'indexes': ('idx_garmin_user_start',),
+         'statement': select(G).where(G.user_id == user_id, G.start_time_gmt >= since)
+            .order_by(G.start_time_gmt.desc()).limit(50)},
+        {'name': 'garmin.get_training_stats', 'indexes': ('idx_garmin_user_start',),
+         'statement': select(func.count(G.id), func.avg(G.training_load), func.avg(G.aerobic_training_effect))
+            .where(G.user_id == user_id, G.start_time_gmt >= since, G.start_time_gmt < until)},
+        {'name': 'garmin.search_by_distance_range', 'indexes': ('idx_garmin_user_distance_start',),
+         'statement': select(G).where(G.user_id == user_id, G.distance_meters >= 10000, G.distance_meters <= 21000)
+            .order_by(G.distance_meters.desc()).limit(50)},
+        {'name': 'garmin.search_by_heart_rate', 'indexes': ('idx_garmin_user_hr_start', 'idx_garmin_user_start'),
+         'statement': select(G).where(G.user_id == user_id, G.avg_heart_rate >= 150, G.avg_heart_rate <= 170)
+            .order_by(G.start_time_gmt.desc()).limit(50)},
+        {'name': 'garmin.search_by_training_load', 'indexes': ('idx_garmin_user_load_start',),
+         'statement': select(G).where(G.user_id == user_id, G.training_load >= 100)
+            .order_by(G.training_load.desc()).limit(50)},
+        {'name': 'garmin.search_by_power_zone', 'indexes': ('idx_garmin_user_power_start',),
+         'statement': select(G).where(G.user_id == user_id, G.avg_power_watts >= 250)
+            .order_by(G.avg_power_watts.desc()).limit(50)},
+    ]
+
+
+def _explain(conn, statement) -> List[str]:
+    """执行EXPLAIN,返回执行计划的文本行"""
+    dialect = conn.dialect
+    compiled = statement.compile(dialect=dialect)
+    params = compiled.params
+    if dialect.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+
+    if dialect.name == 'sqlite':
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+        return [row[-1] for row in rows]
+    if dialect.name == 'mysql':
+        result = conn.exec_driver_sql(f"EXPLAIN {compiled}", params)
+        keys = list(result.keys())
+        return [' '.join(f"{key}={value}" for key, value in zip(keys, row) if value is not None) for row in result]
+    raise ValueError(f"{dialect.name} 不支持执行计划校验")
+
+
+def _used_index(plan: List[str], dialect_name: str) -> Optional[str]:
+    for line in plan:
+        if dialect_name == 'sqlite':
+            # SEARCH t USING [COVERING ]INDEX idx_xxx (user_id=? AND ...)
+            marker = 'INDEX '
+            if 'USING' in line and marker in line:
+                return line.split(marker, 1)[1].split(' ', 1)[0]
+        else:
+            for part in line.split(' '):
+                if part.startswith('key='):
+                    return part[len('key='):]
+    return None
+
+
+def verify_query_plans(engine, user_id: str = DEFAULT_USER_ID) -> List[Dict]:
+    """
+    检查各工具查询形状的执行计划是否命中复合索引
+
+    Returns:
+        [{'name', 'expected', 'used_index', 'filesort', 'ok', 'plan'}];
+        DuckDB不支持此校验(没有基于索引的范围扫描),返回空列表
+    """
+    dialect_name = engine.dialect.name
+    if dialect_name not in ('sqlite', 'mysql'):
+        print(f"{dialect_name} 不做执行计划校验")
+        return []
+
+    results = []
+    with engine.connect() as conn:
+        if dialect_name == 'sqlite':
+            # 让查询规划器获得索引选择度统计
+            conn.exec_driver_sql("ANALYZE")
+        for shape in tool_query_shapes(user_id):
+            plan = _explain(conn, shape['statement'])
+            used = _used_index(plan, dialect_name)
+            if used:
+                # SQLite全量导入交换影子表后,索引名带有时间戳后缀
+                used = re.sub(r'_\d{10,}$', '', used)
+            text_plan = ' | '.join(plan)
+            results.append({
+                'name': shape['name'],
+                'expected': shape['indexes'],
+                'used_index': used,
+                'filesort': 'TEMP B-TREE' in text_plan or 'filesort' in text_plan,
+                'ok': used in shape['indexes'],
+                'plan': plan,
+            })
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from utils.db_backend import create_database_engine, get_database_url
+
+    parser = argparse.ArgumentParser(description="训练数据库迁移")
+    parser.add_argument("command", choices=["upgrade", "status", "explain", "partition"])
+    parser.add_argument("--db-url", default=None, help="数据库URL,默认按config.py")
+    parser.add_argument("--user-id", default=DEFAULT_USER_ID, help="执行计划校验使用的用户")
+    parser.add_argument("--partitions", type=int, default=DEFAULT_USER_PARTITIONS, help="按用户分区的分区数")
+    args = parser.parse_args(argv)
+
+    engine = create_database_engine(args.db_url or get_database_url())
+    try:
+        if args.command == "upgrade":
+            executed = upgrade(engine)
+            print(f"当前版本: v{current_version(engine)}" + ("" if executed else " (无需迁移)"))
+        elif args.command == "status":
+            version = current_version(engine)
+            print(f"当前版本: v{version}, 最新版本: v{LATEST_VERSION}")
+            for migration in MIGRATIONS:
+                state = "已执行" if migration.version <= version else "待执行"
+                print(f"  v{migration.version} {migration.name}: {state}")
+            for table in TRAINING_TABLES:
+                count = user_partition_count(engine, table.name)
+                if count:
+                    print(f"  {table.name}: 按用户分区, {count}个分区")
+        elif args.command == "partition":
+            try:
+                partition_by_user(engine, args.partitions)
+            except ValueError as e:
+                print(f"错误: {e}")
+                return 1
+        else:
+            results = verify_query_plans(engine, args.user_id)
+            for item in results:
+                mark = "✓" if item['ok'] else "✗"
+                sort = ", 需要额外排序" if item['filesort'] else ""
+                print(f"{mark} {item['name']}: {item['used_index'] or '未使用索引'}{sort}")
+                if not item['ok']:
+                    print(f"    期望: {', '.join(item['expected'])}; 计划: {' | '.join(item['plan'])}")
+            if any(not item['ok'] for item in results):
+                return 1
+    finally:
+        engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,29 +3,30 @@
 训练记录ORM模型
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, BigInteger, Text
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, Text, Index
 from sqlalchemy.dialects.mysql import DECIMAL, LONGTEXT
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 import json
+from typing import Optional
 import config
+from utils.db_backend import create_database_engine, get_database_url
 
 # 创建基类
 Base = declarative_base()
 
+# 心率序列可能很长: MySQL使用LONGTEXT,SQLite/DuckDB使用不限长度的TEXT
+LongText = Text().with_variant(LONGTEXT, 'mysql')
+
 # 延迟创建引擎的函数
 def get_engine():
     """
     获取数据库引擎，每次调用都重新读取config配置
     这样可以确保在setup页面修改配置后能使用最新配置
+    后端由DB_URL决定(默认MySQL,可选SQLite/DuckDB嵌入式数据库)
     """
-    return create_engine(
-        f'mysql+pymysql://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}?charset={config.DB_CHARSET}',
-        pool_pre_ping=True,
-        pool_recycle=3600,
-        echo=False
-    )
+    return create_database_engine(get_database_url(config))
 
 # 获取Session的函数
 def get_session_local():
@@ -41,6 +42,14 @@ SessionLocal = get_session_local()
 class TrainingRecordKeep(Base):
     """训练记录模型 - Keep数据源"""
     __tablename__ = 'training_records_keep'
+    # 按工具查询形状设计的复合索引(由 models.migrations 版本2创建):
+    # 用户+时间范围(覆盖统计聚合列)、用户+指标范围+时间排序
+    __table_args__ = (
+        Index('idx_keep_user_start_cover', 'user_id', 'start_time', 'duration_seconds', 'distance_meters',
+              'avg_heart_rate', 'max_heart_rate', 'calories'),
+        Index('idx_keep_user_distance_start', 'user_id', 'distance_meters', 'start_time'),
+        Index('idx_keep_user_hr_start', 'user_id', 'avg_heart_rate', 'start_time'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String(64), default='default_user', index=True)
@@ -52,7 +61,7 @@ class TrainingRecordKeep(Base):
     distance_meters = Column(DECIMAL(10, 2), nullable=True)
     avg_heart_rate = Column(Integer, nullable=True)
     max_heart_rate = Column(Integer, nullable=True)
-    heart_rate_data = Column(LONGTEXT, nullable=True)
+    heart_rate_data = Column(LongText, nullable=True)
     add_ts = Column(BigInteger, nullable=False)
     last_modify_ts = Column(BigInteger, nullable=False)
     data_source = Column(String(64), default='keep_import')
@@ -83,6 +92,14 @@ class TrainingRecordKeep(Base):
 class TrainingRecordGarmin(Base):
     """训练记录模型 - Garmin数据源"""
     __tablename__ = 'training_records_garmin'
+    # 按工具查询形状设计的复合索引(由 models.migrations 版本2创建)
+    __table_args__ = (
+        Index('idx_garmin_user_start', 'user_id', 'start_time_gmt'),
+        Index('idx_garmin_user_distance_start', 'user_id', 'distance_meters', 'start_time_gmt'),
+        Index('idx_garmin_user_hr_start', 'user_id', 'avg_heart_rate', 'start_time_gmt'),
+        Index('idx_garmin_user_load_start', 'user_id', 'training_load', 'start_time_gmt'),
+        Index('idx_garmin_user_power_start', 'user_id', 'avg_power_watts', 'start_time_gmt'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String(64), default='default_user', index=True)
@@ -226,18 +243,21 @@ class TrainingRecordManager:
         }
     }
 
-    def __init__(self, data_source: str = 'keep'):
+    def __init__(self, data_source: str = 'keep', user_id: Optional[str] = None):
         """
         初始化管理器
 
         Args:
             data_source: 数据源类型 ('keep' 或 'garmin')
+            user_id: 用户标识,指定后query()只返回该用户的记录,新建记录默认归属该用户;
+                     为None时不按用户过滤(整表维护操作使用)
         """
         if data_source not in self.DATA_SOURCE_MAP:
             raise ValueError(f"不支持的数据源: {data_source}. 请使用: {list(self.DATA_SOURCE_MAP.keys())}")
 
         self.data_source = data_source
         self.model_class = self.DATA_SOURCE_MAP[data_source]
+        self.user_id = user_id
 
     def get_model_class(self):
         """获取当前数据源的模型类"""
@@ -264,9 +284,12 @@ class TrainingRecordManager:
             session: 数据库会话
 
         Returns:
-            Query对象
+            Query对象(指定了用户时只包含该用户的记录)
         """
-        return session.query(self.model_class)
+        query = session.query(self.model_class)
+        if self.user_id is not None:
+            query = query.filter(self.model_class.user_id == self.user_id)
+        return query
 
     def create_record(self, **kwargs):
         """
@@ -278,6 +301,8 @@ class TrainingRecordManager:
         Returns:
             训练记录实例
         """
+        if self.user_id is not None:
+            kwargs.setdefault('user_id', self.user_id)
         return self.model_class(**kwargs)
 
     def get_field(self, field_name: str):
@@ -13,12 +13,48 @@ from werkzeug.utils import secure_filename
 setup_bp = Blueprint('setup', __name__)
 
 # 导入健康检查模块
-from utils.health_check import run_health_check
+from utils.health_check import run_health_check, invalidate_health_cache
 
 # 导入训练数据导入器
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from scripts.training_data_importer import KeepDataImporter
+from utils.user_context import get_request_user_id
+from sqlalchemy.engine import URL
+from models.migrations import upgrade as upgrade_schema
+from utils.db_backend import create_database_engine
+from utils.import_jobs import get_import_job_manager, ImportJobConflict
+
+
+def start_import_job(source: str, kind: str, func, prepare=None):
+    """
+    提交后台导入任务并返回响应
+
+    Args:
+        source: 数据源(keep/garmin)
+        kind: 任务类型
+        func: 任务函数,接收进度回调
+        prepare: 确认没有冲突任务后在任务管理器的锁内执行的准备步骤(如保存上传文件)
+
+    Returns:
+        (响应, 状态码): 已提交返回202,同一数据源已有任务运行时返回409
+    """
+    try:
+        job = get_import_job_manager().submit(source, kind, func, prepare=prepare)
+    except ImportJobConflict as e:
+        return jsonify({
+            'success': False,
+            'message': '已有导入任务正在运行,请等待完成后再试',
+            'job_id': e.job['job_id'],
+            'job': e.job
+        }), 409
+
+    return jsonify({
+        'success': True,
+        'message': '导入任务已提交',
+        'job_id': job['job_id'],
+        'job': job
+    }), 202
 
 
 @setup_bp.route('/setup')
@@ -31,7 +67,9 @@ def setup_page():
 def api_health_check():
     """健康检查API"""
     try:
-        results = run_health_check()
+        # refresh=1时忽略缓存重新检查
+        force_refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+        results = run_health_check(force_refresh=force_refresh)
         return jsonify({
             'success': True,
             'data': results
@@ -177,6 +215,9 @@ def save_config():
                 'message': f'配置保存成功但重载失败: {str(reload_error)}'
             }), 500
 
+        # 配置已变更,旧的健康检查结果失效
+        invalidate_health_cache()
+
         return jsonify({
             'success': True,
             'message': '配置保存成功'
@@ -244,8 +285,8 @@ def test_llm_connection():
             })
 
         # 测试连接
-        import openai
-        client = openai.OpenAI(api_key=api_key, base_url=base_url)
+        from utils.http_client import create_openai_client
+        client = create_openai_client(api_key=api_key, base_url=base_url)
 
         response = client.chat.completions.create(
             model=model_name,
@@ -342,9 +383,9 @@ def upload_training_excel():
     - file: Excel文件(multipart/form-data)
 
     返回:
-    - success: 是否成功
+    - success: 是否成功提交
     - message: 提示信息
-    - result: 导入统计 {'success': int, 'failed': int, 'total': int}
+    - job_id: 后台导入任务ID,通过 /api/import_jobs/<job_id> 查询进度和导入统计
     """
     try:
         # 检查文件是否存在
@@ -379,18 +420,18 @@ def upload_training_excel():
         # 统一使用keep_data.xlsx作为标准文件名
         filepath = data_dir / 'keep_data.xlsx'
 
-        # 保存文件(覆盖旧文件)
-        file.save(str(filepath))
+        def save_upload():
+            # 保存文件(覆盖旧文件);在任务管理器的锁内执行,导入进行中时不会覆盖正在读取的文件
+            file.save(str(filepath))
 
-        # 执行导入(覆盖写入模式)
-        importer = KeepDataImporter(str(filepath))
-        result = importer.run(truncate_first=True)
+        # 后台执行导入(覆盖写入当前用户的记录);后台线程没有请求上下文,先取出当前用户
+        user_id = get_request_user_id()
 
-        return jsonify({
-            'success': True,
-            'message': f'导入成功! 共{result["success"]}条记录',
-            'result': result
-        })
+        def run_import(report):
+            importer = KeepDataImporter(str(filepath), progress_callback=report, user_id=user_id)
+            return importer.run(truncate_first=True)
+
+        return start_import_job('keep', 'excel_upload', run_import, prepare=save_upload)
 
     except Exception as e:
         import traceback
@@ -460,6 +501,19 @@ def init_database():
 
         connection.close()
 
+        # 补齐SQL脚本之后的版本化迁移(复合索引等)
+        engine = create_database_engine(URL.create(
+            'mysql+pymysql', username=user, password=password, host=host, port=port,
+            database=database, query={'charset': 'utf8mb4'}
+        ).render_as_string(hide_password=False))
+        try:
+            upgrade_schema(engine)
+        finally:
+            engine.dispose()
+
+        # 数据库表已变更,旧的健康检查结果失效
+        invalidate_health_cache()
+
         return jsonify({
             'success': True,
             'message': f'数据库"{database}"初始化成功'
@@ -519,22 +573,15 @@ def import_garmin_data():
                 'message': '邮箱和密码不能为空'
             }), 400
 
-        # 执行导入
+        # 后台执行导入
         from scripts.training_data_importer import GarminDataImporter
-        importer = GarminDataImporter(email, password, is_cn)
-        result = importer.run(truncate_first=True)
+        user_id = get_request_user_id()
 
-        if 'error' in result:
-            return jsonify({
-                'success': False,
-                'message': result['error']
-            }), 500
+        def run_import(report):
+            importer = GarminDataImporter(email, password, is_cn, progress_callback=report, user_id=user_id)
+            return importer.run(truncate_first=True)
 
-        return jsonify({
-            'success': True,
-            'message': f'Garmin数据导入成功! 共{result["success"]}条记录',
-            'result': result
-        })
+        return start_import_job('garmin', 'garmin_import', run_import)
 
     except Exception as e:
         import traceback
@@ -547,3 +594,76 @@ def import_garmin_data():
         }), 500
 
 
+@setup_bp.route('/api/import_jobs', methods=['GET'])
+def list_import_jobs():
+    """
+    查询导入任务历史
+
+    请求参数:
+    - source: 按数据源过滤(可选)
+    - limit: 返回条数(默认20)
+    """
+    source = request.args.get('source')
+    limit = int(request.args.get('limit', 20))
+    return jsonify({
+        'success': True,
+        'data': get_import_job_manager().list_jobs(source=source, limit=limit)
+    })
+
+
+@setup_bp.route('/api/import_jobs/<job_id>', methods=['GET'])
+def get_import_job(job_id):
+    """查询单个导入任务的状态、进度和导入统计"""
+    job = get_import_job_manager().get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': '任务不存在'}), 404
+
+    return jsonify({
+        'success': True,
+        'data': job
+    })
+
+
+@setup_bp.route('/api/rollback_import', methods=['POST'])
+def rollback_import():
+    """
+    回滚当前用户最近一次覆盖导入(从备份表写回该用户导入前的记录,其他用户不受影响)
+
+    请求参数:
+    - source: 数据源(keep/garmin)
+    """
+    data = request.get_json() or {}
+    source = data.get('source')
+    if source not in ('keep', 'garmin'):
+        return jsonify({'success': False, 'message': 'source必须为keep或garmin'}), 400
+
+    if get_import_job_manager().get_active_job(source):
+        return jsonify({'success': False, 'message': '导入任务正在运行,请等待完成后再回滚'}), 409
+
+    try:
+        from scripts.training_data_importer import BaseImporter
+        from models.training_record import TrainingRecordManager
+        from utils.record_count_cache import get_record_count_cache
+        from utils.training_load_model import get_load_model_cache
+        from utils.hr_analytics import get_hr_analytics_cache
+
+        user_id = get_request_user_id()
+        table = TrainingRecordManager(data_source=source).get_model_class().__table__
+        importer = BaseImporter(user_id=user_id)
+        try:
+            restored = importer.restore_previous_rows(table)
+        finally:
+            importer.engine.dispose()
+        if not restored:
+            return jsonify({'success': False, 'message': '没有可回滚的导入备份'}), 404
+
+        # 只替换了当前用户的记录,失效该用户的派生缓存(写回的记录ID重新分配,心率分析缓存整体清空)
+        get_record_count_cache().invalidate(source, user_id)
+        if source == 'garmin':
+            get_load_model_cache(source, user_id).invalidate()
+        else:
+            get_hr_analytics_cache(source).invalidate()
+
+        return jsonify({'success': True, 'message': '已回滚到上一次导入前的数据'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'回滚失败: {str(e)}'}), 500
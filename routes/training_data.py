@@ -3,10 +3,20 @@
 训练数据管理路由
 """
 
-from flask import Blueprint, render_template, request, jsonify
-from datetime import datetime
+from flask import Blueprint, render_template, request, jsonify, make_response, Response, stream_with_context
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
 from models.training_record import TrainingRecordManager, SessionLocal
 from utils.config_reloader import get_config_value
+from utils.training_load_model import get_load_model_cache
+from utils.hr_analytics import get_hr_analytics_cache
+from utils.record_count_cache import get_record_count_cache
+from utils.user_context import get_request_user_id, is_user_switch_allowed, set_request_user_id
+from utils.training_export import (
+    EXPORT_FORMATS, PYARROW_AVAILABLE, export_columns, iter_record_batches, stream_export
+)
+import base64
+import hashlib
 import json
 import time
 
@@ -17,10 +27,47 @@ def get_record_manager():
     """
     获取训练记录管理器（支持配置热重载）
 
-    每次调用都会读取最新的TRAINING_DATA_SOURCE配置
+    每次调用都会读取最新的TRAINING_DATA_SOURCE配置,
+    查询范围限定为Flask会话中的当前用户
     """
     data_source = get_config_value('TRAINING_DATA_SOURCE', 'keep')
-    return TrainingRecordManager(data_source=data_source)
+    return TrainingRecordManager(data_source=data_source, user_id=get_request_user_id())
+
+
+def invalidate_derived_caches(data_source: str, user_id: str, record_id: int = None):
+    """
+    训练记录被修改后,清理基于该数据源、该用户计算的派生缓存
+
+    Args:
+        data_source: 被修改的数据源
+        user_id: 记录所属用户
+        record_id: 被修改的记录ID(新增记录时为None)
+    """
+    if data_source == 'garmin':
+        # 训练负荷模型依赖该用户全部历史,单条修改直接失效,下次查询时重建
+        get_load_model_cache(data_source, user_id).invalidate()
+    elif data_source == 'keep' and record_id is not None:
+        # 心率分析按记录缓存,只清理被修改的记录
+        get_hr_analytics_cache(data_source).invalidate(record_id)
+    # 记录总数缓存(分页接口使用)
+    get_record_count_cache().invalidate(data_source, user_id)
+
+
+def encode_cursor(start_time: datetime, record_id: int) -> str:
+    """将(开始时间, 记录ID)编码为分页游标"""
+    # isoformat保留微秒,否则带小数秒的开始时间会让(start_time, id)比较跳过或重复记录
+    raw = f"{start_time.isoformat()}|{record_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str):
+    """解析分页游标,返回(开始时间, 记录ID)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        time_str, id_str = raw.rsplit('|', 1)
+        return datetime.fromisoformat(time_str), int(id_str)
+    except Exception:
+        raise ValueError(cursor)
 
 
 @training_data_bp.route('/')
@@ -38,37 +85,142 @@ def index():
 
 @training_data_bp.route('/api/records', methods=['GET'])
 def get_records():
-    """获取所有训练记录"""
+    """
+    获取训练记录(按开始时间倒序分页)
+
+    支持两种分页方式:
+    - cursor: 游标分页,基于(start_time, id)定位,利用start_time索引,翻页耗时与页码无关
+    - page: 传统页码分页(OFFSET),保留用于兼容
+    响应带ETag,内容未变化时返回304
+    """
     session = SessionLocal()
     try:
+        manager = get_record_manager()
+        Model = manager.get_model_class()
+        start_time_field = manager.get_field('start_time')
+
         # 获取分页参数
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
+        cursor = request.args.get('cursor')
 
-        # 查询总数
-        total = get_record_manager().query(session).count()
-
-        # 分页查询
-        start_time_field = get_record_manager().get_field('start_time')
-        records = get_record_manager().query(session)\
-            .order_by(start_time_field.desc())\
-            .limit(per_page)\
-            .offset((page - 1) * per_page)\
-            .all()
+        # 总数走缓存,写操作后失效
+        total = get_record_count_cache().get(
+            manager.data_source,
+            lambda: manager.query(session).count(),
+            manager.user_id
+        )
 
-        return jsonify({
+        query = manager.query(session)
+        if cursor:
+            try:
+                cursor_time, cursor_id = decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'success': False, 'message': f'游标格式错误: {str(e)}'}), 400
+            query = query.filter(or_(
+                start_time_field < cursor_time,
+                and_(start_time_field == cursor_time, Model.id < cursor_id)
+            ))
+
+        # id作为第二排序键,保证同一开始时间的记录顺序稳定
+        query = query.order_by(start_time_field.desc(), Model.id.desc())
+        if not cursor:
+            query = query.offset((page - 1) * per_page)
+        records = query.limit(per_page).all()
+
+        next_cursor = None
+        if len(records) == per_page:
+            last = records[-1]
+            next_cursor = encode_cursor(getattr(last, start_time_field.key), last.id)
+
+        # ETag由数据源、用户、总数、分页参数和本页记录的(id, last_modify_ts)决定
+        etag_source = json.dumps([
+            manager.data_source, manager.user_id, total, page, per_page, cursor,
+            [(r.id, r.last_modify_ts) for r in records]
+        ])
+        etag = hashlib.md5(etag_source.encode('utf-8')).hexdigest()
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        response = jsonify({
             'success': True,
             'data': [record.to_dict() for record in records],
             'total': total,
             'page': page,
-            'per_page': per_page
+            'per_page': per_page,
+            'next_cursor': next_cursor
         })
+        response.set_etag(etag)
+        # no-cache: 浏览器可缓存但每次需带If-None-Match重新验证
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
     finally:
         session.close()
 
 
+def parse_export_time(value: str, end_of_range: bool = False):
+    """
+    解析导出时间范围参数
+
+    支持'YYYY-MM-DD'和'YYYY-MM-DD HH:MM:SS';只给日期的结束时间包含当天全天
+    """
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        day = datetime.strptime(value, '%Y-%m-%d')
+        return day + timedelta(days=1) if end_of_range else day
+
+
+@training_data_bp.route('/api/export', methods=['GET'])
+def export_records():
+    """
+    流式导出训练记录
+
+    参数:
+        format: csv / parquet / ndjson (默认csv)
+        from: 开始时间(含)
+        to: 结束时间(含当天)
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': f'不支持的导出格式: {export_format}'}), 400
+    if export_format == 'parquet' and not PYARROW_AVAILABLE:
+        return jsonify({'success': False, 'message': '导出Parquet需要安装pyarrow: pip install pyarrow'}), 400
+
+    try:
+        start = parse_export_time(request.args.get('from'))
+        end = parse_export_time(request.args.get('to'), end_of_range=True)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'时间格式错误: {str(e)}'}), 400
+
+    manager = get_record_manager()
+    columns = export_columns(manager)
+
+    def generate():
+        # 会话在整个流式响应期间保持打开,输出结束后关闭
+        session = SessionLocal()
+        try:
+            batches = iter_record_batches(session, manager, start, end)
+            for chunk in stream_export(export_format, batches, columns):
+                yield chunk
+        finally:
+            session.close()
+
+    filename = f"training_records_{manager.data_source}_{manager.user_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{EXPORT_FORMATS[export_format]['extension']}"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[export_format]['mimetype'],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
 @training_data_bp.route('/api/record', methods=['POST'])
 def add_record():
     """添加训练记录"""
@@ -106,9 +258,9 @@ def add_record():
         # 否则heart_rate_data保持为None,数据库会存储为NULL
 
         # 创建记录
+        manager = get_record_manager()
         current_ts = int(time.time())
-        record = get_record_manager().create_record(
-            user_id=data.get('user_id', 'default_user'),
+        record = manager.create_record(
             exercise_type=data['exercise_type'],
             duration_seconds=int(data['duration_seconds']),
             start_time=start_time,
@@ -126,6 +278,7 @@ def add_record():
         session.add(record)
         session.commit()
         session.refresh(record)
+        invalidate_derived_caches(manager.data_source, manager.user_id)
 
         return jsonify({
             'success': True,
@@ -144,8 +297,9 @@ def get_record(record_id):
     """获取单个训练记录"""
     session = SessionLocal()
     try:
-        Model = get_record_manager().get_model_class()
-        record = get_record_manager().query(session).filter(Model.id == record_id).first()
+        manager = get_record_manager()
+        Model = manager.get_model_class()
+        record = manager.query(session).filter(Model.id == record_id).first()
         if not record:
             return jsonify({'success': False, 'message': '记录不存在'}), 404
 
@@ -164,16 +318,15 @@ def update_record(record_id):
     """更新训练记录"""
     session = SessionLocal()
     try:
-        Model = get_record_manager().get_model_class()
-        record = get_record_manager().query(session).filter(Model.id == record_id).first()
+        manager = get_record_manager()
+        Model = manager.get_model_class()
+        record = manager.query(session).filter(Model.id == record_id).first()
         if not record:
             return jsonify({'success': False, 'message': '记录不存在'}), 404
 
         data = request.get_json()
 
-        # 更新字段
-        if 'user_id' in data:
-            record.user_id = data['user_id']
+        # 更新字段(记录归属用户不允许通过接口修改)
         if 'exercise_type' in data:
             record.exercise_type = data['exercise_type']
         if 'duration_seconds' in data:
@@ -209,6 +362,7 @@ def update_record(record_id):
 
         session.commit()
         session.refresh(record)
+        invalidate_derived_caches(manager.data_source, manager.user_id, record_id)
 
         return jsonify({
             'success': True,
@@ -227,13 +381,15 @@ def delete_record(record_id):
     """删除训练记录"""
     session = SessionLocal()
     try:
-        Model = get_record_manager().get_model_class()
-        record = get_record_manager().query(session).filter(Model.id == record_id).first()
+        manager = get_record_manager()
+        Model = manager.get_model_class()
+        record = manager.query(session).filter(Model.id == record_id).first()
         if not record:
             return jsonify({'success': False, 'message': '记录不存在'}), 404
 
         session.delete(record)
         session.commit()
+        invalidate_derived_caches(manager.data_source, manager.user_id, record_id)
 
         return jsonify({
             'success': True,
@@ -252,8 +408,9 @@ def get_exercise_types():
     session = SessionLocal()
     try:
         # 从数据库中查询所有不同的运动类型
-        exercise_type_field = get_record_manager().get_field('exercise_type')
-        exercise_types = get_record_manager().query(session)\
+        manager = get_record_manager()
+        exercise_type_field = manager.get_field('exercise_type')
+        exercise_types = manager.query(session)\
             .with_entities(exercise_type_field)\
             .distinct()\
             .order_by(exercise_type_field)\
@@ -302,11 +459,12 @@ def get_data_sources():
 @training_data_bp.route('/api/current_source', methods=['GET'])
 def get_current_source():
     """获取当前使用的数据源"""
+    manager = get_record_manager()
     return jsonify({
         'success': True,
         'data': {
-            'source': get_record_manager().data_source,
-            'available_sources': list(get_record_manager().DATA_SOURCE_MAP.keys())
+            'source': manager.data_source,
+            'available_sources': list(manager.DATA_SOURCE_MAP.keys())
         }
     })
 
@@ -321,14 +479,15 @@ def switch_source():
         if not new_source:
             return jsonify({'success': False, 'message': '缺少source参数'}), 400
 
-        get_record_manager().switch_source(new_source)
+        manager = get_record_manager()
+        manager.switch_source(new_source)
 
         return jsonify({
             'success': True,
             'message': f'数据源已切换到: {new_source}',
             'data': {
-                'source': get_record_manager().data_source,
-                'model_class': get_record_manager().get_model_class().__name__
+                'source': manager.data_source,
+                'model_class': manager.get_model_class().__name__
             }
         })
     except ValueError as e:
@@ -337,6 +496,58 @@ def switch_source():
         return jsonify({'success': False, 'message': f'切换失败: {str(e)}'}), 500
 
 
+@training_data_bp.route('/api/current_user', methods=['GET'])
+def get_current_user():
+    """
+    获取当前会话的训练数据用户
+
+    仅在允许切换用户(config.ALLOW_USER_SWITCH)时返回当前数据源中已有记录的用户列表
+    """
+    session = SessionLocal()
+    try:
+        manager = get_record_manager()
+        allow_switch = is_user_switch_allowed()
+        available_users = []
+        if allow_switch:
+            Model = manager.get_model_class()
+            users = session.query(Model.user_id).distinct().order_by(Model.user_id).all()
+            available_users = [u[0] for u in users if u[0]]
+        return jsonify({
+            'success': True,
+            'data': {
+                'user_id': manager.user_id,
+                'allow_switch': allow_switch,
+                'available_users': available_users
+            }
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+    finally:
+        session.close()
+
+
+@training_data_bp.route('/api/switch_user', methods=['POST'])
+def switch_user():
+    """
+    切换当前会话的训练数据用户,之后的记录管理、导入和引擎分析都限定为该用户
+
+    本项目没有登录认证,切换后即可读写该用户的全部数据,
+    因此默认关闭,仅在 config.ALLOW_USER_SWITCH = True 时可用
+    """
+    if not is_user_switch_allowed():
+        return jsonify({'success': False, 'message': '未开启用户切换(config.ALLOW_USER_SWITCH)'}), 403
+    data = request.get_json() or {}
+    try:
+        user_id = set_request_user_id(data.get('user_id'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({
+        'success': True,
+        'message': f'已切换到用户: {user_id}',
+        'data': {'user_id': user_id}
+    })
+
+
 @training_data_bp.route('/api/sync_garmin_data', methods=['POST'])
 def sync_garmin_data():
     """同步Garmin数据 - 调用setup页面的导入逻辑"""
@@ -362,22 +573,18 @@ def sync_garmin_data():
                 'message': 'Garmin账户配置不完整,请先在config.py中配置GARMIN_EMAIL和GARMIN_PASSWORD'
             }), 400
 
-        # 执行导入
+        # 后台执行导入,立即返回任务ID;后台线程没有请求上下文,先取出当前用户
         from scripts.training_data_importer import GarminDataImporter
-        importer = GarminDataImporter(garmin_email, garmin_password, garmin_is_cn)
-        result = importer.run(truncate_first=True)
+        user_id = get_request_user_id()
+        from routes.setup import start_import_job
 
-        if 'error' in result:
-            return jsonify({
-                'success': False,
-                'message': result['error']
-            }), 500
+        def run_import(report):
+            importer = GarminDataImporter(
+                garmin_email, garmin_password, garmin_is_cn, progress_callback=report, user_id=user_id
+            )
+            return importer.run(truncate_first=True)
 
-        return jsonify({
-            'success': True,
-            'message': f'Garmin数据同步成功! 共导入{result["success"]}条记录',
-            'result': result
-        })
+        return start_import_job('garmin', 'garmin_sync', run_import)
 
     except Exception as e:
         import traceback
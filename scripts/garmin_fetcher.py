@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Garmin活动分页并发抓取
+多个工作线程按页偏移并发请求 get_activities(start, limit),请求速率由自适应令牌桶控制;
+抓到的页面放入队列,由调用方(导入器)边抓取边解析写入
+"""
+
+import queue
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.rate_limiter import AdaptiveTokenBucket, THROTTLE_STATUS_CODES, get_retry_after, get_status_code
+
+# 队列结束标记
+_DONE = object()
+
+
+class ConcurrentActivityFetcher:
+    """Garmin活动并发分页抓取器(生产者)"""
+
+    def __init__(self, client, page_size: int = 50, max_count: int = 4000, concurrency: int = 3,
+                 bucket: Optional[AdaptiveTokenBucket] = None, max_retries: int = 4,
+                 retry_base_delay: float = 0.5, retry_max_delay: float = 8.0):
+        """
+        Args:
+            client: Garmin客户端(需提供 get_activities(start, limit))
+            page_size: 每页数量
+            max_count: 最多抓取数量
+            concurrency: 并发请求数
+            bucket: 令牌桶,默认新建
+            max_retries: 单页最大重试次数
+            retry_base_delay: 非限流错误(网络中断、超时等)首次重试前的等待秒数,之后指数增长
+            retry_max_delay: 非限流错误重试等待的上限秒数
+        """
+        self.client = client
+        self.page_size = page_size
+        self.max_count = max_count
+        self.concurrency = max(1, concurrency)
+        self.bucket = bucket or AdaptiveTokenBucket()
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        self._lock = threading.Lock()
+        self._next_offset = 0
+        # 遇到不满一页(或空页)后,不再请求该偏移之后的页
+        self._stop_offset = max_count
+        self.error: Optional[Exception] = None
+        self.pages_fetched = 0
+        # 调用方提前停止消费时置位,工作线程随即退出
+        self._cancelled = threading.Event()
+
+    def _claim_offset(self) -> Optional[int]:
+        with self._lock:
+            if self.error is not None or self._cancelled.is_set() or self._next_offset >= self._stop_offset:
+                return None
+            offset = self._next_offset
+            self._next_offset += self.page_size
+            return offset
+
+    def _mark_end(self, offset: int):
+        with self._lock:
+            self._stop_offset = min(self._stop_offset, offset)
+
+    def _retry_delay(self, attempt: int) -> float:
+        """非限流错误的指数退避等待时间(带随机抖动,避免多个线程同时重试)"""
+        delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _fetch_page(self, offset: int) -> List[dict]:
+        """请求一页数据,429/5xx时降低令牌桶速率重试,其他错误指数退避后重试"""
+        limit = min(self.page_size, self.max_count - offset)
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                activities = self.client.get_activities(offset, limit)
+                self.bucket.on_success()
+                return activities or []
+            except Exception as e:
+                status = get_status_code(e)
+                attempt += 1
+                if status in THROTTLE_STATUS_CODES:
+                    self.bucket.on_throttle(get_retry_after(e))
+                    print(f"[GarminFetcher] 页 {offset} 被限流/服务端错误({status}), 当前速率 {self.bucket.rate:.2f}/秒")
+                if attempt > self.max_retries:
+                    raise
+                if status not in THROTTLE_STATUS_CODES:
+                    delay = self._retry_delay(attempt)
+                    print(f"[GarminFetcher] 页 {offset} 请求失败({e}), {delay:.1f}秒后第{attempt}次重试")
+                    if self._cancelled.wait(delay):
+                        raise
+
+    def _worker(self, output: queue.Queue):
+        while True:
+            offset = self._claim_offset()
+            if offset is None:
+                return
+            try:
+                activities = self._fetch_page(offset)
+            except Exception as e:
+                with self._lock:
+                    if self.error is None:
+                        self.error = e
+                return
+            if len(activities) < min(self.page_size, self.max_count - offset):
+                self._mark_end(offset + len(activities))
+            if activities:
+                with self._lock:
+                    self.pages_fetched += 1
+                while not self._cancelled.is_set():
+                    try:
+                        output.put((offset, activities), timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+
+    def iter_pages(self) -> Iterator[List[dict]]:
+        """
+        并发抓取并按到达顺序产出每页活动
+
+        Raises:
+            Exception: 某页重试后仍失败时,在已产出的页之后抛出
+        """
+        output: queue.Queue = queue.Queue(maxsize=self.concurrency * 2)
+        workers = [
+            threading.Thread(target=self._worker, args=(output,), daemon=True, name=f'garmin-fetch-{i}')
+            for i in range(self.concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+
+        def close_when_done():
+            for worker in workers:
+                worker.join()
+            # 调用方提前停止消费后不再投递结束标记,避免在已满的队列上永久阻塞
+            while not self._cancelled.is_set():
+                try:
+                    output.put(_DONE, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+        threading.Thread(target=close_when_done, daemon=True, name='garmin-fetch-close').start()
+
+        started = time.perf_counter()
+        fetched = 0
+        try:
+            while True:
+                item = output.get()
+                if item is _DONE:
+                    break
+                offset, activities = item
+                fetched += len(activities)
+                print(f"[GarminFetcher] 抓取活动数据: {offset} ~ {offset + len(activities)}")
+                yield activities
+        finally:
+            self._cancelled.set()
+            # 清空未消费的页,释放内存并让阻塞在put上的线程尽快退出
+            while True:
+                try:
+                    output.get_nowait()
+                except queue.Empty:
+                    break
+
+        elapsed = time.perf_counter() - started
+        print(f"[GarminFetcher] 抓取完成: {fetched}条, {self.pages_fetched}页, 耗时{elapsed:.2f}秒, "
+              f"限流统计 {self.bucket.stats()}")
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Garmin Connect离线模拟客户端
+提供与garminconnect.Garmin相同的 login()/get_activities(start, limit) 接口,
+按固定延迟返回合成的跑步活动,并可模拟并发过高或随机出现的429/503,
+用于在不访问真实服务的情况下对抓取与导入流程做基准测试
+
+用法:
+    python scripts/garmin_stub_client.py --total 2000 --latency 0.3
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class StubHTTPError(Exception):
+    """模拟的HTTP错误(携带status_code和响应头)"""
+
+    def __init__(self, status_code: int, retry_after: float = None):
+        self.status_code = status_code
+        self.response = type('StubResponse', (), {
+            'status_code': status_code,
+            'headers': {'Retry-After': str(retry_after)} if retry_after is not None else {}
+        })()
+        super().__init__(f"{status_code} Stub Garmin error")
+
+
+class StubGarminClient:
+    """模拟的Garmin客户端"""
+
+    def __init__(self, total: int = 2000, latency: float = 0.3, max_concurrent: int = 4,
+                 error_rate: float = 0.0, seed: int = 42):
+        """
+        Args:
+            total: 账户中的活动总数
+            latency: 每次请求的响应延迟(秒)
+            max_concurrent: 超过该并发数的请求返回429
+            error_rate: 随机返回503的概率
+            seed: 随机种子
+        """
+        self.total = total
+        self.latency = latency
+        self.max_concurrent = max_concurrent
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.requests = 0
+        self.rejected = 0
+
+    def login(self):
+        return True
+
+    def _make_activity(self, index: int) -> dict:
+        """生成第index条活动(按时间倒序,index越大越早)"""
+        rnd = random.Random(index)
+        start = datetime(2025, 1, 1, 7, 0, 0) - timedelta(days=index // 2, hours=(index % 2) * 10)
+        duration = rnd.randint(1200, 7200)
+        distance = duration * rnd.uniform(2.6, 3.8)
+        avg_hr = rnd.randint(128, 168)
+        return {
+            'activityId': 10_000_000 + index,
+            'activityName': '模拟跑步',
+            'activityType': {'typeKey': 'running' if index % 10 else 'cycling'},
+            'startTimeGMT': start.strftime('%Y-%m-%d %H:%M:%S'),
+            'endTimeGMT': (start + timedelta(seconds=duration)).strftime('%Y-%m-%d %H:%M:%S'),
+            'duration': duration,
+            'distance': round(distance, 1),
+            'averageHR': avg_hr,
+            'maxHR': avg_hr + rnd.randint(10, 25),
+            'averageRunningCadenceInStepsPerMinute': rnd.randint(165, 185),
+            'averageSpeed': round(distance / duration, 2),
+            'activityTrainingLoad': rnd.randint(30, 250),
+            'aerobicTrainingEffect': round(rnd.uniform(1.5, 4.5), 1),
+            'calories': int(duration / 60 * 11),
+        }
+
+    def get_activities(self, start: int, limit: int) -> list:
+        with self._lock:
+            self.requests += 1
+            self._in_flight += 1
+            overloaded = self._in_flight > self.max_concurrent
+            failed = self._random.random() < self.error_rate
+        try:
+            time.sleep(self.latency)
+            if overloaded:
+                with self._lock:
+                    self.rejected += 1
+                raise StubHTTPError(429, retry_after=1)
+            if failed:
+                with self._lock:
+                    self.rejected += 1
+                raise StubHTTPError(503)
+            end = min(start + limit, self.total)
+            return [self._make_activity(i) for i in range(start, end)]
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+def benchmark(total: int, latency: float, concurrency: int, error_rate: float):
+    """对比旧的顺序抓取(每页间隔1秒)与并发抓取的耗时"""
+    from scripts.garmin_fetcher import ConcurrentActivityFetcher
+
+    page_size = 50
+    pages = (total + page_size - 1) // page_size
+    sequential_estimate = pages * latency + max(pages - 1, 0) * 1.0
+    print(f"顺序抓取预估耗时: {sequential_estimate:.1f}秒 ({pages}页, 每页{latency}秒 + 间隔1秒)")
+
+    client = StubGarminClient(total=total, latency=latency, error_rate=error_rate)
+    fetcher = ConcurrentActivityFetcher(client, page_size=page_size, max_count=max(total, 4000),
+                                        concurrency=concurrency)
+    started = time.perf_counter()
+    count = sum(len(page) for page in fetcher.iter_pages())
+    elapsed = time.perf_counter() - started
+    print(f"并发抓取: {count}条, 耗时{elapsed:.1f}秒, 请求{client.requests}次, "
+          f"被拒绝{client.rejected}次, 令牌桶 {fetcher.bucket.stats()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Garmin抓取离线基准测试')
+    parser.add_argument('--total', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--concurrency', type=int, default=3)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    args = parser.parse_args()
+    benchmark(args.total, args.latency, args.concurrency, args.error_rate)
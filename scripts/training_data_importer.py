@@ -4,6 +4,7 @@
 支持Keep Excel文件和Garmin Connect在线数据导入
 """
 
+import hashlib
 import sys
 from pathlib import Path
 from datetime import datetime
@@ -16,182 +17,440 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 # 重要: 先导入config,确保数据库配置在创建engine前加载
 import config
 
-from sqlalchemy import create_engine
+from sqlalchemy import inspect, MetaData, func, select, text
 from sqlalchemy.orm import sessionmaker
 from garminconnect import Garmin
-from models.training_record import TrainingRecordKeep, TrainingRecordGarmin, Base, TrainingRecordManager, get_session_local
+from models.training_record import TrainingRecordKeep, TrainingRecordGarmin, TrainingRecordManager, get_session_local
+from models.migrations import upgrade as upgrade_schema
+from utils.db_backend import create_database_engine, get_database_url
+from utils.training_load_model import get_load_model_cache
+from utils.hr_analytics import get_hr_analytics_cache
+from utils.record_count_cache import get_record_count_cache
+from utils.user_context import normalize_user_id
+from scripts.garmin_fetcher import ConcurrentActivityFetcher
 
 
 class BaseImporter:
     """训练数据导入器基类"""
 
-    def __init__(self, db_engine=None):
+    # 覆盖导入时写入的影子表后缀,校验通过后替换当前用户的记录
+    STAGING_SUFFIX = '__staging'
+    # 保存被替换记录的备份表后缀(按用户保存),用于回滚
+    BACKUP_SUFFIX = '__old'
+
+    def __init__(self, db_engine=None, progress_callback=None, user_id: str = None):
         """
         初始化导入器
 
         Args:
             db_engine: SQLAlchemy引擎,如果为None则直接从config构建
+            progress_callback: 进度回调 callback(stage, current, total, message),用于后台任务推送进度
+            user_id: 导入记录归属的用户,覆盖写入时只替换该用户的记录;为None时使用默认用户
         """
+        self.progress_callback = progress_callback
+        self.user_id = normalize_user_id(user_id)
         if db_engine:
             self.engine = db_engine
         else:
             # 直接从config构建引擎,避免importlib.reload的不确定性
-            connection_string = (
-                f'mysql+pymysql://{config.DB_USER}:{config.DB_PASSWORD}'
-                f'@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}'
-                f'?charset={config.DB_CHARSET}'
-            )
-            self.engine = create_engine(
-                connection_string,
-                pool_pre_ping=True,
-                pool_recycle=3600,
-                echo=False
-            )
+            self.engine = create_database_engine(get_database_url(config))
 
     def create_table_if_not_exists(self):
-        """如果表不存在则创建"""
-        Base.metadata.create_all(bind=self.engine)
+        """如果表不存在则创建(执行未执行的数据库迁移)"""
+        upgrade_schema(self.engine)
 
+    def staging_table_name(self, table) -> str:
+        """当前用户的影子表名: 每个用户使用独立的影子表,不同用户同时覆盖导入互不影响"""
+        digest = hashlib.sha1(self.user_id.encode('utf-8')).hexdigest()[:12]
+        return f"{table.name}{self.STAGING_SUFFIX}_{digest}"
 
-class KeepDataImporter(BaseImporter):
-    """Keep数据导入器 - 从Excel文件导入"""
+    def create_staging_table(self, table):
+        """
+        创建(或重建)与正式表结构一致的空影子表
+
+        Args:
+            table: 正式表(SQLAlchemy Table)
+
+        Returns:
+            影子表的Table对象,可直接用于Core insert
+        """
+        staging_name = self.staging_table_name(table)
+        staging = table.to_metadata(MetaData(), name=staging_name)
+        # 影子表只用于暂存本次导入的数据,不需要索引
+        staging.indexes.clear()
+
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {staging_name}"))
+            staging.create(conn)
+        return staging
+
+    def drop_staging_table(self, staging):
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {staging.name}"))
+
+    def ensure_backup_table(self, table) -> str:
+        """
+        确保备份表存在且与正式表结构一致
+
+        备份表按user_id保存各用户最近一次覆盖导入前的记录;
+        表结构随迁移变化后旧备份无法写回,直接重建
+
+        Returns:
+            备份表名
+        """
+        backup_name = f"{table.name}{self.BACKUP_SUFFIX}"
+        inspector = inspect(self.engine)
+        if inspector.has_table(backup_name):
+            backup_columns = {column['name'] for column in inspector.get_columns(backup_name)}
+            if backup_columns == {column.name for column in table.columns}:
+                return backup_name
+            with self.engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE {backup_name}"))
+
+        backup = table.to_metadata(MetaData(), name=backup_name)
+        backup.indexes.clear()
+        with self.engine.begin() as conn:
+            backup.create(conn)
+        return backup_name
+
+    def replace_user_rows(self, table, staging, expected_rows: int):
+        """
+        校验影子表后,在一个事务内用影子表中的数据替换当前用户的记录
+
+        只删除并重新写入当前用户的记录,其他用户的记录(包括导入期间其他用户的增删改)不受影响;
+        读者要么看到旧记录要么看到新记录,不会看到部分数据。被替换的旧记录保存到备份表,用于回滚
+
+        Args:
+            table: 正式表
+            staging: 影子表(只包含当前用户本次导入的记录)
+            expected_rows: 本次导入应写入的行数
+
+        Raises:
+            ValueError: 校验失败(影子表为空或行数不符),正式表保持不变
+        """
+        replaced = False
+        try:
+            with self.engine.connect() as conn:
+                staged_rows = conn.execute(select(func.count()).select_from(staging)).scalar()
+            if staged_rows == 0 or staged_rows != expected_rows:
+                raise ValueError(f"影子表校验失败: 写入{staged_rows}行, 预期{expected_rows}行, 已保留原有数据")
+
+            backup_name = self.ensure_backup_table(table)
+            all_columns = ', '.join(c.name for c in table.columns)
+            # 新记录的自增ID由正式表重新分配
+            columns = ', '.join(c.name for c in table.columns if c is not table.autoincrement_column)
+            params = {'user_id': self.user_id}
+
+            with self.engine.begin() as conn:
+                conn.execute(text(f"DELETE FROM {backup_name} WHERE user_id = :user_id"), params)
+                conn.execute(text(
+                    f"INSERT INTO {backup_name} ({all_columns}) "
+                    f"SELECT {all_columns} FROM {table.name} WHERE user_id = :user_id"
+                ), params)
+                conn.execute(text(f"DELETE FROM {table.name} WHERE user_id = :user_id"), params)
+                conn.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {staging.name}"))
+            replaced = True
+        finally:
+            # 无论成功失败都删除影子表(MySQL的DDL会隐式提交事务,因此在事务结束后再删除);
+            # 失败时事务已回滚,备份表中没有任何用户的记录时一并删除
+            self.drop_staging_table(staging)
+            if not replaced:
+                self.drop_backup_table_if_empty(table)
+        print(f"已替换用户 {self.user_id} 的记录: {table.name} ({staged_rows}行), 旧记录保留在 {backup_name}")
+
+    def drop_backup_table_if_empty(self, table):
+        """备份表中已没有任何用户的记录时删除它"""
+        backup_name = f"{table.name}{self.BACKUP_SUFFIX}"
+        try:
+            if not inspect(self.engine).has_table(backup_name):
+                return
+            with self.engine.begin() as conn:
+                if conn.execute(text(f"SELECT COUNT(*) FROM {backup_name}")).scalar() == 0:
+                    conn.execute(text(f"DROP TABLE {backup_name}"))
+        except Exception as e:
+            # 清理失败不影响导入/回滚结果
+            print(f"清理备份表失败: {backup_name}: {e}")
+
+    def restore_previous_rows(self, table) -> bool:
+        """
+        回滚当前用户最近一次覆盖导入: 在一个事务内删除该用户的现有记录,从备份表重新写入
+
+        只影响当前用户,其他用户的记录保持不变
+
+        Args:
+            table: 正式表
+
+        Returns:
+            bool: 当前用户是否存在可回滚的备份
+        """
+        backup_name = f"{table.name}{self.BACKUP_SUFFIX}"
+        if not inspect(self.engine).has_table(backup_name):
+            return False
+
+        columns = ', '.join(c.name for c in table.columns if c is not table.autoincrement_column)
+        params = {'user_id': self.user_id}
+        with self.engine.begin() as conn:
+            backed_up = conn.execute(
+                text(f"SELECT COUNT(*) FROM {backup_name} WHERE user_id = :user_id"), params
+            ).scalar()
+            if not backed_up:
+                return False
+            conn.execute(text(f"DELETE FROM {table.name} WHERE user_id = :user_id"), params)
+            conn.execute(text(
+                f"INSERT INTO {table.name} ({columns}) "
+                f"SELECT {columns} FROM {backup_name} WHERE user_id = :user_id"
+            ), params)
+            conn.execute(text(f"DELETE FROM {backup_name} WHERE user_id = :user_id"), params)
+        # 该用户的备份已用完,所有用户的备份都用完后删除备份表
+        self.drop_backup_table_if_empty(table)
+        print(f"已回滚用户 {self.user_id} 到上一次导入前的数据: {table.name} ({backed_up}行)")
+        return True
+
+    def report_progress(self, stage: str, current: int = None, total: int = None, message: str = ''):
+        """
+        上报导入进度
+
+        Args:
+            stage: 阶段(fetch/parse/insert)
+            current: 当前已处理数量
+            total: 总数量(未知时为None)
+            message: 进度描述
+        """
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback(stage, current, total, message)
+        except Exception as e:
+            print(f"上报导入进度失败: {e}")
 
-    BATCH_SIZE = 100  # 批量提交大小
 
-    def __init__(self, data_file: str, db_engine=None):
+class KeepDataImporter(BaseImporter):
+    """Keep数据导入器 - 从Excel/CSV文件导入"""
+
+    BATCH_SIZE = 5000  # 每批读取、清洗并插入的行数
+
+    # 导入时丢弃的列(轨迹数据体积大且不入库)
+    DROP_COLUMNS = ['运动轨迹']
+
+    # Excel列 -> 数据库字段
+    COLUMN_MAPPING = {
+        '运动类型': 'exercise_type',
+        '运动时长(秒)': 'duration_seconds',
+        '开始时间': 'start_time',
+        '结束时间': 'end_time',
+        '卡路里': 'calories',
+        '运动距离(米)': 'distance_meters',
+        '平均心率': 'avg_heart_rate',
+        '最大心率': 'max_heart_rate',
+        '心率记录': 'heart_rate_data',
+    }
+
+    def __init__(self, data_file: str, db_engine=None, progress_callback=None, user_id: str = None):
         """
         初始化Keep导入器
 
         Args:
             data_file: Excel数据文件路径
             db_engine: SQLAlchemy引擎
+            progress_callback: 进度回调
+            user_id: 导入记录归属的用户
         """
-        super().__init__(db_engine)
+        super().__init__(db_engine, progress_callback, user_id)
         self.data_file = data_file
         self.SessionLocal = sessionmaker(bind=self.engine, autoflush=False, autocommit=False)
 
-    def load_data(self) -> pd.DataFrame:
-        """加载Excel数据文件"""
+    def _check_file(self) -> str:
+        """检查数据文件并返回扩展名"""
         if not Path(self.data_file).exists():
             raise FileNotFoundError(f"数据文件不存在: {self.data_file}")
 
-        # 根据文件扩展名选择加载方式
         file_ext = Path(self.data_file).suffix.lower()
-        if file_ext in ['.xlsx', '.xls']:
-            df = pd.read_excel(self.data_file)
-        elif file_ext == '.csv':
-            df = pd.read_csv(self.data_file)
-        else:
+        if file_ext not in ['.xlsx', '.xls', '.csv']:
             raise ValueError(f"不支持的文件格式: {file_ext}")
+        return file_ext
 
-        # 删除运动轨迹列
-        if '运动轨迹' in df.columns:
-            df = df.drop(columns=['运动轨迹'])
+    def load_data(self) -> pd.DataFrame:
+        """一次性加载完整数据文件(小文件或调试使用,导入流程使用iter_chunks)"""
+        return pd.concat(list(self.iter_chunks()), ignore_index=True)
 
-        return df
+    def iter_chunks(self):
+        """
+        分块读取数据文件,每块最多BATCH_SIZE行
+
+        - .csv: pandas分块读取
+        - .xlsx: openpyxl只读模式逐行读取,不加载整个工作簿
+        - .xls: openpyxl不支持旧格式,退化为pd.read_excel整体读取后切块
+
+        Yields:
+            pd.DataFrame: 已去除轨迹列的数据块
+        """
+        file_ext = self._check_file()
+
+        if file_ext == '.csv':
+            reader = pd.read_csv(
+                self.data_file,
+                chunksize=self.BATCH_SIZE,
+                usecols=lambda col: col not in self.DROP_COLUMNS
+            )
+            for chunk in reader:
+                yield chunk
+            return
+
+        if file_ext == '.xls':
+            df = pd.read_excel(self.data_file)
+            df = df.drop(columns=[c for c in self.DROP_COLUMNS if c in df.columns])
+            for offset in range(0, len(df), self.BATCH_SIZE):
+                yield df.iloc[offset:offset + self.BATCH_SIZE]
+            return
+
+        from openpyxl import load_workbook
+        workbook = load_workbook(self.data_file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            keep_idx = [i for i, name in enumerate(header) if name is not None and name not in self.DROP_COLUMNS]
+            columns = [header[i] for i in keep_idx]
+
+            buffer = []
+            for row in rows:
+                if row is None or all(v is None for v in row):
+                    continue
+                buffer.append([row[i] if i < len(row) else None for i in keep_idx])
+                if len(buffer) >= self.BATCH_SIZE:
+                    yield pd.DataFrame(buffer, columns=columns)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=columns)
+        finally:
+            workbook.close()
 
     def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """数据清洗"""
-        # 填充空值
-        df = df.fillna({
-            '运动时长(秒)': 0,
-            '卡路里': 0,
-            '运动距离(米)': 0.0,
-            '平均心率': 0,
-            '最大心率': 0,
-            '心率记录': '[]'
-        })
-
-        # 转换数据类型
-        df['运动时长(秒)'] = df['运动时长(秒)'].astype(int)
-        df['卡路里'] = df['卡路里'].astype(int)
-        df['运动距离(米)'] = df['运动距离(米)'].astype(float)
-        df['平均心率'] = df['平均心率'].astype(int)
-        df['最大心率'] = df['最大心率'].astype(int)
+        """
+        数据清洗(按列向量化处理)
+
+        开始/结束时间无法解析或缺少运动类型的行会被丢弃,计入导入失败数
+        """
+        df = df.copy()
+
+        # 数值列: 无法解析的值按空值处理,空值填0(与手工录入的缺省一致)
+        for col in ['运动时长(秒)', '卡路里', '平均心率', '最大心率']:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+        df['运动距离(米)'] = pd.to_numeric(df['运动距离(米)'], errors='coerce').fillna(0.0).astype(float)
+
+        # 心率记录保持原始JSON字符串
+        df['心率记录'] = df['心率记录'].where(df['心率记录'].notna(), '[]').astype(str)
 
         # 时间格式统一
-        df['开始时间'] = pd.to_datetime(df['开始时间'])
-        df['结束时间'] = pd.to_datetime(df['结束时间'])
+        df['开始时间'] = pd.to_datetime(df['开始时间'], errors='coerce')
+        df['结束时间'] = pd.to_datetime(df['结束时间'], errors='coerce')
 
-        return df
+        valid = df['开始时间'].notna() & df['结束时间'].notna() & df['运动类型'].notna()
+        return df[valid]
 
-    def import_to_database(self, df: pd.DataFrame, truncate_first: bool = False) -> dict:
+    def _to_parameters(self, df: pd.DataFrame, now_ts: int) -> list:
+        """将清洗后的数据块转换为Core executemany参数列表"""
+        columns = {
+            field: df[col].tolist()
+            for col, field in self.COLUMN_MAPPING.items()
+        }
+        # Timestamp -> datetime,避免驱动逐个做类型适配
+        columns['start_time'] = list(df['开始时间'].dt.to_pydatetime())
+        columns['end_time'] = list(df['结束时间'].dt.to_pydatetime())
+        columns['exercise_type'] = [str(v) for v in columns['exercise_type']]
+
+        count = len(df)
+        columns['user_id'] = [self.user_id] * count
+        columns['add_ts'] = [now_ts] * count
+        columns['last_modify_ts'] = [now_ts] * count
+        columns['data_source'] = ['keep_import'] * count
+
+        keys = list(columns.keys())
+        return [dict(zip(keys, values)) for values in zip(*(columns[k] for k in keys))]
+
+    def import_chunks(self, chunks, truncate_first: bool = False) -> dict:
         """
-        导入数据到数据库
+        清洗并导入数据块
+
+        全部数据块在同一个事务内通过Core executemany插入;覆盖写入时先写入影子表,
+        校验通过后在一个事务内替换当前用户的记录,导入过程中查询始终看到完整的旧数据
 
         Args:
-            df: 待导入的DataFrame
-            truncate_first: 是否先清空表
+            chunks: 原始数据块迭代器
+            truncate_first: 是否先清空当前用户的记录
 
         Returns:
-            dict: 导入结果统计 {'success': int, 'failed': int, 'total': int}
+            dict: 导入结果统计 {'success', 'failed', 'total', 'elapsed_seconds', 'rows_per_sec'}
         """
         # 创建表(如果不存在)
         self.create_table_if_not_exists()
 
-        session = self.SessionLocal()
+        table = TrainingRecordKeep.__table__
+        # 覆盖写入模式:写入当前用户的影子表,完成后替换该用户的记录
+        target = self.create_staging_table(table) if truncate_first else table
+        insert_stmt = target.insert()
+        now_ts = int(datetime.now().timestamp())
+        success_count = 0
+        total_count = 0
+        started = time.perf_counter()
+
         try:
-            # 覆盖写入模式:先清空表
-            if truncate_first:
-                session.query(TrainingRecordKeep).delete()
-                session.commit()
+            with self.engine.begin() as conn:
+                for chunk in chunks:
+                    total_count += len(chunk)
+                    self.report_progress('parse', total_count, None, f"已读取{total_count}行")
+                    cleaned = self.clean_data(chunk)
+                    if cleaned.empty:
+                        continue
+                    conn.execute(insert_stmt, self._to_parameters(cleaned, now_ts))
+                    success_count += len(cleaned)
 
-            now_ts = int(datetime.now().timestamp())
-            success_count = 0
-            failed_count = 0
-            batch_records = []
+                    elapsed = time.perf_counter() - started
+                    progress_message = f"Keep导入进度: {success_count}/{total_count} 行, {success_count / max(elapsed, 1e-6):.0f} 行/秒"
+                    print(progress_message)
+                    self.report_progress('insert', success_count, None, progress_message)
 
-            for idx, row in df.iterrows():
-                try:
-                    record = TrainingRecordKeep(
-                        user_id='default_user',
-                        exercise_type=row['运动类型'],
-                        duration_seconds=int(row['运动时长(秒)']),
-                        start_time=row['开始时间'].to_pydatetime(),
-                        end_time=row['结束时间'].to_pydatetime(),
-                        calories=int(row['卡路里']) if pd.notna(row['卡路里']) else None,
-                        distance_meters=float(row['运动距离(米)']) if pd.notna(row['运动距离(米)']) else None,
-                        avg_heart_rate=int(row['平均心率']) if pd.notna(row['平均心率']) else None,
-                        max_heart_rate=int(row['最大心率']) if pd.notna(row['最大心率']) else None,
-                        heart_rate_data=str(row['心率记录']) if pd.notna(row['心率记录']) else '[]',
-                        add_ts=now_ts,
-                        last_modify_ts=now_ts,
-                        data_source='keep_import'
-                    )
-
-                    batch_records.append(record)
-                    success_count += 1
+            elapsed = time.perf_counter() - started
+            rows_per_sec = round(success_count / max(elapsed, 1e-6), 1)
+            print(f"Keep导入完成: 成功{success_count}行, 失败{total_count - success_count}行, "
+                  f"耗时{elapsed:.2f}秒, {rows_per_sec} 行/秒")
 
-                    # 批量提交
-                    if len(batch_records) >= self.BATCH_SIZE:
-                        session.bulk_save_objects(batch_records)
-                        session.commit()
-                        batch_records = []
+            if truncate_first:
+                self.replace_user_rows(table, target, success_count)
+                # 该用户的旧记录已被替换,心率分析缓存一并清空
+                get_hr_analytics_cache('keep').invalidate()
+        finally:
+            # 读取/清洗/写入中途出错时删除影子表,下次导入不会继承残留数据
+            if truncate_first:
+                self.drop_staging_table(target)
+        get_record_count_cache().invalidate('keep', self.user_id)
 
-                except Exception as e:
-                    failed_count += 1
-                    session.rollback()
+        return {
+            'success': success_count,
+            'failed': total_count - success_count,
+            'total': total_count,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_sec': rows_per_sec
+        }
 
-            # 提交剩余记录
-            if batch_records:
-                session.bulk_save_objects(batch_records)
-                session.commit()
+    def import_to_database(self, df: pd.DataFrame, truncate_first: bool = False) -> dict:
+        """
+        导入数据到数据库
 
-            return {
-                'success': success_count,
-                'failed': failed_count,
-                'total': len(df)
-            }
+        Args:
+            df: 待导入的DataFrame(未清洗的原始数据)
+            truncate_first: 是否先清空表
 
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+        Returns:
+            dict: 导入结果统计
+        """
+        chunks = (df.iloc[offset:offset + self.BATCH_SIZE] for offset in range(0, len(df), self.BATCH_SIZE))
+        return self.import_chunks(chunks, truncate_first=truncate_first)
 
     def run(self, truncate_first: bool = False) -> dict:
         """
-        执行完整导入流程
+        执行完整导入流程(分块读取 -> 按列清洗 -> 批量插入)
 
         Args:
             truncate_first: 是否覆盖写入
@@ -200,10 +459,7 @@ class KeepDataImporter(BaseImporter):
             dict: 导入结果统计
         """
         try:
-            df = self.load_data()
-            df = self.clean_data(df)
-            result = self.import_to_database(df, truncate_first=truncate_first)
-            return result
+            return self.import_chunks(self.iter_chunks(), truncate_first=truncate_first)
         except Exception as e:
             raise e
 
@@ -212,9 +468,19 @@ class GarminDataImporter(BaseImporter):
     """Garmin数据导入器 - 从Garmin Connect在线抓取"""
 
     BATCH_SIZE = 50  # 每次抓取数量
+    INSERT_BATCH_SIZE = 500  # 全量导入每批插入行数
+    FETCH_CONCURRENCY = 3  # 并发抓取的请求数(速率由自适应令牌桶控制)
     MAX_COUNT = 4000  # 最多抓取数量
 
-    def __init__(self, email: str, password: str, is_cn: bool = True, db_engine=None):
+    def __init__(
+        self,
+        email: str,
+        password: str,
+        is_cn: bool = True,
+        db_engine=None,
+        progress_callback=None,
+        user_id: str = None
+    ):
         """
         初始化Garmin导入器
 
@@ -223,8 +489,10 @@ class GarminDataImporter(BaseImporter):
             password: Garmin账户密码
             is_cn: 是否为中国区账户
             db_engine: SQLAlchemy引擎
+            progress_callback: 进度回调
+            user_id: 导入记录归属的用户
         """
-        super().__init__(db_engine)
+        super().__init__(db_engine, progress_callback, user_id)
         self.email = email
         self.password = password
         self.is_cn = is_cn
@@ -239,50 +507,47 @@ class GarminDataImporter(BaseImporter):
         except Exception as e:
             raise Exception(f"Garmin登录失败: {e}")
 
-    def fetch_activities(self) -> list:
+    @staticmethod
+    def is_running_activity(act: dict) -> bool:
+        """是否为跑步活动(不考虑在跑步机上的运动)"""
+        act_type = act.get('activityType', {}).get('typeKey', '')
+        return 'running' in act_type
+
+    def iter_running_pages(self):
         """
-        抓取训练活动数据
+        并发分页抓取活动,逐页产出过滤后的跑步活动
 
-        Returns:
-            list: 过滤后的跑步活动列表
+        Raises:
+            Exception: 某页多次重试后仍失败
         """
         if not self.client:
             raise Exception("请先登录Garmin")
 
-        all_activities = []
-        start = 0
+        fetcher = ConcurrentActivityFetcher(
+            self.client,
+            page_size=self.BATCH_SIZE,
+            max_count=self.MAX_COUNT,
+            concurrency=self.FETCH_CONCURRENCY
+        )
+        fetched = 0
+        for page in fetcher.iter_pages():
+            fetched += len(page)
+            self.report_progress('fetch', fetched, None, f"已抓取{fetched}条活动")
+            yield [act for act in page if self.is_running_activity(act)]
 
-        while True:
-            try:
-                print(f"[GraminDataImport] 抓取活动数据: {start} ~ {start+self.BATCH_SIZE}")
-                activities = self.client.get_activities(start, self.BATCH_SIZE)
-                if not activities:
-                    break
-                count = len(activities)
-                all_activities.extend(activities)
-                # 翻页
-                start += count
-                # 安全退出机制
-                if count < self.BATCH_SIZE:
-                    # print(f"[GraminDataImport] 最后一批数据不足{self.BATCH_SIZE}，停止抓取: {start}")
-                    break
-                if start >= self.MAX_COUNT:
-                    # print(f"[GraminDataImport] 达到最大抓取数量: {start}")
-                    break
-                # 防止请求过快
-                time.sleep(1)
-            except Exception as e:
-                break
-
-        # 过滤跑步数据
+    def fetch_activities(self) -> list:
+        """
+        抓取训练活动数据
+
+        Returns:
+            list: 过滤后的跑步活动列表(抓取中途失败时返回已抓取的部分)
+        """
         running_activities = []
-        for act in all_activities:
-            act_type = act.get('activityType', {}).get('typeKey', '')
-            # print(f"[GraminDataImport] 活动类型: {act_type}")
-            # if 'running' in act_type or 'treadmill' in act_type:
-            # 不考虑在跑步机上的运动
-            if 'running' in act_type:
-                running_activities.append(act)
+        try:
+            for page in self.iter_running_pages():
+                running_activities.extend(page)
+        except Exception as e:
+            print(f"[GraminDataImport] 抓取中断, 已抓取{len(running_activities)}条跑步活动: {e}")
         return running_activities
 
     def parse_activity(self, act: dict) -> dict:
@@ -377,7 +642,7 @@ class GarminDataImporter(BaseImporter):
 
         # 完全匹配training_records_garmin表结构
         return {
-            'user_id': 'default_user',
+            'user_id': self.user_id,
             'activity_id': activity_id,
             'activity_name': activity_name,
             'sport_type': sport_type,
@@ -438,22 +703,22 @@ class GarminDataImporter(BaseImporter):
         if not activities:
             return {'success': 0, 'failed': 0, 'total': 0}
 
+        # 覆盖写入:写入影子表后替换当前用户的记录
+        if truncate_first:
+            return self._import_full([activities])
+
         # 创建训练记录管理器
-        record_manager = TrainingRecordManager(data_source='garmin')
+        record_manager = TrainingRecordManager(data_source='garmin', user_id=self.user_id)
         # 动态获取SessionLocal，确保使用最新的数据库配置
         SessionLocal = get_session_local()
         session = SessionLocal()
 
         success_count = 0
         failed_count = 0
+        # 成功写入的(开始时间, 训练负荷),用于更新训练负荷模型缓存
+        imported_loads = []
 
         try:
-            # 是否清空表
-            if truncate_first:
-                Model = record_manager.get_model_class()
-                deleted_count = session.query(Model).delete()
-                session.commit()
-
             # 逐条导入
             for i, act in enumerate(activities, 1):
                 try:
@@ -469,12 +734,18 @@ class GarminDataImporter(BaseImporter):
                     session.commit()
 
                     success_count += 1
+                    imported_loads.append((record_data.get('start_time_gmt'), record_data.get('training_load')))
+                    if i % self.BATCH_SIZE == 0 or i == len(activities):
+                        self.report_progress('insert', i, len(activities), f"已写入{success_count}条记录")
 
                 except Exception as e:
                     session.rollback()
                     failed_count += 1
                     continue
 
+            self._update_load_model(imported_loads, full_history=False)
+            get_record_count_cache().invalidate('garmin', self.user_id)
+
             return {
                 'success': success_count,
                 'failed': failed_count,
@@ -487,6 +758,80 @@ class GarminDataImporter(BaseImporter):
         finally:
             session.close()
 
+    def _import_full(self, pages) -> dict:
+        """
+        全量导入: 边抓取边解析写入影子表,校验后替换当前用户的记录
+
+        Args:
+            pages: 活动分页迭代器(每项为一页活动列表)
+
+        Returns:
+            dict: 导入统计
+        """
+        self.create_table_if_not_exists()
+        table = TrainingRecordGarmin.__table__
+
+        staging = self.create_staging_table(table)
+        insert_stmt = staging.insert()
+        total_count = 0
+        failed_count = 0
+        imported_loads = []
+
+        try:
+            with self.engine.begin() as conn:
+                for page in pages:
+                    records = []
+                    for act in page:
+                        try:
+                            record_data = self.parse_activity(act)
+                        except Exception:
+                            record_data = None
+                        if record_data:
+                            records.append(record_data)
+                        else:
+                            failed_count += 1
+                    total_count += len(page)
+
+                    for offset in range(0, len(records), self.INSERT_BATCH_SIZE):
+                        conn.execute(insert_stmt, records[offset:offset + self.INSERT_BATCH_SIZE])
+                    imported_loads.extend((r.get('start_time_gmt'), r.get('training_load')) for r in records)
+                    self.report_progress('insert', len(imported_loads), None, f"已写入{len(imported_loads)}条记录")
+
+            if not imported_loads:
+                return {'success': 0, 'failed': failed_count, 'total': total_count, 'error': '没有可导入的跑步数据'}
+
+            self.replace_user_rows(table, staging, len(imported_loads))
+        finally:
+            # 抓取或写入中途出错(以及没有可导入数据)时删除影子表,下次导入不会继承残留数据
+            self.drop_staging_table(staging)
+
+        self._update_load_model(imported_loads, full_history=True)
+        get_record_count_cache().invalidate('garmin', self.user_id)
+
+        return {
+            'success': len(imported_loads),
+            'failed': failed_count,
+            'total': total_count
+        }
+
+    def _update_load_model(self, imported_loads: list, full_history: bool):
+        """
+        更新训练负荷模型(CTL/ATL/TSB/ACWR)按日缓存
+
+        Args:
+            imported_loads: 本次成功写入的(开始时间, 训练负荷)列表
+            full_history: 是否为清空该用户记录后的全量导入(是则直接重建,否则增量更新)
+        """
+        try:
+            cache = get_load_model_cache('garmin', self.user_id)
+            if full_history:
+                cache.rebuild(imported_loads)
+            else:
+                cache.apply_increment(imported_loads)
+        except Exception as e:
+            # 缓存失败不影响导入结果,查询时会从数据库重建
+            print(f"更新训练负荷模型缓存失败: {e}")
+
     def run(self, truncate_first: bool = True) -> dict:
         """
         执行完整的Garmin数据导入流程
@@ -498,9 +843,14 @@ class GarminDataImporter(BaseImporter):
             dict: 导入统计
         """
         try:
+            self.report_progress('login', message='正在登录Garmin Connect')
             if not self.login():
                 return {'success': 0, 'failed': 0, 'total': 0, 'error': '登录失败'}
 
+            # 全量导入: 抓取与解析写入重叠进行,抓取失败时不切换数据
+            if truncate_first:
+                return self._import_full(self.iter_running_pages())
+
             activities = self.fetch_activities()
             if not activities:
                 return {'success': 0, 'failed': 0, 'total': 0, 'error': '没有可导入的跑步数据'}
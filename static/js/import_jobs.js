@@ -0,0 +1,26 @@
+// 后台导入任务(/api/import_jobs)的轮询与进度显示,设置页和Garmin数据页共用
+
+// 轮询后台导入任务直到结束,onProgress接收每次查询到的任务状态
+async function waitForImportJob(jobId, onProgress) {
+    while (true) {
+        const response = await fetch(`/api/import_jobs/${jobId}`);
+        const result = await response.json();
+        if (!result.success) {
+            throw new Error(result.message);
+        }
+        const job = result.data;
+        if (onProgress) onProgress(job);
+        if (!['pending', 'running'].includes(job.status)) {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
+// 导入进度描述
+function formatImportProgress(job) {
+    const stageNames = {queued: '排队中', login: '登录', fetch: '抓取', parse: '解析', insert: '写入'};
+    const stage = stageNames[job.stage] || job.stage;
+    const count = job.current != null ? (job.total ? ` ${job.current}/${job.total}` : ` ${job.current}`) : '';
+    return `${stage}${count} - ${job.message || ''}`;
+}
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共配置
+测试从仓库根目录导入模块(与各引擎运行时相同的 utils.* / models.* 路径)
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+
+@pytest.fixture
+def training_db(tmp_path):
+    """
+    临时SQLite训练库(已执行迁移)
+
+    训练数据工具、路由和导入器绑定到该库,派生缓存指向临时目录,不读写仓库的data目录
+    """
+    from benchmarks.db_binding import bind_database, reset_derived_caches, use_placeholder_db_config
+    use_placeholder_db_config()
+    from models.migrations import upgrade
+    from utils.db_backend import create_database_engine
+    import routes.training_data  # noqa: F401  bind_database按名字替换路由模块的SessionLocal
+
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'training.sqlite3'}")
+    upgrade(engine)
+    bind_database(engine)
+    reset_derived_caches(tmp_path / "cache")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def training_client(training_db):
+    """挂载训练数据路由的Flask测试客户端"""
+    from flask import Flask
+    from routes.training_data import training_data_bp
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(training_data_bp)
+    return app.test_client()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""搜索内容存储(SimHash近似去重、跨段落引用)测试"""
+
+from types import SimpleNamespace
+
+from utils.content_store import ContentStore, hamming_distance, simhash
+from utils.search_store import ContentPool, content_hash
+
+ARTICLE = (
+    "Tapering before a marathon usually lasts two to three weeks. Runners reduce weekly volume by "
+    "forty to sixty percent while keeping some race pace work, which preserves fitness and lets "
+    "accumulated fatigue dissipate before race day. Long runs shrink first, then midweek mileage, "
+    "and the final week keeps only short strides and one short tempo effort. Sleep, carbohydrate "
+    "intake and hydration matter as much as the reduced training load, and most runners feel "
+    "sluggish in the first days of the taper before freshness returns ahead of the race."
+)
+OTHER = (
+    "Heart rate variability is a measure of the variation in time between heartbeats. Coaches use "
+    "morning readings to judge recovery status and adjust the intensity of the day's session."
+)
+
+
+def test_simhash_near_duplicates_are_close_and_unrelated_text_is_far():
+    reformatted = ARTICLE.replace("Tapering", "TAPERING").replace(",", " ,")
+    assert simhash(reformatted) == simhash(ARTICLE)
+    assert hamming_distance(simhash(ARTICLE), simhash(ARTICLE + " Reposted.")) <= 3
+    assert hamming_distance(simhash(ARTICLE), simhash(OTHER)) > 10
+    assert simhash("ab") == 0
+    assert simhash(ARTICLE) == simhash(ARTICLE)
+
+
+def test_add_dedupes_by_url_and_near_duplicate_content():
+    store = ContentStore()
+    first, is_new = store.add({'url': 'https://site.com/taper?utm_source=x', 'title': 'Taper', 'content': ARTICLE}, 0)
+    assert (first, is_new) == ('S1', True)
+    assert store.add({'url': 'http://www.site.com/taper/', 'content': 'different text'}, 1) == ('S1', False)
+    assert store.add({'url': 'https://mirror.com/copy', 'content': ARTICLE + " Reposted."}, 1) == ('S1', False)
+    # 转载的URL也指向原内容
+    assert store.add({'url': 'https://mirror.com/copy', 'content': ''}, 2) == ('S1', False)
+    assert store.add({'url': 'https://hrv.com', 'content': OTHER}, 1) == ('S2', True)
+    assert store.stats() == {'unique': 2, 'duplicates': 3, 'summarized': 0}
+
+
+def test_short_content_without_url_is_never_merged():
+    store = ContentStore()
+    assert store.add({'content': 'short'}, 0)[1]
+    assert store.add({'content': 'short'}, 0)[1]
+    assert len(store) == 2
+
+
+def test_prepare_for_prompt_sends_new_content_once_and_references_summarized():
+    store = ContentStore()
+    results = [
+        {'url': 'https://site.com/taper', 'title': 'Taper', 'content': ARTICLE},
+        {'url': 'https://site.com/taper#again', 'title': 'Taper', 'content': ARTICLE},
+        {'url': 'https://hrv.com', 'title': 'HRV', 'content': OTHER},
+    ]
+    fresh, references = store.prepare_for_prompt(results, paragraph_index=0)
+    assert [r['content_id'] for r in fresh] == ['S1', 'S2']
+    assert references == []
+
+    store.mark_summarized(fresh[:1])
+    assert store.is_summarized('S1') and not store.is_summarized('S2') and not store.is_summarized(None)
+
+    fresh, references = store.prepare_for_prompt(results, paragraph_index=0)
+    assert [r['content_id'] for r in fresh] == ['S2']
+    assert references == ["[S1] 《Taper》(已在本段此前的总结中使用)"]
+
+    _, references = store.prepare_for_prompt(results[:1], paragraph_index=3)
+    assert references[0].startswith("[S1] 《Taper》(已在其他段落中使用,摘录: Tapering before")
+
+
+def test_restore_marks_checkpointed_searches_summarized():
+    def paragraph(*searches):
+        history = [SimpleNamespace(to_dict=lambda s=s: s) for s in searches]
+        return SimpleNamespace(research=SimpleNamespace(search_history=history))
+
+    store = ContentStore()
+    store.restore([
+        paragraph({'url': 'https://site.com/taper', 'title': 'Taper', 'content': ARTICLE}),
+        paragraph({'url': 'https://hrv.com', 'title': 'HRV', 'content': OTHER}),
+    ])
+    assert store.stats() == {'unique': 2, 'duplicates': 0, 'summarized': 2}
+    assert store.get('S2').paragraph_index == 1
+
+
+def test_content_kept_once_in_shared_pool():
+    pool = ContentPool()
+    pool.put(ARTICLE)
+    store = ContentStore(pool)
+    content_id, _ = store.add({'url': 'https://site.com/taper', 'title': 'Taper', 'content': ARTICLE}, 0)
+    item = store.get(content_id)
+    assert not hasattr(item, 'content')
+    assert item.content_key == content_hash(ARTICLE)
+    assert len(pool) == 1
+    assert store.add({'url': 'https://empty.com', 'content': ''}, 0)[0] == 'S2'
+    assert store.get('S2').content_key is None
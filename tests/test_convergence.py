@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""反思循环收敛检测测试"""
+
+from utils.convergence import (
+    ReflectionConvergence,
+    query_similarity,
+    result_key,
+    summary_change,
+)
+
+
+class _Search:
+    """只提供to_dict的搜索记录"""
+
+    def __init__(self, query, url, title="", content=""):
+        self._data = {'query': query, 'url': url, 'title': title, 'content': content}
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+def test_query_similarity_normalizes_width_case_and_spaces():
+    assert query_similarity("马拉松 减量期", "马拉松减量期") == 1.0
+    assert query_similarity("Marathon Taper", "marathon  taper") == 1.0
+    assert query_similarity("ＡＢＣ", "abc") == 1.0
+    assert query_similarity("马拉松减量期", "游泳换气技巧") == 0.0
+    assert query_similarity("", "马拉松") == 0.0
+    assert query_similarity("跑", "跑") == 1.0
+
+
+def test_summary_change_bounds():
+    assert summary_change("相同的总结", "相同的总结") == 0.0
+    assert summary_change("", "新总结") == 1.0
+    assert summary_change("旧总结", "") == 1.0
+    assert 0.0 < summary_change("减量期跑量减少四成", "减量期跑量减少五成") < 0.2
+
+
+def test_result_key_prefers_content_id_then_url_then_hash():
+    assert result_key({'content_id': 'c1', 'url': 'https://a.com/x'}) == 'c1'
+    assert result_key({'url': 'https://www.A.com/x/?utm_source=feed#top'}) == \
+        result_key({'url': 'http://a.com/x'})
+    by_text = result_key({'title': '标题', 'content': '内容'})
+    assert by_text == result_key({'url': '', 'title': '标题', 'content': '内容'})
+    assert by_text != result_key({'title': '标题', 'content': '其他内容'})
+
+
+def test_check_queries_requires_every_query_to_repeat():
+    convergence = ReflectionConvergence([_Search("马拉松减量期训练安排", "https://a.com/1")])
+    assert convergence.check_queries(["马拉松 减量期训练安排"]) is not None
+    assert convergence.check_queries(["马拉松减量期训练安排", "力量训练周期化"]) is None
+    assert convergence.check_queries([]) is None
+    # 阈值为0时不检查;没有之前的查询时不检查
+    assert ReflectionConvergence([_Search("q", "u")], query_threshold=0).check_queries(["q"]) is None
+    assert ReflectionConvergence().check_queries(["马拉松"]) is None
+
+
+def test_check_results_with_seen_urls_and_extra_predicate():
+    convergence = ReflectionConvergence([_Search("q", "https://a.com/1")])
+    assert convergence.check_results([{'url': 'https://www.a.com/1/'}]) is not None
+    assert convergence.check_results([{'url': 'https://a.com/1'}, {'url': 'https://a.com/2'}]) is None
+    assert convergence.check_results(
+        [{'url': 'https://a.com/1'}, {'url': 'https://a.com/2'}],
+        is_seen=lambda result: result['url'].endswith('/2')) is not None
+
+
+def test_check_results_empty_is_not_convergence():
+    # 搜索失败也表现为空结果,不能据此提前结束反思
+    assert ReflectionConvergence([_Search("q", "https://a.com/1")]).check_results([]) is None
+    assert ReflectionConvergence().check_results([]) is None
+
+
+def test_check_summary_threshold():
+    convergence = ReflectionConvergence(min_summary_change=0.05)
+    assert convergence.check_summary("减量期跑量减少四成。", "减量期跑量减少四成。") is not None
+    assert convergence.check_summary("减量期跑量减少四成。", "减量期跑量减少四成,同时保留比赛配速训练。") is None
+    assert ReflectionConvergence(min_summary_change=0).check_summary("a", "a") is None
+
+
+def test_record_round_feeds_later_checks():
+    convergence = ReflectionConvergence()
+    convergence.record_round(["减量期跑量"], [{'url': 'https://a.com/1'}])
+    convergence.record_round(["减量期跑量"], [])
+    assert convergence.prior_queries == ["减量期跑量"]
+    assert convergence.check_queries(["减量期 跑量"]) is not None
+    assert convergence.check_results([{'url': 'https://a.com/1'}]) is not None
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""健康检查(并发截止时间、stale-while-revalidate缓存)测试"""
+
+import threading
+import time
+
+import pytest
+
+import utils.health_check as health_check
+from utils.health_check import HealthChecker, invalidate_health_cache, run_health_check
+
+
+def _ok(name):
+    return {'name': name, 'status': 'success', 'message': '', 'details': None}
+
+
+@pytest.fixture
+def fake_checks(monkeypatch):
+    """把各项检查替换为立即成功的桩,返回可按需覆盖的HealthChecker"""
+    for method in ('check_python_environment', 'check_config_file', 'check_llm_config',
+                   'check_llm_api_connection', 'check_search_api_config', 'check_mysql_config'):
+        monkeypatch.setattr(HealthChecker, method, lambda self, _m=method: _ok(_m))
+    monkeypatch.setattr(HealthChecker, 'check_mysql', lambda self: {
+        'mysql_connection': _ok('mysql_connection'),
+        'database_tables': _ok('database_tables'),
+    })
+    return HealthChecker
+
+
+def test_run_all_checks_keeps_order_and_summary(fake_checks):
+    result = HealthChecker().run_all_checks()
+    assert list(result['checks']) == ['python_env', 'config_file', 'llm_config', 'llm_api', 'search_api',
+                                      'mysql_config', 'mysql_connection', 'database_tables']
+    assert result['overall_status'] == 'ready'
+    assert result['summary'] == {'success': 8, 'warning': 0, 'error': 0}
+
+
+def test_slow_network_checks_time_out_in_parallel(fake_checks, monkeypatch):
+    release = threading.Event()
+
+    def hang(self):
+        release.wait(5)
+        return _ok('late')
+
+    monkeypatch.setattr(HealthChecker, 'check_llm_api_connection', hang)
+    monkeypatch.setattr(HealthChecker, 'check_mysql', hang)
+    monkeypatch.setattr(health_check, 'CHECK_DEADLINES', {'llm_api': 0.2, 'mysql': 0.2})
+    started = time.monotonic()
+    try:
+        result = HealthChecker().run_all_checks()
+    finally:
+        release.set()
+    # 两项检查共享截止时间,总耗时约等于单项上限而不是两项之和
+    assert time.monotonic() - started < 0.35
+    assert result['checks']['llm_api']['status'] == 'error'
+    assert result['checks']['mysql_connection']['status'] == 'error'
+    assert result['overall_status'] == 'needs_config'
+
+
+@pytest.fixture
+def counted_checks(monkeypatch):
+    calls = []
+
+    def run_all_checks(self):
+        calls.append(time.time())
+        return {'overall_status': 'ready', 'checks': {}, 'summary': {}, 'checked_at': time.time()}
+
+    monkeypatch.setattr(HealthChecker, 'run_all_checks', run_all_checks)
+    invalidate_health_cache()
+    yield calls
+    invalidate_health_cache()
+
+
+def test_fresh_cache_is_reused(counted_checks):
+    first = run_health_check()
+    assert run_health_check() is first
+    assert len(counted_checks) == 1
+    run_health_check(force_refresh=True)
+    assert len(counted_checks) == 2
+    invalidate_health_cache()
+    run_health_check()
+    assert len(counted_checks) == 3
+
+
+def test_stale_cache_is_served_while_refreshing(counted_checks):
+    stale = run_health_check()
+    stale['checked_at'] -= health_check.HEALTH_CACHE_TTL + 1
+    assert run_health_check() is stale
+    for _ in range(100):
+        if len(counted_checks) == 2 and not health_check._refreshing:
+            break
+        time.sleep(0.01)
+    assert len(counted_checks) == 2
+    assert run_health_check() is not stale
+
+
+def test_expired_cache_is_recomputed_synchronously(counted_checks):
+    expired = run_health_check()
+    expired['checked_at'] -= health_check.HEALTH_CACHE_STALE_TTL + 1
+    assert run_health_check() is not expired
+    assert len(counted_checks) == 2
+
+
+def test_refresh_started_before_invalidation_is_discarded(counted_checks, monkeypatch):
+    stale = run_health_check()
+    stale['checked_at'] -= health_check.HEALTH_CACHE_TTL + 1
+    started, release = threading.Event(), threading.Event()
+
+    def slow_run_all_checks(self):
+        started.set()
+        release.wait(5)
+        return {'overall_status': 'ready', 'checks': {}, 'summary': {}, 'checked_at': time.time()}
+
+    monkeypatch.setattr(HealthChecker, 'run_all_checks', slow_run_all_checks)
+    assert run_health_check() is stale
+    assert started.wait(5)
+    invalidate_health_cache()
+    release.set()
+    for _ in range(100):
+        if not health_check._refreshing:
+            break
+        time.sleep(0.01)
+    assert health_check._cached_result is None
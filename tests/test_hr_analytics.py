@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""心率时间序列分析(解码、区间、TRIMP、缓存)测试"""
+
+import json
+
+import numpy as np
+import pytest
+
+from utils.hr_analytics import (
+    HeartRateAnalyticsCache,
+    compute_hr_metrics,
+    decode_hr_series,
+    pack_hr_series,
+    summarize_hr_metrics,
+)
+
+
+def test_decode_accepts_json_list_and_packed_bytes():
+    series = [120, 130, 140, 150]
+    from_json = decode_hr_series(json.dumps(series))
+    from_list = decode_hr_series(series)
+    from_bytes = decode_hr_series(pack_hr_series(from_json))
+    for decoded in (from_json, from_list, from_bytes):
+        assert decoded.tolist() == series
+
+
+@pytest.mark.parametrize("raw", [None, "", "   ", "not json", "{}", "[[1, 2], [3, 4]]", 42])
+def test_decode_invalid_input_returns_empty(raw):
+    assert decode_hr_series(raw).shape == (0,)
+
+
+def test_decode_drops_noise_and_missing_points():
+    decoded = decode_hr_series([None, "", 10, 120, "130", 300, float("nan"), 140])
+    assert decoded.tolist() == [120.0, 130.0, 140.0]
+
+
+def test_metrics_require_two_samples():
+    assert compute_hr_metrics(np.array([150.0]), 60) == {}
+
+
+def test_trimp_matches_banister_formula():
+    hr = np.full(60, 150.0)
+    metrics = compute_hr_metrics(hr, duration_seconds=3600, max_hr=190, resting_hr=60)
+    hrr = (150 - 60) / (190 - 60)
+    expected = 60 * hrr * 0.64 * np.exp(1.92 * hrr)
+    assert metrics['trimp'] == pytest.approx(round(expected, 1))
+    assert metrics['sample_interval_s'] == 60.0
+    assert metrics['cardiac_drift_pct'] == 0.0
+
+
+def test_zone_seconds_cover_whole_session():
+    hr = np.array([100.0, 115.0, 135.0, 155.0, 175.0] * 12)
+    metrics = compute_hr_metrics(hr, duration_seconds=600, max_hr=190)
+    # 100 < 0.6*190 → Z1, 115 → Z2, 135 → Z3, 155 → Z4, 175 → Z5
+    assert metrics['hr_zone_seconds'] == [120] * 5
+    assert sum(metrics['hr_zone_percent']) == pytest.approx(100.0)
+
+
+def test_recovery_and_drift():
+    hr = np.concatenate([np.full(60, 140.0), np.full(60, 160.0), np.full(60, 120.0)])
+    metrics = compute_hr_metrics(hr, duration_seconds=180)
+    assert metrics['hr_recovery_60s'] == 40
+    assert metrics['cardiac_drift_pct'] is not None
+
+
+def test_summarize_empty_and_mixed():
+    assert summarize_hr_metrics([{}, {}])['hr_analyzed_sessions'] == 0
+    first = compute_hr_metrics(np.full(10, 150.0), 600)
+    second = compute_hr_metrics(np.full(10, 170.0), 600)
+    summary = summarize_hr_metrics([first, {}, second])
+    assert summary['hr_analyzed_sessions'] == 2
+    assert summary['total_trimp'] == pytest.approx(first['trimp'] + second['trimp'], abs=0.1)
+    assert summary['hr_zone_seconds'] == [a + b for a, b in zip(first['hr_zone_seconds'], second['hr_zone_seconds'])]
+
+
+def test_cache_hits_skip_loading_and_version_change_recomputes(tmp_path):
+    cache = HeartRateAnalyticsCache(cache_dir=tmp_path)
+    loaded = []
+
+    def load_series(ids):
+        loaded.append(list(ids))
+        return {activity_id: json.dumps([140, 150, 160]) for activity_id in ids}
+
+    first = cache.analyze_many([(1, 100, 180), (2, 100, 180)], load_series)
+    assert loaded == [[1, 2]]
+
+    # 新实例从磁盘读取指标缓存,不再加载原始序列
+    reloaded = HeartRateAnalyticsCache(cache_dir=tmp_path)
+    assert reloaded.analyze_many([(1, 100, 180), (2, 100, 180)], load_series) == first
+    assert loaded == [[1, 2]]
+
+    # 版本变化后重新计算
+    reloaded.analyze_many([(1, 101, 180)], load_series)
+    assert loaded[-1] == [1]
+
+
+def test_sidecar_serves_series_without_raw_data(tmp_path):
+    cache = HeartRateAnalyticsCache(cache_dir=tmp_path)
+    metrics = cache.analyze(7, 1, json.dumps([140, 150, 160]), 180)
+
+    # 指标未写盘,新实例只能从uint8旁路文件恢复序列
+    fresh = HeartRateAnalyticsCache(cache_dir=tmp_path)
+    assert fresh.analyze(7, 1, None, 180) == metrics
+
+    fresh.invalidate(7)
+    assert not list((tmp_path / "hr_series_keep").glob("7_*.u8"))
+    assert fresh.analyze(7, 1, None, 180) == {}
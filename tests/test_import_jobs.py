@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""后台导入任务管理测试: 同一数据源互斥、准备步骤与提交的原子性"""
+
+import threading
+
+import pytest
+
+from utils.import_jobs import STATUS_SUCCEEDED, ImportJobConflict, ImportJobManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ImportJobManager(history_file=tmp_path / 'import_jobs.json')
+    yield manager
+    manager._executor.shutdown(wait=True)
+
+
+def test_prepare_skipped_when_source_busy(manager):
+    release = threading.Event()
+    prepared = []
+    first = manager.submit('keep', 'excel_upload', lambda report: release.wait(5) and {'success': 1},
+                           prepare=lambda: prepared.append('first'))
+
+    with pytest.raises(ImportJobConflict) as excinfo:
+        manager.submit('keep', 'excel_upload', lambda report: {}, prepare=lambda: prepared.append('second'))
+    assert excinfo.value.job['job_id'] == first['job_id']
+    # 其他数据源不受影响
+    manager.submit('garmin', 'garmin_sync', lambda report: {'success': 0}, prepare=lambda: prepared.append('garmin'))
+    assert prepared == ['first', 'garmin']
+
+    release.set()
+    manager._executor.shutdown(wait=True)
+    assert manager.get_job(first['job_id'])['status'] == STATUS_SUCCEEDED
+
+
+def test_failed_prepare_does_not_register_job(manager):
+    def broken():
+        raise OSError("磁盘已满")
+
+    with pytest.raises(OSError):
+        manager.submit('keep', 'excel_upload', lambda report: {}, prepare=broken)
+    assert manager.list_jobs() == []
+    assert manager.get_active_job('keep') is None
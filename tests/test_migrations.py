@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""训练数据库版本化迁移测试"""
+
+import pytest
+from sqlalchemy import inspect
+
+from models.migrations import (
+    COMPOSITE_INDEXES,
+    LATEST_VERSION,
+    TRAINING_TABLES,
+    applied_versions,
+    current_version,
+    partition_by_user,
+    upgrade,
+    user_partition_count,
+    verify_query_plans,
+)
+from utils.db_backend import create_database_engine
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'training.sqlite3'}")
+    yield engine
+    engine.dispose()
+
+
+def _index_names(engine, table_name):
+    return {index['name'] for index in inspect(engine).get_indexes(table_name)}
+
+
+def test_upgrade_is_idempotent(sqlite_engine):
+    assert current_version(sqlite_engine) == 0
+    assert upgrade(sqlite_engine, verbose=False) == [version for version in range(1, LATEST_VERSION + 1)]
+    assert upgrade(sqlite_engine, verbose=False) == []
+    assert applied_versions(sqlite_engine) == list(range(1, LATEST_VERSION + 1))
+
+    for table in TRAINING_TABLES:
+        assert inspect(sqlite_engine).has_table(table.name)
+        assert set(COMPOSITE_INDEXES[table.name]) <= _index_names(sqlite_engine, table.name)
+
+
+def test_upgrade_to_target_then_latest(sqlite_engine):
+    assert upgrade(sqlite_engine, target=1, verbose=False) == [1]
+    assert current_version(sqlite_engine) == 1
+    for table in TRAINING_TABLES:
+        assert not set(COMPOSITE_INDEXES[table.name]) & _index_names(sqlite_engine, table.name)
+
+    assert upgrade(sqlite_engine, verbose=False) == [2]
+    for table in TRAINING_TABLES:
+        assert set(COMPOSITE_INDEXES[table.name]) <= _index_names(sqlite_engine, table.name)
+
+
+def test_composite_indexes_added_to_existing_tables(sqlite_engine):
+    # 迁移表出现之前由create_all建好的库: 版本1跳过已有表,版本2只补建缺少的索引
+    for table in TRAINING_TABLES:
+        table.create(sqlite_engine)
+    assert upgrade(sqlite_engine, verbose=False) == [1, 2]
+    assert current_version(sqlite_engine) == LATEST_VERSION
+
+
+def test_query_plans_use_composite_indexes(sqlite_engine):
+    upgrade(sqlite_engine, verbose=False)
+    results = verify_query_plans(sqlite_engine)
+    assert results
+    assert [item['name'] for item in results if not item['ok']] == []
+
+
+def test_partition_requires_mysql(sqlite_engine):
+    assert user_partition_count(sqlite_engine, TRAINING_TABLES[0].name) == 0
+    with pytest.raises(ValueError):
+        partition_by_user(sqlite_engine, verbose=False)
+
+
+def test_upgrade_on_duckdb(tmp_path):
+    pytest.importorskip("duckdb_engine")
+    engine = create_database_engine(f"duckdb:///{tmp_path / 'training.duckdb'}")
+    try:
+        assert upgrade(engine, verbose=False) == [1, 2]
+        assert upgrade(engine, verbose=False) == []
+        assert verify_query_plans(engine) == []
+    finally:
+        engine.dispose()
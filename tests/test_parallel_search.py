@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""段落级并发搜索(URL规范化、并发执行、轮转合并、查询去重)测试"""
+
+import threading
+import time
+
+import pytest
+
+from utils.parallel_search import dedupe_queries, merge_search_results, normalize_url, run_searches_concurrently
+
+
+@pytest.mark.parametrize("a, b", [
+    ("https://www.Example.com/path/", "http://example.com/path"),
+    ("https://example.com/a?utm_source=x&b=2&a=1#top", "https://example.com/a?a=1&b=2"),
+    ("https://example.com", "https://example.com/"),
+    ("https://example.com:443/x", "https://example.com/x"),
+])
+def test_normalize_url_equivalences(a, b):
+    assert normalize_url(a) == normalize_url(b)
+
+
+def test_normalize_url_keeps_distinct_pages_apart():
+    assert normalize_url("https://example.com/a?id=1") != normalize_url("https://example.com/a?id=2")
+    assert normalize_url("https://example.com:8080/a") != normalize_url("https://example.com/a")
+    assert normalize_url("") == ""
+
+
+def test_run_concurrently_preserves_order_and_isolates_failures():
+    barrier = threading.Barrier(3, timeout=2)
+
+    def search(query):
+        barrier.wait()  # 三个搜索必须同时在执行,串行时会超时
+        if query == 'bad':
+            raise RuntimeError("boom")
+        return query.upper()
+
+    results = run_searches_concurrently(['a', 'bad', 'c'], search, max_workers=3)
+    assert results == [('a', 'A'), ('bad', None), ('c', 'C')]
+
+
+def test_run_serially_with_single_worker():
+    active = []
+    peak = []
+
+    def search(query):
+        active.append(query)
+        peak.append(len(active))
+        time.sleep(0.01)
+        active.remove(query)
+        return query
+
+    assert run_searches_concurrently(['a', 'b', 'c'], search, max_workers=1) == [('a', 'a'), ('b', 'b'), ('c', 'c')]
+    assert max(peak) == 1
+    assert run_searches_concurrently([], search) == []
+
+
+def test_merge_round_robin_dedupes_and_keeps_longer_content():
+    first = [{'url': 'https://a.com/1', 'content': 'short'}, {'url': 'https://a.com/2', 'content': 'x'}]
+    second = [{'url': 'https://www.a.com/1/', 'content': 'much longer content'}, {'url': 'https://b.com', 'content': 'y'}]
+    third = [{'url': '', 'content': 'no url'}, {'url': '', 'content': 'no url either'}]
+
+    merged = merge_search_results([first, second, third])
+    assert [r['content'] for r in merged] == ['much longer content', 'no url', 'x', 'y', 'no url either']
+    assert len(merge_search_results([first, second, third], max_results=2)) == 2
+    assert merge_search_results([]) == []
+
+
+def test_dedupe_queries():
+    assert dedupe_queries(['Taper  Week', 'taper week', '', '  ', 'VO2max'], limit=5) == ['Taper  Week', 'VO2max']
+    assert dedupe_queries([('web', 'a'), ('news', 'a'), ('web', 'A')], limit=5) == [('web', 'a'), ('news', 'a')]
+    assert dedupe_queries(['a', 'b', 'c'], limit=1) == ['a']
+
+
+def test_search_prompts_ask_for_extra_queries_only_when_parallel():
+    from MediaEngine.prompts import (
+        SYSTEM_PROMPT_FIRST_SEARCH,
+        SYSTEM_PROMPT_REFLECTION,
+        get_first_search_prompt,
+        get_reflection_prompt,
+    )
+    assert get_first_search_prompt() is SYSTEM_PROMPT_FIRST_SEARCH
+    assert get_reflection_prompt(1) is SYSTEM_PROMPT_REFLECTION
+    assert '"searches"' not in SYSTEM_PROMPT_FIRST_SEARCH + SYSTEM_PROMPT_REFLECTION
+    for prompt in (get_first_search_prompt(3), get_reflection_prompt(3)):
+        assert '"searches"' in prompt and '最多3个' in prompt
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""稳定前缀提示词组装与LLM用量统计测试"""
+
+import json
+import threading
+from types import SimpleNamespace
+
+from utils.llm_usage import LLMUsageStats, extract_usage
+from utils.prompt_layout import SECTION_SEPARATOR, build_user_message, dumps_payload, order_payload
+
+
+def _payload(**overrides):
+    data = {
+        'search_results': ["结果一", "结果二"],
+        'search_query': "减量期跑量",
+        'paragraph_latest_state': "上一版总结",
+        'content': "减量期的跑量安排",
+        'title': "跑量",
+        'extra': 1,
+    }
+    data.update(overrides)
+    return data
+
+
+def test_order_payload_puts_plan_first_and_volatile_last():
+    assert list(order_payload(_payload())) == [
+        'title', 'content', 'extra', 'paragraph_latest_state', 'search_query', 'search_results']
+    assert list(order_payload({'b': 1, 'a': 2})) == ['a', 'b']
+
+
+def test_dumps_payload_is_independent_of_insertion_order():
+    data = _payload()
+    reversed_data = dict(reversed(list(data.items())))
+    assert dumps_payload(data) == dumps_payload(reversed_data)
+    assert json.loads(dumps_payload(data)) == data
+    assert "减量期" in dumps_payload(data)
+    assert dumps_payload("原样字符串") == "原样字符串"
+    assert dumps_payload([1, "二"]) == '[1, "二"]'
+
+
+def test_rounds_of_same_paragraph_share_prefix():
+    first = build_user_message(_payload(), guidance="HOST发言")
+    second = build_user_message(_payload(paragraph_latest_state="新总结", search_query="新查询"),
+                                guidance="HOST发言")
+    prefix = 'HOST发言' + SECTION_SEPARATOR + dumps_payload({'title': "跑量", 'content': "减量期的跑量安排"})[:-1]
+    assert first.startswith(prefix) and second.startswith(prefix)
+
+
+def test_build_user_message_sections():
+    assert build_user_message({'title': 't'}) == '{"title": "t"}'
+    assert build_user_message({'title': 't'}, guidance="  引导 ", trailing_context="【当前日期】") == \
+        SECTION_SEPARATOR.join(["引导", '{"title": "t"}', "【当前日期】"])
+    # 空白的引导和上下文不产生多余的分隔符
+    assert build_user_message({'title': 't'}, guidance=" \n", trailing_context="") == '{"title": "t"}'
+
+
+def test_extract_usage_provider_fields():
+    openai_style = SimpleNamespace(prompt_tokens=100, completion_tokens=20,
+                                   prompt_tokens_details=SimpleNamespace(cached_tokens=64))
+    assert extract_usage(openai_style) == {'prompt_tokens': 100, 'completion_tokens': 20, 'cached_tokens': 64}
+    deepseek = {'prompt_tokens': 100, 'completion_tokens': 20, 'prompt_cache_hit_tokens': 32,
+                'prompt_tokens_details': None}
+    assert extract_usage(deepseek)['cached_tokens'] == 32
+    assert extract_usage({'prompt_tokens': 10, 'cache_read_input_tokens': 8})['cached_tokens'] == 8
+    assert extract_usage(None) == {'prompt_tokens': 0, 'completion_tokens': 0, 'cached_tokens': 0}
+    assert extract_usage({'prompt_tokens': 'n/a'})['prompt_tokens'] == 0
+
+
+def test_usage_stats_accumulate_and_reset():
+    stats = LLMUsageStats()
+    assert stats.snapshot()['cache_hit_ratio'] == 0.0
+    stats.record({'prompt_tokens': 100, 'completion_tokens': 10, 'prompt_cache_hit_tokens': 50})
+    stats.record({'prompt_tokens': 100, 'completion_tokens': 10})
+    snapshot = stats.snapshot()
+    assert (snapshot['calls'], snapshot['prompt_tokens'], snapshot['cached_tokens'],
+            snapshot['cache_hit_calls']) == (2, 200, 50, 1)
+    assert snapshot['cache_hit_ratio'] == 0.25
+    assert "缓存命中 50, 25.0%" in stats.format_summary()
+    stats.reset()
+    assert stats.snapshot()['calls'] == 0
+
+
+def test_usage_stats_thread_safe():
+    stats = LLMUsageStats()
+    threads = [threading.Thread(target=lambda: [stats.record({'prompt_tokens': 1}) for _ in range(500)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stats.snapshot()['prompt_tokens'] == 4000
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""搜索结果token预算打包测试"""
+
+import pytest
+
+import utils.prompt_packer as prompt_packer
+from utils.prompt_packer import (
+    MIN_ITEM_TOKENS,
+    TRUNCATION_MARK,
+    estimate_tokens,
+    pack_search_results,
+    truncate_text,
+    truncate_to_tokens,
+)
+
+CHINESE = "马拉松减量期通常持续两到三周。期间跑量减少四到六成，但保留部分比赛配速训练！这样既能保持体能，又能消除疲劳。" * 8
+ENGLISH = ("Tapering lasts two to three weeks. Volume drops by half while some race pace work remains. "
+           "Fatigue dissipates and fitness is preserved. ") * 8
+
+
+def test_estimate_tokens_fallback_counts_cjk_per_character(monkeypatch):
+    monkeypatch.setattr(prompt_packer, '_ENCODING', None)
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("马拉松") == 3
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("跑步abcd") == 3
+
+
+def test_truncate_text_prefers_chinese_sentence_boundary():
+    text = "第一句话很长很长很长。第二句话也很长很长很长。第三句"
+    assert truncate_text(text, 15) == "第一句话很长很长很长。" + TRUNCATION_MARK
+    # 句子边界太靠前(保留不足六成)时不在句末截断
+    assert truncate_text(text, 20) == text[:20] + TRUNCATION_MARK
+    assert truncate_text(text, 100) == text
+
+
+def test_truncate_text_falls_back_to_space_then_hard_cut():
+    assert truncate_text("word " * 20, 23) == "word word word word" + TRUNCATION_MARK
+    assert truncate_text("x" * 50, 10) == "x" * 10 + TRUNCATION_MARK
+
+
+@pytest.mark.parametrize("text", [CHINESE, ENGLISH])
+@pytest.mark.parametrize("budget", [5, 40, 120])
+def test_truncate_to_tokens_stays_within_budget(text, budget):
+    truncated = truncate_to_tokens(text, budget)
+    assert estimate_tokens(truncated) <= budget
+    assert truncate_to_tokens(text, 10 ** 6) == text
+
+
+def _results(*contents, scores=None):
+    return [{'title': f"t{i}", 'content': content, **({'score': scores[i]} if scores else {})}
+            for i, content in enumerate(contents)]
+
+
+def render(result, content):
+    return f"标题: {result['title']}\n内容: {content}"
+
+
+@pytest.mark.parametrize("budget", [MIN_ITEM_TOKENS * 3, 600, 1200])
+def test_pack_stays_within_budget_and_keeps_order(budget):
+    results = _results(CHINESE, ENGLISH, CHINESE[:40], ENGLISH)
+    packed, report = pack_search_results(results, budget, render=render)
+    assert report.used_tokens == sum(estimate_tokens(text) for text in packed)
+    assert report.used_tokens <= budget
+    titles = [text.split('\n')[0] for text in packed]
+    assert titles == sorted(titles)
+    assert report.kept + len(report.dropped) == len(results)
+
+
+def test_pack_drops_lowest_relevance_when_budget_is_too_small():
+    results = _results(ENGLISH, ENGLISH, ENGLISH, scores=[0.2, 0.9, 0.5])
+    packed, report = pack_search_results(results, MIN_ITEM_TOKENS * 2, render=render)
+    assert report.dropped == ['t0']
+    assert [text.split('\n')[0] for text in packed] == ['标题: t1', '标题: t2']
+
+
+def test_short_results_are_kept_whole_and_free_budget_for_long_ones():
+    short = "减量期两到三周。"
+    results = _results(short, CHINESE)
+    packed, report = pack_search_results(results, 300, render=render)
+    assert packed[0] == render(results[0], short)
+    assert report.trimmed == ['t1']
+    assert report.used_tokens <= 300
+
+
+def test_pack_applies_max_length_and_skips_empty_content():
+    results = _results("", ENGLISH)
+    packed, report = pack_search_results(results, 10 ** 6, max_length=100)
+    assert len(packed) == 1
+    assert len(packed[0]) <= 100 + len(TRUNCATION_MARK)
+    assert report.trimmed == ['t1']
+    assert "1条结果" in report.summary()
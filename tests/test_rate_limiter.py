@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""自适应令牌桶与Garmin并发分页抓取测试"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from scripts.garmin_fetcher import ConcurrentActivityFetcher
+from utils.rate_limiter import AdaptiveTokenBucket, get_retry_after, get_status_code
+
+
+class HTTPError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        headers = {'Retry-After': retry_after} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status, headers=headers)
+
+
+def test_bucket_aimd_rate_bounds():
+    bucket = AdaptiveTokenBucket(rate=1.0, min_rate=0.5, max_rate=1.5, increase_step=0.25,
+                                 cooldown_seconds=0)
+    for _ in range(5):
+        bucket.on_success()
+    assert bucket.rate == 1.5
+    bucket.on_throttle(0)
+    assert bucket.rate == 0.75
+    bucket.on_throttle(0)
+    assert bucket.rate == 0.5
+    assert bucket.stats() == {'rate': 0.5, 'successes': 5, 'throttles': 2}
+
+
+def test_bucket_allows_burst_then_paces():
+    bucket = AdaptiveTokenBucket(rate=20.0, capacity=2.0)
+    started = time.monotonic()
+    bucket.acquire()
+    bucket.acquire()
+    assert time.monotonic() - started < 0.05
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.04
+
+
+def test_bucket_pauses_for_retry_after():
+    bucket = AdaptiveTokenBucket(rate=100.0, min_rate=50.0)
+    bucket.on_throttle(retry_after=0.2)
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.18
+
+
+def test_status_code_and_retry_after_extraction():
+    assert get_status_code(HTTPError(429, '3')) == 429
+    assert get_status_code(SimpleNamespace(status_code=503)) == 503
+    assert get_status_code(Exception("Server returned 502 Bad Gateway")) == 502
+    assert get_status_code(Exception("connection reset")) is None
+    assert get_retry_after(HTTPError(429, '1.5')) == 1.5
+    assert get_retry_after(HTTPError(429, 'Wed, 21 Oct 2015 07:28:00 GMT')) is None
+    assert get_retry_after(Exception("no response")) is None
+
+
+class FakeGarmin:
+    """total条活动的分页客户端,failures: {offset: [依次抛出的异常]}"""
+
+    def __init__(self, total, failures=None):
+        self.total = total
+        self.failures = failures or {}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get_activities(self, start, limit):
+        with self._lock:
+            self.calls.append(start)
+            pending = self.failures.get(start)
+            if pending:
+                raise pending.pop(0)
+        return [{'activityId': i} for i in range(start, min(start + limit, self.total))]
+
+
+def fast_fetcher(client, **kwargs):
+    bucket = AdaptiveTokenBucket(rate=1000.0, max_rate=1000.0, capacity=100.0, cooldown_seconds=0.01)
+    kwargs.setdefault('retry_base_delay', 0.001)
+    return ConcurrentActivityFetcher(client, page_size=10, bucket=bucket, **kwargs)
+
+
+def collect(fetcher):
+    return sorted(a['activityId'] for page in fetcher.iter_pages() for a in page)
+
+
+@pytest.mark.parametrize("total", [0, 9, 10, 47])
+def test_fetcher_returns_every_activity_once(total):
+    client = FakeGarmin(total)
+    assert collect(fast_fetcher(client, concurrency=3)) == list(range(total))
+
+
+def test_fetcher_respects_max_count():
+    assert collect(fast_fetcher(FakeGarmin(100), max_count=25)) == list(range(25))
+
+
+def test_fetcher_retries_throttled_and_flaky_pages():
+    client = FakeGarmin(30, failures={
+        10: [HTTPError(429, '0.01'), ConnectionError("reset")],
+        20: [TimeoutError("timeout")],
+    })
+    fetcher = fast_fetcher(client)
+    assert collect(fetcher) == list(range(30))
+    assert fetcher.bucket.throttles == 1
+    assert client.calls.count(10) == 3
+
+
+def test_fetcher_backs_off_exponentially_on_non_throttle_errors(monkeypatch):
+    monkeypatch.setattr('scripts.garmin_fetcher.random.uniform', lambda low, high: high)
+    fetcher = fast_fetcher(FakeGarmin(0), retry_base_delay=0.5, retry_max_delay=3.0)
+    assert [fetcher._retry_delay(attempt) for attempt in range(1, 6)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+
+    waits = []
+    client = FakeGarmin(10, failures={0: [ConnectionError("reset")] * 3})
+    fetcher = fast_fetcher(client, retry_base_delay=0.01)
+    monkeypatch.setattr(fetcher._cancelled, 'wait', lambda delay: waits.append(delay) or False)
+    assert len(fetcher._fetch_page(0)) == 10
+    assert waits == [0.01, 0.02, 0.04]
+
+
+def test_fetcher_raises_after_max_retries():
+    client = FakeGarmin(30, failures={10: [ConnectionError("down")] * 10})
+    fetcher = fast_fetcher(client, max_retries=2, concurrency=1)
+    with pytest.raises(ConnectionError):
+        collect(fetcher)
+    assert client.calls.count(10) == 3
+
+
+def test_fetcher_threads_exit_when_consumer_stops_early():
+    existing = set(threading.enumerate())
+    fetcher = fast_fetcher(FakeGarmin(400), concurrency=3, max_count=400)
+    pages = fetcher.iter_pages()
+    next(pages)
+    # 等工作线程把有界队列填满,再停止消费
+    time.sleep(0.2)
+    pages.close()
+
+    deadline = time.time() + 3
+    while time.time() < deadline:
+        alive = [t for t in threading.enumerate() if t not in existing]
+        if not alive:
+            break
+        time.sleep(0.05)
+    assert alive == []
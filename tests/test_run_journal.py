@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""检查点日志写入与回放测试"""
+
+import json
+
+import pytest
+
+from utils.run_journal import RunJournal, list_runs
+
+
+@pytest.fixture
+def State():
+    from benchmarks.db_binding import use_placeholder_db_config
+    use_placeholder_db_config()
+    from InsightEngine.state.state import State
+    return State
+
+
+def _result(index):
+    return {'url': f"https://example.com/{index}", 'title': f"结果{index}",
+            'content': f"第{index}条搜索内容:减量期跑量减少四到六成。", 'score': 0.5 + index / 10}
+
+
+def _run_to_completion(State, journal):
+    state = State(query="马拉松减量期怎么安排")
+    journal.record_start(state.query)
+    state.report_title = "减量期训练报告"
+    state.add_paragraph("跑量", "减量期的跑量安排")
+    state.add_paragraph("强度", "减量期的强度安排")
+    journal.record_structure(state)
+
+    for index, paragraph in enumerate(state.paragraphs):
+        research = paragraph.research
+        research.add_search_results("初始查询", [_result(1), _result(2)])
+        research.latest_summary = f"段落{index}初始总结"
+        journal.record_summary(state, index, 'initial')
+        research.add_search_results("反思查询", [_result(3)])
+        research.latest_summary = f"段落{index}反思总结"
+        research.increment_reflection()
+        journal.record_summary(state, index, 'reflection')
+        research.record_early_stop("结果收敛", 1)
+        paragraph.research.mark_completed()
+        journal.record_paragraph_completed(state, index)
+
+    state.final_report = "# 减量期训练报告"
+    state.mark_completed()
+    journal.record_final_report(state.final_report)
+    return state
+
+
+def _comparable(state):
+    data = state.to_dict()
+    data.pop('created_at')
+    data.pop('updated_at')
+    return data
+
+
+def test_replay_round_trip_restores_state(State, tmp_path):
+    journal = RunJournal('insight', run_id='run1', journal_dir=tmp_path)
+    state = _run_to_completion(State, journal)
+
+    restored = RunJournal('insight', run_id='run1', journal_dir=tmp_path).replay(State())
+    assert _comparable(restored) == _comparable(state)
+    assert restored.is_completed
+    assert restored.paragraphs[1].research.early_stop_reason == "结果收敛"
+    assert restored.paragraphs[0].research.search_history[0].content == _result(1)['content']
+
+
+def test_summary_events_only_carry_new_searches(State, tmp_path):
+    journal = RunJournal('insight', run_id='run1', journal_dir=tmp_path)
+    _run_to_completion(State, journal)
+
+    summaries = [event for event in journal.events() if event['type'] == 'summary']
+    assert [(event['paragraph'], event['step'], len(event['searches'])) for event in summaries] == [
+        (0, 'initial', 2), (0, 'reflection', 1), (1, 'initial', 2), (1, 'reflection', 1)]
+
+
+def test_replay_resumes_incremental_journaling(State, tmp_path):
+    journal = RunJournal('insight', run_id='run1', journal_dir=tmp_path)
+    state = State(query="q")
+    state.add_paragraph("跑量", "内容")
+    journal.record_structure(state)
+    state.paragraphs[0].research.add_search_results("初始查询", [_result(1), _result(2)])
+    journal.record_summary(state, 0, 'initial')
+
+    resumed_journal = RunJournal('insight', run_id='run1', journal_dir=tmp_path)
+    resumed = resumed_journal.replay(State())
+    assert resumed.paragraphs[0].research.get_search_count() == 2
+    assert not resumed.paragraphs[0].research.is_completed
+
+    # 恢复后继续写入时只追加回放之后新增的搜索记录
+    resumed.paragraphs[0].research.add_search_results("反思查询", [_result(3)])
+    resumed_journal.record_summary(resumed, 0, 'reflection')
+    last = list(resumed_journal.events())[-1]
+    assert [search['url'] for search in last['searches']] == [_result(3)['url']]
+    assert resumed_journal.replay(State()).paragraphs[0].research.get_search_count() == 3
+
+
+def test_partial_last_line_is_skipped(State, tmp_path):
+    journal = RunJournal('insight', run_id='run1', journal_dir=tmp_path)
+    state = _run_to_completion(State, journal)
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'type': 'final_report', 'final_report': '新报告'})[:20])
+
+    restored = journal.replay(State())
+    assert restored.final_report == state.final_report
+
+
+def test_new_structure_resets_paragraphs(State, tmp_path):
+    journal = RunJournal('insight', run_id='run1', journal_dir=tmp_path)
+    state = State(query="q")
+    state.add_paragraph("旧段落", "内容")
+    journal.record_structure(state)
+    state.paragraphs[0].research.add_search_results("查询", [_result(1)])
+    journal.record_summary(state, 0, 'initial')
+
+    state = State(query="q", report_title="新标题")
+    state.add_paragraph("新段落一", "内容")
+    state.add_paragraph("新段落二", "内容")
+    journal.record_structure(state)
+
+    restored = RunJournal('insight', run_id='run1', journal_dir=tmp_path).replay(State())
+    assert [p.title for p in restored.paragraphs] == ["新段落一", "新段落二"]
+    assert restored.paragraphs[0].research.get_search_count() == 0
+
+
+def test_missing_journal_and_list_runs(State, tmp_path):
+    journal = RunJournal('insight', run_id='missing', journal_dir=tmp_path)
+    assert not journal.exists()
+    assert list(journal.events()) == []
+    assert list_runs('insight', tmp_path) == []
+
+    for run_id in ('20240101_080000_aaaaaa', '20240102_080000_bbbbbb'):
+        RunJournal('insight', run_id=run_id, journal_dir=tmp_path).record_start("q")
+    RunJournal('media', run_id='20240103_080000_cccccc', journal_dir=tmp_path).record_start("q")
+    assert list_runs('insight', tmp_path) == ['20240102_080000_bbbbbb', '20240101_080000_aaaaaa']
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""外部搜索结果SQLite缓存测试(规范化键、TTL与stale-while-revalidate、LRU淘汰)"""
+
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import utils.search_cache as search_cache
+from utils.search_cache import SearchCache, make_cache_key, normalize_query
+
+
+def identity(value):
+    return value
+
+
+def cached_call(cache, fetch, tool='web_search_only', query='marathon taper', cacheable=bool):
+    return cache.get_or_fetch('bocha', tool, {'query': query, 'count': 10}, fetch,
+                              identity, identity, cacheable)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SearchCache(tmp_path / "search_cache.sqlite3")
+
+
+def test_normalize_query_and_cache_key():
+    assert normalize_query("  Ｍarathon　 TAPER  plan ") == "marathon taper plan"
+    assert make_cache_key('bocha', 'web_search_only', {'query': 'A  b', 'domains': ['y', 'x'], 'page': None}) == \
+        make_cache_key('bocha', 'web_search_only', {'query': 'a b', 'domains': ['x', 'y']})
+    assert make_cache_key('bocha', 'web_search_only', {'query': 'a'}) != \
+        make_cache_key('tavily', 'web_search_only', {'query': 'a'})
+    assert make_cache_key('bocha', 'web_search_only', {'query': 'a'}) != \
+        make_cache_key('bocha', 'search_last_week', {'query': 'a'})
+
+
+def test_hit_after_miss_and_round_trip_through_disk(cache, tmp_path):
+    payload = {'results': [{'title': '减量周', 'url': 'https://example.com'}]}
+    assert cached_call(cache, lambda: payload) == payload
+    assert cached_call(cache, lambda: pytest.fail("命中缓存时不应请求"), query=" Marathon  TAPER") == payload
+
+    reopened = SearchCache(tmp_path / "search_cache.sqlite3")
+    assert cached_call(reopened, lambda: pytest.fail("命中缓存时不应请求")) == payload
+    stats = cache.stats()
+    assert stats['tools']['web_search_only'] == {'hits': 1, 'stale_hits': 0, 'misses': 1, 'writes': 1,
+                                                 'hit_rate': 0.5}
+    assert stats['entries'] == 1
+
+
+def test_uncacheable_responses_are_not_stored(cache):
+    assert cached_call(cache, lambda: {}) == {}
+    assert cached_call(cache, lambda: {'results': [1]}) == {'results': [1]}
+    assert cache.stats()['total']['misses'] == 2
+
+
+def test_fetch_errors_propagate_and_are_not_cached(cache):
+    def boom():
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        cached_call(cache, boom)
+    assert cache.stats()['entries'] == 0
+
+
+def _age_entries(cache, seconds):
+    with sqlite3.connect(str(cache.cache_file)) as conn:
+        conn.execute("UPDATE search_cache SET expires_at = expires_at - ?, stale_until = stale_until - ?",
+                     (seconds, seconds))
+    conn.close()
+
+
+def test_stale_entry_is_served_and_refreshed_once(cache, monkeypatch):
+    monkeypatch.setitem(search_cache.SEARCH_CACHE_TTLS, 'web_search_only', (100, 100))
+    cached_call(cache, lambda: {'v': 1})
+    _age_entries(cache, 150)
+
+    release = threading.Event()
+    refreshes = []
+
+    def slow_refresh():
+        refreshes.append(1)
+        release.wait(5)
+        return {'v': 2}
+
+    assert cached_call(cache, slow_refresh) == {'v': 1}
+    # 刷新尚未完成时再次命中不会启动第二个刷新线程
+    assert cached_call(cache, slow_refresh) == {'v': 1}
+    release.set()
+    for _ in range(100):
+        if not cache._refreshing:
+            break
+        time.sleep(0.01)
+    assert refreshes == [1]
+    assert cached_call(cache, lambda: pytest.fail("刷新后应命中新鲜缓存")) == {'v': 2}
+    assert cache.stats()['tools']['web_search_only']['stale_hits'] == 2
+
+
+def test_entry_beyond_stale_window_is_a_miss(cache, monkeypatch):
+    monkeypatch.setitem(search_cache.SEARCH_CACHE_TTLS, 'web_search_only', (100, 100))
+    cached_call(cache, lambda: {'v': 1})
+    _age_entries(cache, 250)
+    assert cached_call(cache, lambda: {'v': 2}) == {'v': 2}
+
+
+def test_lru_eviction_by_entries_and_bytes(tmp_path):
+    cache = SearchCache(tmp_path / "c.sqlite3", max_entries=2)
+    for i, query in enumerate(['a', 'b']):
+        cached_call(cache, lambda i=i: {'v': i}, query=query)
+        time.sleep(0.01)
+    cached_call(cache, lambda: pytest.fail("命中"), query='a')  # 'a' 成为最近访问
+    cached_call(cache, lambda: {'v': 3}, query='c')
+    assert cache.stats()['entries'] == 2
+    assert cache.evictions == 1
+    assert cached_call(cache, lambda: {'v': 'refetched'}, query='b') == {'v': 'refetched'}
+
+    small = SearchCache(tmp_path / "small.sqlite3", max_bytes=len(json.dumps({'v': 'x' * 50})) + 1)
+    cached_call(small, lambda: {'v': 'x' * 50}, query='a')
+    cached_call(small, lambda: {'v': 'y' * 50}, query='b')
+    assert small.stats()['entries'] == 1
+
+
+def test_connections_are_closed(cache, monkeypatch):
+    opened = []
+    real_connect = sqlite3.connect
+
+    class TrackedConnection(sqlite3.Connection):
+        closed = False
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    def connect(*args, **kwargs):
+        conn = real_connect(*args, factory=TrackedConnection, **kwargs)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(search_cache.sqlite3, 'connect', connect)
+    cached_call(cache, lambda: {'v': 1})
+    cached_call(cache, lambda: {'v': 1})
+    cache.stats()
+    cache.clear()
+    assert opened and all(conn.closed for conn in opened)
+
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""研究状态紧凑内存表示测试"""
+
+import pytest
+
+from utils.search_store import ContentPool, PooledSearch, SlottedRecord, content_hash, intern_text
+from utils.state_snapshot import BlobStore
+
+CONTENT = "减量期跑量减少四到六成,保留部分比赛配速训练。" * 20
+
+
+class _Record(SlottedRecord):
+    __slots__ = ('name', 'value')
+    _fields = ('name', 'value')
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+
+class _Search(PooledSearch):
+    __slots__ = ('query',)
+    _fields = ('query', 'content')
+
+    def __init__(self, query="", content="", pool=None):
+        self.query = intern_text(query)
+        self._init_content(content, pool)
+
+
+def test_intern_text_shares_strings():
+    a = "".join(["马拉松", "减量期"])
+    b = "".join(["马拉松", "减量期"])
+    assert a is not b
+    assert intern_text(a) is intern_text(b)
+    assert intern_text(None) is None
+    assert intern_text(3) == 3
+
+
+def test_content_pool_dedupes_by_hash():
+    pool = ContentPool()
+    key = pool.put(CONTENT)
+    assert key == content_hash(CONTENT) == BlobStore.content_hash(CONTENT)
+    assert pool.put("".join([CONTENT])) is key
+    assert len(pool) == 1
+    assert pool.get(key) == CONTENT
+    assert pool.put("") is None and pool.put(None) is None
+    assert pool.get(None) == "" and pool.is_loaded(None)
+    with pytest.raises(KeyError):
+        pool.get(content_hash("不存在"))
+
+
+def test_slotted_record_equality_and_repr():
+    record = _Record("a", 1)
+    assert not hasattr(record, '__dict__')
+    with pytest.raises(AttributeError):
+        record.other = 1
+    assert record == _Record("a", 1)
+    assert record != _Record("a", 2)
+    assert record != ("a", 1)
+    assert repr(record) == "_Record(name='a', value=1)"
+    with pytest.raises(TypeError):
+        hash(record)
+
+
+def test_pooled_search_without_pool_keeps_content():
+    search = _Search("q", CONTENT)
+    assert search.content == CONTENT
+    assert search.content_key is None
+    assert search.is_content_loaded()
+    search.content = "新内容"
+    assert search.content == "新内容"
+
+
+def test_attach_pool_migrates_content_and_shares_it():
+    pool = ContentPool()
+    first, second = _Search("q", CONTENT), _Search("q", CONTENT)
+    first.attach_pool(pool)
+    second.attach_pool(pool)
+    assert first.content_key == second.content_key == content_hash(CONTENT)
+    assert len(pool) == 1
+    assert first == second
+    # 重复关联同一个池不做任何事
+    first.attach_pool(pool)
+    first.attach_pool(None)
+    assert first.content == CONTENT
+
+    other = ContentPool()
+    first.attach_pool(other)
+    assert len(other) == 1 and first.content == CONTENT
+
+    first.content = "改写后的内容"
+    assert first.content_key == content_hash("改写后的内容")
+    assert second.content == CONTENT
+
+
+def test_bind_content_key_loads_from_blob_store_lazily(tmp_path):
+    store = BlobStore(tmp_path / 'blobs')
+    key = store.put(CONTENT)
+    pool = ContentPool(blob_store=store)
+    searches = [_Search("q"), _Search("q")]
+    for search in searches:
+        search.bind_content_key(key, pool)
+
+    assert not searches[0].is_content_loaded()
+    assert len(pool) == 0
+    assert searches[0].content == CONTENT
+    assert searches[1].is_content_loaded()
+    assert len(pool) == 1
+
+    missing = _Search("q")
+    missing.bind_content_key(content_hash("不存在"), pool)
+    with pytest.raises(FileNotFoundError):
+        missing.content
+
+
+def test_engine_research_shares_run_pool():
+    from benchmarks.db_binding import use_placeholder_db_config
+    use_placeholder_db_config()
+    from InsightEngine.state.state import Search, State
+
+    state = State(query="q")
+    for index in range(2):
+        state.add_paragraph(f"段落{index}", "内容")
+        state.paragraphs[index].research.add_search_results("查询", [{'url': 'u', 'content': CONTENT}])
+    state.paragraphs[1].research.add_search(Search(query="查询", url="v", content=CONTENT))
+
+    histories = [p.research.search_history for p in state.paragraphs]
+    assert len(state.content_pool) == 1
+    assert histories[0][0].query is histories[1][0].query
+    assert histories[1][1].content_key == histories[0][0].content_key
+    assert State.from_dict(state.to_dict()).to_dict() == state.to_dict()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""相似训练k近邻索引测试"""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from utils.similarity_index import (
+    TrainingFeatureIndex,
+    derive_volume_features,
+    rows_to_matrix,
+    zone_fractions,
+)
+
+FEATURES = ['distance_km', 'pace', 'avg_hr']
+
+
+def make_source(rows):
+    """rows: {id: (特征, last_modify_ts)} -> (签名, fetch_rows回调, 调用记录)"""
+    calls = []
+
+    def fetch_rows(after_id):
+        calls.append(after_id)
+        selected = sorted(i for i in rows if after_id is None or i > after_id)
+        ids = np.array(selected, dtype=np.int64)
+        features = np.array([rows[i][0] for i in selected], dtype=np.float64).reshape(-1, len(FEATURES))
+        return ids, features, sum(rows[i][1] for i in selected)
+
+    def signature():
+        return len(rows), max(rows), sum(ts for _, ts in rows.values())
+
+    return signature, fetch_rows, calls
+
+
+def brute_force(features, ids, record_id, k):
+    X = np.asarray(features, dtype=np.float64)
+    Z = (X - X.mean(axis=0)) / X.std(axis=0)
+    pos = list(ids).index(record_id)
+    dist = np.sqrt(((Z - Z[pos]) ** 2).sum(axis=1) / X.shape[1])
+    order = [i for i in np.argsort(dist) if i != pos][:k]
+    return [int(ids[i]) for i in order]
+
+
+def test_query_matches_brute_force_and_excludes_self():
+    rng = np.random.default_rng(3)
+    features = rng.normal([10, 330, 150], [3, 30, 10], size=(50, 3))
+    ids = np.arange(100, 150)
+    index = TrainingFeatureIndex(FEATURES)
+    index.rebuild(ids, features, 0, (50, 149, 0))
+
+    result = index.query(120, k=5)
+    assert [record_id for record_id, _ in result] == brute_force(features, ids, 120, 5)
+    assert 120 not in [record_id for record_id, _ in result]
+    assert [d for _, d in result] == sorted(d for _, d in result)
+
+
+def test_query_edge_cases():
+    index = TrainingFeatureIndex(FEATURES)
+    assert index.query(1) == []
+    index.rebuild([1], [[10, 300, 150]], 0, (1, 1, 0))
+    assert index.query(1) == []
+    index.rebuild([1, 2], [[10, 300, 150], [12, 310, 155]], 0, (2, 2, 0))
+    assert index.query(1, k=10) == [(2, index.query(1)[0][1])]
+    assert index.query(99) == []
+
+
+def test_missing_and_constant_columns_do_not_break_distances():
+    index = TrainingFeatureIndex(FEATURES)
+    features = [[10, np.nan, 150], [10, np.nan, 160], [10, np.nan, 151]]
+    index.rebuild([1, 2, 3], features, 0, (3, 3, 0))
+    assert index.query(1, k=1)[0][0] == 3
+    assert index.describe(1) == {'distance_km': 10.0, 'pace': None, 'avg_hr': 150.0}
+
+
+def test_sync_appends_new_rows_and_rebuilds_on_edit():
+    rows = {1: ([10, 300, 150], 5), 2: ([12, 320, 155], 5)}
+    signature, fetch_rows, calls = make_source(rows)
+    index = TrainingFeatureIndex(FEATURES)
+
+    assert index.sync(signature(), fetch_rows) == 'rebuilt'
+    assert index.sync(signature(), fetch_rows) == 'cached'
+
+    rows[3] = ([8, 290, 148], 7)
+    assert index.sync(signature(), fetch_rows) == 'appended'
+    assert calls == [None, 2]
+    assert len(index) == 3
+
+    # 修改旧记录(last_modify_ts变化)后追加校验失败,回退为全量重建
+    rows[1] = ([11, 305, 150], 9)
+    rows[4] = ([9, 295, 149], 7)
+    assert index.sync(signature(), fetch_rows) == 'rebuilt'
+    assert index.describe(1)['distance_km'] == 11.0
+
+    index.invalidate()
+    assert index.sync(signature(), fetch_rows) == 'rebuilt'
+
+
+def test_rows_to_matrix_and_derived_features():
+    rows = [SimpleNamespace(distance_meters=5000, duration_seconds=1500),
+            SimpleNamespace(distance_meters=None, duration_seconds=600)]
+    matrix = rows_to_matrix(rows, ['distance_meters', 'duration_seconds'])
+    assert np.isnan(matrix[1, 0])
+    assert rows_to_matrix([], ['a', 'b']).shape == (0, 2)
+
+    distance_km, minutes, pace = derive_volume_features(matrix[:, 0], matrix[:, 1])
+    assert distance_km[0] == 5.0 and minutes[0] == 25.0 and pace[0] == 300.0
+    assert np.isnan(pace[1])
+
+
+def test_zone_fractions():
+    zones = np.array([[60, 60, 0, 0, 0], [np.nan] * 5])
+    fractions = zone_fractions(zones)
+    assert fractions[0].tolist() == [0.5, 0.5, 0.0, 0.0, 0.0]
+    assert np.isnan(fractions[1]).all()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""研究状态紧凑快照测试"""
+
+import json
+
+import pytest
+
+import utils.state_snapshot as state_snapshot
+from utils.state_snapshot import (
+    BLOB_DIR_NAME,
+    SNAPSHOT_SUFFIX,
+    BlobStore,
+    is_snapshot_file,
+    load_snapshot,
+    save_snapshot,
+)
+
+LONG_CONTENT = "减量期跑量减少四到六成,保留部分比赛配速训练。" * 200
+
+
+@pytest.fixture
+def State():
+    from benchmarks.db_binding import use_placeholder_db_config
+    use_placeholder_db_config()
+    from InsightEngine.state.state import State
+    return State
+
+
+def _build_state(State):
+    state = State(query="马拉松减量期", report_title="减量期报告", final_report="# 报告")
+    for index in range(2):
+        state.add_paragraph(f"段落{index}", "内容")
+        research = state.paragraphs[index].research
+        # 两个段落引用同一条内容
+        research.add_search_results(f"查询{index}", [
+            {'url': 'https://a.com/shared', 'title': '共享', 'content': LONG_CONTENT, 'score': 0.9},
+            {'url': f'https://a.com/{index}', 'title': f'结果{index}', 'content': f'第{index}条内容'},
+            {'url': f'https://a.com/empty{index}', 'title': '空内容', 'content': ''},
+        ])
+        research.latest_summary = f"总结{index}"
+        research.increment_reflection()
+    state.paragraphs[0].research.mark_completed()
+    return state
+
+
+def _blob_files(directory):
+    return sorted(path for path in (directory / BLOB_DIR_NAME).rglob('*') if path.is_file())
+
+
+def test_blob_store_round_trip_and_dedupe(tmp_path):
+    store = BlobStore(tmp_path / 'blobs')
+    digest = store.put(LONG_CONTENT)
+    assert digest == BlobStore.content_hash(LONG_CONTENT)
+    assert store.put(LONG_CONTENT) == digest
+    assert len(list((tmp_path / 'blobs').rglob('*.*'))) == 1
+    assert store.exists(digest)
+    assert store.get(digest) == LONG_CONTENT
+    with pytest.raises(FileNotFoundError):
+        store.get(BlobStore.content_hash("不存在"))
+
+
+def test_snapshot_round_trip(State, tmp_path):
+    state = _build_state(State)
+    path = tmp_path / f"state{SNAPSHOT_SUFFIX}"
+    state.save_to_file(str(path))
+
+    assert is_snapshot_file(str(path))
+    loaded = State.load_from_file(str(path))
+    assert loaded.to_dict() == state.to_dict()
+    # 共享内容和两条独立内容各存一份,空内容不写blob
+    assert len(_blob_files(tmp_path)) == 3
+
+
+def test_snapshot_content_loads_lazily(State, tmp_path):
+    path = tmp_path / f"state{SNAPSHOT_SUFFIX}"
+    save_snapshot(_build_state(State), str(path))
+
+    loaded = load_snapshot(State, str(path))
+    first, second = loaded.paragraphs[0].research.search_history[:2]
+    assert not first.is_content_loaded()
+    assert first.content == LONG_CONTENT
+    assert first.is_content_loaded()
+    # 两个段落的共享内容只读取一次
+    assert loaded.paragraphs[1].research.search_history[0].is_content_loaded()
+    assert not second.is_content_loaded()
+
+
+def test_resave_only_writes_new_blobs(State, tmp_path):
+    path = tmp_path / f"state{SNAPSHOT_SUFFIX}"
+    save_snapshot(_build_state(State), str(path))
+    before = {p: p.stat().st_mtime_ns for p in _blob_files(tmp_path)}
+
+    loaded = load_snapshot(State, str(path))
+    loaded.paragraphs[1].research.add_search_results("新查询", [{'url': 'https://b.com', 'content': '新内容'}])
+    save_snapshot(loaded, str(path))
+
+    after = _blob_files(tmp_path)
+    assert len(after) == len(before) + 1
+    assert all(p.stat().st_mtime_ns == before[p] for p in before)
+    # 重新保存时未访问过的内容不会被读取
+    assert not loaded.paragraphs[0].research.search_history[0].is_content_loaded()
+    assert load_snapshot(State, str(path)).paragraphs[1].research.search_history[-1].content == '新内容'
+
+
+def test_fallback_encoding_and_compression(State, tmp_path, monkeypatch):
+    monkeypatch.setattr(state_snapshot, 'MSGPACK_AVAILABLE', False)
+    monkeypatch.setattr(state_snapshot, 'ZSTD_AVAILABLE', False)
+    state = _build_state(State)
+    path = tmp_path / f"state{SNAPSHOT_SUFFIX}"
+    save_snapshot(state, str(path), blob_dir=str(tmp_path / 'other_blobs'))
+
+    with open(path, 'rb') as f:
+        header = json.loads(f.readline())
+    assert (header['encoding'], header['compression'], header['blob_dir']) == ('json', 'zlib', 'other_blobs')
+    assert load_snapshot(State, str(path)).to_dict() == state.to_dict()
+
+
+def test_json_state_files_still_load(State, tmp_path):
+    state = _build_state(State)
+    path = tmp_path / "state.json"
+    state.save_to_file(str(path))
+    assert not is_snapshot_file(str(path))
+    assert not is_snapshot_file(str(tmp_path / "missing.snap"))
+    assert State.load_from_file(str(path)).to_dict() == state.to_dict()
+    with pytest.raises(ValueError):
+        load_snapshot(State, str(path))
+
+
+def test_newer_snapshot_version_is_rejected(State, tmp_path):
+    path = tmp_path / f"state{SNAPSHOT_SUFFIX}"
+    save_snapshot(_build_state(State), str(path))
+    with open(path, 'rb') as f:
+        header = json.loads(f.readline())
+        body = f.read()
+    header['version'] = state_snapshot.SNAPSHOT_VERSION + 1
+    path.write_bytes(json.dumps(header).encode('utf-8') + b'\n' + body)
+    with pytest.raises(ValueError):
+        load_snapshot(State, str(path))
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""训练记录流式导出测试"""
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+
+from models.training_record import TrainingRecordKeep, TrainingRecordManager
+from utils.training_export import (
+    PYARROW_AVAILABLE,
+    export_columns,
+    iter_record_batches,
+    stream_csv,
+    stream_export,
+    stream_ndjson,
+)
+
+COLUMNS = export_columns(TrainingRecordManager('keep'))
+NAMES = [col.name for col in COLUMNS]
+
+
+def _row(record_id, start_time):
+    values = {
+        'id': record_id, 'user_id': 'default_user', 'exercise_type': '跑步', 'duration_seconds': 1800,
+        'start_time': start_time, 'end_time': start_time + timedelta(minutes=30), 'calories': None,
+        'distance_meters': Decimal('5000.50'), 'avg_heart_rate': 150, 'max_heart_rate': 170,
+        'heart_rate_data': '[150, 151]', 'add_ts': 0, 'last_modify_ts': 0, 'data_source': 'keep_import',
+    }
+    return tuple(values[name] for name in NAMES)
+
+
+BATCHES = [
+    [_row(1, datetime(2024, 1, 1, 7)), _row(2, datetime(2024, 1, 2, 7))],
+    [_row(3, datetime(2024, 1, 3, 7))],
+]
+
+
+def test_csv_round_trip_with_bom_and_one_chunk_per_batch():
+    chunks = list(stream_csv(iter(BATCHES), COLUMNS))
+    assert len(chunks) == len(BATCHES)
+    text = ''.join(chunks)
+    assert text.startswith('\ufeff')
+    rows = list(csv.DictReader(io.StringIO(text[1:])))
+    assert [row['id'] for row in rows] == ['1', '2', '3']
+    assert rows[0]['start_time'] == '2024-01-01 07:00:00'
+    assert rows[0]['distance_meters'] == '5000.5'
+    assert rows[0]['calories'] == ''
+
+
+def test_csv_without_rows_still_has_header():
+    text = ''.join(stream_csv(iter([]), COLUMNS))
+    assert text.strip('\ufeff\r\n').split(',') == NAMES
+
+
+def test_ndjson_round_trip():
+    lines = ''.join(stream_ndjson(iter(BATCHES), COLUMNS)).splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [r['id'] for r in records] == [1, 2, 3]
+    assert records[0]['exercise_type'] == '跑步'
+    assert records[0]['calories'] is None
+
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason="需要pyarrow")
+def test_parquet_round_trip_writes_one_row_group_per_batch():
+    import pyarrow.parquet as pq
+
+    data = b''.join(stream_export('parquet', iter(BATCHES), COLUMNS))
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    assert parquet_file.num_row_groups == len(BATCHES)
+    table = parquet_file.read()
+    assert table.column('id').to_pylist() == [1, 2, 3]
+    assert table.column('distance_meters').to_pylist()[0] == pytest.approx(5000.5)
+    assert table.column('start_time').to_pylist()[2] == datetime(2024, 1, 3, 7)
+
+
+def test_unknown_format_raises():
+    with pytest.raises(ValueError):
+        stream_export('xlsx', iter([]), COLUMNS)
+
+
+@pytest.fixture
+def records(training_db):
+    base = datetime(2024, 1, 1, 7)
+    with Session(training_db) as session:
+        for i in range(7):
+            session.add(TrainingRecordKeep(
+                exercise_type='跑步', duration_seconds=1800, start_time=base + timedelta(days=i),
+                end_time=base + timedelta(days=i, minutes=30), add_ts=0, last_modify_ts=0,
+            ))
+        session.add(TrainingRecordKeep(
+            user_id='someone_else', exercise_type='跑步', duration_seconds=1800, start_time=base,
+            end_time=base + timedelta(minutes=30), add_ts=0, last_modify_ts=0,
+        ))
+        session.commit()
+
+
+def test_iter_record_batches_orders_filters_and_scopes_user(training_db, records):
+    manager = TrainingRecordManager('keep', user_id='default_user')
+    with Session(training_db) as session:
+        batches = list(iter_record_batches(session, manager, start=datetime(2024, 1, 2), batch_size=4))
+    assert [len(batch) for batch in batches] == [4, 2]
+    start_times = [row[NAMES.index('start_time')] for batch in batches for row in batch]
+    assert start_times == sorted(start_times)
+    assert start_times[0] == datetime(2024, 1, 2, 7)
+
+
+def test_export_route_streams_date_range(training_client, records):
+    response = training_client.get('/training/api/export', query_string={
+        'format': 'ndjson', 'from': '2024-01-02', 'to': '2024-01-03'
+    })
+    assert response.status_code == 200
+    assert 'attachment' in response.headers['Content-Disposition']
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    # 只给日期的结束时间包含当天全天
+    assert [r['start_time'] for r in records] == ['2024-01-02 07:00:00', '2024-01-03 07:00:00']
+
+
+def test_export_route_rejects_bad_parameters(training_client, records):
+    assert training_client.get('/training/api/export', query_string={'format': 'xml'}).status_code == 400
+    assert training_client.get('/training/api/export', query_string={'from': '2024/01/01'}).status_code == 400
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""训练负荷模型(EWMA/CTL/ATL/TSB/ACWR)测试"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from utils.training_load_model import (
+    ATL_TIME_CONSTANT,
+    CTL_TIME_CONSTANT,
+    TrainingLoadModelCache,
+    aggregate_daily_load,
+    compute_load_model,
+    ewma,
+)
+
+
+def naive_ewma(values, time_constant, initial=0.0):
+    d = np.exp(-1.0 / time_constant)
+    out = []
+    state = initial
+    for x in values:
+        state = d * state + (1 - d) * x
+        out.append(state)
+    return np.asarray(out)
+
+
+@pytest.mark.parametrize("n", [1, 63, 64, 65, 500, 2000])
+def test_ewma_matches_recurrence_across_block_boundaries(n):
+    rng = np.random.default_rng(n)
+    values = rng.uniform(0, 300, size=n) * (rng.random(n) > 0.4)
+    for tau in (ATL_TIME_CONSTANT, CTL_TIME_CONSTANT):
+        np.testing.assert_allclose(ewma(values, tau, 12.5), naive_ewma(values, tau, 12.5), rtol=1e-9, atol=1e-9)
+
+
+def test_ewma_empty_and_decay_from_initial():
+    assert ewma(np.array([]), 7).shape == (0,)
+    decayed = ewma(np.zeros(7), 7, initial=100.0)
+    assert decayed[-1] == pytest.approx(100.0 * np.exp(-1.0))
+
+
+def test_compute_load_model_tsb_uses_previous_day():
+    load = np.array([100.0, 0.0, 50.0])
+    ctl, atl, tsb, acwr = compute_load_model(load, ctl_initial=10.0, atl_initial=20.0)
+    assert tsb[0] == pytest.approx(10.0 - 20.0)
+    assert tsb[1:] == pytest.approx(ctl[:-1] - atl[:-1])
+    assert acwr == pytest.approx(atl / ctl)
+
+
+def test_compute_load_model_acwr_nan_without_chronic_load():
+    _, _, _, acwr = compute_load_model(np.zeros(3))
+    assert np.isnan(acwr).all()
+
+
+def test_aggregate_daily_load_sums_same_day_and_skips_missing():
+    records = [
+        (datetime(2024, 1, 2, 7), 50),
+        (datetime(2024, 1, 1, 7), 30),
+        (datetime(2024, 1, 2, 18), 25),
+        (None, 10),
+        (datetime(2024, 1, 3), None),
+    ]
+    days, loads = aggregate_daily_load(records)
+    assert list(days) == [(date(2024, 1, 1) - date(1970, 1, 1)).days, (date(2024, 1, 2) - date(1970, 1, 1)).days]
+    assert list(loads) == [30.0, 75.0]
+
+
+def _history(days, start=datetime(2024, 1, 1)):
+    rng = np.random.default_rng(7)
+    return [(start + timedelta(days=i), float(rng.integers(0, 200))) for i in range(days) if i % 3]
+
+
+def test_cache_increment_matches_rebuild(tmp_path):
+    history = _history(120)
+    earlier, later = history[:50], history[50:]
+
+    full = TrainingLoadModelCache(cache_dir=tmp_path / "full")
+    full.rebuild(history)
+
+    incremental = TrainingLoadModelCache(cache_dir=tmp_path / "inc")
+    incremental.rebuild(earlier)
+    incremental.apply_increment(later)
+    # 早于基线的记录向前扩展日轴
+    incremental.apply_increment([(datetime(2023, 12, 25), 40.0)])
+    full.apply_increment([(datetime(2023, 12, 25), 40.0)])
+
+    assert incremental.start_day == full.start_day
+    np.testing.assert_allclose(incremental.ctl, full.ctl)
+    np.testing.assert_allclose(incremental.atl, full.atl)
+
+
+def test_cache_round_trips_through_disk(tmp_path):
+    history = _history(60)
+    writer = TrainingLoadModelCache(cache_dir=tmp_path)
+    writer.rebuild(history)
+
+    reader = TrainingLoadModelCache(cache_dir=tmp_path)
+    assert reader.is_ready()
+    as_of = date(2024, 3, 15)
+    assert reader.get_series(14, as_of) == writer.get_series(14, as_of)
+
+    writer.invalidate()
+    assert not TrainingLoadModelCache(cache_dir=tmp_path).is_ready()
+
+
+def test_get_series_decays_after_last_training_day(tmp_path):
+    cache = TrainingLoadModelCache(cache_dir=tmp_path)
+    cache.rebuild([(datetime(2024, 1, 1), 100.0)])
+    series = cache.get_series(days=10, as_of=date(2024, 1, 10))
+    assert series['latest']['date'] == "2024-01-10"
+    assert series['summary']['training_days'] == 1
+    assert series['series']['ctl'] == sorted(series['series']['ctl'], reverse=True)
+    assert cache.get_series(days=10, as_of=date(2023, 12, 1)) == {}
+
+
+def test_rebuild_without_loads_clears_cache(tmp_path):
+    cache = TrainingLoadModelCache(cache_dir=tmp_path)
+    cache.rebuild([(datetime(2024, 1, 1), 100.0)])
+    cache.rebuild([(datetime(2024, 1, 1), None)])
+    assert not cache.is_ready()
+    assert cache.get_series() == {}
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""训练记录分页接口测试(游标编解码、游标/页码分页、记录总数缓存、ETag)"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from models.training_record import TrainingRecordKeep
+from routes.training_data import decode_cursor, encode_cursor
+from utils.record_count_cache import RecordCountCache
+
+
+@pytest.mark.parametrize("start_time", [
+    datetime(2024, 5, 1, 7, 30),
+    datetime(2024, 5, 1, 7, 30, 15, 123456),
+    datetime(1999, 12, 31, 23, 59, 59, 1),
+])
+def test_cursor_round_trip_keeps_microseconds(start_time):
+    cursor = encode_cursor(start_time, 42)
+    assert decode_cursor(cursor) == (start_time, 42)
+    assert "/" not in cursor and "+" not in cursor
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "MjAyNC0wNS0wMQ==", "YWJjfHh5eg=="])
+def test_decode_cursor_rejects_malformed_input(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_record_count_cache_ttl_and_invalidation():
+    cache = RecordCountCache(ttl=300)
+    counts = iter([3, 4, 5, 6])
+    assert cache.get('keep', lambda: next(counts), 'alice') == 3
+    assert cache.get('keep', lambda: next(counts), 'alice') == 3
+    assert cache.get('keep', lambda: next(counts), 'bob') == 4
+    cache.invalidate('keep', 'alice')
+    assert cache.get('keep', lambda: next(counts), 'alice') == 5
+    assert cache.get('keep', lambda: next(counts), 'bob') == 4
+    cache.invalidate('keep')
+    assert cache.get('keep', lambda: next(counts), 'bob') == 6
+    assert RecordCountCache(ttl=0).get('keep', lambda: 1) == 1
+
+
+def _add_records(engine, start_times, user_id='default_user'):
+    with Session(engine) as session:
+        for start_time in start_times:
+            session.add(TrainingRecordKeep(
+                user_id=user_id, exercise_type='跑步', duration_seconds=1800,
+                start_time=start_time, end_time=start_time + timedelta(minutes=30),
+                distance_meters=5000, add_ts=0, last_modify_ts=0,
+            ))
+        session.commit()
+
+
+@pytest.fixture
+def records(training_db):
+    base = datetime(2024, 1, 1, 6, 0, 0, 500000)
+    # 同一开始时间的多条记录 + 带微秒的开始时间,检验(start_time, id)游标不跳过也不重复
+    start_times = [base + timedelta(days=i // 3, microseconds=i % 2) for i in range(23)]
+    _add_records(training_db, start_times)
+    _add_records(training_db, [base], user_id='someone_else')
+    with Session(training_db) as session:
+        rows = session.query(TrainingRecordKeep.id).filter_by(user_id='default_user').order_by(
+            TrainingRecordKeep.start_time.desc(), TrainingRecordKeep.id.desc()).all()
+    return [row.id for row in rows]
+
+
+def test_cursor_pagination_walks_every_record_once(training_client, records):
+    seen = []
+    cursor = None
+    while True:
+        query = {'per_page': 5}
+        if cursor:
+            query['cursor'] = cursor
+        body = training_client.get('/training/api/records', query_string=query).get_json()
+        assert body['success'], body
+        assert body['total'] == len(records)
+        seen.extend(record['id'] for record in body['data'])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert seen == records
+
+
+def test_offset_pagination_is_ordered(training_client, records):
+    body = training_client.get('/training/api/records', query_string={'page': 2, 'per_page': 5}).get_json()
+    assert [record['id'] for record in body['data']] == records[5:10]
+
+
+def test_bad_cursor_returns_400(training_client, records):
+    response = training_client.get('/training/api/records', query_string={'cursor': 'bad'})
+    assert response.status_code == 400
+
+
+def test_etag_revalidation(training_client, records):
+    first = training_client.get('/training/api/records')
+    etag = first.headers['ETag']
+    second = training_client.get('/training/api/records', headers={'If-None-Match': etag})
+    assert second.status_code == 304
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""多用户数据隔离测试: 用户标识、按用户覆盖导入/回滚、会话用户切换开关"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from utils.user_context import (
+    DEFAULT_USER_ID,
+    get_current_user_id,
+    normalize_user_id,
+    user_cache_suffix,
+    user_scope,
+)
+
+
+def test_normalize_user_id():
+    assert normalize_user_id(None) == DEFAULT_USER_ID
+    assert normalize_user_id("  ") == DEFAULT_USER_ID
+    assert normalize_user_id(" runner.01@club ") == "runner.01@club"
+    for invalid in ("a b", "用户", "x" * 65, "a;drop"):
+        with pytest.raises(ValueError):
+            normalize_user_id(invalid)
+
+
+def test_user_scope_and_cache_suffix():
+    assert get_current_user_id() == DEFAULT_USER_ID
+    with user_scope("alice"):
+        assert get_current_user_id() == "alice"
+        with user_scope(None):
+            assert get_current_user_id() == DEFAULT_USER_ID
+        assert get_current_user_id() == "alice"
+    assert get_current_user_id() == DEFAULT_USER_ID
+    assert user_cache_suffix(None) == ""
+    assert user_cache_suffix("alice") == "_u_alice"
+
+
+# ===== 按用户覆盖导入与回滚 =====
+
+def _keep_row(user_id, index):
+    start = datetime(2024, 5, 1, 7) + timedelta(days=index)
+    return {'user_id': user_id, 'exercise_type': 'running', 'duration_seconds': 1800 + index,
+            'start_time': start, 'end_time': start + timedelta(minutes=30),
+            'add_ts': 0, 'last_modify_ts': 0}
+
+
+def _durations(engine, table, user_id):
+    with engine.connect() as conn:
+        return sorted(conn.execute(
+            select(table.c.duration_seconds).where(table.c.user_id == user_id)).scalars())
+
+
+@pytest.fixture
+def keep_table(training_db):
+    from models.training_record import TrainingRecordKeep
+    table = TrainingRecordKeep.__table__
+    with training_db.begin() as conn:
+        conn.execute(table.insert(), [_keep_row('alice', i) for i in range(3)] +
+                     [_keep_row('bob', i) for i in range(10, 12)])
+    return table
+
+
+def _stage(importer, table, rows):
+    staging = importer.create_staging_table(table)
+    with importer.engine.begin() as conn:
+        conn.execute(staging.insert(), rows)
+    return staging
+
+
+def test_replace_and_restore_only_touch_importing_user(training_db, keep_table):
+    from scripts.training_data_importer import BaseImporter
+    alice = BaseImporter(db_engine=training_db, user_id='alice')
+    bob = BaseImporter(db_engine=training_db, user_id='bob')
+    assert alice.staging_table_name(keep_table) != bob.staging_table_name(keep_table)
+
+    staging = _stage(alice, keep_table, [_keep_row('alice', i) for i in range(20, 24)])
+    # 导入期间其他用户新增的记录不会被覆盖导入丢掉
+    with training_db.begin() as conn:
+        conn.execute(keep_table.insert(), [_keep_row('bob', 12)])
+    alice.replace_user_rows(keep_table, staging, 4)
+
+    assert _durations(training_db, keep_table, 'alice') == [1820, 1821, 1822, 1823]
+    assert _durations(training_db, keep_table, 'bob') == [1810, 1811, 1812]
+
+    assert not bob.restore_previous_rows(keep_table)
+    assert alice.restore_previous_rows(keep_table)
+    assert _durations(training_db, keep_table, 'alice') == [1800, 1801, 1802]
+    assert _durations(training_db, keep_table, 'bob') == [1810, 1811, 1812]
+    # 备份只能回滚一次
+    assert not alice.restore_previous_rows(keep_table)
+
+
+def test_replace_rejects_row_count_mismatch(training_db, keep_table):
+    from sqlalchemy import inspect
+    from scripts.training_data_importer import BaseImporter
+    alice = BaseImporter(db_engine=training_db, user_id='alice')
+    staging = _stage(alice, keep_table, [_keep_row('alice', 20)])
+
+    with pytest.raises(ValueError):
+        alice.replace_user_rows(keep_table, staging, 2)
+    assert _durations(training_db, keep_table, 'alice') == [1800, 1801, 1802]
+    assert not inspect(training_db).has_table(staging.name)
+
+
+def test_failed_keep_import_drops_staging_table(training_db, keep_table):
+    from sqlalchemy import inspect
+    from scripts.training_data_importer import BaseImporter, KeepDataImporter
+    importer = KeepDataImporter('keep.csv', db_engine=training_db, user_id='alice')
+    staging_name = importer.staging_table_name(keep_table)
+
+    def broken_chunks():
+        yield from ()
+        raise IOError("读取中断")
+
+    with pytest.raises(IOError):
+        importer.import_chunks(broken_chunks(), truncate_first=True)
+    assert not inspect(training_db).has_table(staging_name)
+    # 替换失败时旧数据不变,也不会留下空的备份表
+    assert _durations(training_db, keep_table, 'alice') == [1800, 1801, 1802]
+    assert not inspect(training_db).has_table(f"{keep_table.name}{BaseImporter.BACKUP_SUFFIX}")
+
+
+def test_restore_drops_backup_table_once_used_up(training_db, keep_table):
+    from sqlalchemy import inspect
+    from scripts.training_data_importer import BaseImporter
+    alice = BaseImporter(db_engine=training_db, user_id='alice')
+    bob = BaseImporter(db_engine=training_db, user_id='bob')
+    backup_name = f"{keep_table.name}{BaseImporter.BACKUP_SUFFIX}"
+    alice.replace_user_rows(keep_table, _stage(alice, keep_table, [_keep_row('alice', 20)]), 1)
+    bob.replace_user_rows(keep_table, _stage(bob, keep_table, [_keep_row('bob', 20)]), 1)
+
+    assert alice.restore_previous_rows(keep_table)
+    # 其他用户的备份还在,备份表保留
+    assert inspect(training_db).has_table(backup_name)
+    assert bob.restore_previous_rows(keep_table)
+    assert not inspect(training_db).has_table(backup_name)
+
+
+def test_backup_table_rebuilt_when_columns_change(training_db, keep_table):
+    from scripts.training_data_importer import BaseImporter
+    alice = BaseImporter(db_engine=training_db, user_id='alice')
+    backup_name = f"{keep_table.name}{BaseImporter.BACKUP_SUFFIX}"
+    with training_db.begin() as conn:
+        conn.exec_driver_sql(f"CREATE TABLE {backup_name} (id INTEGER, user_id VARCHAR(64))")
+    assert not alice.restore_previous_rows(keep_table)
+
+    staging = _stage(alice, keep_table, [_keep_row('alice', 20)])
+    alice.replace_user_rows(keep_table, staging, 1)
+    assert alice.restore_previous_rows(keep_table)
+    with training_db.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(keep_table)).scalar() == 5
+
+
+# ===== 会话用户切换 =====
+
+def test_switch_user_disabled_by_default(training_client):
+    response = training_client.post('/training/api/switch_user', json={'user_id': 'alice'})
+    assert response.status_code == 403
+    data = training_client.get('/training/api/current_user').get_json()['data']
+    assert data['user_id'] == DEFAULT_USER_ID
+    assert data['allow_switch'] is False
+    assert data['available_users'] == []
+
+
+def test_switch_user_when_allowed(training_client, monkeypatch):
+    import routes.training_data
+    # 路由每次请求都会从磁盘重新加载config,直接替换开关函数
+    monkeypatch.setattr(routes.training_data, 'is_user_switch_allowed', lambda: True)
+    assert training_client.post('/training/api/switch_user', json={'user_id': 'bad id'}).status_code == 400
+    response = training_client.post('/training/api/switch_user', json={'user_id': 'alice'})
+    assert response.status_code == 200
+    data = training_client.get('/training/api/current_user').get_json()['data']
+    assert data['user_id'] == 'alice'
+    assert data['allow_switch'] is True
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+单次研究内的搜索内容存储与去重
+不同段落、不同反思轮次的搜索结果经常重复,每条都完整送进总结提示词会浪费大量token。
+ContentStore 在一次研究运行内为每条内容分配ID:
+- 按规范化URL去重
+- 按SimHash(字符3-gram)识别转载、镜像等近似重复内容
+- 已经参与过总结的内容,之后只以 "[S3] 标题" 形式引用,只有新内容才完整进入提示词
+正文本身保存在研究状态的 ContentPool 中,这里只记录内容哈希,同一内容在内存中只有一份
+"""
+
+import hashlib
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.parallel_search import normalize_url
+from utils.search_store import ContentPool
+
+# SimHash位数与近似重复判定阈值(汉明距离)
+SIMHASH_BITS = 64
+SIMHASH_MAX_DISTANCE = 3
+# 分段索引: 汉明距离<=3时,4个16位分段中至少有一段完全相同
+SIMHASH_BANDS = 4
+# 内容过短时SimHash不可靠,只按URL去重
+MIN_SIMHASH_LENGTH = 80
+# 引用其他段落已用过的内容时附带的摘录长度
+REFERENCE_EXCERPT_CHARS = 200
+
+_NON_WORD_RE = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def simhash(text: str, bits: int = SIMHASH_BITS) -> int:
+    """计算文本的SimHash(去掉标点空白后取字符3-gram,中英文通用)"""
+    normalized = _NON_WORD_RE.sub('', text.lower())
+    if len(normalized) < 3:
+        return 0
+    weights = [0] * bits
+    shingles = Counter(normalized[i:i + 3] for i in range(len(normalized) - 2))
+    for shingle, count in shingles.items():
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=bits // 8).digest(), 'big')
+        for bit in range(bits):
+            weights[bit] += count if value >> bit & 1 else -count
+    fingerprint = 0
+    for bit in range(bits):
+        if weights[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+@dataclass
+class StoredContent:
+    """存储的一条搜索内容"""
+    content_id: str
+    url: str
+    title: str
+    content_key: Optional[str]      # 正文在ContentPool中的哈希,空内容为None
+    fingerprint: int
+    paragraph_index: int
+    summarized: bool = False
+
+
+class ContentStore:
+    """一次研究运行内的搜索内容存储(按URL和近似内容去重)"""
+
+    def __init__(self, pool: Optional[ContentPool] = None):
+        """
+        Args:
+            pool: 保存正文的内容池,通常传入State的content_pool,与搜索记录共享;未提供时使用独立的池
+        """
+        self.pool = pool if pool is not None else ContentPool()
+        self._lock = threading.Lock()
+        self._items: Dict[str, StoredContent] = {}
+        self._by_url: Dict[str, str] = {}
+        self._bands: Dict[Tuple[int, int], List[str]] = {}
+        self.duplicate_count = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, content_id: str) -> Optional[StoredContent]:
+        return self._items.get(content_id)
+
+    def _band_keys(self, fingerprint: int) -> List[Tuple[int, int]]:
+        width = SIMHASH_BITS // SIMHASH_BANDS
+        mask = (1 << width) - 1
+        return [(band, fingerprint >> (band * width) & mask) for band in range(SIMHASH_BANDS)]
+
+    def _find_near_duplicate(self, fingerprint: int) -> Optional[str]:
+        for key in self._band_keys(fingerprint):
+            for content_id in self._bands.get(key, ()):
+                if hamming_distance(fingerprint, self._items[content_id].fingerprint) <= SIMHASH_MAX_DISTANCE:
+                    return content_id
+        return None
+
+    def add(self, result: Dict[str, Any], paragraph_index: int) -> Tuple[str, bool]:
+        """
+        登记一条搜索结果
+
+        Args:
+            result: 搜索结果(含url、title、content)
+            paragraph_index: 所属段落
+
+        Returns:
+            (内容ID, 是否为新内容)
+        """
+        url_key = normalize_url(result.get('url', ''))
+        content = result.get('content') or ''
+        with self._lock:
+            if url_key and url_key in self._by_url:
+                self.duplicate_count += 1
+                return self._by_url[url_key], False
+
+            fingerprint = simhash(content) if len(content) >= MIN_SIMHASH_LENGTH else 0
+            if fingerprint:
+                duplicate_id = self._find_near_duplicate(fingerprint)
+                if duplicate_id:
+                    if url_key:
+                        self._by_url[url_key] = duplicate_id
+                    self.duplicate_count += 1
+                    return duplicate_id, False
+
+            content_id = f"S{len(self._items) + 1}"
+            self._items[content_id] = StoredContent(
+                content_id=content_id,
+                url=result.get('url', ''),
+                title=result.get('title', ''),
+                content_key=self.pool.put(content),
+                fingerprint=fingerprint,
+                paragraph_index=paragraph_index
+            )
+            if url_key:
+                self._by_url[url_key] = content_id
+            if fingerprint:
+                for key in self._band_keys(fingerprint):
+                    self._bands.setdefault(key, []).append(content_id)
+            return content_id, True
+
+    def prepare_for_prompt(self, results: List[Dict[str, Any]],
+                           paragraph_index: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        区分需要完整送入提示词的新内容和只需引用的已总结内容
+
+        尚未登记的结果会先登记并带上content_id;同一批次内重复的结果只保留第一条
+
+        Args:
+            results: 本次(合并后的)搜索结果
+            paragraph_index: 当前段落
+
+        Returns:
+            (新内容结果列表, 已总结内容的引用文本列表)
+        """
+        fresh: List[Dict[str, Any]] = []
+        references: List[str] = []
+        seen = set()
+        for result in results:
+            content_id = result.get('content_id') or self.add(result, paragraph_index)[0]
+            if content_id in seen:
+                continue
+            seen.add(content_id)
+            item = self._items[content_id]
+            if not item.summarized:
+                fresh.append(dict(result, content_id=content_id))
+            elif item.paragraph_index == paragraph_index:
+                references.append(f"[{content_id}] 《{item.title}》(已在本段此前的总结中使用)")
+            else:
+                excerpt = self.pool.get(item.content_key)[:REFERENCE_EXCERPT_CHARS]
+                references.append(f"[{content_id}] 《{item.title}》(已在其他段落中使用,摘录: {excerpt}...)")
+
+        if references:
+            print(f"  - 内容去重: {len(fresh)} 条新内容, {len(references)} 条已总结内容仅引用ID")
+        return fresh, references
+
+    def mark_summarized(self, results: List[Dict[str, Any]]):
+        """标记结果已参与总结(之后只引用ID)"""
+        with self._lock:
+            for result in results:
+                item = self._items.get(result.get('content_id'))
+                if item:
+                    item.summarized = True
+
+    def is_summarized(self, content_id: Optional[str]) -> bool:
+        """内容是否已参与过总结"""
+        item = self._items.get(content_id) if content_id else None
+        return bool(item and item.summarized)
+
+    def restore(self, paragraphs: List[Any]):
+        """从检查点恢复的段落搜索历史重建存储(检查点中的搜索都已参与过总结)"""
+        for paragraph_index, paragraph in enumerate(paragraphs):
+            for search in paragraph.research.search_history:
+                content_id, _ = self.add(search.to_dict(), paragraph_index)
+                self.mark_summarized([{'content_id': content_id}])
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'unique': len(self._items),
+            'duplicates': self.duplicate_count,
+            'summarized': sum(1 for item in self._items.values() if item.summarized)
+        }
+
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+反思循环的收敛检测
+反思循环原来固定跑满 max_reflections 轮,每轮一次搜索加两次LLM调用,
+即使反思查询和之前重复、搜到的全是用过的内容、或者总结几乎没有变化。
+ReflectionConvergence 在每轮的三个位置检查是否已经收敛:
+- 搜索前: 反思查询与本段已执行过的查询近似重复
+- 总结前: 搜索结果全部是已经见过的内容
+- 总结后: 新总结相对上一版的改动比例低于阈值
+"""
+
+import hashlib
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from utils.parallel_search import normalize_url
+from utils.search_cache import normalize_query
+
+# 默认阈值
+QUERY_SIMILARITY_THRESHOLD = 0.85
+MIN_SUMMARY_CHANGE = 0.05
+
+
+def _bigrams(text: str) -> set:
+    text = normalize_query(text).replace(' ', '')
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def query_similarity(a: str, b: str) -> float:
+    """两个查询的相似度(规范化后字符2-gram的Jaccard系数,中英文通用)"""
+    grams_a, grams_b = _bigrams(a), _bigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+def summary_change(old: str, new: str) -> float:
+    """新旧总结的改动比例(0表示完全相同,1表示完全不同),基于difflib的编辑相似度"""
+    if not old or not new:
+        return 1.0
+    return 1.0 - SequenceMatcher(None, old, new, autojunk=False).ratio()
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    """搜索结果的去重键: 优先内容ID,其次规范化URL,最后按标题和内容取哈希"""
+    if result.get('content_id'):
+        return result['content_id']
+    url = normalize_url(result.get('url') or '')
+    if url:
+        return url
+    text = f"{result.get('title', '')}\n{result.get('content', '')}"
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ReflectionConvergence:
+    """单个段落反思循环的收敛检测"""
+
+    def __init__(self, search_history: Iterable[Any] = (),
+                 query_threshold: float = QUERY_SIMILARITY_THRESHOLD,
+                 min_summary_change: float = MIN_SUMMARY_CHANGE):
+        """
+        Args:
+            search_history: 段落已有的搜索记录(Search对象),作为之前的查询和已见内容
+            query_threshold: 查询相似度达到该值视为重复,0为不检查
+            min_summary_change: 总结改动比例低于该值视为收敛,0为不检查
+        """
+        self.query_threshold = query_threshold
+        self.min_summary_change = min_summary_change
+        self.prior_queries: List[str] = []
+        self.seen_keys = set()
+        for search in search_history:
+            data = search.to_dict()
+            self._remember_query(data.get('query', ''))
+            self.seen_keys.add(result_key(data))
+
+    def _remember_query(self, query: str):
+        if query and query not in self.prior_queries:
+            self.prior_queries.append(query)
+
+    def check_queries(self, queries: List[str]) -> Optional[str]:
+        """所有反思查询都与之前的查询近似重复时返回原因"""
+        if not self.query_threshold or not queries or not self.prior_queries:
+            return None
+        matches = []
+        for query in queries:
+            best = max(self.prior_queries, key=lambda prior: query_similarity(query, prior))
+            similarity = query_similarity(query, best)
+            if similarity < self.query_threshold:
+                return None
+            matches.append(f"'{query}'≈'{best}'({similarity:.2f})")
+        return f"反思查询与之前的查询重复: {', '.join(matches)}"
+
+    def check_results(self, results: List[Dict[str, Any]],
+                      is_seen: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Optional[str]:
+        """
+        搜索结果全部是已见内容时返回原因
+
+        没有结果不视为收敛: 搜索失败(超时、限流等)也会表现为空结果,
+        这种情况下继续下一轮反思,由 max_reflections 限制轮数
+
+        Args:
+            results: 本轮搜索结果
+            is_seen: 额外的已见判断(如内容存储中已参与过其他段落总结的内容)
+        """
+        if not results:
+            return None
+        for result in results:
+            if result_key(result) in self.seen_keys:
+                continue
+            if is_seen and is_seen(result):
+                continue
+            return None
+        return f"反思搜索的 {len(results)} 条结果都已在之前的总结中使用"
+
+    def check_summary(self, old: str, new: str) -> Optional[str]:
+        """新总结相对上一版改动过小时返回原因"""
+        if not self.min_summary_change:
+            return None
+        change = summary_change(old, new)
+        if change < self.min_summary_change:
+            return f"总结改动比例 {change:.1%} 低于阈值 {self.min_summary_change:.0%}"
+        return None
+
+    def record_round(self, queries: List[str], results: List[Dict[str, Any]]):
+        """记录本轮的查询和结果,供后续轮次比较"""
+        for query in queries:
+            self._remember_query(query)
+        for result in results:
+            self.seen_keys.add(result_key(result))
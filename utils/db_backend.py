@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+训练数据库后端
+根据config.py构建数据库连接URL和SQLAlchemy引擎,支持:
+- mysql:  默认,按DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME连接MySQL服务器
+- sqlite: 嵌入式单文件数据库(WAL模式),如 DB_URL = "sqlite:///data/training.sqlite3"
+- duckdb: 嵌入式列式数据库,如 DB_URL = "duckdb:///data/training.duckdb" (需要 duckdb 和 duckdb-engine)
+
+另外提供DuckDB分析引擎(DB_ANALYTICS_ENGINE = "duckdb"):
+以只读方式挂载训练库,统计和训练效果等聚合查询由DuckDB的列式执行引擎完成
+"""
+
+import os
+from typing import Optional
+
+from sqlalchemy import Table, create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateColumn
+
+SUPPORTED_BACKENDS = ('mysql', 'sqlite', 'duckdb')
+EMBEDDED_BACKENDS = ('sqlite', 'duckdb')
+
+# DuckDB分析引擎挂载训练库时使用的库名
+ANALYTICS_CATALOG = 'training'
+
+
+def _load_config(config_module=None):
+    if config_module is not None:
+        return config_module
+    import config
+    return config
+
+
+def get_database_url(config_module=None) -> str:
+    """
+    获取训练数据库连接URL
+
+    优先使用DB_URL;未配置时按MySQL各项配置拼接
+
+    Args:
+        config_module: 配置模块/对象,默认使用根目录config.py
+    """
+    cfg = _load_config(config_module)
+    db_url = (getattr(cfg, 'DB_URL', '') or '').strip()
+    if db_url:
+        return db_url
+    return (
+        f"mysql+pymysql://{getattr(cfg, 'DB_USER', '')}:{getattr(cfg, 'DB_PASSWORD', '')}"
+        f"@{getattr(cfg, 'DB_HOST', 'localhost')}:{getattr(cfg, 'DB_PORT', 3306)}/{getattr(cfg, 'DB_NAME', '')}"
+        f"?charset={getattr(cfg, 'DB_CHARSET', 'utf8mb4')}"
+    )
+
+
+def get_backend_name(db_url: str) -> str:
+    """返回URL对应的后端名称(mysql/sqlite/duckdb)"""
+    return make_url(db_url).get_backend_name()
+
+
+def is_embedded_backend(db_url: str) -> bool:
+    return get_backend_name(db_url) in EMBEDDED_BACKENDS
+
+
+def validate_database_config(config_module=None) -> Optional[str]:
+    """
+    检查数据库配置是否完整
+
+    Returns:
+        配置问题描述,配置完整时返回None
+    """
+    cfg = _load_config(config_module)
+    db_url = (getattr(cfg, 'DB_URL', '') or '').strip()
+    if db_url:
+        try:
+            backend = get_backend_name(db_url)
+        except Exception as e:
+            return f"DB_URL格式错误: {e}"
+        if backend not in SUPPORTED_BACKENDS:
+            return f"不支持的数据库类型: {backend} (支持: {', '.join(SUPPORTED_BACKENDS)})"
+        if backend in EMBEDDED_BACKENDS and not make_url(db_url).database:
+            return "DB_URL未指定数据库文件路径"
+        return None
+
+    if not all([getattr(cfg, key, '') for key in ('DB_HOST', 'DB_USER', 'DB_PASSWORD', 'DB_NAME')]):
+        return "数据库配置不完整! 请设置 DB_HOST, DB_USER, DB_PASSWORD, DB_NAME,或使用 DB_URL 指定嵌入式数据库"
+    return None
+
+
+def _ensure_parent_dir(db_url: str):
+    """嵌入式数据库文件所在目录不存在时自动创建"""
+    database = make_url(db_url).database
+    if database and database != ':memory:' and not database.startswith('file:'):
+        parent = os.path.dirname(os.path.abspath(database))
+        os.makedirs(parent, exist_ok=True)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL模式下读写互不阻塞;synchronous=NORMAL在WAL下仍保证崩溃一致性"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
+
+def create_database_engine(db_url: Optional[str] = None, **engine_kwargs):
+    """
+    按后端类型创建SQLAlchemy引擎
+
+    Args:
+        db_url: 连接URL,默认由config.py构建
+        engine_kwargs: 额外的create_engine参数(仅MySQL使用连接池参数)
+    """
+    db_url = db_url or get_database_url()
+    backend = get_backend_name(db_url)
+
+    if backend == 'sqlite':
+        _ensure_parent_dir(db_url)
+        engine = create_engine(
+            db_url,
+            # 同一连接可能被Flask/Streamlit的不同线程使用
+            connect_args={'check_same_thread': False, 'timeout': 30},
+            echo=False
+        )
+        event.listen(engine, 'connect', _set_sqlite_pragmas)
+        return engine
+
+    if backend == 'duckdb':
+        try:
+            import duckdb_engine  # noqa: F401
+        except ImportError:
+            raise ImportError("使用DuckDB需要安装依赖: pip install duckdb duckdb-engine")
+        _ensure_parent_dir(db_url)
+        return create_engine(db_url, echo=False)
+
+    engine_kwargs.setdefault('pool_pre_ping', True)
+    engine_kwargs.setdefault('pool_recycle', 3600)
+    return create_engine(db_url, echo=False, **engine_kwargs)
+
+
+# ===== DuckDB建表兼容 =====
+# DuckDB不支持SERIAL,自增主键改为 序列 + DEFAULT nextval(),ORM模型无需修改
+
+def _sequence_name(table: Table) -> str:
+    return f"{table.name}_id_seq"
+
+
+@compiles(CreateColumn, 'duckdb')
+def _compile_duckdb_column(element, compiler, **kw):
+    column = element.element
+    if column.table is not None and column is column.table.autoincrement_column:
+        return (
+            f"{compiler.preparer.format_column(column)} INTEGER "
+            f"DEFAULT nextval('{_sequence_name(column.table)}') NOT NULL"
+        )
+    return compiler.visit_create_column(element, **kw)
+
+
+@event.listens_for(Table, 'before_create')
+def _create_duckdb_sequence(table, connection, **kw):
+    if connection.dialect.name == 'duckdb' and table.autoincrement_column is not None:
+        connection.exec_driver_sql(f"CREATE SEQUENCE IF NOT EXISTS {_sequence_name(table)}")
+
+
+# ===== DuckDB分析引擎 =====
+
+def get_analytics_engine_name(config_module=None) -> str:
+    cfg = _load_config(config_module)
+    return (getattr(cfg, 'DB_ANALYTICS_ENGINE', '') or '').strip().lower()
+
+
+def _attach_statement(db_url: str) -> str:
+    """生成DuckDB只读挂载训练库的ATTACH语句"""
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend == 'sqlite':
+        path = os.path.abspath(url.database).replace("'", "''")
+        return f"ATTACH '{path}' AS {ANALYTICS_CATALOG} (TYPE sqlite, READ_ONLY)"
+    if backend == 'mysql':
+        parts = {
+            'host': url.host or 'localhost',
+            'port': url.port or 3306,
+            'user': url.username or '',
+            'password': url.password or '',
+            'database': url.database or '',
+        }
+        dsn = ' '.join(f"{key}={value}" for key, value in parts.items()).replace("'", "''")
+        return f"ATTACH '{dsn}' AS {ANALYTICS_CATALOG} (TYPE mysql, READ_ONLY)"
+    raise ValueError(f"DuckDB分析引擎不支持挂载 {backend} 数据库")
+
+
+def create_analytics_engine(db_url: Optional[str] = None):
+    """
+    创建DuckDB分析引擎
+
+    - 主库为DuckDB时直接返回None(聚合查询本来就在DuckDB中执行)
+    - 主库为SQLite/MySQL时,创建内存DuckDB并通过sqlite/mysql扩展只读挂载主库,
+      之后同一个ORM聚合查询可直接在该引擎上执行
+
+    Returns:
+        SQLAlchemy引擎;无法创建(依赖缺失、扩展不可用)时打印原因并返回None
+    """
+    db_url = db_url or get_database_url()
+    if get_backend_name(db_url) == 'duckdb':
+        return None
+
+    try:
+        import duckdb_engine  # noqa: F401
+    except ImportError:
+        print("DuckDB分析引擎不可用: 需要安装 duckdb 和 duckdb-engine,聚合查询使用主数据库")
+        return None
+
+    try:
+        attach = _attach_statement(db_url)
+        engine = create_engine('duckdb:///:memory:', echo=False)
+
+        @event.listens_for(engine, 'connect')
+        def _attach_training_db(dbapi_connection, connection_record):
+            dbapi_connection.execute(attach)
+            dbapi_connection.execute(f"USE {ANALYTICS_CATALOG}")
+
+        # 立即建立一次连接,扩展无法加载或主库不可达时回退到主数据库
+        with engine.connect():
+            pass
+        return engine
+    except Exception as e:
+        print(f"DuckDB分析引擎初始化失败,聚合查询使用主数据库: {e}")
+        return None
@@ -152,11 +152,8 @@ def format_host_speech_for_prompt(host_speech: str) -> str:
     if not host_speech:
         return ""
     
-    return f"""
-### 论坛主持人最新总结
+    # 分隔符由 utils.prompt_layout.build_user_message 统一添加
+    return f"""### 论坛主持人最新总结
 以下是论坛主持人对各Agent讨论的最新总结和引导，请参考其中的观点和建议：
 
-{host_speech}
-
----
-"""
+{host_speech}"""
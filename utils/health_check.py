@@ -1,14 +1,35 @@
 # -*- coding: utf-8 -*-
 """
 健康检查模块 - 检测系统配置状态
+
+耗时的网络检查(LLM API、MySQL)并发执行,各自有超时上限;
+检查结果短时间缓存,过期后先返回旧结果并在后台刷新
 """
 
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
 import pymysql
 import requests
-from typing import Dict, Tuple
+from sqlalchemy import inspect
+from sqlalchemy.engine import make_url
+from typing import Dict, Optional, Tuple
+
+from utils.db_backend import create_database_engine, get_backend_name, is_embedded_backend, validate_database_config
+
+# 各网络检查的超时上限(秒)
+CHECK_DEADLINES = {
+    'llm_api': 12,
+    'mysql': 8
+}
+
+# 缓存结果视为新鲜的时间(秒)
+HEALTH_CACHE_TTL = 30
+# 缓存结果过期后仍可先返回(同时后台刷新)的最长时间(秒)
+HEALTH_CACHE_STALE_TTL = 300
 
 
 class HealthChecker:
@@ -17,6 +38,9 @@ class HealthChecker:
     def __init__(self):
         self.results = {}
         self.config = None
+        # MySQL连接检查与表检查共用的连接
+        self._mysql_connection = None
+        self._mysql_error = None
 
     def load_config(self) -> Tuple[bool, str]:
         """加载配置文件"""
@@ -140,8 +164,8 @@ class HealthChecker:
 
         try:
             # 测试API连接
-            import openai
-            client = openai.OpenAI(api_key=api_key, base_url=base_url)
+            from utils.http_client import create_openai_client
+            client = create_openai_client(api_key=api_key, base_url=base_url)
 
             # 发送简单的测试请求
             response = client.chat.completions.create(
@@ -216,6 +240,16 @@ class HealthChecker:
                 'details': None
             }
 
+        db_url = self._embedded_database_url()
+        if db_url:
+            error = validate_database_config(self.config)
+            return {
+                'name': 'MySQL配置',
+                'status': 'error' if error else 'success',
+                'message': error or f'使用嵌入式数据库,无需MySQL ({get_backend_name(db_url)}: {make_url(db_url).database})',
+                'details': []
+            }
+
         result = {
             'name': 'MySQL配置',
             'status': 'success',
@@ -249,6 +283,85 @@ class HealthChecker:
 
         return result
 
+    def _get_mysql_connection(self):
+        """获取(必要时创建)共用的MySQL连接,不指定数据库,以便数据库不存在时也能连接"""
+        # 首次连接失败后,表检查直接复用该错误,不再等待第二次连接超时
+        if self._mysql_error is not None:
+            raise self._mysql_error
+        if self._mysql_connection is None:
+            try:
+                self._mysql_connection = self._connect_mysql()
+            except Exception as e:
+                self._mysql_error = e
+                raise
+        return self._mysql_connection
+
+    def _connect_mysql(self):
+        return pymysql.connect(
+            host=getattr(self.config, 'DB_HOST', ''),
+            port=getattr(self.config, 'DB_PORT', 3306),
+            user=getattr(self.config, 'DB_USER', ''),
+            password=getattr(self.config, 'DB_PASSWORD', ''),
+            charset='utf8mb4',
+            connect_timeout=5,
+            read_timeout=5
+        )
+
+    def _close_mysql_connection(self):
+        if self._mysql_connection is not None:
+            try:
+                self._mysql_connection.close()
+            except Exception:
+                pass
+            self._mysql_connection = None
+
+    def _embedded_database_url(self) -> Optional[str]:
+        """config.py通过DB_URL配置了SQLite/DuckDB时返回该URL"""
+        db_url = (getattr(self.config, 'DB_URL', '') or '').strip()
+        try:
+            return db_url if db_url and is_embedded_backend(db_url) else None
+        except Exception:
+            return None
+
+    def check_embedded_database(self, db_url: str) -> Dict[str, Dict]:
+        """嵌入式数据库: 打开数据库文件并检查训练数据表"""
+        connection_result = {'name': 'MySQL连接', 'status': 'success', 'message': '', 'details': None}
+        tables_result = {'name': '数据库表', 'status': 'success', 'message': '', 'details': None}
+        engine = None
+        try:
+            engine = create_database_engine(db_url)
+            tables = inspect(engine).get_table_names()
+            connection_result['message'] = f'嵌入式数据库可用 ({get_backend_name(db_url)})'
+            training_tables = [name for name in tables if name.startswith('training_records_')]
+            if training_tables:
+                tables_result['message'] = f'数据库表检查通过,共{len(tables)}个表'
+            else:
+                tables_result['status'] = 'warning'
+                tables_result['message'] = '尚未创建训练数据表'
+                tables_result['details'] = '首次查询或导入训练数据时会自动建表'
+        except Exception as e:
+            for result in (connection_result, tables_result):
+                result['status'] = 'error'
+                result['message'] = '嵌入式数据库打开失败'
+                result['details'] = str(e)
+        finally:
+            if engine is not None:
+                engine.dispose()
+        return {'mysql_connection': connection_result, 'database_tables': tables_result}
+
+    def check_mysql(self) -> Dict[str, Dict]:
+        """依次执行MySQL连接检查和表检查(共用一个连接)"""
+        db_url = self._embedded_database_url() if self.config else None
+        if db_url:
+            return self.check_embedded_database(db_url)
+        try:
+            return {
+                'mysql_connection': self.check_mysql_connection(),
+                'database_tables': self.check_database_tables()
+            }
+        finally:
+            self._close_mysql_connection()
+
     def check_mysql_connection(self) -> Dict:
         """检查MySQL连接"""
         if not self.config:
@@ -262,7 +375,6 @@ class HealthChecker:
         db_host = getattr(self.config, 'DB_HOST', '')
         db_port = getattr(self.config, 'DB_PORT', 3306)
         db_user = getattr(self.config, 'DB_USER', '')
-        db_password = getattr(self.config, 'DB_PASSWORD', '')
         db_name = getattr(self.config, 'DB_NAME', '')
 
         if not db_user or db_user == 'your_db_username':
@@ -282,22 +394,13 @@ class HealthChecker:
 
         try:
             # 测试数据库连接
-            connection = pymysql.connect(
-                host=db_host,
-                port=db_port,
-                user=db_user,
-                password=db_password,
-                charset='utf8mb4',
-                connect_timeout=5
-            )
+            connection = self._get_mysql_connection()
 
             # 检查数据库是否存在
             with connection.cursor() as cursor:
                 cursor.execute(f"SHOW DATABASES LIKE '{db_name}'")
                 db_exists = cursor.fetchone() is not None
 
-            connection.close()
-
             if db_exists:
                 result['message'] = f'MySQL连接成功,数据库"{db_name}"已存在'
             else:
@@ -331,10 +434,7 @@ class HealthChecker:
                 'details': None
             }
 
-        db_host = getattr(self.config, 'DB_HOST', '')
-        db_port = getattr(self.config, 'DB_PORT', 3306)
         db_user = getattr(self.config, 'DB_USER', '')
-        db_password = getattr(self.config, 'DB_PASSWORD', '')
         db_name = getattr(self.config, 'DB_NAME', '')
 
         if not db_user or db_user == 'your_db_username':
@@ -353,23 +453,13 @@ class HealthChecker:
         }
 
         try:
-            connection = pymysql.connect(
-                host=db_host,
-                port=db_port,
-                user=db_user,
-                password=db_password,
-                database=db_name,
-                charset='utf8mb4',
-                connect_timeout=5
-            )
+            connection = self._get_mysql_connection()
 
             with connection.cursor() as cursor:
-                cursor.execute("SHOW TABLES")
+                cursor.execute(f"SHOW TABLES FROM `{db_name}`")
                 tables = cursor.fetchall()
                 table_count = len(tables)
 
-            connection.close()
-
             if table_count == 0:
                 result['status'] = 'warning'
                 result['message'] = '数据库为空,未找到任何表'
@@ -393,19 +483,53 @@ class HealthChecker:
 
         return result
 
+    @staticmethod
+    def _timeout_result(name: str, deadline: int) -> Dict:
+        return {
+            'name': name,
+            'status': 'error',
+            'message': f'检查超时(超过{deadline}秒)',
+            'details': None
+        }
+
     def run_all_checks(self) -> Dict:
-        """运行所有健康检查"""
+        """运行所有健康检查(网络检查并发执行,总耗时约等于最慢的一项)"""
+        # 本地检查耗时可忽略,顺序执行;配置文件检查需在其他检查之前完成
         checks = {
             'python_env': self.check_python_environment(),
             'config_file': self.check_config_file(),
             'llm_config': self.check_llm_config(),
-            'llm_api': self.check_llm_api_connection(),
-            'search_api': self.check_search_api_config(),
-            'mysql_config': self.check_mysql_config(),
-            'mysql_connection': self.check_mysql_connection(),
-            'database_tables': self.check_database_tables()
         }
 
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='health-check')
+        try:
+            llm_future = executor.submit(self.check_llm_api_connection)
+            mysql_future = executor.submit(self.check_mysql)
+
+            checks['search_api'] = self.check_search_api_config()
+            checks['mysql_config'] = self.check_mysql_config()
+
+            started = time.monotonic()
+            try:
+                checks['llm_api'] = llm_future.result(timeout=CHECK_DEADLINES['llm_api'])
+            except FutureTimeoutError:
+                checks['llm_api'] = self._timeout_result('LLM API连接', CHECK_DEADLINES['llm_api'])
+
+            remaining = max(0.0, CHECK_DEADLINES['mysql'] - (time.monotonic() - started))
+            try:
+                checks.update(mysql_future.result(timeout=remaining))
+            except FutureTimeoutError:
+                checks['mysql_connection'] = self._timeout_result('MySQL连接', CHECK_DEADLINES['mysql'])
+                checks['database_tables'] = self._timeout_result('数据库表', CHECK_DEADLINES['mysql'])
+        finally:
+            # 超时的检查线程在后台自行结束,不阻塞本次返回
+            executor.shutdown(wait=False)
+
+        # 保持原有的展示顺序
+        order = ['python_env', 'config_file', 'llm_config', 'llm_api', 'search_api',
+                 'mysql_config', 'mysql_connection', 'database_tables']
+        checks = {key: checks[key] for key in order}
+
         # 统计状态
         status_summary = {
             'success': 0,
@@ -426,14 +550,77 @@ class HealthChecker:
         return {
             'overall_status': overall_status,
             'checks': checks,
-            'summary': status_summary
+            'summary': status_summary,
+            'checked_at': time.time()
         }
 
 
-def run_health_check() -> Dict:
-    """运行健康检查并返回结果"""
-    checker = HealthChecker()
-    return checker.run_all_checks()
+# 健康检查结果缓存
+_cache_lock = threading.Lock()
+_cached_result: Optional[Dict] = None
+_refreshing = False
+# 缓存代数: 每次清空缓存加1,清空之前开始的检查结果不再写回缓存
+_cache_generation = 0
+
+
+def _store_result(result: Dict, generation: int):
+    """写入缓存(调用方持有_cache_lock);检查开始后缓存被清空过则丢弃结果"""
+    global _cached_result
+    if generation == _cache_generation:
+        _cached_result = result
+
+
+def _refresh_in_background(generation: int):
+    """后台刷新缓存(同一时间只有一个刷新线程)"""
+    global _refreshing
+    try:
+        result = HealthChecker().run_all_checks()
+        with _cache_lock:
+            _store_result(result, generation)
+    except Exception as e:
+        print(f"后台刷新健康检查失败: {e}")
+    finally:
+        with _cache_lock:
+            _refreshing = False
+
+
+def invalidate_health_cache():
+    """清空缓存(配置修改后调用,下次检查重新执行;正在进行的检查结果不会写回)"""
+    global _cached_result, _cache_generation
+    with _cache_lock:
+        _cached_result = None
+        _cache_generation += 1
+
+
+def run_health_check(force_refresh: bool = False) -> Dict:
+    """
+    运行健康检查并返回结果
+
+    - 缓存未过期(HEALTH_CACHE_TTL内): 直接返回缓存
+    - 缓存已过期但未超过HEALTH_CACHE_STALE_TTL: 返回旧结果,同时后台刷新
+    - 无缓存或force_refresh: 同步执行检查
+
+    Args:
+        force_refresh: 是否忽略缓存重新检查
+    """
+    global _refreshing
+    with _cache_lock:
+        generation = _cache_generation
+        cached = _cached_result
+        if cached is not None and not force_refresh:
+            age = time.time() - cached['checked_at']
+            if age < HEALTH_CACHE_TTL:
+                return cached
+            if age < HEALTH_CACHE_STALE_TTL:
+                if not _refreshing:
+                    _refreshing = True
+                    threading.Thread(target=_refresh_in_background, args=(generation,), daemon=True).start()
+                return cached
+
+    result = HealthChecker().run_all_checks()
+    with _cache_lock:
+        _store_result(result, generation)
+    return result
 
 
 if __name__ == '__main__':
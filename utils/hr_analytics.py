@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+心率时间序列分析
+将Keep训练记录中的heart_rate_data(JSON文本)解码为NumPy数组,向量化计算:
+- 心率区间时长 (按最大心率百分比划分的5区间)
+- 心率漂移 (Cardiac Drift, 后半程相对前半程的平均心率变化)
+- TRIMP (Banister训练冲量)
+- 心率恢复 (任意60秒窗口内的最大心率下降)
+
+解码后的序列可选地以uint8二进制旁路文件保存,再次计算时跳过JSON解析;
+计算结果按活动ID缓存,记录修改(last_modify_ts变化)后自动失效
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# 心率区间上下界 (占最大心率的比例),与Garmin默认5区间一致
+HR_ZONE_BOUNDS = (0.5, 0.6, 0.7, 0.8, 0.9)
+
+DEFAULT_MAX_HR = 190
+DEFAULT_RESTING_HR = 60
+
+# 心率漂移计算时丢弃的热身比例
+DRIFT_WARMUP_FRACTION = 0.1
+
+# 心率恢复窗口(秒)
+RECOVERY_WINDOW_SECONDS = 60
+
+# 合法心率范围,超出视为传感器噪声
+_VALID_HR_RANGE = (30, 240)
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / "data" / "cache"
+
+
+def decode_hr_series(raw: Any) -> np.ndarray:
+    """
+    将心率数据解码为float64数组,无效点(空值、越界值)剔除
+
+    Args:
+        raw: uint8打包的bytes、JSON文本或列表
+
+    Returns:
+        心率数组,无数据时返回空数组
+    """
+    if raw is None:
+        return np.empty(0, dtype=np.float64)
+
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        arr = np.frombuffer(bytes(raw), dtype=np.uint8).astype(np.float64)
+    else:
+        if isinstance(raw, str):
+            if not raw.strip():
+                return np.empty(0, dtype=np.float64)
+            try:
+                raw = json.loads(raw)
+            except (json.JSONDecodeError, ValueError):
+                return np.empty(0, dtype=np.float64)
+        if not isinstance(raw, (list, tuple)):
+            return np.empty(0, dtype=np.float64)
+        try:
+            arr = np.asarray(raw, dtype=np.float64)
+        except (ValueError, TypeError):
+            # 含有None/空字符串等混合值时退化为逐元素转换
+            arr = np.array([_to_float(x) for x in raw], dtype=np.float64)
+
+    if arr.ndim != 1:
+        return np.empty(0, dtype=np.float64)
+    valid = np.isfinite(arr) & (arr >= _VALID_HR_RANGE[0]) & (arr <= _VALID_HR_RANGE[1])
+    return arr[valid]
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def pack_hr_series(hr: np.ndarray) -> bytes:
+    """将心率序列打包为uint8二进制(每个点1字节)"""
+    return np.clip(np.rint(hr), 0, 255).astype(np.uint8).tobytes()
+
+
+def compute_hr_metrics(
+    hr: np.ndarray,
+    duration_seconds: Optional[float],
+    max_hr: float = DEFAULT_MAX_HR,
+    resting_hr: float = DEFAULT_RESTING_HR
+) -> Dict[str, Any]:
+    """
+    计算单次训练的心率指标
+
+    采样间隔由训练时长/采样点数推算(Keep序列不带时间戳);
+    Keep只有心率没有逐点配速,因此心率漂移为纯心率漂移,不是配速:心率解耦
+
+    Args:
+        hr: 心率序列
+        duration_seconds: 训练时长(秒)
+        max_hr: 最大心率
+        resting_hr: 静息心率
+
+    Returns:
+        指标字典,序列过短时返回{}
+    """
+    n = hr.shape[0]
+    if n < 2:
+        return {}
+
+    dt = float(duration_seconds) / n if duration_seconds and duration_seconds > 0 else 1.0
+
+    # 心率区间时长
+    bounds = np.asarray(HR_ZONE_BOUNDS, dtype=np.float64) * max_hr
+    zone_index = np.digitize(hr, bounds)  # 0: 低于Z1, 1-5: Z1-Z5
+    zone_counts = np.bincount(zone_index, minlength=len(HR_ZONE_BOUNDS) + 1)
+    zone_seconds = [int(round(c * dt)) for c in zone_counts[1:]]
+
+    # 心率漂移: 去掉热身段后,后半程均值相对前半程均值的百分比变化
+    steady = hr[int(n * DRIFT_WARMUP_FRACTION):]
+    half = steady.shape[0] // 2
+    cardiac_drift_pct = None
+    if half >= 1:
+        first_mean = steady[:half].mean()
+        second_mean = steady[half:].mean()
+        if first_mean > 0:
+            cardiac_drift_pct = round(float((second_mean - first_mean) / first_mean * 100.0), 2)
+
+    # Banister TRIMP (男性系数 0.64 / 1.92)
+    reserve = max(max_hr - resting_hr, 1.0)
+    hrr = np.clip((hr - resting_hr) / reserve, 0.0, 1.0)
+    trimp = float(np.sum(dt / 60.0 * hrr * 0.64 * np.exp(1.92 * hrr)))
+
+    # 心率恢复: 任意60秒窗口内的最大下降
+    lag = int(round(RECOVERY_WINDOW_SECONDS / dt))
+    hr_recovery_60s = None
+    if 0 < lag < n:
+        drops = hr[:-lag] - hr[lag:]
+        hr_recovery_60s = int(max(0.0, float(drops.max())))
+
+    return {
+        'samples': int(n),
+        'sample_interval_s': round(dt, 2),
+        'avg_hr': round(float(hr.mean()), 1),
+        'max_hr': int(hr.max()),
+        'min_hr': int(hr.min()),
+        'hr_zone_seconds': zone_seconds,
+        'hr_zone_percent': [round(float(c) / n * 100.0, 1) for c in zone_counts[1:]],
+        'cardiac_drift_pct': cardiac_drift_pct,
+        'trimp': round(trimp, 1),
+        'hr_recovery_60s': hr_recovery_60s,
+    }
+
+
+class HeartRateAnalyticsCache:
+    """
+    心率分析结果缓存
+
+    - 指标缓存: {活动ID: {version, params, metrics}} 持久化为JSON
+    - 序列旁路缓存(可选): 每个活动一个uint8二进制文件,跳过JSON解码
+    """
+
+    def __init__(self, data_source: str = "keep", cache_dir: Optional[Path] = None,
+                 use_sidecar: bool = True):
+        self.data_source = data_source
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.metrics_path = self.cache_dir / f"hr_metrics_{data_source}.json"
+        self.sidecar_dir = self.cache_dir / f"hr_series_{data_source}"
+        self.use_sidecar = use_sidecar
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._loaded_mtime: Optional[float] = None
+        self._dirty = False
+
+    # ===== 持久化 =====
+
+    def _load(self):
+        if not self.metrics_path.exists():
+            return
+        mtime = self.metrics_path.stat().st_mtime
+        if self._loaded_mtime is not None and mtime <= self._loaded_mtime:
+            return
+        try:
+            with open(self.metrics_path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+            self._loaded_mtime = mtime
+        except Exception as e:
+            print(f"心率分析缓存读取失败,将重新计算: {e}")
+            self._entries = {}
+
+    def flush(self):
+        """将新增的指标写回磁盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.metrics_path.with_suffix(".tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.metrics_path)
+                self._loaded_mtime = self.metrics_path.stat().st_mtime
+                self._dirty = False
+            except Exception as e:
+                print(f"心率分析缓存写入失败: {e}")
+
+    def _sidecar_path(self, activity_id: Any, version: Any) -> Path:
+        return self.sidecar_dir / f"{activity_id}_{version}.u8"
+
+    def _read_sidecar(self, activity_id: Any, version: Any) -> Optional[np.ndarray]:
+        if not self.use_sidecar:
+            return None
+        path = self._sidecar_path(activity_id, version)
+        if not path.exists():
+            return None
+        try:
+            return decode_hr_series(path.read_bytes())
+        except OSError:
+            return None
+
+    def _write_sidecar(self, activity_id: Any, version: Any, hr: np.ndarray):
+        if not self.use_sidecar or hr.shape[0] == 0:
+            return
+        try:
+            self.sidecar_dir.mkdir(parents=True, exist_ok=True)
+            for stale in self.sidecar_dir.glob(f"{activity_id}_*.u8"):
+                stale.unlink()
+            self._sidecar_path(activity_id, version).write_bytes(pack_hr_series(hr))
+        except OSError as e:
+            print(f"心率序列旁路缓存写入失败: {e}")
+
+    # ===== 查询 =====
+
+    def get_cached(self, activity_id: Any, version: Any,
+                   max_hr: float = DEFAULT_MAX_HR,
+                   resting_hr: float = DEFAULT_RESTING_HR) -> Optional[Dict[str, Any]]:
+        """
+        获取已缓存的指标,版本或参数不一致时返回None
+
+        Args:
+            activity_id: 活动ID
+            version: 记录版本(last_modify_ts)
+        """
+        with self._lock:
+            self._load()
+            entry = self._entries.get(str(activity_id))
+            if not entry:
+                return None
+            if entry.get('version') != version or entry.get('params') != [max_hr, resting_hr]:
+                return None
+            return entry.get('metrics')
+
+    def analyze(self, activity_id: Any, version: Any, raw_series: Any,
+                duration_seconds: Optional[float],
+                max_hr: float = DEFAULT_MAX_HR,
+                resting_hr: float = DEFAULT_RESTING_HR) -> Dict[str, Any]:
+        """
+        计算并缓存单个活动的心率指标
+
+        Args:
+            activity_id: 活动ID
+            version: 记录版本(last_modify_ts)
+            raw_series: 原始heart_rate_data;为None时尝试读取旁路缓存
+            duration_seconds: 训练时长(秒)
+
+        Returns:
+            指标字典(无有效心率时为{})
+        """
+        cached = self.get_cached(activity_id, version, max_hr, resting_hr)
+        if cached is not None:
+            return cached
+
+        hr = self._read_sidecar(activity_id, version)
+        if hr is None:
+            hr = decode_hr_series(raw_series)
+            self._write_sidecar(activity_id, version, hr)
+
+        metrics = compute_hr_metrics(hr, duration_seconds, max_hr, resting_hr)
+        with self._lock:
+            self._entries[str(activity_id)] = {
+                'version': version,
+                'params': [max_hr, resting_hr],
+                'metrics': metrics,
+            }
+            self._dirty = True
+        return metrics
+
+    def analyze_many(
+        self,
+        rows: Iterable[Tuple[Any, Any, Optional[float]]],
+        load_series,
+        max_hr: float = DEFAULT_MAX_HR,
+        resting_hr: float = DEFAULT_RESTING_HR
+    ) -> Dict[Any, Dict[str, Any]]:
+        """
+        批量计算指标,只为缓存未命中的活动加载原始心率文本
+
+        Args:
+            rows: (活动ID, 版本, 训练时长) 可迭代对象
+            load_series: 回调函数,接收未命中的活动ID列表,返回{活动ID: heart_rate_data}
+
+        Returns:
+            {活动ID: 指标字典}
+        """
+        results: Dict[Any, Dict[str, Any]] = {}
+        misses: List[Tuple[Any, Any, Optional[float]]] = []
+        for activity_id, version, duration in rows:
+            cached = self.get_cached(activity_id, version, max_hr, resting_hr)
+            if cached is not None:
+                results[activity_id] = cached
+            elif self.use_sidecar and self._sidecar_path(activity_id, version).exists():
+                results[activity_id] = self.analyze(activity_id, version, None, duration, max_hr, resting_hr)
+            else:
+                misses.append((activity_id, version, duration))
+
+        if misses:
+            raw_map = load_series([m[0] for m in misses]) or {}
+            for activity_id, version, duration in misses:
+                results[activity_id] = self.analyze(
+                    activity_id, version, raw_map.get(activity_id), duration, max_hr, resting_hr
+                )
+
+        self.flush()
+        return results
+
+    def invalidate(self, activity_id: Any = None):
+        """清除指定活动(或全部)的缓存"""
+        with self._lock:
+            self._load()
+            if activity_id is None:
+                self._entries = {}
+                if self.sidecar_dir.exists():
+                    for path in self.sidecar_dir.glob("*.u8"):
+                        try:
+                            path.unlink()
+                        except OSError:
+                            pass
+            else:
+                self._entries.pop(str(activity_id), None)
+                if self.sidecar_dir.exists():
+                    for path in self.sidecar_dir.glob(f"{activity_id}_*.u8"):
+                        try:
+                            path.unlink()
+                        except OSError:
+                            pass
+            self._dirty = True
+            self.flush()
+
+
+def summarize_hr_metrics(metrics_list: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    将多次训练的心率指标汇总为统计列(用于get_training_stats等汇总结果)
+
+    Returns:
+        汇总字典,没有有效心率数据时各项为None
+    """
+    valid = [m for m in metrics_list if m]
+    if not valid:
+        return {
+            'hr_analyzed_sessions': 0,
+            'total_trimp': None,
+            'avg_trimp': None,
+            'avg_cardiac_drift_pct': None,
+            'hr_zone_seconds': None,
+        }
+
+    trimp = np.array([m['trimp'] for m in valid], dtype=np.float64)
+    zones = np.array([m['hr_zone_seconds'] for m in valid], dtype=np.int64).sum(axis=0)
+    drift = np.array(
+        [m['cardiac_drift_pct'] for m in valid if m.get('cardiac_drift_pct') is not None],
+        dtype=np.float64
+    )
+    return {
+        'hr_analyzed_sessions': len(valid),
+        'total_trimp': round(float(trimp.sum()), 1),
+        'avg_trimp': round(float(trimp.mean()), 1),
+        'avg_cardiac_drift_pct': round(float(drift.mean()), 2) if drift.size else None,
+        'hr_zone_seconds': [int(z) for z in zones],
+    }
+
+
+# 全局缓存实例 (按数据源区分)
+_caches: Dict[str, HeartRateAnalyticsCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_hr_analytics_cache(data_source: str = "keep") -> HeartRateAnalyticsCache:
+    """获取指定数据源的心率分析缓存单例"""
+    with _caches_lock:
+        if data_source not in _caches:
+            _caches[data_source] = HeartRateAnalyticsCache(data_source)
+        return _caches[data_source]
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+进程级共享HTTP客户端
+每次用裸 requests.post / 新建 openai.OpenAI 都要重新做DNS解析、TCP和TLS握手,
+这里提供进程内共享、保持长连接的客户端:
+- get_http_session(): 带连接池的 requests.Session,按主机设置默认超时(Bocha搜索、本地应用探测)
+- get_llm_http_client(): 共享的 httpx.Client,供OpenAI兼容接口使用;安装了h2时启用HTTP/2
+- create_openai_client(): 使用共享httpx客户端创建 openai.OpenAI(健康检查、连接测试)
+"""
+
+import threading
+from typing import Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# requests连接池: 缓存连接池的主机数 / 每个主机保持的最大连接数
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 20
+
+# 默认超时(连接, 读取),单位秒
+DEFAULT_TIMEOUT: Tuple[float, float] = (5, 60)
+
+# 按主机的超时(连接, 读取)
+HOST_TIMEOUTS = {
+    'api.bocha.cn': (5, 30),
+    'localhost': (2, 10),
+    '127.0.0.1': (2, 10),
+}
+
+# LLM接口(httpx)连接设置
+LLM_CONNECT_TIMEOUT = 10
+LLM_READ_TIMEOUT = 180
+LLM_MAX_CONNECTIONS = 20
+LLM_MAX_KEEPALIVE_CONNECTIONS = 10
+LLM_KEEPALIVE_EXPIRY = 60
+
+
+def get_timeout(url: str) -> Tuple[float, float]:
+    """获取URL所属主机的默认超时"""
+    return HOST_TIMEOUTS.get(urlparse(url).hostname, DEFAULT_TIMEOUT)
+
+
+class _PooledSession(requests.Session):
+    """未显式指定timeout时按主机补上默认超时的Session"""
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = get_timeout(url)
+        return super().request(method, url, **kwargs)
+
+
+_session: Optional[requests.Session] = None
+_llm_client = None
+_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """获取共享的requests.Session(长连接、连接池,重试由调用方的retry_helper负责)"""
+    global _session
+    with _lock:
+        if _session is None:
+            session = _PooledSession()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def get_llm_http_client():
+    """
+    获取共享的httpx.Client(供openai.OpenAI的http_client参数使用)
+
+    Returns:
+        httpx.Client;未安装httpx时返回None,由OpenAI SDK使用其默认客户端
+    """
+    global _llm_client
+    if not HTTPX_AVAILABLE:
+        return None
+    with _lock:
+        if _llm_client is None:
+            _llm_client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+                )
+            )
+        return _llm_client
+
+
+def create_openai_client(api_key: str, base_url: Optional[str] = None, **kwargs):
+    """
+    创建使用共享连接池的OpenAI兼容客户端
+
+    Args:
+        api_key: API密钥
+        base_url: 接口地址
+        **kwargs: 传给openai.OpenAI的其他参数
+    """
+    import openai
+
+    http_client = get_llm_http_client()
+    if http_client is not None:
+        kwargs.setdefault('http_client', http_client)
+    return openai.OpenAI(api_key=api_key, base_url=base_url, **kwargs)
+
+
+def close_http_clients():
+    """关闭共享客户端(进程退出时调用)"""
+    global _session, _llm_client
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+        if _llm_client is not None:
+            _llm_client.close()
+            _llm_client = None
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+后台导入任务管理
+Excel上传导入、Garmin导入/同步都作为后台任务提交到线程池执行,接口立即返回任务ID:
+- 进度(抓取/解析/写入)通过Socket.IO事件 import_progress 推送,也可通过轮询接口查询
+- 同一数据源同一时间只允许一个导入任务运行
+- 任务历史持久化到 data/import_jobs.json,服务重启后仍可查询
+"""
+
+import json
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# 任务历史文件
+DEFAULT_HISTORY_FILE = Path(__file__).parent.parent / "data" / "import_jobs.json"
+
+# 保留的历史任务数
+MAX_HISTORY = 100
+
+# 导入线程池大小(Keep和Garmin可各运行一个任务)
+MAX_WORKERS = 2
+
+# 任务状态
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+STATUS_INTERRUPTED = 'interrupted'
+
+ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+
+# 进度回调: report(stage, current, total, message)
+ProgressCallback = Callable[[str, Optional[int], Optional[int], str], None]
+
+
+class ImportJobConflict(Exception):
+    """同一数据源已有导入任务在运行"""
+
+    def __init__(self, job: Dict[str, Any]):
+        self.job = job
+        super().__init__(f"数据源 {job['source']} 已有导入任务在运行: {job['job_id']}")
+
+
+class ImportJobManager:
+    """导入任务管理器"""
+
+    def __init__(self, history_file: Path = DEFAULT_HISTORY_FILE, max_workers: int = MAX_WORKERS):
+        self.history_file = Path(history_file)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='import-job')
+        self._lock = threading.RLock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._emitter: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._load_history()
+
+    # ===== 持久化 =====
+
+    def _load_history(self):
+        """加载任务历史;上次进程退出时仍在运行的任务标记为interrupted"""
+        if not self.history_file.exists():
+            return
+        try:
+            jobs = json.loads(self.history_file.read_text(encoding='utf-8'))
+        except Exception as e:
+            print(f"读取导入任务历史失败: {e}")
+            return
+        for job in jobs:
+            if job.get('status') in ACTIVE_STATUSES:
+                job['status'] = STATUS_INTERRUPTED
+                job['message'] = '服务重启,任务中断'
+            self._jobs[job['job_id']] = job
+
+    def _save_history(self):
+        """保存任务历史(只在任务状态变化时调用,进度更新不落盘)"""
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j['created_at'])[-MAX_HISTORY:]
+            self._jobs = {job['job_id']: job for job in jobs}
+            payload = json.dumps(jobs, ensure_ascii=False, indent=2, default=str)
+        try:
+            self.history_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.history_file.with_suffix('.tmp')
+            tmp_file.write_text(payload, encoding='utf-8')
+            tmp_file.replace(self.history_file)
+        except Exception as e:
+            print(f"保存导入任务历史失败: {e}")
+
+    # ===== 推送 =====
+
+    def set_emitter(self, emitter: Callable[[Dict[str, Any]], None]):
+        """设置进度推送函数(由app.py注入socketio.emit)"""
+        self._emitter = emitter
+
+    def _emit(self, job: Dict[str, Any]):
+        if self._emitter is None:
+            return
+        try:
+            self._emitter(dict(job))
+        except Exception as e:
+            print(f"推送导入进度失败: {e}")
+
+    # ===== 任务 =====
+
+    def get_active_job(self, source: str) -> Optional[Dict[str, Any]]:
+        """获取数据源正在运行的任务"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job['source'] == source and job['status'] in ACTIVE_STATUSES:
+                    return dict(job)
+        return None
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self, source: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """按创建时间倒序列出任务"""
+        with self._lock:
+            jobs = [dict(j) for j in self._jobs.values() if source is None or j['source'] == source]
+        jobs.sort(key=lambda j: j['created_at'], reverse=True)
+        return jobs[:limit]
+
+    def submit(self, source: str, kind: str, func: Callable[[ProgressCallback], Dict[str, Any]],
+               prepare: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+        """
+        提交导入任务
+
+        Args:
+            source: 数据源(keep/garmin),同一数据源互斥
+            kind: 任务类型描述(如excel_upload、garmin_import、garmin_sync)
+            func: 任务函数,接收进度回调,返回导入统计;返回值含error时任务视为失败
+            prepare: 确认没有冲突任务后、登记任务前在锁内执行(如保存上传文件),
+                     保证检查和准备之间不会有同一数据源的任务插入;抛出异常时不提交任务
+
+        Returns:
+            任务信息
+
+        Raises:
+            ImportJobConflict: 同一数据源已有任务在运行
+        """
+        with self._lock:
+            active = self.get_active_job(source)
+            if active:
+                raise ImportJobConflict(active)
+            if prepare is not None:
+                prepare()
+
+            job = {
+                'job_id': uuid.uuid4().hex[:12],
+                'source': source,
+                'kind': kind,
+                'status': STATUS_PENDING,
+                'stage': 'queued',
+                'current': None,
+                'total': None,
+                'message': '等待执行',
+                'result': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None
+            }
+            self._jobs[job['job_id']] = job
+        self._save_history()
+        self._emit(job)
+
+        self._executor.submit(self._run, job['job_id'], func)
+        return dict(job)
+
+    def _update(self, job_id: str, persist: bool = False, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            snapshot = dict(job)
+        if persist:
+            self._save_history()
+        self._emit(snapshot)
+
+    def _run(self, job_id: str, func: Callable[[ProgressCallback], Dict[str, Any]]):
+        self._update(job_id, persist=True, status=STATUS_RUNNING, started_at=time.time(), message='开始执行')
+
+        def report(stage: str, current: Optional[int] = None, total: Optional[int] = None, message: str = ''):
+            self._update(job_id, stage=stage, current=current, total=total, message=message)
+
+        try:
+            result = func(report) or {}
+            if result.get('error'):
+                self._update(job_id, persist=True, status=STATUS_FAILED, stage='done',
+                             message=result['error'], result=result, finished_at=time.time())
+            else:
+                self._update(job_id, persist=True, status=STATUS_SUCCEEDED, stage='done',
+                             message=f"导入完成,共{result.get('success', 0)}条记录",
+                             result=result, finished_at=time.time())
+        except Exception as e:
+            print(f"导入任务 {job_id} 失败: {traceback.format_exc()}")
+            self._update(job_id, persist=True, status=STATUS_FAILED, stage='done',
+                         message=str(e), finished_at=time.time())
+
+
+# 全局实例
+_job_manager: Optional[ImportJobManager] = None
+_job_manager_lock = threading.Lock()
+
+
+def get_import_job_manager() -> ImportJobManager:
+    """获取导入任务管理器单例"""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = ImportJobManager()
+        return _job_manager
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+LLM调用的token用量统计
+记录每次调用的输入/输出token,以及服务商报告的前缀缓存命中token,
+用于观察稳定前缀的提示词组装(utils/prompt_layout.py)实际命中了多少缓存。
+
+各服务商报告缓存命中的字段不同:
+- OpenAI / 通义千问 / Kimi 等: usage.prompt_tokens_details.cached_tokens
+- DeepSeek:                    usage.prompt_cache_hit_tokens
+- Anthropic兼容网关:            usage.cache_read_input_tokens
+"""
+
+import threading
+from typing import Any, Dict
+
+
+def _get(obj: Any, name: str) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _as_int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def extract_usage(usage: Any) -> Dict[str, int]:
+    """从响应的usage(SDK对象或字典)中取出输入、输出和缓存命中token数"""
+    cached = _as_int(_get(_get(usage, 'prompt_tokens_details'), 'cached_tokens'))
+    if not cached:
+        cached = _as_int(_get(usage, 'prompt_cache_hit_tokens')) or _as_int(_get(usage, 'cache_read_input_tokens'))
+    return {
+        'prompt_tokens': _as_int(_get(usage, 'prompt_tokens')),
+        'completion_tokens': _as_int(_get(usage, 'completion_tokens')),
+        'cached_tokens': cached,
+    }
+
+
+class LLMUsageStats:
+    """单个LLM客户端的累计用量(线程安全)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.cached_tokens = 0
+            self.cache_hit_calls = 0
+
+    def record(self, usage: Any) -> Dict[str, int]:
+        """记录一次调用的用量,返回本次解析出的token数"""
+        values = extract_usage(usage)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += values['prompt_tokens']
+            self.completion_tokens += values['completion_tokens']
+            self.cached_tokens += values['cached_tokens']
+            if values['cached_tokens']:
+                self.cache_hit_calls += 1
+        return values
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'cached_tokens': self.cached_tokens,
+                'cache_hit_calls': self.cache_hit_calls,
+                'cache_hit_ratio': self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+            }
+
+    def format_summary(self) -> str:
+        stats = self.snapshot()
+        return (f"LLM调用 {stats['calls']} 次, 输入 {stats['prompt_tokens']} tokens "
+                f"(缓存命中 {stats['cached_tokens']}, {stats['cache_hit_ratio']:.1%}), "
+                f"输出 {stats['completion_tokens']} tokens")
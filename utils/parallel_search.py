@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+段落级并发多查询搜索
+搜索/反思节点一次给出多个互补查询(MediaEngine可为每个查询指定不同工具),
+这里并发执行这些搜索,再按URL合并去重,交给一次总结调用,
+用并行I/O换取覆盖面,而不是增加串行的反思轮次
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 默认并发搜索数(与各引擎配置 MAX_PARALLEL_SEARCHES 的默认值一致: 单查询串行)
+DEFAULT_MAX_PARALLEL_SEARCHES = 1
+
+# 规范化URL时丢弃的跟踪参数前缀
+TRACKING_PARAM_PREFIXES = ('utm_', 'spm', 'fbclid', 'gclid')
+
+
+def normalize_url(url: str) -> str:
+    """
+    规范化URL用于去重: 主机名小写、去掉www.、片段和跟踪参数、末尾斜杠,
+    http/https视为相同
+    """
+    if not url:
+        return ''
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ))
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('', host, path, query, ''))
+
+
+def run_searches_concurrently(searches: Sequence[Any], search_func: Callable[[Any], Any],
+                              max_workers: int = DEFAULT_MAX_PARALLEL_SEARCHES) -> List[Tuple[Any, Optional[Any]]]:
+    """
+    并发执行多个搜索
+
+    Args:
+        searches: 搜索请求列表(查询字符串或(工具, 查询)等,原样传给search_func)
+        search_func: 执行单个搜索的函数
+        max_workers: 最大并发数
+
+    Returns:
+        与输入顺序一致的 (搜索请求, 响应) 列表;单个搜索失败时响应为None,不影响其他搜索
+    """
+    if not searches:
+        return []
+
+    def run_one(search):
+        try:
+            return search_func(search)
+        except Exception as e:
+            print(f"  ⚠️  搜索失败 ({search}): {e}")
+            return None
+
+    started = time.perf_counter()
+    if len(searches) == 1 or max_workers <= 1:
+        responses = [run_one(search) for search in searches]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(searches)),
+                                thread_name_prefix='paragraph-search') as executor:
+            responses = list(executor.map(run_one, searches))
+    print(f"  - 并发执行 {len(searches)} 个搜索,耗时 {time.perf_counter() - started:.2f}秒")
+    return list(zip(searches, responses))
+
+
+def merge_search_results(result_lists: Sequence[List[Dict[str, Any]]],
+                         max_results: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    合并多个搜索的结果并按规范化URL去重
+
+    按轮转顺序从各个查询的结果中依次取一条,保证每个查询都有结果进入总结;
+    同一URL出现多次时保留内容更长的一条
+
+    Args:
+        result_lists: 每个搜索转换后的结果列表(含url、content等字段)
+        max_results: 合并后的最大结果数
+
+    Returns:
+        去重后的结果列表
+    """
+    merged: List[Dict[str, Any]] = []
+    index_by_url: Dict[str, int] = {}
+    longest = max((len(results) for results in result_lists), default=0)
+
+    for position in range(longest):
+        for results in result_lists:
+            if position >= len(results):
+                continue
+            result = results[position]
+            key = normalize_url(result.get('url', '')) or f"#{id(result)}"
+            existing = index_by_url.get(key)
+            if existing is None:
+                index_by_url[key] = len(merged)
+                merged.append(result)
+            elif len(result.get('content') or '') > len(merged[existing].get('content') or ''):
+                merged[existing] = result
+
+    total = sum(len(results) for results in result_lists)
+    if total > len(merged):
+        print(f"  - 合并搜索结果: {total} 条 → 去重后 {len(merged)} 条")
+    if max_results is not None:
+        merged = merged[:max_results]
+    return merged
+
+
+def dedupe_queries(queries: Sequence[Any], limit: int) -> List[Any]:
+    """
+    去掉空查询和重复查询(忽略大小写和多余空白),最多保留limit个
+
+    Args:
+        queries: 查询字符串,或 (工具名, 查询) 元组
+        limit: 最多保留的数量
+    """
+    seen = set()
+    unique = []
+    for query in queries:
+        if isinstance(query, str):
+            tool, text = '', query
+        else:
+            tool, text = query
+        text = ' '.join((text or '').split()).lower()
+        key = (tool, text)
+        if not text or key in seen:
+            continue
+        seen.add(key)
+        unique.append(query)
+        if len(unique) >= limit:
+            break
+    return unique
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+稳定前缀的提示词组装
+兼容OpenAI接口的服务商(OpenAI、DeepSeek、通义千问、Kimi等)会缓存请求的公共前缀,
+命中部分按缓存计费且首token延迟更低,但只有逐字节相同的前缀才能命中。
+总结/反思调用的系统提示词(含工具说明)本身是固定的,用户消息按以下顺序组装,
+使变化的内容都排在最后:
+
+1. HOST发言引导    (论坛主持人发言更新前,所有段落、所有轮次相同)
+2. 段落规划        (title、content,同一段落的各轮次相同)
+3. 易变内容        (最新总结、搜索查询、搜索结果)
+4. 附加上下文      (当前时间等每次调用都可能变化的内容)
+
+JSON字段按固定顺序、固定分隔符序列化,同样的输入总是得到同样的字节序列。
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+# 段落规划字段(稳定前缀)
+PARAGRAPH_PLAN_KEYS = ('title', 'content')
+# 易变字段,按变化频率从低到高排在JSON末尾
+VOLATILE_KEYS = ('paragraph_latest_state', 'search_query', 'search_results')
+
+# 消息各部分之间的分隔符
+SECTION_SEPARATOR = "\n\n---\n\n"
+
+
+def order_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """段落规划字段在前,其他字段按名称排序,易变字段在最后"""
+    ordered = {key: data[key] for key in PARAGRAPH_PLAN_KEYS if key in data}
+    for key in sorted(data):
+        if key not in ordered and key not in VOLATILE_KEYS:
+            ordered[key] = data[key]
+    for key in VOLATILE_KEYS:
+        if key in data:
+            ordered[key] = data[key]
+    return ordered
+
+
+def dumps_payload(data: Any) -> str:
+    """按固定字段顺序序列化提示词输入,字符串原样返回"""
+    if isinstance(data, str):
+        return data
+    if isinstance(data, dict):
+        data = order_payload(data)
+    return json.dumps(data, ensure_ascii=False)
+
+
+def build_user_message(data: Any, guidance: Optional[str] = None,
+                       trailing_context: Optional[str] = None) -> str:
+    """
+    组装用户消息: [引导] --- JSON输入 --- [附加上下文]
+
+    Args:
+        data: 节点输入(字典按固定顺序序列化)
+        guidance: 稳定的引导内容(如HOST发言),放在最前面
+        trailing_context: 每次调用都可能变化的上下文(如当前时间),放在最后面
+    """
+    sections = []
+    if guidance and guidance.strip():
+        sections.append(guidance.strip())
+    sections.append(dumps_payload(data))
+    if trailing_context and trailing_context.strip():
+        sections.append(trailing_context.strip())
+    return SECTION_SEPARATOR.join(sections)
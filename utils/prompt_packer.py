@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+按token预算打包搜索结果
+原来的 format_search_results_for_prompt 只按字符数逐条截断,不限制总量,
+一个段落可能把几百KB内容送进LLM;而按空格找截断点的逻辑对中文无效。
+这里在给定token预算内:
+- 用本地tokenizer(安装了tiktoken时)或快速估算统计token
+- 按相关度分配各条结果的预算,分不到最小份额的低相关结果整体丢弃
+- 在句子边界截断(支持中文标点)
+- 返回打包报告,记录被截断和丢弃的结果
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+# 单条结果至少分到的token数,不足时丢弃低相关结果
+MIN_ITEM_TOKENS = 150
+# 截断时在目标长度之前至少保留的比例(找不到句子边界时直接硬截断)
+MIN_SENTENCE_KEEP_RATIO = 0.6
+TRUNCATION_MARK = "..."
+
+_CJK_RE = re.compile(r'[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]')
+_SENTENCE_END_RE = re.compile(r'[。！？；!?;]|\.(?=\s)|\n')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    统计文本token数
+
+    安装了tiktoken时精确计数;否则按中日韩字符约1个token、其他字符约4个字符1个token估算
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """
+    截断到max_chars字符以内,优先在句子边界(中英文标点、换行)截断,
+    其次在空格处截断,都找不到合适位置时硬截断
+    """
+    if len(text) <= max_chars:
+        return text
+    window = text[:max_chars]
+    min_keep = int(max_chars * MIN_SENTENCE_KEEP_RATIO)
+
+    sentence_end = None
+    for match in _SENTENCE_END_RE.finditer(window):
+        sentence_end = match.end()
+    if sentence_end and sentence_end >= min_keep:
+        return window[:sentence_end].rstrip() + TRUNCATION_MARK
+
+    last_space = window.rfind(' ')
+    if last_space >= min_keep:
+        return window[:last_space] + TRUNCATION_MARK
+    return window + TRUNCATION_MARK
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """按token数截断(先按比例估算字符数,再逐步收紧)"""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    max_chars = max(1, int(len(text) * max_tokens / tokens))
+    truncated = truncate_text(text, max_chars)
+    while estimate_tokens(truncated) > max_tokens and max_chars > 1:
+        max_chars = int(max_chars * 0.9)
+        truncated = truncate_text(text, max_chars)
+    return truncated
+
+
+@dataclass
+class PackReport:
+    """打包报告"""
+    budget: int
+    used_tokens: int = 0
+    original_tokens: int = 0
+    kept: int = 0
+    trimmed: List[str] = field(default_factory=list)
+    dropped: List[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return (f"提示词打包: {self.kept}条结果, {self.used_tokens}/{self.budget} tokens "
+                f"(原始{self.original_tokens}), 截断{len(self.trimmed)}条, 丢弃{len(self.dropped)}条")
+
+
+def _relevance(result: Dict[str, Any], rank: int) -> float:
+    """相关度权重: 优先使用搜索返回的score,没有时按排名递减"""
+    score = result.get('score')
+    if isinstance(score, (int, float)) and score > 0:
+        return float(score)
+    return 1.0 / (rank + 1)
+
+
+def pack_search_results(search_results: List[Dict[str, Any]], token_budget: int,
+                        max_length: Optional[int] = None,
+                        render: Optional[Callable[[Dict[str, Any], str], str]] = None):
+    """
+    在token预算内打包搜索结果
+
+    Args:
+        search_results: 搜索结果(含content,可选score、title、content_id)
+        token_budget: 所有结果合计的token预算
+        max_length: 单条结果的最大字符数(与原来的截断规则一致)
+        render: 将结果和(截断后的)内容渲染为提示词文本的函数,默认只输出内容
+
+    Returns:
+        (提示词文本列表(保持原顺序), PackReport)
+    """
+    render = render or (lambda result, content: content)
+    report = PackReport(budget=token_budget)
+
+    items = []
+    for rank, result in enumerate(search_results):
+        content = result.get('content') or ''
+        if not content:
+            continue
+        label = result.get('content_id') or result.get('title') or result.get('url') or f"#{rank + 1}"
+        report.original_tokens += estimate_tokens(render(result, content))
+        if max_length and len(content) > max_length:
+            content = truncate_text(content, max_length)
+            report.trimmed.append(label)
+        text = render(result, content)
+        items.append({
+            'rank': rank, 'result': result, 'content': content, 'label': label,
+            'tokens': estimate_tokens(text), 'overhead': estimate_tokens(render(result, '')),
+            'weight': _relevance(result, rank)
+        })
+
+    # 预算不够每条最小份额时,从相关度最低的开始丢弃
+    by_relevance = sorted(items, key=lambda item: (-item['weight'], item['rank']))
+    while by_relevance and len(by_relevance) * MIN_ITEM_TOKENS > token_budget:
+        report.dropped.append(by_relevance.pop()['label'])
+
+    # 按相关度比例分配预算;用不完份额的短结果把剩余预算让给其他结果
+    allocation: Dict[int, int] = {}
+    pending = list(by_relevance)
+    remaining = token_budget
+    while pending:
+        total_weight = sum(item['weight'] for item in pending)
+        satisfied = [item for item in pending
+                     if item['tokens'] <= remaining * item['weight'] / total_weight]
+        if not satisfied:
+            for item in pending:
+                allocation[item['rank']] = int(remaining * item['weight'] / total_weight)
+            break
+        for item in satisfied:
+            allocation[item['rank']] = item['tokens']
+            remaining -= item['tokens']
+            pending.remove(item)
+
+    packed = []
+    for item in items:
+        if item['rank'] not in allocation:
+            continue
+        content = item['content']
+        if item['tokens'] > allocation[item['rank']]:
+            content = truncate_to_tokens(content, max(1, allocation[item['rank']] - item['overhead']))
+            if item['label'] not in report.trimmed:
+                report.trimmed.append(item['label'])
+        text = render(item['result'], content)
+        report.used_tokens += estimate_tokens(text)
+        packed.append(text)
+
+    report.kept = len(packed)
+    return packed, report
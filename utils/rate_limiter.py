@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+自适应令牌桶限流器
+按AIMD(加性增、乘性减)调整请求速率:
+- 请求成功时速率缓慢上调,服务健康时逐步提速
+- 遇到HTTP 429/5xx时速率减半,并在Retry-After(或默认冷却时间)内暂停发放令牌
+"""
+
+import re
+import threading
+import time
+from typing import Optional
+
+# 需要退避的HTTP状态码
+THROTTLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class AdaptiveTokenBucket:
+    """线程安全的自适应令牌桶"""
+
+    def __init__(self, rate: float = 2.0, min_rate: float = 0.2, max_rate: float = 8.0,
+                 capacity: float = 2.0, increase_step: float = 0.25, decrease_factor: float = 0.5,
+                 cooldown_seconds: float = 2.0):
+        """
+        Args:
+            rate: 初始速率(令牌/秒)
+            min_rate: 速率下限
+            max_rate: 速率上限
+            capacity: 桶容量(允许的突发请求数)
+            increase_step: 每次成功增加的速率
+            decrease_factor: 每次被限流时速率乘以的系数
+            cooldown_seconds: 被限流且无Retry-After时的暂停时间
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.capacity = capacity
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown_seconds = cooldown_seconds
+
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+        # 统计
+        self.successes = 0
+        self.throttles = 0
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def acquire(self):
+        """阻塞直到获得一个令牌"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        """请求成功: 加性提速"""
+        with self._lock:
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """请求被限流或服务端错误: 乘性降速并暂停发放令牌"""
+        with self._lock:
+            self.throttles += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = 0
+            pause = retry_after if retry_after is not None else self.cooldown_seconds
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'rate': round(self.rate, 3),
+                'successes': self.successes,
+                'throttles': self.throttles
+            }
+
+
+def get_status_code(error: Exception) -> Optional[int]:
+    """
+    从请求异常中提取HTTP状态码
+
+    依次尝试 error.status_code、error.response.status_code,最后从异常信息中匹配
+    """
+    status = getattr(error, 'status_code', None)
+    if isinstance(status, int):
+        return status
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if isinstance(status, int):
+        return status
+    match = re.search(r'\b(429|5\d\d)\b', str(error))
+    return int(match.group(1)) if match else None
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """从异常携带的响应头中读取Retry-After(秒)"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('Retry-After') if hasattr(headers, 'get') else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+训练记录总数缓存
+分页接口每次翻页都执行 COUNT(*) 会随表增长线性变慢,这里按(数据源, 用户)缓存总数:
+- 通过Web接口增删记录、导入数据后主动失效
+- 其他进程写库时无法感知,依靠TTL兜底,总数可能短暂偏差(近似值)
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from utils.user_context import DEFAULT_USER_ID
+
+# 缓存有效期(秒)
+RECORD_COUNT_CACHE_TTL = 300
+
+
+class RecordCountCache:
+    """按(数据源, 用户)缓存记录总数"""
+
+    def __init__(self, ttl: int = RECORD_COUNT_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (data_source, user_id) -> (总数, 写入时间)
+        self._counts: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+    def get(self, data_source: str, count_func: Callable[[], int], user_id: str = DEFAULT_USER_ID) -> int:
+        """
+        获取记录总数,缓存未命中或过期时调用count_func重新统计
+
+        Args:
+            data_source: 数据源
+            count_func: 实际执行COUNT查询的回调
+            user_id: 用户标识
+        """
+        key = (data_source, user_id)
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached is not None and time.time() - cached[1] < self.ttl:
+                return cached[0]
+
+        count = int(count_func())
+        with self._lock:
+            self._counts[key] = (count, time.time())
+        return count
+
+    def invalidate(self, data_source: Optional[str] = None, user_id: Optional[str] = None):
+        """
+        失效缓存
+
+        - data_source为None: 全部失效
+        - user_id为None: 失效该数据源所有用户的缓存(整表导入、回滚)
+        """
+        with self._lock:
+            if data_source is None:
+                self._counts.clear()
+            elif user_id is None:
+                for key in [k for k in self._counts if k[0] == data_source]:
+                    del self._counts[key]
+            else:
+                self._counts.pop((data_source, user_id), None)
+
+
+# 全局实例
+_record_count_cache = RecordCountCache()
+
+
+def get_record_count_cache() -> RecordCountCache:
+    """获取记录总数缓存单例"""
+    return _record_count_cache
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+研究运行的检查点日志 (追加写入的JSON Lines)
+一次研究要调用几十次LLM,进程中途退出或异常逃出重试后,之前的结果会全部丢失。
+RunJournal 在每次总结/反思完成后追加一条事件(只记录增量:新增的搜索记录和最新总结),
+不再每次整体重写 to_json(indent=2);resume 时按顺序回放事件重建State,
+跳过已完成的段落和反思轮次。
+
+事件类型:
+- start: 运行开始(查询)
+- structure: 报告结构(标题和段落)
+- summary: 段落的初始总结或一轮反思完成
+- paragraph_completed: 段落完成
+- final_report: 最终报告生成
+"""
+
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# 默认检查点目录
+DEFAULT_JOURNAL_DIR = Path(__file__).parent.parent / "data" / "checkpoints"
+
+
+def new_run_id() -> str:
+    """生成运行ID(时间戳 + 随机后缀,便于按时间排序)"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+class RunJournal:
+    """单次研究运行的追加写入检查点日志"""
+
+    def __init__(self, engine: str, run_id: Optional[str] = None, journal_dir: Optional[Path] = None):
+        """
+        Args:
+            engine: 引擎名(query/media/insight),不同引擎的日志分目录存放
+            run_id: 运行ID,不传时生成新ID
+            journal_dir: 检查点根目录
+        """
+        self.engine = engine
+        self.run_id = run_id or new_run_id()
+        self.path = Path(journal_dir or DEFAULT_JOURNAL_DIR) / engine / f"{self.run_id}.jsonl"
+        self._lock = threading.Lock()
+        # 各段落已写入日志的搜索记录数,之后只追加新增部分
+        self._journaled_searches: Dict[int, int] = {}
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _append(self, event: Dict[str, Any]):
+        event = dict(event, ts=datetime.now().isoformat())
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def events(self) -> Iterator[Dict[str, Any]]:
+        """按顺序读取事件;崩溃时写了一半的最后一行会被跳过"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"检查点日志中有不完整的记录,已跳过: {self.path}")
+
+    # ===== 写入 =====
+
+    def record_start(self, query: str):
+        self._append({'type': 'start', 'engine': self.engine, 'run_id': self.run_id, 'query': query})
+
+    def record_structure(self, state):
+        self._append({
+            'type': 'structure',
+            'query': state.query,
+            'report_title': state.report_title,
+            'paragraphs': [{'title': p.title, 'content': p.content} for p in state.paragraphs]
+        })
+
+    def record_summary(self, state, paragraph_index: int, step: str):
+        """
+        记录一次总结(step为initial或reflection),只写入上次检查点之后新增的搜索记录
+        """
+        research = state.paragraphs[paragraph_index].research
+        start = self._journaled_searches.get(paragraph_index, 0)
+        new_searches = research.search_history[start:]
+        self._append({
+            'type': 'summary',
+            'paragraph': paragraph_index,
+            'step': step,
+            'searches': [search.to_dict() for search in new_searches],
+            'latest_summary': research.latest_summary,
+            'reflection_iteration': research.reflection_iteration
+        })
+        self._journaled_searches[paragraph_index] = len(research.search_history)
+
+    def record_paragraph_completed(self, state, paragraph_index: int):
+        research = state.paragraphs[paragraph_index].research
+        self._append({
+            'type': 'paragraph_completed',
+            'paragraph': paragraph_index,
+            'early_stop_reason': research.early_stop_reason,
+            'reflections_saved': research.reflections_saved
+        })
+
+    def record_final_report(self, final_report: str):
+        self._append({'type': 'final_report', 'final_report': final_report})
+
+    # ===== 回放 =====
+
+    def replay(self, state):
+        """
+        按顺序回放日志,把检查点内容恢复到(新建的)state中
+
+        Args:
+            state: 引擎的State实例
+
+        Returns:
+            恢复后的state
+        """
+        research_data: Dict[int, Dict[str, Any]] = {}
+        for event in self.events():
+            event_type = event.get('type')
+            if event_type == 'start':
+                state.query = event.get('query', state.query)
+            elif event_type == 'structure':
+                state.query = event.get('query') or state.query
+                state.report_title = event.get('report_title', '')
+                state.paragraphs = []
+                research_data = {}
+                for paragraph in event.get('paragraphs', []):
+                    state.add_paragraph(paragraph['title'], paragraph['content'])
+            elif event_type == 'summary':
+                data = research_data.setdefault(event['paragraph'], {'search_history': []})
+                data['search_history'].extend(event.get('searches', []))
+                data['latest_summary'] = event.get('latest_summary', '')
+                data['reflection_iteration'] = event.get('reflection_iteration', 0)
+            elif event_type == 'paragraph_completed':
+                data = research_data.setdefault(event['paragraph'], {'search_history': []})
+                data['is_completed'] = True
+                data['early_stop_reason'] = event.get('early_stop_reason', '')
+                data['reflections_saved'] = event.get('reflections_saved', 0)
+            elif event_type == 'final_report':
+                state.final_report = event.get('final_report', '')
+                state.mark_completed()
+
+        for index, data in research_data.items():
+            if index < len(state.paragraphs):
+                paragraph = state.paragraphs[index]
+                paragraph.research = type(paragraph.research).from_dict(data, state.content_pool)
+                self._journaled_searches[index] = len(paragraph.research.search_history)
+        state.update_timestamp()
+        return state
+
+
+def list_runs(engine: str, journal_dir: Optional[Path] = None) -> List[str]:
+    """列出某个引擎已有的运行ID(新的在前)"""
+    directory = Path(journal_dir or DEFAULT_JOURNAL_DIR) / engine
+    if not directory.exists():
+        return []
+    return sorted((path.stem for path in directory.glob("*.jsonl")), reverse=True)
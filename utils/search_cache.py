@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+外部搜索结果持久化缓存 (SQLite)
+反思循环经常重复发出几乎相同的查询,Tavily深度搜索和Bocha AI搜索又是最慢、最贵的调用,
+这里按"规范化查询 + 工具参数"缓存搜索结果:
+- 每个工具单独配置TTL(24小时资讯短、理论搜索长)
+- 过期后在stale窗口内先返回旧结果,同时后台刷新(stale-while-revalidate)
+- 按总字节数和条目数上限做LRU淘汰
+- 统计各工具的命中率
+
+缓存位于搜索客户端带重试装饰器的 _search_internal 之前:命中时不发请求,
+未命中时仍通过 _search_internal 发请求,重试机制照常生效
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+# 默认缓存文件
+DEFAULT_CACHE_FILE = Path(__file__).parent.parent / "data" / "cache" / "search_cache.sqlite3"
+
+# 各工具的(TTL, stale窗口),单位秒
+SEARCH_CACHE_TTLS: Dict[str, Tuple[int, int]] = {
+    # QueryEngine (Tavily) - 运动科学理论变化很慢
+    'deep_search_news': (7 * 86400, 7 * 86400),
+    # MediaEngine (Bocha)
+    'comprehensive_search': (86400, 86400),
+    'web_search_only': (86400, 86400),
+    'search_for_structured_data': (3600, 1800),
+    'search_last_week': (6 * 3600, 3600),
+    'search_last_24_hours': (1800, 600),
+}
+DEFAULT_TTL = (3600, 1800)
+
+# 容量上限
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+MAX_CACHE_ENTRIES = 20000
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询: 全半角统一、去首尾空白、合并连续空白、英文小写"""
+    text = unicodedata.normalize('NFKC', query or '')
+    return ' '.join(text.split()).lower()
+
+
+def make_cache_key(namespace: str, tool: str, params: Dict[str, Any]) -> str:
+    """由命名空间、工具名和参数生成缓存键(查询已规范化,列表参数排序)"""
+    normalized = {}
+    for key, value in params.items():
+        if value is None:
+            continue
+        if key == 'query':
+            value = normalize_query(value)
+        elif isinstance(value, (list, tuple, set)):
+            value = sorted(value)
+        normalized[key] = value
+    raw = json.dumps([namespace, tool, normalized], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class SearchCache:
+    """SQLite持久化搜索缓存"""
+
+    def __init__(self, cache_file: Path = DEFAULT_CACHE_FILE, max_bytes: int = MAX_CACHE_BYTES,
+                 max_entries: int = MAX_CACHE_ENTRIES):
+        self.cache_file = Path(cache_file)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        # tool -> {'hits', 'stale_hits', 'misses', 'writes'}
+        self._metrics: Dict[str, Dict[str, int]] = {}
+        self.evictions = 0
+        self._init_db()
+
+    # ===== 存储 =====
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开连接并在一个事务中执行,退出时提交(异常时回滚)并关闭连接"""
+        # sqlite3.Connection 自身的上下文管理只负责提交/回滚,不会关闭连接
+        conn = sqlite3.connect(str(self.cache_file), timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    tool TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    stale_until REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_access ON search_cache(last_access)")
+
+    def _lookup(self, cache_key: str) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """查找缓存,返回(载荷, 是否已过期);超出stale窗口视为未命中"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, expires_at, stale_until FROM search_cache WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, expires_at, stale_until = row
+            if now >= stale_until:
+                conn.execute("DELETE FROM search_cache WHERE cache_key = ?", (cache_key,))
+                return None
+            conn.execute("UPDATE search_cache SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+        return json.loads(payload), now >= expires_at
+
+    def _store(self, cache_key: str, namespace: str, tool: str, payload: Dict[str, Any]):
+        ttl, stale = SEARCH_CACHE_TTLS.get(tool, DEFAULT_TTL)
+        now = time.time()
+        data = json.dumps(payload, ensure_ascii=False)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, namespace, tool, now, now + ttl, now + ttl + stale, now, len(data.encode('utf-8')), data)
+            )
+            self._evict(conn)
+        self._count(tool, 'writes')
+
+    def _evict(self, conn: sqlite3.Connection):
+        """清理超出stale窗口的条目,再按最近访问时间淘汰直到满足容量上限"""
+        conn.execute("DELETE FROM search_cache WHERE stale_until <= ?", (time.time(),))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM search_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT cache_key, size FROM search_cache ORDER BY last_access ASC").fetchall()
+        victims = []
+        for cache_key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((cache_key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM search_cache WHERE cache_key = ?", victims)
+        self.evictions += len(victims)
+
+    # ===== 统计 =====
+
+    def _count(self, tool: str, metric: str):
+        with self._lock:
+            tool_metrics = self._metrics.setdefault(tool, {'hits': 0, 'stale_hits': 0, 'misses': 0, 'writes': 0})
+            tool_metrics[metric] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """各工具及总体的命中率统计"""
+        with self._lock:
+            tools = {tool: dict(m) for tool, m in self._metrics.items()}
+        totals = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'writes': 0}
+        for tool, metrics in tools.items():
+            lookups = metrics['hits'] + metrics['stale_hits'] + metrics['misses']
+            metrics['hit_rate'] = round((metrics['hits'] + metrics['stale_hits']) / lookups, 3) if lookups else 0.0
+            for key in totals:
+                totals[key] += metrics[key]
+        lookups = totals['hits'] + totals['stale_hits'] + totals['misses']
+        totals['hit_rate'] = round((totals['hits'] + totals['stale_hits']) / lookups, 3) if lookups else 0.0
+
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM search_cache").fetchone()
+        return {
+            'tools': tools,
+            'total': totals,
+            'entries': entries,
+            'size_bytes': size,
+            'evictions': self.evictions
+        }
+
+    # ===== 对外接口 =====
+
+    def get_or_fetch(self, namespace: str, tool: str, params: Dict[str, Any], fetch: Callable[[], Any],
+                     serialize: Callable[[Any], Dict[str, Any]], deserialize: Callable[[Dict[str, Any]], Any],
+                     is_cacheable: Callable[[Any], bool]) -> Any:
+        """
+        读取缓存,未命中时调用fetch获取并写入缓存
+
+        Args:
+            namespace: 命名空间(如tavily、bocha)
+            tool: 工具名,决定TTL
+            params: 实际请求参数(参与缓存键计算)
+            fetch: 发起真实请求的函数(应为带重试的 _search_internal 调用)
+            serialize: 响应对象 -> 可JSON序列化的字典
+            deserialize: 字典 -> 响应对象
+            is_cacheable: 判断响应是否应缓存(失败或空结果不缓存)
+        """
+        cache_key = make_cache_key(namespace, tool, params)
+        try:
+            cached = self._lookup(cache_key)
+        except Exception as e:
+            print(f"读取搜索缓存失败: {e}")
+            cached = None
+
+        if cached is not None:
+            payload, is_stale = cached
+            if is_stale:
+                self._count(tool, 'stale_hits')
+                print(f"🗄️ 搜索缓存命中(已过期,后台刷新): {tool}")
+                self._refresh_in_background(cache_key, namespace, tool, fetch, serialize, is_cacheable)
+            else:
+                self._count(tool, 'hits')
+                print(f"🗄️ 搜索缓存命中: {tool}")
+            return deserialize(payload)
+
+        self._count(tool, 'misses')
+        response = fetch()
+        self._maybe_store(cache_key, namespace, tool, response, serialize, is_cacheable)
+        return response
+
+    def _maybe_store(self, cache_key, namespace, tool, response, serialize, is_cacheable):
+        if not is_cacheable(response):
+            return
+        try:
+            self._store(cache_key, namespace, tool, serialize(response))
+        except Exception as e:
+            print(f"写入搜索缓存失败: {e}")
+
+    def _refresh_in_background(self, cache_key, namespace, tool, fetch, serialize, is_cacheable):
+        """后台重新请求并更新缓存,同一缓存键同时只刷新一次"""
+        with self._lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+        def refresh():
+            try:
+                self._maybe_store(cache_key, namespace, tool, fetch(), serialize, is_cacheable)
+            except Exception as e:
+                print(f"后台刷新搜索缓存失败: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(cache_key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def clear(self):
+        """清空缓存"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM search_cache")
+
+
+# 全局实例
+_search_cache: Optional[SearchCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """获取搜索缓存单例"""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache()
+        return _search_cache
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+研究状态的紧凑内存表示
+长时间运行(多段落、多轮反思)的State里常驻数千条Search记录,每条都带有独立的
+时间戳字符串、重复的查询字符串和完整的搜索内容,Streamlit会话会一直持有它们。
+
+- SlottedRecord: Search/Research/Paragraph 的基类,使用 __slots__ 而不是实例字典
+- ContentPool:   单次研究运行共享的内容池,按SHA-256保存搜索内容,相同内容只保留一份;
+                 哈希与快照的blob仓库一致,从快照加载时内容在首次访问时才从blob仓库读取
+- PooledSearch:  搜索记录只保存内容哈希,content 通过内容池读写
+- intern_text:   同一轮搜索的查询词和时间戳共享同一个字符串对象
+"""
+
+import hashlib
+import sys
+from typing import Any, Dict, Optional
+
+
+def intern_text(value: Any) -> Any:
+    """驻留字符串,相同的查询词/时间戳在所有搜索记录间共享;非字符串原样返回"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def content_hash(text: str) -> str:
+    """内容哈希(与 utils.state_snapshot.BlobStore.content_hash 相同)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ContentPool:
+    """单次研究运行的搜索内容池"""
+
+    __slots__ = ('_items', '_blob_store')
+
+    def __init__(self, blob_store=None):
+        self._items: Dict[str, str] = {}
+        self._blob_store = blob_store
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def attach_blob_store(self, blob_store):
+        """关联快照的blob仓库,池中没有的内容按哈希从仓库延迟读取"""
+        self._blob_store = blob_store
+
+    def put(self, text: Optional[str]) -> Optional[str]:
+        """保存内容并返回哈希,空内容返回None"""
+        if not text:
+            return None
+        # 驻留哈希,引用同一内容的搜索记录共享同一个键字符串
+        key = sys.intern(content_hash(text))
+        self._items.setdefault(key, text)
+        return key
+
+    def get(self, key: Optional[str]) -> str:
+        if not key:
+            return ""
+        text = self._items.get(key)
+        if text is None:
+            if self._blob_store is None:
+                raise KeyError(f"内容池中不存在该内容: {key}")
+            text = self._items.setdefault(key, self._blob_store.get(key))
+        return text
+
+    def is_loaded(self, key: Optional[str]) -> bool:
+        return not key or key in self._items
+
+
+class SlottedRecord:
+    """
+    基于 __slots__ 的状态记录基类
+
+    子类在 _fields 中列出持久化字段(与 to_dict 的键一致),
+    用于相等比较、repr 和快照序列化
+    """
+
+    __slots__ = ()
+    _fields: tuple = ()
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{self.__class__.__name__}({values})"
+
+
+class PooledSearch(SlottedRecord):
+    """
+    内容保存在内容池中的搜索记录基类
+
+    未关联内容池时内容直接保存在记录上,加入Research后迁移到运行共享的内容池
+    """
+
+    __slots__ = ('_content', '_pool')
+
+    def _init_content(self, content: str, pool: Optional[ContentPool]):
+        self._pool = pool
+        self._content = pool.put(content) if pool is not None else content
+
+    @property
+    def content(self) -> str:
+        if self._pool is None:
+            return self._content
+        return self._pool.get(self._content)
+
+    @content.setter
+    def content(self, value: str):
+        if self._pool is None:
+            self._content = value
+        else:
+            self._content = self._pool.put(value)
+
+    @property
+    def content_key(self) -> Optional[str]:
+        """内容哈希,未关联内容池时为None"""
+        return self._content if self._pool is not None else None
+
+    def is_content_loaded(self) -> bool:
+        return self._pool is None or self._pool.is_loaded(self._content)
+
+    def attach_pool(self, pool: Optional[ContentPool]):
+        """把内容迁移到运行共享的内容池"""
+        if pool is None or pool is self._pool:
+            return
+        content = self.content
+        self._pool = pool
+        self._content = pool.put(content)
+
+    def bind_content_key(self, key: Optional[str], pool: ContentPool):
+        """直接引用池中(或池关联的blob仓库中)已有的内容,不读取内容本身"""
+        self._pool = pool
+        self._content = key
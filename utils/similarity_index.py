@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+相似训练检索索引
+将每条训练记录表示为特征向量(距离、时长、配速、心率、步频、功率、训练效果、心率区间占比等),
+按列标准化后用NumPy暴力计算欧氏距离做k近邻查询
+
+索引常驻内存,通过数据库签名(记录数、最大ID、last_modify_ts之和)判断是否需要更新:
+- 只有新增记录(导入)时,仅拉取ID大于已索引最大ID的记录追加到索引
+- 有修改或删除时,全量重建
+"""
+
+import threading
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.user_context import DEFAULT_USER_ID
+
+
+# (记录数, 最大ID, last_modify_ts之和)
+IndexSignature = Tuple[int, int, int]
+
+# fetch(after_id) -> (ids, 特征矩阵, 这些记录的last_modify_ts之和)
+FetchRows = Callable[[Optional[int]], Tuple[np.ndarray, np.ndarray, int]]
+
+
+class TrainingFeatureIndex:
+    """训练记录特征向量索引 (标准化 + NumPy暴力k近邻)"""
+
+    def __init__(self, feature_names: Sequence[str]):
+        self.feature_names = list(feature_names)
+        self._lock = threading.RLock()
+        self.ids = np.empty(0, dtype=np.int64)
+        self.features = np.empty((0, len(self.feature_names)), dtype=np.float64)
+        self.signature: Optional[IndexSignature] = None
+        self._ts_sum = 0
+        self._standardized = np.empty((0, len(self.feature_names)), dtype=np.float64)
+        self._row_of: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    # ===== 构建 =====
+
+    def _restandardize(self):
+        """按列z-score标准化;缺失值填0(即列均值),无方差的列不参与距离计算"""
+        X = self.features
+        if X.shape[0] == 0:
+            self._standardized = X.copy()
+            self._row_of = {}
+            return
+        # 全缺失的列均值/标准差为NaN,随后按无方差列处理
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            mean = np.nanmean(X, axis=0)
+            std = np.nanstd(X, axis=0)
+        usable = np.isfinite(std) & (std > 0)
+        safe_std = np.where(usable, std, 1.0)
+        Z = (X - np.where(np.isfinite(mean), mean, 0.0)) / safe_std
+        Z[:, ~usable] = 0.0
+        Z[~np.isfinite(Z)] = 0.0
+        self._standardized = Z
+        self._row_of = {int(i): pos for pos, i in enumerate(self.ids)}
+
+    def rebuild(self, ids: np.ndarray, features: np.ndarray, ts_sum: int, signature: IndexSignature):
+        """全量重建索引"""
+        with self._lock:
+            self.ids = np.asarray(ids, dtype=np.int64)
+            self.features = np.asarray(features, dtype=np.float64).reshape(-1, len(self.feature_names))
+            self._ts_sum = int(ts_sum)
+            self.signature = signature
+            self._restandardize()
+
+    def append(self, ids: np.ndarray, features: np.ndarray, ts_sum: int, signature: IndexSignature):
+        """追加新记录并重新标准化"""
+        with self._lock:
+            self.ids = np.concatenate((self.ids, np.asarray(ids, dtype=np.int64)))
+            self.features = np.vstack((
+                self.features,
+                np.asarray(features, dtype=np.float64).reshape(-1, len(self.feature_names))
+            ))
+            self._ts_sum += int(ts_sum)
+            self.signature = signature
+            self._restandardize()
+
+    def sync(self, signature: IndexSignature, fetch_rows: FetchRows) -> str:
+        """
+        根据数据库签名同步索引
+
+        Args:
+            signature: 数据库当前签名(记录数, 最大ID, last_modify_ts之和)
+            fetch_rows: 拉取记录的回调, after_id为None时拉取全部
+
+        Returns:
+            'cached' / 'appended' / 'rebuilt'
+        """
+        with self._lock:
+            if self.signature == signature:
+                return 'cached'
+
+            count, max_id, ts_sum = signature
+            if self.signature is not None and len(self) > 0 and count > len(self):
+                old_max_id = int(self.ids.max())
+                new_ids, new_features, new_ts_sum = fetch_rows(old_max_id)
+                # 只有新增、没有修改/删除时,追加后的签名应与数据库完全一致
+                if (len(self) + len(new_ids) == count
+                        and self._ts_sum + new_ts_sum == ts_sum):
+                    self.append(new_ids, new_features, new_ts_sum, signature)
+                    return 'appended'
+
+            ids, features, all_ts_sum = fetch_rows(None)
+            self.rebuild(ids, features, all_ts_sum, signature)
+            return 'rebuilt'
+
+    def invalidate(self):
+        """清空索引,下次查询时全量重建"""
+        with self._lock:
+            self.signature = None
+
+    # ===== 查询 =====
+
+    def contains(self, record_id: int) -> bool:
+        return int(record_id) in self._row_of
+
+    def query(self, record_id: int, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        查询与指定记录最相似的k条记录(不含自身)
+
+        Returns:
+            [(记录ID, 标准化欧氏距离)] 按距离升序
+        """
+        with self._lock:
+            pos = self._row_of.get(int(record_id))
+            if pos is None or len(self) <= 1:
+                return []
+            Z = self._standardized
+            diff = Z - Z[pos]
+            # 除以特征数的平方根,使距离与特征维度无关(每维平均偏离多少个标准差)
+            dist = np.sqrt(np.einsum('ij,ij->i', diff, diff) / max(Z.shape[1], 1))
+            dist[pos] = np.inf
+
+            k = max(1, min(int(k), len(self) - 1))
+            nearest = np.argpartition(dist, k - 1)[:k]
+            nearest = nearest[np.argsort(dist[nearest])]
+            return [(int(self.ids[i]), round(float(dist[i]), 3)) for i in nearest]
+
+    def describe(self, record_id: int) -> Dict[str, Optional[float]]:
+        """返回记录的原始特征值"""
+        with self._lock:
+            pos = self._row_of.get(int(record_id))
+            if pos is None:
+                return {}
+            row = self.features[pos]
+            return {
+                name: (None if not np.isfinite(v) else round(float(v), 3))
+                for name, v in zip(self.feature_names, row)
+            }
+
+
+def rows_to_matrix(rows: Sequence[Any], columns: Sequence[str]) -> np.ndarray:
+    """
+    将查询结果行转换为float矩阵,None转为NaN
+
+    Args:
+        rows: SQLAlchemy结果行(可按属性访问)
+        columns: 需要提取的列名
+    """
+    if not rows:
+        return np.empty((0, len(columns)), dtype=np.float64)
+    data = [[getattr(row, col) for col in columns] for row in rows]
+    arr = np.array(data, dtype=object)
+    arr[arr == None] = np.nan  # noqa: E711  逐元素比较
+    return arr.astype(np.float64)
+
+
+def derive_volume_features(distance_meters: np.ndarray, duration_seconds: np.ndarray) -> List[np.ndarray]:
+    """
+    由距离/时长列派生基础特征
+
+    Returns:
+        [距离(公里), 时长(分钟), 配速(秒/公里)],距离为0或缺失时配速为NaN
+    """
+    distance_km = distance_meters / 1000.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pace = np.where(distance_km > 0, duration_seconds / distance_km, np.nan)
+    return [distance_km, duration_seconds / 60.0, pace]
+
+
+def zone_fractions(zone_seconds: np.ndarray) -> np.ndarray:
+    """将区间时长矩阵(n, 区间数)转换为每行占比,全部缺失的行为NaN"""
+    filled = np.nan_to_num(zone_seconds, nan=0.0)
+    total = filled.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, filled / total, np.nan)
+
+
+# 全局索引实例 (按数据源和用户区分)
+_indexes: Dict[Tuple[str, str], TrainingFeatureIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_similarity_index(
+    data_source: str,
+    feature_names: Sequence[str],
+    user_id: str = DEFAULT_USER_ID
+) -> TrainingFeatureIndex:
+    """获取指定数据源、指定用户的相似训练索引单例"""
+    key = (data_source, user_id)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.feature_names != list(feature_names):
+            index = TrainingFeatureIndex(feature_names)
+            _indexes[key] = index
+        return index
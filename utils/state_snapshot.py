@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+研究状态的紧凑快照
+State.to_json(indent=2) 每次保存都把所有搜索结果的完整内容(单条可达数万字)重新写一遍,
+长时间运行的状态文件可达数MB,写入和重新加载都很慢。紧凑快照:
+- 搜索内容按SHA-256存入内容寻址的blob仓库(默认快照同目录下的 blobs/),
+  同一内容只存一份,已存在的blob不再重写,重复保存只写入新增内容
+- 快照本体只保存段落结构、总结和内容哈希,使用msgpack编码(未安装时用JSON),
+  zstd压缩(未安装时用zlib)
+- 加载时搜索内容不立即读取,State的内容池关联blob仓库,首次访问 search.content 时才读取
+  (内容池与blob仓库使用相同的SHA-256哈希)
+
+文件格式: 第一行为JSON头(格式标识、编码、压缩方式),之后为压缩后的状态数据
+"""
+
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Type
+
+from utils.search_store import content_hash
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+SNAPSHOT_SUFFIX = '.snap'
+SNAPSHOT_MAGIC = 'state-snapshot'
+SNAPSHOT_VERSION = 1
+BLOB_DIR_NAME = 'blobs'
+
+# 状态保存格式
+STATE_FORMATS = ('json', 'compact')
+
+
+# ===== 编码与压缩 =====
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise ImportError("读取该快照需要安装zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _encode(payload: Dict[str, Any], encoding: str) -> bytes:
+    if encoding == 'msgpack':
+        return msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _decode(data: bytes, encoding: str) -> Dict[str, Any]:
+    if encoding == 'msgpack':
+        if not MSGPACK_AVAILABLE:
+            raise ImportError("读取该快照需要安装msgpack: pip install msgpack")
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data.decode('utf-8'))
+
+
+# ===== 内容寻址blob仓库 =====
+
+class BlobStore:
+    """按内容SHA-256存储文本,blob写入后不再修改"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.compression = 'zstd' if ZSTD_AVAILABLE else 'zlib'
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return content_hash(text)
+
+    def _path(self, digest: str, compression: str) -> Path:
+        suffix = '.zst' if compression == 'zstd' else '.z'
+        return self.root / digest[:2] / f"{digest}{suffix}"
+
+    def put(self, text: str) -> str:
+        """写入内容并返回哈希,相同内容已存在时直接返回"""
+        digest = self.content_hash(text)
+        if self.exists(digest):
+            return digest
+        path = self._path(digest, self.compression)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(_compress(text.encode('utf-8'), self.compression))
+        os.replace(tmp_path, path)
+        return digest
+
+    def exists(self, digest: str) -> bool:
+        return any(self._path(digest, c).exists() for c in ('zstd', 'zlib'))
+
+    def get(self, digest: str) -> str:
+        for compression in ('zstd', 'zlib'):
+            path = self._path(digest, compression)
+            if path.exists():
+                with open(path, 'rb') as f:
+                    return _decompress(f.read(), compression).decode('utf-8')
+        raise FileNotFoundError(f"快照引用的内容不存在: {digest} (blob目录: {self.root})")
+
+
+# ===== 状态 <-> 快照 =====
+
+def _search_record(search, store: BlobStore) -> Dict[str, Any]:
+    """
+    搜索记录只保存元数据和内容哈希
+
+    内容池的哈希与blob仓库一致,仓库中已有该内容时直接沿用哈希,不读取也不重写内容
+    """
+    record = {name: getattr(search, name) for name in search._fields if name != 'content'}
+    content_key = search.content_key
+    if content_key and store.exists(content_key):
+        record['content_ref'] = content_key
+    else:
+        content = search.content or ''
+        record['content_ref'] = store.put(content) if content else None
+    return record
+
+
+def _to_record(obj, store: BlobStore) -> Any:
+    """按各状态类的_fields递归转换(字段名与to_dict的键一致),搜索记录的内容写入blob仓库"""
+    record_fields = getattr(type(obj), '_fields', None)
+    if isinstance(record_fields, tuple) and record_fields:
+        return {
+            name: (
+                [_search_record(search, store) for search in obj.search_history]
+                if name == 'search_history'
+                else _to_record(getattr(obj, name), store)
+            )
+            for name in record_fields
+        }
+    if isinstance(obj, list):
+        return [_to_record(item, store) for item in obj]
+    return obj
+
+
+def save_snapshot(state, filepath: str, blob_dir: Optional[str] = None):
+    """
+    把State保存为紧凑快照
+
+    Args:
+        state: 引擎的State对象
+        filepath: 快照文件路径
+        blob_dir: blob仓库目录,默认为快照所在目录下的blobs/
+    """
+    filepath = Path(filepath)
+    store = BlobStore(blob_dir or filepath.parent / BLOB_DIR_NAME)
+
+    payload = _to_record(state, store)
+
+    encoding = 'msgpack' if MSGPACK_AVAILABLE else 'json'
+    compression = 'zstd' if ZSTD_AVAILABLE else 'zlib'
+    header = {
+        'format': SNAPSHOT_MAGIC,
+        'version': SNAPSHOT_VERSION,
+        'encoding': encoding,
+        'compression': compression,
+        'blob_dir': os.path.relpath(store.root, filepath.parent)
+    }
+
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = filepath.with_name(f"{filepath.name}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(json.dumps(header).encode('utf-8') + b'\n')
+        f.write(_compress(_encode(payload, encoding), compression))
+    os.replace(tmp_path, filepath)
+
+
+def _read_header(f) -> Optional[Dict[str, Any]]:
+    first_line = f.readline(4096)
+    try:
+        header = json.loads(first_line.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    return header if isinstance(header, dict) and header.get('format') == SNAPSHOT_MAGIC else None
+
+
+def is_snapshot_file(filepath: str) -> bool:
+    """文件是否为紧凑快照(按文件头判断,与扩展名无关)"""
+    try:
+        with open(filepath, 'rb') as f:
+            return _read_header(f) is not None
+    except OSError:
+        return False
+
+
+def load_snapshot(state_cls: Type, filepath: str, blob_dir: Optional[str] = None):
+    """
+    从紧凑快照加载State,搜索内容延迟到首次访问时读取
+
+    Args:
+        state_cls: 引擎的State类
+        filepath: 快照文件路径
+        blob_dir: blob仓库目录,默认使用快照头中记录的相对路径
+    """
+    filepath = Path(filepath)
+    with open(filepath, 'rb') as f:
+        header = _read_header(f)
+        if header is None:
+            raise ValueError(f"不是状态快照文件: {filepath}")
+        if header.get('version', 0) > SNAPSHOT_VERSION:
+            raise ValueError(f"快照版本过新: v{header.get('version')}")
+        payload = _decode(_decompress(f.read(), header['compression']), header['encoding'])
+
+    store = BlobStore(blob_dir or filepath.parent / header.get('blob_dir', BLOB_DIR_NAME))
+
+    # 先去掉内容哈希用State.from_dict重建(内容为空),再让搜索记录引用内容池中的哈希,
+    # 内容池关联blob仓库,首次访问 search.content 时才读取
+    refs = []
+    for paragraph_record in payload.get('paragraphs', []):
+        history = paragraph_record.get('research', {}).get('search_history', [])
+        refs.append([record.pop('content_ref', None) for record in history])
+
+    state = state_cls.from_dict(payload)
+    pool = state.content_pool
+    pool.attach_blob_store(store)
+    for paragraph, paragraph_refs in zip(state.paragraphs, refs):
+        for search, content_ref in zip(paragraph.research.search_history, paragraph_refs):
+            if content_ref:
+                search.bind_content_key(content_ref, pool)
+    return state
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+训练记录流式导出
+通过服务端游标(yield_per/stream_results)按批读取记录,逐批编码为CSV/NDJSON/Parquet输出,
+内存占用与导出总行数无关,适用于导出完整训练历史
+
+Parquet依赖pyarrow(可选依赖),每批数据写为一个row group
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import BigInteger, DateTime, Integer, Numeric
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# 每批从数据库读取的行数(Parquet即每个row group的行数)
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': {'mimetype': 'text/csv; charset=utf-8', 'extension': 'csv'},
+    'ndjson': {'mimetype': 'application/x-ndjson; charset=utf-8', 'extension': 'ndjson'},
+    'parquet': {'mimetype': 'application/vnd.apache.parquet', 'extension': 'parquet'},
+}
+
+
+def _to_plain(value: Any) -> Any:
+    """将数据库值转换为可序列化的基础类型"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def iter_record_batches(session, manager, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[tuple]]:
+    """
+    按开始时间顺序分批读取训练记录
+
+    只查询列值(不构造ORM对象),并开启服务端游标,数据库驱动不会一次性缓冲全部结果
+
+    Args:
+        session: 数据库会话
+        manager: TrainingRecordManager
+        start: 开始时间下限(含)
+        end: 开始时间上限(不含)
+        batch_size: 每批行数
+
+    Yields:
+        每批的行元组列表,列顺序与export_columns(manager)一致
+    """
+    Model = manager.get_model_class()
+    start_time_field = manager.get_field('start_time')
+
+    query = manager.query(session).with_entities(*export_columns(manager))
+    if start is not None:
+        query = query.filter(start_time_field >= start)
+    if end is not None:
+        query = query.filter(start_time_field < end)
+    query = query.order_by(start_time_field.asc(), Model.id.asc()).yield_per(batch_size)
+
+    batch = []
+    for row in query:
+        batch.append(tuple(row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_columns(manager) -> list:
+    """导出的列(模型表的全部列)"""
+    return list(manager.get_model_class().__table__.columns)
+
+
+def stream_csv(batches: Iterator[List[tuple]], columns: list) -> Iterator[str]:
+    """逐批编码为CSV文本(带BOM,Excel可直接识别UTF-8中文)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow([col.name for col in columns])
+    for batch in batches:
+        writer.writerows([[_to_plain(v) for v in row] for row in batch])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    remaining = buffer.getvalue()
+    if remaining:
+        yield remaining
+
+
+def stream_ndjson(batches: Iterator[List[tuple]], columns: list) -> Iterator[str]:
+    """逐批编码为NDJSON(每行一个JSON对象)"""
+    names = [col.name for col in columns]
+    for batch in batches:
+        lines = [
+            json.dumps(dict(zip(names, (_to_plain(v) for v in row))), ensure_ascii=False)
+            for row in batch
+        ]
+        yield '\n'.join(lines) + '\n'
+
+
+def _arrow_type(column):
+    """SQL列类型到Arrow类型的映射"""
+    if isinstance(column.type, (Integer, BigInteger)):
+        return pa.int64()
+    if isinstance(column.type, Numeric):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp('s')
+    return pa.string()
+
+
+class _ChunkSink(io.RawIOBase):
+    """收集ParquetWriter写出的字节,由生成器逐段取走"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_parquet(batches: Iterator[List[tuple]], columns: list) -> Iterator[bytes]:
+    """逐批写为Parquet row group,每写完一个row group即输出对应字节"""
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("导出Parquet需要安装pyarrow: pip install pyarrow")
+
+    schema = pa.schema([pa.field(col.name, _arrow_type(col)) for col in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for batch in batches:
+            arrays: Dict[str, list] = {col.name: [] for col in columns}
+            for row in batch:
+                for col, value in zip(columns, row):
+                    arrays[col.name].append(float(value) if isinstance(value, Decimal) else value)
+            writer.write_table(pa.Table.from_pydict(arrays, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def stream_export(export_format: str, batches: Iterator[List[tuple]], columns: list) -> Iterator:
+    """
+    按格式流式编码
+
+    Args:
+        export_format: csv / ndjson / parquet
+        batches: iter_record_batches的输出
+        columns: export_columns的输出
+    """
+    if export_format == 'csv':
+        return stream_csv(batches, columns)
+    if export_format == 'ndjson':
+        return stream_ndjson(batches, columns)
+    if export_format == 'parquet':
+        return stream_parquet(batches, columns)
+    raise ValueError(f"不支持的导出格式: {export_format}. 请使用: {list(EXPORT_FORMATS.keys())}")
@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+"""
+训练负荷模型 (Fitness/Fatigue)
+基于Garmin training_load按日汇总,一次NumPy向量化计算完整历史的:
+- CTL (Chronic Training Load, 慢性负荷/体能, 时间常数42天)
+- ATL (Acute Training Load, 急性负荷/疲劳, 时间常数7天)
+- TSB (Training Stress Balance, 训练压力平衡 = 前一日CTL - 前一日ATL)
+- ACWR (Acute:Chronic Workload Ratio, 急慢性负荷比 = ATL / CTL)
+
+结果按日缓存到磁盘(data/cache),导入新数据时只从受影响的最早日期开始增量重算
+"""
+
+import os
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Optional, Tuple, Dict, Any, List
+
+import numpy as np
+
+from utils.user_context import DEFAULT_USER_ID, user_cache_suffix
+
+
+CTL_TIME_CONSTANT = 42
+ATL_TIME_CONSTANT = 7
+
+# ACWR风险区间阈值 (Gabbett 2016)
+ACWR_SWEET_SPOT = (0.8, 1.3)
+ACWR_DANGER_ZONE = 1.5
+
+# 分块闭式解的块长度: 块内用cumsum一次求解,块间只传递一个状态值
+# 64天时 exp(64/7) ≈ 9e3,数值误差可忽略
+_EWMA_BLOCK_SIZE = 64
+
+_EPOCH = date(1970, 1, 1)
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / "data" / "cache"
+
+
+def _decay(time_constant: float) -> float:
+    """指数衰减系数 exp(-1/τ)"""
+    return float(np.exp(-1.0 / time_constant))
+
+
+def ewma(values: np.ndarray, time_constant: float, initial: float = 0.0) -> np.ndarray:
+    """
+    向量化指数加权移动平均: y[t] = d * y[t-1] + (1 - d) * x[t], d = exp(-1/τ)
+
+    将序列切成定长块,块内使用缩放cumsum闭式求解,块间仅串行传递末尾状态,
+    因此对多年历史也只需要 O(n / 块长) 次Python循环
+
+    Args:
+        values: 按天连续的负荷序列
+        time_constant: 时间常数τ(天)
+        initial: 序列开始前一天的状态值
+
+    Returns:
+        与values等长的EWMA序列
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = x.shape[0]
+    if n == 0:
+        return np.empty(0, dtype=np.float64)
+
+    d = _decay(time_constant)
+    alpha = 1.0 - d
+    block = _EWMA_BLOCK_SIZE
+    n_blocks = (n + block - 1) // block
+
+    padded = np.zeros(n_blocks * block, dtype=np.float64)
+    padded[:n] = x
+    blocks = padded.reshape(n_blocks, block)
+
+    k = np.arange(block, dtype=np.float64)
+    grow = d ** (k + 1)           # d^(k+1)
+    shrink = d ** (-(k + 1))      # d^-(k+1)
+
+    # 每块以0为初始状态的响应
+    zero_state = alpha * grow * np.cumsum(blocks * shrink, axis=1)
+
+    # 串行传递块间状态
+    carry = np.empty(n_blocks, dtype=np.float64)
+    state = float(initial)
+    block_decay = d ** block
+    for b in range(n_blocks):
+        carry[b] = state
+        state = block_decay * state + zero_state[b, -1]
+
+    result = zero_state + carry[:, None] * grow[None, :]
+    return result.reshape(-1)[:n]
+
+
+def compute_load_model(
+    daily_load: np.ndarray,
+    ctl_initial: float = 0.0,
+    atl_initial: float = 0.0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    由逐日负荷计算CTL/ATL/TSB/ACWR
+
+    Args:
+        daily_load: 按天连续的每日负荷合计(无训练日为0)
+        ctl_initial: 序列开始前一天的CTL
+        atl_initial: 序列开始前一天的ATL
+
+    Returns:
+        (ctl, atl, tsb, acwr) 四个等长数组; CTL为0时ACWR为NaN
+    """
+    ctl = ewma(daily_load, CTL_TIME_CONSTANT, ctl_initial)
+    atl = ewma(daily_load, ATL_TIME_CONSTANT, atl_initial)
+
+    # TSB反映"当天开始训练前"的状态,使用前一日的CTL/ATL
+    prev_ctl = np.concatenate(([ctl_initial], ctl[:-1]))
+    prev_atl = np.concatenate(([atl_initial], atl[:-1]))
+    tsb = prev_ctl - prev_atl
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        acwr = np.where(ctl > 0, atl / ctl, np.nan)
+
+    return ctl, atl, tsb, acwr
+
+
+def _to_day_index(value) -> Optional[int]:
+    """datetime/date转为距1970-01-01的天数"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return (value - _EPOCH).days
+    return None
+
+
+def _from_day_index(index: int) -> date:
+    return _EPOCH + timedelta(days=int(index))
+
+
+def aggregate_daily_load(records: Iterable[Tuple[Any, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    将(开始时间, 训练负荷)记录聚合为按天合计
+
+    Returns:
+        (day_indices, loads) 升序排列且去重的日序号与当日负荷合计
+    """
+    days: List[int] = []
+    loads: List[float] = []
+    for start_time, load in records:
+        day = _to_day_index(start_time)
+        if day is None or load is None:
+            continue
+        days.append(day)
+        loads.append(float(load))
+
+    if not days:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    day_arr = np.asarray(days, dtype=np.int64)
+    load_arr = np.asarray(loads, dtype=np.float64)
+    unique_days, inverse = np.unique(day_arr, return_inverse=True)
+    sums = np.bincount(inverse, weights=load_arr, minlength=unique_days.shape[0])
+    return unique_days, sums
+
+
+class TrainingLoadModelCache:
+    """
+    训练负荷模型的按日缓存
+
+    内存中保存从首个训练日到最近训练日的连续逐日序列(daily_load/ctl/atl),
+    并持久化为npz文件供其他进程(Flask导入、InsightEngine查询)共享
+    """
+
+    def __init__(
+        self,
+        data_source: str = "garmin",
+        cache_dir: Optional[Path] = None,
+        user_id: str = DEFAULT_USER_ID
+    ):
+        self.data_source = data_source
+        self.user_id = user_id
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.cache_path = self.cache_dir / f"load_model_{data_source}{user_cache_suffix(user_id)}.npz"
+        self._lock = threading.RLock()
+        self._loaded_mtime: Optional[float] = None
+        self._reset()
+
+    def _reset(self):
+        self.start_day: Optional[int] = None
+        self.daily_load = np.empty(0, dtype=np.float64)
+        self.ctl = np.empty(0, dtype=np.float64)
+        self.atl = np.empty(0, dtype=np.float64)
+
+    # ===== 持久化 =====
+
+    def _load_from_disk(self) -> bool:
+        """磁盘缓存比内存新时重新加载"""
+        if not self.cache_path.exists():
+            return False
+        mtime = self.cache_path.stat().st_mtime
+        if self._loaded_mtime is not None and mtime <= self._loaded_mtime:
+            return True
+        try:
+            with np.load(self.cache_path) as data:
+                self.start_day = int(data["start_day"])
+                self.daily_load = data["daily_load"].astype(np.float64)
+                self.ctl = data["ctl"].astype(np.float64)
+                self.atl = data["atl"].astype(np.float64)
+            self._loaded_mtime = mtime
+            return True
+        except Exception as e:
+            print(f"训练负荷模型缓存读取失败,将重新计算: {e}")
+            self._reset()
+            self._loaded_mtime = None
+            return False
+
+    def _save_to_disk(self):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix(".tmp.npz")
+            np.savez(
+                tmp_path,
+                start_day=np.int64(self.start_day),
+                daily_load=self.daily_load,
+                ctl=self.ctl,
+                atl=self.atl
+            )
+            os.replace(tmp_path, self.cache_path)
+            self._loaded_mtime = self.cache_path.stat().st_mtime
+        except Exception as e:
+            print(f"训练负荷模型缓存写入失败: {e}")
+
+    # ===== 构建与增量更新 =====
+
+    def is_ready(self) -> bool:
+        """缓存是否可用(必要时从磁盘加载)"""
+        with self._lock:
+            self._load_from_disk()
+            return self.start_day is not None
+
+    def invalidate(self):
+        """清空缓存(内存与磁盘)"""
+        with self._lock:
+            self._reset()
+            self._loaded_mtime = None
+            if self.cache_path.exists():
+                try:
+                    self.cache_path.unlink()
+                except OSError as e:
+                    print(f"删除训练负荷模型缓存失败: {e}")
+
+    def rebuild(self, records: Iterable[Tuple[Any, Any]]):
+        """
+        由完整历史重建缓存
+
+        Args:
+            records: (开始时间, 训练负荷) 可迭代对象
+        """
+        days, loads = aggregate_daily_load(records)
+        with self._lock:
+            self._reset()
+            if days.shape[0] == 0:
+                self.invalidate()
+                return
+            self.start_day = int(days[0])
+            self.daily_load = np.zeros(int(days[-1] - days[0]) + 1, dtype=np.float64)
+            self.daily_load[days - days[0]] = loads
+            self.ctl, self.atl, _, _ = compute_load_model(self.daily_load)
+            self._save_to_disk()
+
+    def apply_increment(self, records: Iterable[Tuple[Any, Any]]):
+        """
+        追加新导入的训练记录,只从受影响的最早日期开始重算
+
+        Args:
+            records: 新增的(开始时间, 训练负荷)记录
+        """
+        days, loads = aggregate_daily_load(records)
+        if days.shape[0] == 0:
+            return
+
+        with self._lock:
+            self._load_from_disk()
+            if self.start_day is None:
+                # 没有基线缓存时无法增量,留待查询时从数据库全量重建
+                return
+
+            # 必要时向前/向后扩展日轴
+            old_end = self.start_day + self.daily_load.shape[0] - 1
+            new_start = min(self.start_day, int(days[0]))
+            new_end = max(self.start_day + self.daily_load.shape[0] - 1, int(days[-1]))
+            if new_start < self.start_day or new_end >= self.start_day + self.daily_load.shape[0]:
+                extended = np.zeros(new_end - new_start + 1, dtype=np.float64)
+                offset = self.start_day - new_start
+                extended[offset:offset + self.daily_load.shape[0]] = self.daily_load
+                ctl = np.zeros_like(extended)
+                atl = np.zeros_like(extended)
+                ctl[offset:offset + self.ctl.shape[0]] = self.ctl
+                atl[offset:offset + self.atl.shape[0]] = self.atl
+                self.daily_load, self.ctl, self.atl = extended, ctl, atl
+                self.start_day = new_start
+
+            positions = days - self.start_day
+            np.add.at(self.daily_load, positions, loads)
+
+            # 新扩展出的日期尚未计算过,需要一并重算
+            first = min(int(positions.min()), old_end + 1 - self.start_day)
+            ctl0 = float(self.ctl[first - 1]) if first > 0 else 0.0
+            atl0 = float(self.atl[first - 1]) if first > 0 else 0.0
+            ctl, atl, _, _ = compute_load_model(self.daily_load[first:], ctl0, atl0)
+            self.ctl[first:] = ctl
+            self.atl[first:] = atl
+            self._save_to_disk()
+
+    # ===== 查询 =====
+
+    def get_series(self, days: int = 42, as_of: Optional[date] = None) -> Dict[str, Any]:
+        """
+        获取截止到as_of(默认今天)的最近N天负荷模型序列
+
+        最后一次训练之后的空白日按无负荷继续衰减,保证"今天"的状态真实
+
+        Args:
+            days: 返回的天数窗口
+            as_of: 截止日期
+
+        Returns:
+            包含latest/series/summary的紧凑字典,缓存为空时返回{}
+        """
+        with self._lock:
+            self._load_from_disk()
+            if self.start_day is None:
+                return {}
+
+            end_day = _to_day_index(as_of or date.today())
+            last_cached = self.start_day + self.daily_load.shape[0] - 1
+            daily_load, ctl, atl = self.daily_load, self.ctl, self.atl
+
+            if end_day > last_cached:
+                gap = end_day - last_cached
+                tail_load = np.zeros(gap, dtype=np.float64)
+                tail_ctl, tail_atl, _, _ = compute_load_model(tail_load, float(ctl[-1]), float(atl[-1]))
+                daily_load = np.concatenate((daily_load, tail_load))
+                ctl = np.concatenate((ctl, tail_ctl))
+                atl = np.concatenate((atl, tail_atl))
+
+            end_pos = end_day - self.start_day
+            if end_pos < 0:
+                return {}
+            start_pos = max(0, end_pos - max(1, int(days)) + 1)
+
+            prev_ctl = np.concatenate(([0.0], ctl[:-1]))
+            prev_atl = np.concatenate(([0.0], atl[:-1]))
+            window = slice(start_pos, end_pos + 1)
+            w_load = daily_load[window]
+            w_ctl = ctl[window]
+            w_atl = atl[window]
+            w_tsb = (prev_ctl - prev_atl)[window]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                w_acwr = np.where(w_ctl > 0, w_atl / w_ctl, np.nan)
+
+        dates = [_from_day_index(self.start_day + p).isoformat() for p in range(start_pos, end_pos + 1)]
+
+        def _round(arr: np.ndarray, ndigits: int = 1) -> List[Optional[float]]:
+            return [None if np.isnan(v) else round(float(v), ndigits) for v in arr]
+
+        acwr_valid = w_acwr[~np.isnan(w_acwr)]
+        latest_acwr = None if np.isnan(w_acwr[-1]) else round(float(w_acwr[-1]), 2)
+
+        return {
+            'latest': {
+                'date': dates[-1],
+                'ctl': round(float(w_ctl[-1]), 1),
+                'atl': round(float(w_atl[-1]), 1),
+                'tsb': round(float(w_tsb[-1]), 1),
+                'acwr': latest_acwr,
+            },
+            'series': {
+                'dates': dates,
+                'daily_load': _round(w_load, 0),
+                'ctl': _round(w_ctl),
+                'atl': _round(w_atl),
+                'tsb': _round(w_tsb),
+                'acwr': _round(w_acwr, 2),
+            },
+            'summary': {
+                'window_days': len(dates),
+                'training_days': int(np.count_nonzero(w_load)),
+                'total_load': round(float(w_load.sum()), 0),
+                'ctl_change': round(float(w_ctl[-1] - w_ctl[0]), 1),
+                'max_acwr': round(float(acwr_valid.max()), 2) if acwr_valid.size else None,
+                'days_acwr_in_sweet_spot': int(np.count_nonzero(
+                    (acwr_valid >= ACWR_SWEET_SPOT[0]) & (acwr_valid <= ACWR_SWEET_SPOT[1])
+                )),
+                'days_acwr_above_danger': int(np.count_nonzero(acwr_valid > ACWR_DANGER_ZONE)),
+                'min_tsb': round(float(w_tsb.min()), 1),
+            },
+            'parameters': {
+                'ctl_time_constant': CTL_TIME_CONSTANT,
+                'atl_time_constant': ATL_TIME_CONSTANT,
+                'history_start': _from_day_index(self.start_day).isoformat(),
+            }
+        }
+
+
+# 全局缓存实例 (按数据源和用户区分)
+_caches: Dict[Tuple[str, str], TrainingLoadModelCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_load_model_cache(data_source: str = "garmin", user_id: str = DEFAULT_USER_ID) -> TrainingLoadModelCache:
+    """获取指定数据源、指定用户的训练负荷模型缓存单例"""
+    key = (data_source, user_id)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = TrainingLoadModelCache(data_source, user_id=user_id)
+        return _caches[key]
+
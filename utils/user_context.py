@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+当前用户上下文
+训练数据按user_id隔离,用户标识的传递链路:
+Flask会话(session['user_id']) -> 引擎URL参数(user_id) -> Agent配置 -> BaseTrainingDataSearch
+
+- Flask请求内通过 get_request_user_id() 读取会话中的用户
+- 非Web场景(脚本、基准测试)可用 user_scope() 临时切换当前用户
+- 未指定用户时使用 DEFAULT_USER_ID,与单用户部署的历史数据保持兼容
+- 会话用户只能在 config.ALLOW_USER_SWITCH 开启时切换(默认关闭,本项目没有登录认证)
+"""
+
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+DEFAULT_USER_ID = 'default_user'
+
+# Flask会话中保存用户标识的键
+SESSION_USER_KEY = 'user_id'
+
+# 用户标识只允许字母、数字和 _ . @ -,长度与user_id列(String(64))一致
+_USER_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.@-]{1,64}$')
+
+_current_user_id: ContextVar[Optional[str]] = ContextVar('training_user_id', default=None)
+
+
+def normalize_user_id(user_id: Optional[str]) -> str:
+    """
+    校验并规范化用户标识
+
+    Args:
+        user_id: 用户标识,为空时返回默认用户
+
+    Raises:
+        ValueError: 用户标识包含非法字符或超长
+    """
+    if user_id is None:
+        return DEFAULT_USER_ID
+    user_id = str(user_id).strip()
+    if not user_id:
+        return DEFAULT_USER_ID
+    if not _USER_ID_PATTERN.match(user_id):
+        raise ValueError(f"用户标识不合法: {user_id!r} (只允许字母、数字和 _ . @ -,最长64位)")
+    return user_id
+
+
+def get_current_user_id() -> str:
+    """获取当前上下文的用户标识,Flask请求内优先读取会话"""
+    user_id = _current_user_id.get()
+    if user_id is not None:
+        return user_id
+    return get_request_user_id()
+
+
+@contextmanager
+def user_scope(user_id: Optional[str]):
+    """在with块内把当前用户切换为user_id"""
+    token = _current_user_id.set(normalize_user_id(user_id))
+    try:
+        yield
+    finally:
+        _current_user_id.reset(token)
+
+
+def get_request_user_id() -> str:
+    """读取Flask会话中的用户标识,不在请求上下文或会话未设置时返回默认用户"""
+    try:
+        from flask import has_request_context, session
+    except ImportError:
+        return DEFAULT_USER_ID
+    if not has_request_context():
+        return DEFAULT_USER_ID
+    try:
+        return normalize_user_id(session.get(SESSION_USER_KEY))
+    except ValueError:
+        return DEFAULT_USER_ID
+
+
+def is_user_switch_allowed() -> bool:
+    """是否允许切换会话用户(config.ALLOW_USER_SWITCH,默认关闭)"""
+    try:
+        import config
+    except ImportError:
+        return False
+    return bool(getattr(config, 'ALLOW_USER_SWITCH', False))
+
+
+def set_request_user_id(user_id: Optional[str]) -> str:
+    """把用户标识写入Flask会话,返回规范化后的值"""
+    from flask import session
+    user_id = normalize_user_id(user_id)
+    session[SESSION_USER_KEY] = user_id
+    return user_id
+
+
+def user_cache_suffix(user_id: Optional[str]) -> str:
+    """
+    派生缓存文件名的用户后缀
+
+    默认用户返回空字符串,保持单用户部署已有缓存文件名不变
+    """
+    user_id = normalize_user_id(user_id)
+    return '' if user_id == DEFAULT_USER_ID else f"_u_{user_id}"